@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark the shared header-only metadata reader against the Pillow-based
+readers it replaced.
+
+Usage: python bench_metadata.py [image_count]
+"""
+
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from PIL import ExifTags, Image
+from PIL.TiffImagePlugin import IFDRational
+
+sys.path.insert(0, str(Path(__file__).parent / "python"))
+
+from common import read_metadata
+
+
+def make_images(folder: Path, count: int) -> list:
+    exif = Image.Exif()
+    exif[0x010F], exif[0x0110] = "DJI", "FC6310"
+    exif.get_ifd(0x8769)[0x9003] = "2024:05:01 10:20:30"
+    exif.get_ifd(0x8825).update({
+        1: "N", 2: (IFDRational(25), IFDRational(12), IFDRational(3456, 100)),
+        3: "E", 4: (IFDRational(55), IFDRational(16), IFDRational(789, 100)),
+        6: IFDRational(12050, 100),
+    })
+    source = folder / "source.jpg"
+    # Drone-like payload: a few MB of incompressible pixels
+    Image.frombytes("RGB", (1600, 1200), bytes(range(256)) * (1600 * 1200 * 3 // 256)).save(source, exif=exif, quality=95)
+    data = source.read_bytes()
+    paths = []
+    for i in range(count):
+        path = folder / f"IMG_{i:05d}.jpg"
+        path.write_bytes(data)
+        paths.append(path)
+    return paths
+
+
+def pillow_read(path: Path) -> dict:
+    with Image.open(path) as img:
+        exif = img._getexif() or {}
+        width, height = img.size
+    gps = {ExifTags.GPSTAGS.get(k, k): v for k, v in (exif.get(34853) or {}).items()}
+    return {"gps": gps, "width": width, "height": height}
+
+
+def run(label: str, fn, paths: list) -> float:
+    start = time.perf_counter()
+    for path in paths:
+        fn(path)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<12} {elapsed * 1000:8.1f} ms  ({len(paths) / elapsed:8.0f} files/s)")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_images(Path(tmp), count)
+        pillow = run("pillow", pillow_read, paths)
+        header = run("common", read_metadata, paths)
+    print(f"speedup      {pillow / header:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark the peak memory of a large geotagging scan result: one dict per
+image plus the final JSON string, against ImageRecords with streamed JSON.
+
+Each variant runs in its own process so the peak RSS figures don't mix.
+Usage: python bench_records.py [image_count]
+"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent / "python" / "geotagging"))
+
+from image_records import ImageRecords, iter_json
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def fake_images(count: int):
+    for i in range(count):
+        folder = f"/mnt/survey/2024-05-01/flight_{i // 2000:03d}"
+        has_gps = i % 10 != 0
+        yield {
+            "filename": f"DJI_{i:06d}.JPG",
+            "path": f"{folder}/DJI_{i:06d}.JPG",
+            "hasGps": has_gps,
+            "latitude": 25.0 + i * 1e-6 if has_gps else None,
+            "longitude": 55.0 + i * 1e-6 if has_gps else None,
+            "altitude": round(100 + (i % 50) * 0.37, 2) if has_gps else None,
+            "phi": None,
+            "alpha": None,
+            "kappa": None,
+            "writable": True,
+            "exifStatus": "OK" if has_gps else "NO_EXIF",
+            "timestamp": f"2024:05:01 {10 + i // 36000 % 10:02d}:{i // 60 % 60:02d}:{i % 60:02d}",
+            "camera": "DJI FC6310" if i % 3 else "DJI L1",
+            "width": 5472,
+            "height": 3648,
+        }
+
+
+def run_dicts(count: int) -> None:
+    images = list(fake_images(count))
+    text = json.dumps({"images": images, "stats": {"total": len(images)}}, ensure_ascii=False)
+    with open(os.devnull, "w", encoding="utf-8") as out:
+        out.write(text)
+
+
+def run_records(count: int) -> None:
+    images = ImageRecords()
+    images.extend(fake_images(count))
+    with open(os.devnull, "w", encoding="utf-8") as out:
+        for chunk in iter_json({"images": images, "stats": images.stats()}, images, ensure_ascii=False):
+            out.write(chunk)
+
+
+def child(variant: str, count: int) -> None:
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    (run_dicts if variant == "dicts" else run_records)(count)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({"peak": peak_rss_mb() - baseline, "seconds": elapsed}))
+
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--child":
+        child(sys.argv[2], int(sys.argv[3]))
+        return
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    results = {}
+    for variant in ("dicts", "records"):
+        proc = subprocess.run([sys.executable, __file__, "--child", variant, str(count)],
+                              capture_output=True, text=True, check=True)
+        results[variant] = json.loads(proc.stdout)
+        print(f"{variant:<8} peak +{results[variant]['peak']:8.1f} MB  {results[variant]['seconds']:6.2f} s  ({count} images)")
+    print(f"reduction {results['dicts']['peak'] / max(results['records']['peak'], 0.1):7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -108,7 +108,26 @@ const SCRIPT_MAP = {
   'map:group': 'mapOrganizer/group_images.py',
   'map:copy-selected': 'mapOrganizer/copy_selected.py',
   'map:load': 'mapOrganizer/map_loader.py',
-  'map:export-images': 'mapOrganizer/export_images.py'
+  'map:export-images': 'mapOrganizer/export_images.py',
+  'map:thumbnails': 'mapOrganizer/thumbnails.py',
+  'map:find-duplicates': 'mapOrganizer/find_duplicates.py',
+  'catalog:index': 'mapOrganizer/index_catalog.py',
+  'catalog:query': 'mapOrganizer/index_catalog.py',
+  'map:import-boundaries': 'mapOrganizer/import_boundaries.py',
+  'map:footprints': 'mapOrganizer/footprints.py',
+  'map:coverage': 'mapOrganizer/flight_coverage.py'
+};
+
+// The image catalog the UI indexes into (catalog:index) and every script reads
+const getCatalogPath = () => path.join(app.getPath('userData'), 'catalog.sqlite');
+
+// Resolve a script's "catalog" option to the app catalog: true, or unset once
+// a catalog has been indexed, means getCatalogPath(); false and paths stay
+const withCatalog = (payload = {}) => {
+  const { catalog } = payload;
+  if (catalog === false || typeof catalog === 'string') return payload;
+  if (catalog !== true && !fs.existsSync(getCatalogPath())) return payload;
+  return { ...payload, catalog: getCatalogPath() };
 };
 
 const getPythonExecutable = () => {
@@ -344,6 +363,61 @@ const runRenamer = (event, channel, payload) =>
       .catch(reject);
   });
 
+// Python jobs emit progress/heartbeat lines while they work, so a job is only
+// considered stuck after this long without any output (not after a fixed runtime)
+const JOB_IDLE_TIMEOUT_MS = 20000;
+// Time a job gets to flush its partial result after a cancel request
+const JOB_CANCEL_GRACE_MS = 5000;
+
+// Running child processes by IPC channel, so a job can be cancelled
+const activeJobs = new Map();
+
+const trackJob = (channel, child) => {
+  if (!channel) return () => {};
+  activeJobs.set(channel, child);
+  return () => {
+    if (activeJobs.get(channel) === child) activeJobs.delete(channel);
+  };
+};
+
+// Ask a job to stop: a "cancel" line on stdin (works on Windows, where kill()
+// cannot be caught), then SIGTERM, and a hard kill if it still does not exit
+const requestCancel = (child) => {
+  if (!child || child.exitCode !== null || child.killed) return;
+  try {
+    if (child.stdin && child.stdin.writable) child.stdin.write('cancel\n');
+  } catch (_e) {
+    // ignore
+  }
+  const term = setTimeout(() => {
+    try {
+      child.kill('SIGTERM');
+    } catch (_e) {
+      // ignore
+    }
+    const kill = setTimeout(() => {
+      try {
+        child.kill('SIGKILL');
+      } catch (_e) {
+        // ignore
+      }
+    }, JOB_CANCEL_GRACE_MS);
+    child.once('close', () => clearTimeout(kill));
+  }, JOB_CANCEL_GRACE_MS);
+  child.once('close', () => clearTimeout(term));
+};
+
+// Calls onIdle after idleMs without a touch(); touch() on every output chunk
+const createIdleWatchdog = (idleMs, onIdle) => {
+  let timer = null;
+  const touch = () => {
+    clearTimeout(timer);
+    timer = setTimeout(onIdle, idleMs);
+  };
+  touch();
+  return { touch, clear: () => clearTimeout(timer) };
+};
+
 const runBundledToolOrPython = ({
   exeName,
   args = [],
@@ -353,21 +427,22 @@ const runBundledToolOrPython = ({
   event,
   channel,
   progressChannelOverride,
-  timeoutMs = 20000
+  timeoutMs = JOB_IDLE_TIMEOUT_MS
 }) =>
   new Promise((resolve, reject) => {
-    const timer = setTimeout(() => reject(new Error(`${exeName} timeout after ${timeoutMs}ms`)), timeoutMs);
-    const settle = (fn) => (value) => {
-      clearTimeout(timer);
-      fn(value);
-    };
-
     const exePath = getBundledExe(exeName);
     if (exePath) {
       logToFile(`[Runner] Using packaged exe ${exeName} at ${exePath} args=${JSON.stringify(args)}`);
       const child = spawn(exePath, args, { windowsHide: true, shell: false, stdio: ['pipe', 'pipe', 'pipe'] });
+      const untrack = trackJob(channel || exeName, child);
       let stdout = '';
       let stderr = '';
+      let idle = false;
+      const watchdog = createIdleWatchdog(timeoutMs, () => {
+        idle = true;
+        logToFile(`[Runner] ${exeName} silent for ${timeoutMs}ms, cancelling`);
+        requestCancel(child);
+      });
 
       if (stdinPayload) {
         child.stdin.write(stdinPayload);
@@ -375,28 +450,36 @@ const runBundledToolOrPython = ({
       }
 
       child.stdout.on('data', (data) => {
+        watchdog.touch();
         stdout += data.toString();
       });
       child.stderr.on('data', (data) => {
+        watchdog.touch();
         stderr += data.toString();
       });
-      child.on('error', settle((err) => {
+      child.on('error', (err) => {
+        watchdog.clear();
+        untrack();
         reject(new Error(`Failed to start ${exeName}.exe: ${err.message}`));
-      }));
-      child.on('close', settle((code) => {
+      });
+      child.on('close', (code) => {
+        watchdog.clear();
+        untrack();
+        // A cancelled job exits cleanly with its partial result
         if (code !== 0) {
-          reject(new Error(`${exeName}.exe exited with code ${code}${stderr ? `: ${stderr.trim()}` : ''}`));
+          const reason = idle ? `no output for ${timeoutMs}ms` : `exited with code ${code}`;
+          reject(new Error(`${exeName}.exe ${reason}${stderr ? `: ${stderr.trim()}` : ''}`));
           return;
         }
         resolve({ stdout: stdout.trim(), stderr: stderr.trim() });
-      }));
+      });
       return;
     }
 
     // Dev or python fallback: run python script
     runPythonScript(event, channel, relativeScript, payload, progressChannelOverride, timeoutMs)
-      .then(settle(resolve))
-      .catch(settle(reject));
+      .then(resolve)
+      .catch(reject);
   });
 
 const parseJsonFromOutput = (text) => {
@@ -444,7 +527,7 @@ const runPythonScript = (
   relativeScript,
   payload = {},
   progressChannelOverride,
-  timeoutMs = 20000
+  timeoutMs = JOB_IDLE_TIMEOUT_MS
 ) =>
   new Promise((resolve, reject) => {
     const scriptPath = resolveScriptPath(relativeScript);
@@ -462,18 +545,19 @@ const runPythonScript = (
 
     let stdout = '';
     let stderr = '';
+    let idle = false;
     const progressChannel = progressChannelOverride || `${channel}:progress`;
+    const untrack = trackJob(channel || relativeScript, child);
 
-    const timer = setTimeout(() => {
-      try {
-        child.kill('SIGTERM');
-      } catch (_e) {
-        // ignore
-      }
-      reject(new Error(`${relativeScript} timed out after ${timeoutMs}ms`));
-    }, timeoutMs);
+    // Progress lines double as a heartbeat; only a silent script is cancelled
+    const watchdog = createIdleWatchdog(timeoutMs, () => {
+      idle = true;
+      logToFile(`[Runner] ${relativeScript} silent for ${timeoutMs}ms, cancelling`);
+      requestCancel(child);
+    });
 
     child.stdout.on('data', (data) => {
+      watchdog.touch();
       const text = data.toString();
       stdout += text;
       const lines = text.split(/\r?\n/).filter(Boolean);
@@ -490,17 +574,24 @@ const runPythonScript = (
     });
 
     child.stderr.on('data', (data) => {
+      watchdog.touch();
       stderr += data.toString();
     });
 
     child.on('error', (err) => {
-      clearTimeout(timer);
+      watchdog.clear();
+      untrack();
       reject(new Error(`Failed to start Python script: ${err.message}`));
     });
 
     child.on('close', (code) => {
-      clearTimeout(timer);
+      watchdog.clear();
+      untrack();
       if (code !== 0) {
+        if (idle) {
+          reject(new Error(`${relativeScript} produced no output for ${timeoutMs}ms`));
+          return;
+        }
         reject(
           new Error(
             `Python script exited with code ${code}. Stderr: ${stderr || 'n/a'}`
@@ -916,7 +1007,11 @@ const registerIpcHandlers = () => {
   ipcMain.handle('dialog:save-csv', async () => {
     const result = await dialog.showSaveDialog({
       title: 'Save GPS CSV',
-      filters: [{ name: 'CSV', extensions: ['csv'] }],
+      filters: [
+        { name: 'CSV', extensions: ['csv'] },
+        { name: 'GeoJSON', extensions: ['geojson'] },
+        { name: 'KML', extensions: ['kml'] }
+      ],
       defaultPath: path.join(app.getPath('documents'), 'geotag.csv')
     });
     if (result.canceled || !result.filePath) {
@@ -1097,13 +1192,14 @@ const registerIpcHandlers = () => {
       return { ok: false, error: 'Folder path is required' };
     }
 
-    const args = [JSON.stringify({ ...payload, folder })];
+    const extractPayload = withCatalog({ ...payload, folder });
+    const args = [JSON.stringify(extractPayload)];
     try {
       const result = await runBundledToolOrPython({
         exeName: 'extract_gps',
         args,
         relativeScript: 'geotagging/extract_gps.py',
-        payload: { ...payload, folder },
+        payload: extractPayload,
         event,
         channel: 'geotag:extract',
         progressChannelOverride: 'geotag:progress'
@@ -1126,19 +1222,30 @@ const registerIpcHandlers = () => {
     }
   });
 
+  // Cancel a running job by its IPC channel; the job resolves with its partial result
+  ipcMain.handle('job:cancel', async (_event, payload = {}) => {
+    const child = activeJobs.get(payload.channel);
+    if (!child) {
+      return { ok: false, error: 'No running job for this channel' };
+    }
+    requestCancel(child);
+    return { ok: true };
+  });
+
   ipcMain.handle('geotag:write', async (_event, payload = {}) => {
     const folder = payload.folder || payload.path;
     const csvPath = payload.csv || payload.csvPath;
     if (!folder || !csvPath) {
       return { ok: false, error: 'Folder and CSV path are required' };
     }
-    const args = [JSON.stringify({ ...payload, folder, csv: csvPath, csvPath })];
+    const writePayload = withCatalog({ ...payload, folder, csv: csvPath, csvPath });
+    const args = [JSON.stringify(writePayload)];
     try {
       const result = await runBundledToolOrPython({
         exeName: 'write_gps',
         args,
         relativeScript: 'geotagging/write_gps.py',
-        payload: { ...payload, folder, csv: csvPath }
+        payload: writePayload
       });
       const rawOutput = typeof result?.stdout === 'string' ? result.stdout : result;
       const parsed =
@@ -1170,7 +1277,7 @@ const registerIpcHandlers = () => {
 
       if (app.isPackaged) {
         const exePath = getBundledExe('extract_gps');
-        const scanPayload = { ...payload, folder, mode: 'scan' };
+        const scanPayload = withCatalog({ ...payload, folder, mode: 'scan' });
         const args = [JSON.stringify(scanPayload)];
         logToFile(
           `[GeoTag] Running packaged extract_gps.exe: ${exePath || 'not found'} args=${JSON.stringify(args)}`
@@ -1213,7 +1320,7 @@ const registerIpcHandlers = () => {
         event,
         'geotag:auto-scan',
         SCRIPT_MAP['geotag:auto-scan'],
-        { ...payload, mode: 'scan' },
+        withCatalog({ ...payload, mode: 'scan' }),
         'geotag:scan-progress'
       );
       const normalizedDev = normalizeScanResult(response);
@@ -1237,10 +1344,13 @@ const registerIpcHandlers = () => {
     ipcMain.handle('geotag:scan-images', handleAutoScan);
   }
 
+  // The renamer takes its catalog option under payload.options
+  const withRenamerCatalog = (payload = {}) => ({ ...payload, options: withCatalog(payload?.options || {}) });
+
   // Flight renamer: preview
   ipcMain.handle('renamer:preview', async (event, payload) => {
     try {
-      const response = await runRenamer(event, 'renamer:preview', payload);
+      const response = await runRenamer(event, 'renamer:preview', withRenamerCatalog(payload));
       return { ok: true, data: response };
     } catch (err) {
       return {
@@ -1254,7 +1364,7 @@ const registerIpcHandlers = () => {
   // Flight renamer: execute
   ipcMain.handle('renamer:execute', async (event, payload) => {
     try {
-      const response = await runRenamer(event, 'renamer:execute', payload);
+      const response = await runRenamer(event, 'renamer:execute', withRenamerCatalog(payload));
       return { ok: true, data: response };
     } catch (err) {
       return {
@@ -1268,7 +1378,7 @@ const registerIpcHandlers = () => {
   // Flight renamer: undo
   ipcMain.handle('renamer:undo', async (event, payload) => {
     try {
-      const response = await runRenamer(event, 'renamer:undo', payload);
+      const response = await runRenamer(event, 'renamer:undo', withRenamerCatalog(payload));
       return { ok: true, data: response };
     } catch (err) {
       return {
@@ -1302,7 +1412,7 @@ const registerIpcHandlers = () => {
     return null;
   };
 
-  const runMapLoaderProcess = (folder) =>
+  const runMapLoaderProcess = (folder, options = {}) =>
     new Promise((resolve) => {
       const exePath = resolveMapLoaderExecutable();
       if (!exePath) {
@@ -1311,7 +1421,7 @@ const registerIpcHandlers = () => {
         return;
       }
 
-      const args = [folder];
+      const args = Object.keys(options).length ? [folder, JSON.stringify(options)] : [folder];
       logToFile(`[MapLoad] exe=${exePath} args=${JSON.stringify(args)}`);
 
       try {
@@ -1346,7 +1456,11 @@ const registerIpcHandlers = () => {
 
           if (trimmedStdout) {
             try {
-              const parsed = JSON.parse(trimmedStdout);
+              // Progress lines may precede the final JSON payload
+              const parsed = parseJsonFromOutput(trimmedStdout);
+              if (!parsed) {
+                throw new Error('no JSON payload found');
+              }
               logToFile(`[MapLoad] parsed=${JSON.stringify(parsed)}`);
 
               if (Array.isArray(parsed.images)) {
@@ -1388,14 +1502,121 @@ const registerIpcHandlers = () => {
       return { ok: false, error: 'Folder path is required' };
     }
 
+    const options = {};
+    if (payload.recursive !== undefined) options.recursive = Boolean(payload.recursive);
+    if (payload.workers !== undefined) options.workers = payload.workers;
+    const { catalog } = withCatalog({ catalog: payload.catalog });
+    if (catalog !== undefined) options.catalog = catalog;
+
     try {
-      const response = await runMapLoaderProcess(folder);
+      const response = await runMapLoaderProcess(folder, options);
       return response;
     } catch (err) {
       return { ok: false, error: err?.message || 'Map loading failed' };
     }
   });
   
+  // Preview thumbnails for map popups and geotag tables; cached under userData
+  ipcMain.handle('map:thumbnails', async (event, payload = {}) => {
+    const paths = Array.isArray(payload.paths) ? payload.paths : null;
+    if (!paths && !payload.folder) {
+      return { ok: false, error: 'paths[] or folder is required' };
+    }
+
+    // Progress lines double as the heartbeat the idle watchdog waits for
+    const thumbPayload = {
+      ...payload,
+      progress: true,
+      cacheDir: payload.cacheDir || path.join(app.getPath('userData'), 'thumbnails')
+    };
+    try {
+      const result = await runBundledToolOrPython({
+        exeName: 'thumbnails',
+        args: [JSON.stringify(thumbPayload)],
+        relativeScript: SCRIPT_MAP['map:thumbnails'],
+        payload: thumbPayload,
+        event,
+        channel: 'map:thumbnails'
+      });
+      const parsed = typeof result?.stdout === 'string' ? parseJsonFromOutput(result.stdout) : result;
+      if (!parsed) {
+        return { ok: false, error: 'No output received from thumbnails' };
+      }
+      if (parsed.error) {
+        return { ok: false, error: parsed.error };
+      }
+      return { ok: true, data: parsed };
+    } catch (err) {
+      return { ok: false, error: err?.message || 'Thumbnail generation failed' };
+    }
+  });
+
+  // Content duplicates (e.g. a card copied twice) so exports and renames can skip them
+  ipcMain.handle('map:find-duplicates', async (event, payload = {}) => {
+    if (!Array.isArray(payload.paths) && !payload.folder) {
+      return { ok: false, error: 'paths[] or folder is required' };
+    }
+
+    const dupPayload = {
+      ...payload,
+      hashCache: payload.hashCache ?? path.join(app.getPath('userData'), 'hash-cache.json')
+    };
+    try {
+      const result = await runBundledToolOrPython({
+        exeName: 'find_duplicates',
+        args: [JSON.stringify(dupPayload)],
+        relativeScript: SCRIPT_MAP['map:find-duplicates'],
+        payload: dupPayload,
+        event,
+        channel: 'map:find-duplicates'
+      });
+      const parsed = typeof result?.stdout === 'string' ? parseJsonFromOutput(result.stdout) : result;
+      if (!parsed) {
+        return { ok: false, error: 'No output received from find_duplicates' };
+      }
+      if (parsed.error) {
+        return { ok: false, error: parsed.error };
+      }
+      return { ok: true, data: parsed };
+    } catch (err) {
+      return { ok: false, error: err?.message || 'Duplicate detection failed' };
+    }
+  });
+
+  // Image catalog: "index" stores folder metadata once, "query" answers
+  // time / bbox / camera / folder lookups without touching the files
+  for (const [channel, mode] of [['catalog:index', 'index'], ['catalog:query', 'query']]) {
+    ipcMain.handle(channel, async (event, payload = {}) => {
+      const catalogPayload = {
+        ...payload,
+        mode,
+        // Progress lines double as the heartbeat the idle watchdog waits for
+        progress: true,
+        catalog: payload.catalog || getCatalogPath()
+      };
+      try {
+        const result = await runBundledToolOrPython({
+          exeName: 'index_catalog',
+          args: [JSON.stringify(catalogPayload)],
+          relativeScript: SCRIPT_MAP[channel],
+          payload: catalogPayload,
+          event,
+          channel
+        });
+        const parsed = typeof result?.stdout === 'string' ? parseJsonFromOutput(result.stdout) : result;
+        if (!parsed) {
+          return { ok: false, error: 'No output received from index_catalog' };
+        }
+        if (parsed.error) {
+          return { ok: false, error: parsed.error };
+        }
+        return { ok: true, data: parsed };
+      } catch (err) {
+        return { ok: false, error: err?.message || 'Catalog request failed' };
+      }
+    });
+  }
+
   // Add specific handler for map:copy-selected to handle the three arguments
   ipcMain.handle('map:copy-selected', async (_event, payload = {}) => {
     const { source, destination, filenames } = payload;
@@ -1560,6 +1781,89 @@ const registerIpcHandlers = () => {
     }
   });
   
+  // Boundary import: parse and simplify KML / GeoJSON in Python, off the renderer thread
+  ipcMain.handle('map:import-boundaries', async (event, payload = {}) => {
+    if (!payload?.path) {
+      return { ok: false, error: 'Boundary file path is required' };
+    }
+    try {
+      const result = await runBundledToolOrPython({
+        exeName: 'import_boundaries',
+        args: [JSON.stringify(payload)],
+        relativeScript: SCRIPT_MAP['map:import-boundaries'],
+        payload,
+        event,
+        channel: 'map:import-boundaries'
+      });
+      const parsed = typeof result?.stdout === 'string' ? parseJsonFromOutput(result.stdout) : result;
+      if (!parsed) {
+        return { ok: false, error: 'No output received from import_boundaries' };
+      }
+      if (parsed.error) {
+        return { ok: false, error: parsed.error };
+      }
+      return { ok: true, data: parsed };
+    } catch (err) {
+      return { ok: false, error: err?.message || 'Boundary import failed' };
+    }
+  });
+
+  // Ground footprints (GeoJSON) from GPS altitude and camera orientation
+  ipcMain.handle('map:footprints', async (event, payload = {}) => {
+    if (!Array.isArray(payload.images) && !payload.folder) {
+      return { ok: false, error: 'images[] or folder is required' };
+    }
+    payload = withCatalog(payload);
+    try {
+      const result = await runBundledToolOrPython({
+        exeName: 'footprints',
+        args: [JSON.stringify(payload)],
+        relativeScript: SCRIPT_MAP['map:footprints'],
+        payload,
+        event,
+        channel: 'map:footprints'
+      });
+      const parsed = typeof result?.stdout === 'string' ? parseJsonFromOutput(result.stdout) : result;
+      if (!parsed) {
+        return { ok: false, error: 'No output received from footprints' };
+      }
+      if (parsed.error) {
+        return { ok: false, error: parsed.error };
+      }
+      return { ok: true, data: parsed };
+    } catch (err) {
+      return { ok: false, error: err?.message || 'Footprint computation failed' };
+    }
+  });
+
+  // Coverage / overlap raster, gap polygons and heatmap for flight QA
+  ipcMain.handle('map:coverage', async (event, payload = {}) => {
+    if (!Array.isArray(payload.images) && !payload.folder) {
+      return { ok: false, error: 'images[] or folder is required' };
+    }
+    payload = withCatalog(payload);
+    try {
+      const result = await runBundledToolOrPython({
+        exeName: 'flight_coverage',
+        args: [JSON.stringify(payload)],
+        relativeScript: SCRIPT_MAP['map:coverage'],
+        payload,
+        event,
+        channel: 'map:coverage'
+      });
+      const parsed = typeof result?.stdout === 'string' ? parseJsonFromOutput(result.stdout) : result;
+      if (!parsed) {
+        return { ok: false, error: 'No output received from coverage analysis' };
+      }
+      if (parsed.error) {
+        return { ok: false, error: parsed.error };
+      }
+      return { ok: true, data: parsed };
+    } catch (err) {
+      return { ok: false, error: err?.message || 'Coverage analysis failed' };
+    }
+  });
+
   Object.entries(SCRIPT_MAP).forEach(([channel, script]) => {
     if (
       channel === 'renamer:preview' ||
@@ -1571,7 +1875,14 @@ const registerIpcHandlers = () => {
       channel === 'map:copy-selected' ||
       channel === 'map:load' ||
       channel === 'map:export-images' ||
-      channel === 'export-selected-images'
+      channel === 'export-selected-images' ||
+      channel === 'map:thumbnails' ||
+      channel === 'map:find-duplicates' ||
+      channel === 'catalog:index' ||
+      channel === 'catalog:query' ||
+      channel === 'map:import-boundaries' ||
+      channel === 'map:footprints' ||
+      channel === 'map:coverage'
     ) {
       return; // handled explicitly above
     }
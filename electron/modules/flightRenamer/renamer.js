@@ -331,7 +331,11 @@
       renderPreview();
       if (mode === 'execute') {
         state.lastOutput = data.outputFolder || state.output || state.lastOutput;
-        log(`Copied ${data.copied || 0} of ${data.processed || state.items.length}. Failed: ${data.failed || 0}`, 'success');
+        if (data.renamed !== undefined) {
+          log(`Renamed ${data.renamed} of ${data.processed || state.items.length}. Failed: ${data.failed || 0}`, 'success');
+        } else {
+          log(`Copied ${data.copied || 0} of ${data.processed || state.items.length}. Failed: ${data.failed || 0}`, 'success');
+        }
         showToast('Rename completed', 'success');
         if (Array.isArray(data.errors) && data.errors.length) {
           data.errors.slice(0, 10).forEach((e) => log(`Warning: ${e}`, 'error'));
@@ -349,7 +353,11 @@
           });
         }
       } else if (mode === 'undo') {
-        log(`Undo completed. Removed: ${data.removed || 0}`, 'success');
+        if (data.restored !== undefined) {
+          log(`Undo completed. Restored: ${data.restored}`, 'success');
+        } else {
+          log(`Undo completed. Removed: ${data.removed || 0}`, 'success');
+        }
         showToast('Undo completed', 'success');
         state.renameApplied = false;
         updateButtons();
@@ -579,6 +579,9 @@
       return;
     }
     const csvPath = saveRes.path;
+    // The save dialog also offers GeoJSON and KML; the extension picks the format
+    const ext = csvPath.split('.').pop().toLowerCase();
+    const exportFormat = ext === 'geojson' || ext === 'kml' ? ext : 'csv';
     await withBusy(els.exportCsvBtn, async () => {
       setProgress('Exporting CSV...', '', 30);
       log('Exporting GPS + orientation to CSV...', 'info');
@@ -588,6 +591,7 @@
             folder: state.folder,
             lang: state.lang,
             exportCsv: true,
+            exportFormat,
             csvPath,
             recursive: state.recursive
           }),
@@ -26,7 +26,11 @@
     hoverPopup: null,
     flightPathLayer: null,
     currentPathPoints: [],
-    importedKmlLayers: []
+    importedKmlLayers: [],
+    footprintLayer: null,
+    coverageLayer: null,
+    // Simplification tolerance (metres) for imported boundaries
+    boundaryTolerance: 0.5
   };
 
   // Circle marker styles
@@ -172,7 +176,9 @@
   };
 
   const addKmlPolygon = (latlngs, name = 'KML Polygon') => {
-    if (!latlngs || latlngs.length < 3 || !state.map || !state.drawnItems) return null;
+    // Either a ring of [lat, lng] or [outer ring, ...holes]
+    const outer = Array.isArray(latlngs?.[0]?.[0]) ? latlngs[0] : latlngs;
+    if (!outer || outer.length < 3 || !state.map || !state.drawnItems) return null;
     const color = getNextPolygonColor();
     const layer = L.polygon(latlngs, {
       color,
@@ -207,13 +213,68 @@
     return layer;
   };
 
+  // Draws the compact features returned by python/mapOrganizer/import_boundaries.py
+  const importBoundaryFeatures = (data) => {
+    if (!data || !Array.isArray(data.features) || !state.map) {
+      showToast('No supported geometries found', 'warning');
+      return false;
+    }
+    clearImportedKml();
+    const addedLayers = [];
+    const points = [];
+    data.features.forEach((feature) => {
+      if (feature.type === 'polygon') {
+        const layer = addKmlPolygon(feature.rings, feature.name);
+        if (layer) addedLayers.push(layer);
+      } else if (feature.type === 'path') {
+        const layer = addKmlPath(feature.coordinates, feature.name);
+        if (layer) addedLayers.push(layer);
+      } else if (feature.type === 'point') {
+        const [latitude, longitude] = feature.coordinates;
+        points.push({ filename: feature.name, filepath: feature.path || null, latitude, longitude });
+      }
+    });
+    if (points.length) {
+      addMarkersFromGPSData(points);
+    }
+    if (addedLayers.length) {
+      const [minLng, minLat, maxLng, maxLat] = data.bbox;
+      state.map.fitBounds(L.latLngBounds([minLat, minLng], [maxLat, maxLng]).pad(0.1));
+    }
+    if (!addedLayers.length && !points.length) {
+      showToast('No supported geometries found', 'warning');
+      return false;
+    }
+    return true;
+  };
+
   const importKmlFlow = async () => {
     try {
-      // Let user pick a KML file
+      // Let user pick a KML (or, with the Python importer, GeoJSON) file
       const res = await (window.api?.selectFiles?.() || Promise.resolve({ files: [] }));
-      const filePath = Array.isArray(res?.files) ? res.files.find((p) => p.toLowerCase().endsWith('.kml')) : null;
+      const canImportGeoJson = Boolean(window.api?.importBoundaries);
+      const filePath = Array.isArray(res?.files)
+        ? res.files.find((p) => /\.kml$/i.test(p) || (canImportGeoJson && /\.(geojson|json)$/i.test(p)))
+        : null;
       if (!filePath) {
-        showToast('Please select a KML file', 'warning');
+        showToast(canImportGeoJson ? 'Please select a KML or GeoJSON file' : 'Please select a KML file', 'warning');
+        return;
+      }
+
+      // Large boundary files are parsed and simplified in Python, off the renderer thread
+      if (canImportGeoJson) {
+        const result = await window.api.importBoundaries({
+          path: filePath,
+          tolerance: state.boundaryTolerance,
+          method: 'douglas-peucker'
+        });
+        if (!result || !result.ok) {
+          showToast(result?.error || 'Failed to load boundary file', 'error');
+          return;
+        }
+        if (importBoundaryFeatures(result.data)) {
+          showToast('Boundaries imported successfully', 'success');
+        }
         return;
       }
 
@@ -276,14 +337,135 @@
       if (layer) addedLayers.push(layer);
     });
 
+    // Point placemarks (e.g. a geotagging KML export) become image markers
+    const points = [];
+    Array.from(xml.getElementsByTagName('Placemark')).forEach((placemark) => {
+      const pointNode = placemark.getElementsByTagName('Point')[0];
+      const coordsNode = pointNode?.getElementsByTagName('coordinates')[0];
+      const latlng = parseKmlCoordinates(coordsNode?.textContent)[0];
+      if (!latlng) return;
+      const data = {};
+      Array.from(placemark.getElementsByTagName('Data')).forEach((node) => {
+        const value = node.getElementsByTagName('value')[0];
+        data[node.getAttribute('name')] = value ? value.textContent : '';
+      });
+      const name = placemark.getElementsByTagName('name')[0]?.textContent || data.filename || `Point ${points.length + 1}`;
+      points.push({ filename: name, filepath: data.path || data.filepath || null, latitude: latlng[0], longitude: latlng[1] });
+    });
+    if (points.length) {
+      addMarkersFromGPSData(points);
+    }
+
     if (addedLayers.length) {
       const group = L.featureGroup(addedLayers);
       state.map.fitBounds(group.getBounds().pad(0.1));
-    } else {
+    } else if (!points.length) {
       showToast('No supported KML geometries found', 'warning');
     }
   };
 
+  // Ground footprints from python/mapOrganizer/footprints.py; clicking one toggles its image
+  const toggleFootprints = async () => {
+    if (!state.map) return;
+    if (state.footprintLayer) {
+      state.map.removeLayer(state.footprintLayer);
+      state.footprintLayer = null;
+      return;
+    }
+    if (!state.selectedFolder || !window.api?.computeFootprints) {
+      showToast('Load a folder of images first', 'warning');
+      return;
+    }
+    const result = await window.api.computeFootprints({ folder: state.selectedFolder, recursive: false });
+    if (!result || !result.ok) {
+      showToast(result?.error || 'Failed to compute footprints', 'error');
+      return;
+    }
+    const collection = result.data;
+    if (!collection?.features?.length) {
+      showToast('No footprints: images need GPS altitude and a known camera', 'warning');
+      return;
+    }
+    state.footprintLayer = L.geoJSON(collection, {
+      style: { color: '#0ea5e9', weight: 1, opacity: 0.7, fillOpacity: 0.05 },
+      renderer: state.renderer || state.map?.options?.renderer,
+      onEachFeature: (feature, layer) => {
+        const { filename, filepath } = feature.properties || {};
+        layer.on('click', () => {
+          const marker = state.markers.find((m) => m.options?.filePath === filepath);
+          if (marker) {
+            const { lat, lng } = marker.getLatLng();
+            handleMarkerClick(marker, { lat, lng, filename, filepath });
+          }
+        });
+      }
+    }).addTo(state.map);
+    state.footprintLayer.bringToBack();
+    const skipped = collection.stats.total - collection.stats.footprints;
+    showToast(`${collection.stats.footprints} footprints${skipped ? `, ${skipped} skipped` : ''}`, 'success');
+  };
+
+  // Heatmap colours by number of images seeing a cell: 0 (gap), 1, 2, 3+
+  const coverageColors = [[239, 68, 68], [249, 115, 22], [250, 204, 21], [34, 197, 94]];
+
+  const coverageHeatmapUrl = (heatmap) => {
+    const bytes = Uint8Array.from(atob(heatmap.data), (c) => c.charCodeAt(0));
+    const canvas = document.createElement('canvas');
+    canvas.width = heatmap.cols;
+    canvas.height = heatmap.rows;
+    const ctx = canvas.getContext('2d');
+    const image = ctx.createImageData(heatmap.cols, heatmap.rows);
+    bytes.forEach((value, i) => {
+      if (value === heatmap.noData) return; // outside the survey area: transparent
+      const [r, g, b] = coverageColors[Math.min(value, coverageColors.length - 1)];
+      image.data.set([r, g, b, 255], i * 4);
+    });
+    ctx.putImageData(image, 0, 0);
+    return canvas.toDataURL();
+  };
+
+  // Coverage heatmap and gap polygons from python/mapOrganizer/flight_coverage.py
+  const toggleCoverage = async () => {
+    if (!state.map) return;
+    if (state.coverageLayer) {
+      state.map.removeLayer(state.coverageLayer);
+      state.coverageLayer = null;
+      return;
+    }
+    if (!state.selectedFolder || !window.api?.analyzeCoverage) {
+      showToast('Load a folder of images first', 'warning');
+      return;
+    }
+    const result = await window.api.analyzeCoverage({ folder: state.selectedFolder, recursive: false });
+    if (!result || !result.ok) {
+      showToast(result?.error || 'Failed to analyze coverage', 'error');
+      return;
+    }
+    const report = result.data;
+    if (!report?.heatmap) {
+      showToast('No footprints: images need GPS altitude and a known camera', 'warning');
+      return;
+    }
+    const [west, south, east, north] = report.heatmap.bbox;
+    const heatmapLayer = L.imageOverlay(coverageHeatmapUrl(report.heatmap), [[south, west], [north, east]], {
+      opacity: 0.45
+    });
+    const gapLayer = L.geoJSON(report.gaps, {
+      style: { color: '#b91c1c', weight: 1.5, fillOpacity: 0.15 },
+      renderer: state.renderer || state.map?.options?.renderer,
+      onEachFeature: (feature, layer) => {
+        const { areaM2, maxOverlap } = feature.properties || {};
+        layer.bindTooltip(`${Math.round(areaM2)} m², seen ${maxOverlap}× at most`);
+      }
+    });
+    state.coverageLayer = L.layerGroup([heatmapLayer, gapLayer]).addTo(state.map);
+    const { stats } = report;
+    showToast(
+      `Covered ${stats.coveredPercent}%, ${stats.overlapPercent}% seen ${stats.minOverlap}+ times, ${stats.gapRegions} gaps`,
+      stats.gapRegions ? 'warning' : 'success'
+    );
+  };
+
   const clearFlightPath = () => {
     if (state.flightPathLayer && state.map) {
       state.map.removeLayer(state.flightPathLayer);
@@ -1702,6 +1884,20 @@
         await importKmlFlow();
       });
     }
+
+    if (els.footprintsBtn) {
+      els.footprintsBtn.addEventListener('click', async (e) => {
+        e.preventDefault();
+        await toggleFootprints();
+      });
+    }
+
+    if (els.coverageBtn) {
+      els.coverageBtn.addEventListener('click', async (e) => {
+        e.preventDefault();
+        await toggleCoverage();
+      });
+    }
     
     if (els.clearSelectionBtn) {
       els.clearSelectionBtn.addEventListener('click', (e) => {
@@ -2260,7 +2456,9 @@
       polygonCount: qs('polygonCount'),
       polygonSelectedCount: qs('polygonSelectedCount'),
       polygonHiddenCount: qs('polygonHiddenCount'),
-      importKmlBtn: qs('importKmlBtn')
+      importKmlBtn: qs('importKmlBtn'),
+      footprintsBtn: qs('footprintsBtn'),
+      coverageBtn: qs('coverageBtn')
     });
 
     initLang();
@@ -29,9 +29,17 @@ contextBridge.exposeInMainWorld('api', {
   copySelectedImages: (payload) => safeInvoke('map:copy-selected', payload),
   exportImages: (payload) => safeInvoke('map:export-images', payload),
   mapLoader: (payload) => safeInvoke('map:load', payload),
+  getThumbnails: (payload) => safeInvoke('map:thumbnails', payload),
+  findDuplicates: (payload) => safeInvoke('map:find-duplicates', payload),
+  indexCatalog: (payload) => safeInvoke('catalog:index', payload),
+  queryCatalog: (payload) => safeInvoke('catalog:query', payload),
   importKml: (payload) => safeInvoke('map:import-kml', payload),
+  importBoundaries: (payload) => safeInvoke('map:import-boundaries', payload),
+  computeFootprints: (payload) => safeInvoke('map:footprints', payload),
+  analyzeCoverage: (payload) => safeInvoke('map:coverage', payload),
   changeLanguage: (locale) => safeInvoke('i18n:set-language', { locale }),
   openFolder: (path) => safeInvoke('open-folder', { path }),
+  cancelJob: (channel) => safeInvoke('job:cancel', { channel }),
   onGeotagProgress: (handler) => onChannel('geotag:progress', handler),
   onScanProgress: (handler) => onChannel('geotag:scan-progress', handler),
   onScanComplete: (handler) => onChannel('geotag:scan-complete', handler),
@@ -46,6 +54,10 @@ contextBridge.exposeInMainWorld('electronAPI', {
   copySelectedImages: (payload) => safeInvoke('map:copy-selected', payload),
   exportImages: (payload) => safeInvoke('map:export-images', payload),
   mapLoader: (payload) => safeInvoke('map:load', payload),
+  getThumbnails: (payload) => safeInvoke('map:thumbnails', payload),
+  findDuplicates: (payload) => safeInvoke('map:find-duplicates', payload),
+  indexCatalog: (payload) => safeInvoke('catalog:index', payload),
+  queryCatalog: (payload) => safeInvoke('catalog:query', payload),
   openFolder: (path) => safeInvoke('open-folder', { path })
 });
 
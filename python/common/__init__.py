@@ -0,0 +1,38 @@
+"""
+Shared metadata core for the Shamal Tools Python scripts.
+
+Scripts put the python/ folder on sys.path and import from here, so every
+module reads EXIF, converts GPS values and walks folders the same way.
+"""
+
+from .exif import (
+    HEADER_BUDGET,
+    UnsupportedFormat,
+    capture_time,
+    header_budget,
+    parse_tiff,
+    read_exif,
+    read_header,
+    read_thumbnail,
+)
+from .gps import dms_to_decimal, rational_to_float
+from .metadata import gps_altitude, gps_position, read_metadata, read_tags
+from .walk import iter_image_files
+
+__all__ = [
+    "HEADER_BUDGET",
+    "UnsupportedFormat",
+    "capture_time",
+    "dms_to_decimal",
+    "gps_altitude",
+    "gps_position",
+    "header_budget",
+    "iter_image_files",
+    "parse_tiff",
+    "rational_to_float",
+    "read_exif",
+    "read_header",
+    "read_metadata",
+    "read_tags",
+    "read_thumbnail",
+]
@@ -0,0 +1,188 @@
+"""
+Asyncio scheduler for file system calls on high-latency mounts.
+
+On SMB/NFS shares every stat, directory listing and open costs a network
+round trip, so a script that issues them one after another spends most of
+its time waiting. IOScheduler runs such calls concurrently: an event loop in
+a background thread hands each blocking call to a thread pool, gated by one
+semaphore per mount point, so every mount gets its own concurrency limit
+(a NAS can take 32 requests in flight while a USB disk stays at 4).
+
+The scripts stay synchronous. They use the blocking helpers:
+
+- walk(): the same files in the same order as common.walk.iter_image_files(),
+  with all subfolders of a level listed concurrently;
+- imap() / map(): apply a function to many paths, results in input order;
+- submit(): a single call as a concurrent.futures.Future.
+
+Scripts create one with open_scheduler(options) from the "ioConcurrency"
+(default limit per mount) and "mountConcurrency" ({mount path: limit})
+options; without them everything runs serially as before.
+"""
+
+import asyncio
+import os
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Collection, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .walk import list_folder
+
+DEFAULT_CONCURRENCY = 8
+# Threads are only started on demand; the semaphores decide real concurrency
+MAX_THREADS = 128
+
+
+def _folder_of(path: str) -> str:
+    if path.endswith(os.sep):
+        return os.path.normcase(os.path.abspath(path))
+    return os.path.normcase(os.path.dirname(os.path.abspath(path)))
+
+
+class IOScheduler:
+    """
+    Runs blocking file system calls concurrently with per-mount limits.
+    Use as a context manager (or call close()) so the loop thread stops.
+    """
+
+    def __init__(self, concurrency: int = DEFAULT_CONCURRENCY, mounts: Optional[Dict[str, int]] = None):
+        self.concurrency = max(1, int(concurrency))
+        self.mounts = {
+            os.path.normcase(os.path.abspath(path)): max(1, int(limit)) for path, limit in (mounts or {}).items()
+        }
+        self._mount_cache: Dict[str, str] = {}
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._executor = ThreadPoolExecutor(max_workers=MAX_THREADS, thread_name_prefix="io")
+        self._loop = asyncio.new_event_loop()
+        self._loop.set_default_executor(self._executor)
+        self._thread = threading.Thread(target=self._loop.run_forever, name="io-scheduler", daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        if self._loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(self._cancel_all(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self) -> "IOScheduler":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    async def _cancel_all(self) -> None:
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Mounts
+
+    def mount_of(self, path: str) -> str:
+        """
+        Mount point holding path: a configured mount when path is under one,
+        otherwise the nearest ancestor folder for which os.path.ismount() is
+        true. Cached per folder; a trailing separator marks path as a folder.
+        """
+        folder = _folder_of(path)
+        cached = self._mount_cache.get(folder)
+        if cached is not None:
+            return cached
+        configured = [m for m in self.mounts if folder == m or folder.startswith(m.rstrip(os.sep) + os.sep)]
+        if configured:
+            mount = max(configured, key=len)
+        else:
+            mount = folder
+            while not os.path.ismount(mount):
+                parent = os.path.dirname(mount)
+                if parent == mount:
+                    break
+                mount = parent
+        self._mount_cache[folder] = mount
+        return mount
+
+    def limit(self, mount: str) -> int:
+        return self.mounts.get(mount, self.concurrency)
+
+    # Scheduling
+
+    async def call(self, path: str, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run fn(*args) on the thread pool once path's mount has a free slot.
+        """
+        loop = asyncio.get_running_loop()
+        mount = self._mount_cache.get(_folder_of(path))
+        if mount is None:
+            # Finding the mount point stats the folder's ancestors once
+            mount = await loop.run_in_executor(None, self.mount_of, path)
+        semaphore = self._semaphores.get(mount)
+        if semaphore is None:
+            semaphore = self._semaphores[mount] = asyncio.Semaphore(self.limit(mount))
+        async with semaphore:
+            return await loop.run_in_executor(None, fn, *args)
+
+    def submit(self, path: str, fn: Callable[..., Any], *args: Any) -> Future:
+        return asyncio.run_coroutine_threadsafe(self.call(path, fn, *args), self._loop)
+
+    def imap(self, fn: Callable[[Any], Any], items: Iterable[Any], path_of: Callable[[Any], str] = str,
+             window: Optional[int] = None) -> Iterator[Any]:
+        """
+        Yield fn(item) for every item, in input order, with up to `window`
+        calls queued ahead. Closing the generator early cancels queued calls.
+        """
+        window = window or self.concurrency * 4
+        pending: deque = deque()
+        try:
+            for item in items:
+                pending.append(self.submit(path_of(item), fn, item))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def map(self, fn: Callable[[Any], Any], items: Iterable[Any], path_of: Callable[[Any], str] = str) -> List[Any]:
+        return list(self.imap(fn, items, path_of))
+
+    # Walking
+
+    async def _walk(self, folder: str, extensions: Collection[str], recursive: bool) -> List[Tuple[str, str]]:
+        files, subfolders = await self.call(os.path.join(folder, ""), list_folder, folder, extensions, recursive)
+        if subfolders:
+            nested = await asyncio.gather(*(self._walk(sub, extensions, recursive) for sub in subfolders))
+            for sub_files in nested:
+                files.extend(sub_files)
+        return files
+
+    def walk(self, folder: str, extensions: Collection[str], recursive: bool = False) -> List[Tuple[str, str]]:
+        """
+        (filename, filepath) pairs in common.walk.iter_image_files() order.
+        """
+        return asyncio.run_coroutine_threadsafe(self._walk(folder, extensions, recursive), self._loop).result()
+
+
+def open_scheduler(options: Dict[str, Any]) -> Optional[IOScheduler]:
+    """
+    IOScheduler for a script's options, or None when neither
+    "ioConcurrency" (above 1) nor "mountConcurrency" is given.
+    """
+    try:
+        concurrency = int(options.get("ioConcurrency") or 0)
+    except (TypeError, ValueError):
+        concurrency = 0
+    mounts = options.get("mountConcurrency")
+    if not isinstance(mounts, dict):
+        mounts = {}
+    try:
+        mounts = {str(path): int(limit) for path, limit in mounts.items()}
+    except (TypeError, ValueError):
+        mounts = {}
+    if concurrency <= 1 and not mounts:
+        return None
+    return IOScheduler(concurrency if concurrency > 1 else DEFAULT_CONCURRENCY, mounts)
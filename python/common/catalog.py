@@ -0,0 +1,437 @@
+"""
+Local SQLite catalog of image metadata.
+
+Every module used to walk and decode the same folders on its own. The
+catalog keeps one row per image file (path, size, mtime) and its header
+metadata, filled by Catalog.index() (see mapOrganizer/index_catalog.py),
+so later runs can:
+
+- look metadata up by path instead of decoding the header (lookup());
+  an entry is only used while the file's size and mtime still match, so a
+  stale catalog costs a re-read, never a wrong answer;
+- query by capture time, bounding box, camera and folder without touching
+  the files at all (query()).
+
+Capture time, camera and folder are plain B-tree indexes. Positions go into
+an R-tree virtual table when this SQLite build has the R-tree module, with
+a (latitude, longitude) index as the fallback.
+"""
+
+import os
+import sqlite3
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .metadata import read_metadata
+from .walk import iter_image_files
+
+SCHEMA_VERSION = 1
+DEFAULT_EXTENSIONS = (".jpg", ".jpeg", ".png", ".tif", ".tiff", ".dng", ".jfif")
+DEFAULT_WORKERS = 4
+# Rows written per transaction while indexing
+COMMIT_EVERY = 500
+
+_META_COLUMNS = (
+    "timestamp", "subsec", "latitude", "longitude", "altitude", "make", "model",
+    "camera", "orientation", "width", "height", "user_comment",
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    folder_id INTEGER NOT NULL REFERENCES folders(id),
+    name TEXT NOT NULL,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_folder ON files(folder_id);
+CREATE TABLE IF NOT EXISTS metadata (
+    file_id INTEGER PRIMARY KEY REFERENCES files(id) ON DELETE CASCADE,
+    captured_at TEXT,
+    timestamp TEXT,
+    subsec TEXT,
+    latitude REAL,
+    longitude REAL,
+    altitude REAL,
+    make TEXT,
+    model TEXT,
+    camera TEXT,
+    orientation INTEGER,
+    width INTEGER,
+    height INTEGER,
+    user_comment BLOB
+);
+CREATE INDEX IF NOT EXISTS metadata_time ON metadata(captured_at);
+CREATE INDEX IF NOT EXISTS metadata_camera ON metadata(camera);
+CREATE INDEX IF NOT EXISTS metadata_position ON metadata(latitude, longitude);
+"""
+
+
+def default_catalog_path() -> str:
+    """
+    Catalog used for "catalog": true when a script runs on its own; the app
+    passes the path of its own catalog (userData/catalog.sqlite) instead.
+    """
+    return os.path.join(tempfile.gettempdir(), "shamal-catalog.sqlite")
+
+
+def iso_time(ts: Optional[str]) -> Optional[str]:
+    """
+    EXIF "YYYY:MM:DD HH:MM:SS" as sortable "YYYY-MM-DDTHH:MM:SS", or None.
+    """
+    if not ts or len(ts) < 19 or ts[4] != ":" or ts[7] != ":":
+        return None
+    return f"{ts[:4]}-{ts[5:7]}-{ts[8:10]}T{ts[11:19]}"
+
+
+def _read(path: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+    try:
+        # Full precision; lookup() rounds like read_metadata() would
+        return path, read_metadata(path, gps_digits=None)
+    except Exception:
+        return path, None
+
+
+def _under(column: str, folder: str, recursive: bool) -> Tuple[str, List[str]]:
+    """
+    WHERE clause for a folder column matching folder (and its subfolders);
+    a range on the path keeps the UNIQUE index usable.
+    """
+    folder = os.path.abspath(folder)
+    if not recursive:
+        return f"{column} = ?", [folder]
+    prefix = folder.rstrip(os.sep) + os.sep
+    upper = prefix[:-1] + chr(ord(os.sep) + 1)
+    return f"({column} = ? OR ({column} >= ? AND {column} < ?))", [folder, prefix, upper]
+
+
+class Catalog:
+    """
+    One SQLite catalog file. Use from a single thread; index() decodes on a
+    thread pool but writes from the calling thread.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_catalog_path()
+        folder = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(folder, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        self.db.executescript(_SCHEMA)
+        self.has_rtree = self._create_rtree()
+        self.db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        self.db.commit()
+
+    def _create_rtree(self) -> bool:
+        try:
+            self.db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS positions USING rtree(id, min_lat, max_lat, min_lon, max_lon)"
+            )
+        except sqlite3.OperationalError:
+            # SQLite built without the R-tree module
+            return False
+        return True
+
+    def close(self) -> None:
+        self.db.close()
+
+    def __enter__(self) -> "Catalog":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # Writing
+
+    def _folder_id(self, folder: str) -> int:
+        row = self.db.execute("SELECT id FROM folders WHERE path = ?", (folder,)).fetchone()
+        if row is not None:
+            return row[0]
+        return self.db.execute("INSERT INTO folders(path) VALUES (?)", (folder,)).lastrowid
+
+    def _delete(self, file_ids: Sequence[int]) -> None:
+        for file_id in file_ids:
+            if self.has_rtree:
+                self.db.execute("DELETE FROM positions WHERE id = ?", (file_id,))
+            self.db.execute("DELETE FROM files WHERE id = ?", (file_id,))
+
+    def store(self, path: str, st: os.stat_result, meta: Optional[Dict[str, Any]]) -> None:
+        """
+        Insert or replace one file and its metadata (None when unreadable).
+        """
+        path = os.path.abspath(path)
+        folder_id = self._folder_id(os.path.dirname(path))
+        row = self.db.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+        if row is not None:
+            self._delete([row[0]])
+        file_id = self.db.execute(
+            "INSERT INTO files(folder_id, name, path, size, mtime_ns) VALUES (?, ?, ?, ?, ?)",
+            (folder_id, os.path.basename(path), path, st.st_size, st.st_mtime_ns),
+        ).lastrowid
+        if meta is None:
+            return
+        values = [meta.get(column) for column in _META_COLUMNS]
+        self.db.execute(
+            f"INSERT INTO metadata(file_id, captured_at, {', '.join(_META_COLUMNS)}) "
+            f"VALUES (?, ?, {', '.join('?' * len(_META_COLUMNS))})",
+            [file_id, iso_time(meta.get("timestamp"))] + values,
+        )
+        lat, lon = meta.get("latitude"), meta.get("longitude")
+        if self.has_rtree and lat is not None and lon is not None:
+            self.db.execute("INSERT INTO positions VALUES (?, ?, ?, ?, ?)", (file_id, lat, lat, lon, lon))
+
+    def refresh(self, paths: Iterable[str], workers: int = DEFAULT_WORKERS) -> int:
+        """
+        Re-read and store the given files, e.g. after writing GPS tags.
+        Missing files are dropped. Returns the number of files stored.
+        """
+        stats = {}
+        gone = []
+        for path in paths:
+            path = os.path.abspath(path)
+            try:
+                stats[path] = os.stat(path)
+            except OSError:
+                gone.append(path)
+        for path in gone:
+            row = self.db.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+            if row is not None:
+                self._delete([row[0]])
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for path, meta in executor.map(_read, list(stats)):
+                self.store(path, stats[path], meta)
+        self.db.commit()
+        return len(stats)
+
+    def index(self, folder: str, recursive: bool = True, extensions: Sequence[str] = DEFAULT_EXTENSIONS,
+              workers: int = DEFAULT_WORKERS, reporter=None, cancel=None) -> Dict[str, Any]:
+        """
+        Bring the catalog up to date for a folder.
+
+        Only new or changed files (by size and mtime) are decoded; catalog
+        rows for files that no longer exist under the folder are removed.
+
+        Args:
+            folder: Folder to index
+            recursive: Whether to include subfolders
+            extensions: Lower-case file extensions to index
+            workers: Header-reading thread pool size
+            reporter: Optional common.jobs.ProgressReporter (total is set here)
+            cancel: Optional cancel token; stops between files and keeps
+                    what was stored so far
+
+        Returns:
+            dict: 'total', 'added', 'updated', 'unchanged', 'removed',
+                  'unreadable' and 'cancelled'
+        """
+        clause, params = _under("d.path", folder, recursive)
+        known = {
+            row["path"]: (row["id"], row["size"], row["mtime_ns"])
+            for row in self.db.execute(
+                f"SELECT f.id, f.path, f.size, f.mtime_ns FROM files f JOIN folders d ON d.id = f.folder_id WHERE {clause}",
+                params,
+            )
+        }
+
+        seen = set()
+        changed: List[Tuple[str, os.stat_result]] = []
+        for _name, path in iter_image_files(folder, extensions, recursive):
+            path = os.path.abspath(path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            seen.add(path)
+            entry = known.get(path)
+            if entry is None or entry[1] != st.st_size or entry[2] != st.st_mtime_ns:
+                changed.append((path, st))
+
+        result = {"total": len(seen), "added": 0, "updated": 0, "unchanged": len(seen) - len(changed),
+                  "removed": 0, "unreadable": 0, "cancelled": False}
+        if reporter is not None:
+            reporter.total = len(changed)
+
+        def work(item):
+            if cancel is not None and cancel.is_set():
+                return item[0], False
+            return _read(item[0])
+
+        stored = 0
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for (path, st), (_path, meta) in zip(changed, executor.map(work, changed)):
+                if meta is False:
+                    result["cancelled"] = True
+                    break
+                self.store(path, st, meta)
+                result["updated" if path in known else "added"] += 1
+                result["unreadable"] += meta is None
+                stored += 1
+                if stored % COMMIT_EVERY == 0:
+                    self.db.commit()
+                if reporter is not None:
+                    reporter.advance()
+
+        if not result["cancelled"]:
+            stale = [entry[0] for path, entry in known.items() if path not in seen]
+            self._delete(stale)
+            result["removed"] = len(stale)
+        self.db.commit()
+        return result
+
+    # Reading
+
+    def lookup(self, paths: Iterable[str], gps_digits: Optional[int] = 8) -> Dict[str, Dict[str, Any]]:
+        """
+        read_metadata()-style dicts for the paths whose catalog entry is
+        still current, keyed by the path as given. Unknown, changed and
+        unreadable files are left out so callers decode them as usual.
+        """
+        found: Dict[str, Dict[str, Any]] = {}
+        for path in paths:
+            key = str(path)
+            absolute = os.path.abspath(key)
+            row = self.db.execute(
+                f"SELECT f.size, f.mtime_ns, {', '.join('m.' + c for c in _META_COLUMNS)} "
+                "FROM files f JOIN metadata m ON m.file_id = f.id WHERE f.path = ?",
+                (absolute,),
+            ).fetchone()
+            if row is None:
+                continue
+            try:
+                st = os.stat(absolute)
+            except OSError:
+                continue
+            if st.st_size != row["size"] or st.st_mtime_ns != row["mtime_ns"]:
+                continue
+            meta = {column: row[column] for column in _META_COLUMNS}
+            if gps_digits is not None:
+                for column in ("latitude", "longitude"):
+                    if meta[column] is not None:
+                        meta[column] = round(meta[column], gps_digits)
+            found[key] = meta
+        return found
+
+    def query(self, folder: Optional[str] = None, recursive: bool = True, camera: Optional[str] = None,
+              bbox: Optional[Sequence[float]] = None, start: Optional[str] = None, end: Optional[str] = None,
+              geotagged: Optional[bool] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Catalog rows matching every given filter, ordered by capture time.
+
+        Args:
+            folder: Only images in this folder (and its subfolders when recursive)
+            camera: Exact camera name ("Make Model", as read_metadata() reports it)
+            bbox: [minLon, minLat, maxLon, maxLat] (GeoJSON order)
+            start: Earliest capture time, ISO 8601 ("2024-05-01" or "2024-05-01T10:00:00")
+            end: Capture time upper bound, exclusive
+            geotagged: True/False to only return images with/without a position
+            limit: Maximum number of rows
+
+        Returns:
+            list: dicts with filename, path, folder, size, capturedAt, timestamp,
+                  latitude, longitude, altitude, camera, make, model,
+                  orientation, width and height
+        """
+        joins = ["JOIN folders d ON d.id = f.folder_id", "JOIN metadata m ON m.file_id = f.id"]
+        where: List[str] = []
+        params: List[Any] = []
+        if folder:
+            clause, values = _under("d.path", folder, recursive)
+            where.append(clause)
+            params.extend(values)
+        if camera:
+            where.append("m.camera = ?")
+            params.append(camera)
+        if start:
+            where.append("m.captured_at >= ?")
+            params.append(start)
+        if end:
+            where.append("m.captured_at < ?")
+            params.append(end)
+        if bbox:
+            min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox)
+            if self.has_rtree:
+                # R-tree boxes are float32, so use them as an overlap filter
+                # and let the exact columns below decide
+                joins.append("JOIN positions p ON p.id = f.id")
+                where.append("p.max_lat >= ? AND p.min_lat <= ? AND p.max_lon >= ? AND p.min_lon <= ?")
+                params.extend([min_lat, max_lat, min_lon, max_lon])
+            where.append("m.latitude >= ? AND m.latitude <= ? AND m.longitude >= ? AND m.longitude <= ?")
+            params.extend([min_lat, max_lat, min_lon, max_lon])
+        if geotagged is not None:
+            where.append("m.latitude IS NOT NULL AND m.longitude IS NOT NULL" if geotagged
+                         else "(m.latitude IS NULL OR m.longitude IS NULL)")
+
+        sql = (
+            "SELECT f.name, f.path, d.path AS folder, f.size, m.captured_at, m.timestamp, m.latitude, m.longitude, "
+            "m.altitude, m.camera, m.make, m.model, m.orientation, m.width, m.height "
+            f"FROM files f {' '.join(joins)}"
+        )
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        # Untimed images sort last, then by path
+        sql += " ORDER BY m.captured_at IS NULL, m.captured_at, f.path"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return [
+            {
+                "filename": row["name"],
+                "path": row["path"],
+                "folder": row["folder"],
+                "size": row["size"],
+                "capturedAt": row["captured_at"],
+                "timestamp": row["timestamp"],
+                "latitude": row["latitude"],
+                "longitude": row["longitude"],
+                "altitude": row["altitude"],
+                "camera": row["camera"],
+                "make": row["make"],
+                "model": row["model"],
+                "orientation": row["orientation"],
+                "width": row["width"],
+                "height": row["height"],
+            }
+            for row in self.db.execute(sql, params)
+        ]
+
+    def cameras(self) -> List[str]:
+        return [row[0] for row in self.db.execute(
+            "SELECT DISTINCT camera FROM metadata WHERE camera IS NOT NULL ORDER BY camera")]
+
+    def summary(self) -> Dict[str, Any]:
+        row = self.db.execute(
+            "SELECT COUNT(f.id), COUNT(m.file_id), COUNT(m.latitude), MIN(m.captured_at), MAX(m.captured_at) "
+            "FROM files f LEFT JOIN metadata m ON m.file_id = f.id"
+        ).fetchone()
+        return {
+            "files": row[0],
+            "withMetadata": row[1],
+            "geotagged": row[2],
+            "firstCapture": row[3],
+            "lastCapture": row[4],
+            "folders": self.db.execute("SELECT COUNT(*) FROM folders").fetchone()[0],
+            "cameras": self.cameras(),
+            "rtree": self.has_rtree,
+        }
+
+
+def open_catalog(option: Any) -> Optional[Catalog]:
+    """
+    Catalog for a "catalog" option: a path, true for the default location,
+    or false/None for no catalog. Returns None when it cannot be opened.
+    """
+    if not option:
+        return None
+    try:
+        return Catalog(option if isinstance(option, str) else None)
+    except (sqlite3.Error, OSError):
+        return None
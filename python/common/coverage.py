@@ -0,0 +1,353 @@
+"""
+Coverage and overlap analysis of image footprints on a ground grid.
+
+Footprints (see common/footprints.py) are rasterized onto a grid of square
+cells in local metres: every cell counts the footprints that contain its
+centre. Accumulation is vectorized: the candidate cells of many footprints
+(their bounding boxes) are expanded into flat index arrays, tested against
+the quadrilaterals in one go and summed with np.bincount. Footprints are
+processed in chunks of at most CHUNK_CELLS candidates, and the grid itself
+is capped at MAX_CELLS by coarsening the cell size, so memory stays bounded
+however many images a mission has.
+
+On top of the counts:
+
+- polygon_mask(): the cells of the surveyed area (a boundary polygon, or
+  the convex hull of the camera positions);
+- label_regions() / region_outlines(): connected gap regions and their
+  outlines, traced along cell edges;
+- heatmap(): a small copy of the grid for map overlays, min-pooled so gaps
+  do not disappear when the grid is shrunk;
+- track_overlap(): forward overlap between consecutive images and side
+  overlap between neighbouring flight lines.
+"""
+
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Only footprints and coverage need NumPy
+    np = None
+
+MAX_CELLS = 4_000_000
+CHUNK_CELLS = 1_000_000
+
+# A new flight line starts where the track turns by more than this
+TURN_DEGREES = 30.0
+
+
+class Grid:
+    """
+    Square cells of `cell` metres; row 0 is the southern edge, column 0
+    the western edge of the local projection's (x0, y0).
+    """
+
+    __slots__ = ("x0", "y0", "cell", "rows", "cols")
+
+    def __init__(self, x0: float, y0: float, cell: float, rows: int, cols: int):
+        self.x0, self.y0, self.cell, self.rows, self.cols = x0, y0, cell, rows, cols
+
+    @classmethod
+    def covering(cls, xmin: float, ymin: float, xmax: float, ymax: float, cell: float,
+                 max_cells: int = MAX_CELLS) -> "Grid":
+        """Grid over the extent; the cell grows when it would exceed max_cells."""
+        width, height = max(xmax - xmin, 1e-9), max(ymax - ymin, 1e-9)
+        cell = max(cell, math.sqrt(width * height / max_cells))
+        while math.ceil(width / cell) * math.ceil(height / cell) > max_cells:
+            cell *= 1.01
+        return cls(xmin, ymin, cell, max(1, math.ceil(height / cell)), max(1, math.ceil(width / cell)))
+
+    @property
+    def size(self) -> int:
+        return self.rows * self.cols
+
+    def centres_x(self):
+        return self.x0 + (np.arange(self.cols) + 0.5) * self.cell
+
+    def centres_y(self):
+        return self.y0 + (np.arange(self.rows) + 0.5) * self.cell
+
+
+def rasterize(quads, grid: Grid, chunk_cells: int = CHUNK_CELLS):
+    """
+    Per-cell count of the convex quadrilaterals (shape (N, 4, 2), metres)
+    containing the cell centre, as a (rows, cols) uint16 array.
+    """
+    quads = np.asarray(quads, dtype=float)
+    counts = np.zeros(grid.size, dtype=np.int64)
+    if not len(quads):
+        return counts.reshape(grid.rows, grid.cols).astype(np.uint16)
+    # Candidate cell ranges: the centres inside each quad's bounding box
+    lo = quads.min(axis=1)
+    hi = quads.max(axis=1)
+    c0 = np.clip(np.ceil((lo[:, 0] - grid.x0) / grid.cell - 0.5), 0, grid.cols).astype(np.int64)
+    c1 = np.clip(np.floor((hi[:, 0] - grid.x0) / grid.cell - 0.5) + 1, 0, grid.cols).astype(np.int64)
+    r0 = np.clip(np.ceil((lo[:, 1] - grid.y0) / grid.cell - 0.5), 0, grid.rows).astype(np.int64)
+    r1 = np.clip(np.floor((hi[:, 1] - grid.y0) / grid.cell - 0.5) + 1, 0, grid.rows).astype(np.int64)
+    ncols = np.maximum(c1 - c0, 0)
+    nrows = np.maximum(r1 - r0, 0)
+    sizes = ncols * nrows
+
+    start = 0
+    cumulative = np.cumsum(sizes)
+    while start < len(quads):
+        # Take quads until the chunk holds chunk_cells candidates (at least one quad)
+        base = cumulative[start - 1] if start else 0
+        stop = max(start + 1, int(np.searchsorted(cumulative, base + chunk_cells, side="right")))
+        idx = np.arange(start, stop)
+        m = sizes[idx]
+        total = int(m.sum())
+        start = stop
+        if total == 0:
+            continue
+        owner = np.repeat(idx, m)
+        offsets = np.repeat(np.cumsum(m) - m, m)
+        local = np.arange(total) - offsets
+        r = r0[owner] + local // ncols[owner]
+        c = c0[owner] + local % ncols[owner]
+        px = grid.x0 + (c + 0.5) * grid.cell
+        py = grid.y0 + (r + 0.5) * grid.cell
+        # Inside a convex quad: on the same side of all four edges, either winding
+        left = np.ones(total, dtype=bool)
+        right = np.ones(total, dtype=bool)
+        for k in range(4):
+            ax, ay = quads[:, k, 0][owner], quads[:, k, 1][owner]
+            bx, by = quads[:, (k + 1) % 4, 0][owner], quads[:, (k + 1) % 4, 1][owner]
+            cross = (bx - ax) * (py - ay) - (by - ay) * (px - ax)
+            left &= cross >= 0
+            right &= cross <= 0
+        flat = (r * grid.cols + c)[left | right]
+        counts += np.bincount(flat, minlength=grid.size)
+    return np.minimum(counts, np.iinfo(np.uint16).max).reshape(grid.rows, grid.cols).astype(np.uint16)
+
+
+def convex_hull(points: Sequence[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """Convex hull (counter-clockwise, monotone chain) of planar points."""
+    pts = sorted(set(map(tuple, points)))
+    if len(pts) <= 2:
+        return pts
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower: List[Tuple[float, float]] = []
+    for p in pts:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0:
+            lower.pop()
+        lower.append(p)
+    upper: List[Tuple[float, float]] = []
+    for p in reversed(pts):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0:
+            upper.pop()
+        upper.append(p)
+    return lower[:-1] + upper[:-1]
+
+
+def polygon_mask(ring: Sequence[Tuple[float, float]], grid: Grid):
+    """
+    (rows, cols) bool array of the cells whose centre is inside the polygon
+    ring (metres, even-odd rule), filled one row at a time by scanline.
+    """
+    mask = np.zeros((grid.rows, grid.cols), dtype=bool)
+    ring = np.asarray(ring, dtype=float)
+    if len(ring) < 3:
+        return mask
+    ax, ay = ring[:, 0], ring[:, 1]
+    bx, by = np.roll(ax, -1), np.roll(ay, -1)
+    xs = grid.centres_x()
+    for row, y in enumerate(grid.centres_y()):
+        crosses = (ay <= y) != (by <= y)
+        if not crosses.any():
+            continue
+        t = (y - ay[crosses]) / (by[crosses] - ay[crosses])
+        x = np.sort(ax[crosses] + t * (bx[crosses] - ax[crosses]))
+        for start, stop in zip(np.searchsorted(xs, x[0::2]), np.searchsorted(xs, x[1::2])):
+            mask[row, start:stop] = True
+    return mask
+
+
+def label_regions(mask) -> Tuple[object, int]:
+    """
+    Label 4-connected regions of a bool mask: (labels, count) with labels
+    0 for background and 1..count per region. Works on row runs, so the
+    Python loop is over runs rather than cells.
+    """
+    rows, cols = mask.shape
+    labels = np.zeros((rows, cols), dtype=np.int32)
+    parent: List[int] = [0]
+
+    def find(a: int) -> int:
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        return a
+
+    previous: List[Tuple[int, int, int]] = []
+    runs_by_row = []
+    for r in range(rows):
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], mask[r].view(np.int8), [0]))))
+        current = []
+        j = 0
+        for s, e in zip(edges[0::2].tolist(), edges[1::2].tolist()):
+            label = len(parent)
+            parent.append(label)
+            # Runs in the previous row that share a column are connected
+            while j < len(previous) and previous[j][1] <= s:
+                j += 1
+            k = j
+            while k < len(previous) and previous[k][0] < e:
+                a, b = find(previous[k][2]), find(label)
+                if a != b:
+                    parent[max(a, b)] = min(a, b)
+                k += 1
+            current.append((s, e, label))
+        runs_by_row.append(current)
+        previous = current
+
+    roots: Dict[int, int] = {}
+    for r, runs in enumerate(runs_by_row):
+        for s, e, label in runs:
+            root = find(label)
+            labels[r, s:e] = roots.setdefault(root, len(roots) + 1)
+    return labels, len(roots)
+
+
+def region_outlines(labels) -> Dict[int, List[List[Tuple[int, int]]]]:
+    """
+    Outline rings of each labelled region as (col, row) grid vertices,
+    traced along cell edges with the region on the left; the outer ring
+    comes first (counter-clockwise), holes follow (clockwise).
+    """
+    rows, cols = labels.shape
+    padded = np.pad(labels, 1)
+    centre = padded[1:-1, 1:-1]
+    edges: Dict[int, Dict[Tuple[int, int], List[Tuple[int, int]]]] = {}
+    # (neighbour offset, edge start, edge end) per side, region on the left
+    sides = (
+        ((-1, 0), (0, 0), (1, 0)),   # south edge, eastward
+        ((1, 0), (1, 1), (0, 1)),    # north edge, westward
+        ((0, -1), (0, 1), (0, 0)),   # west edge, southward
+        ((0, 1), (1, 0), (1, 1)),    # east edge, northward
+    )
+    for (dr, dc), (sc, sr), (ec, er) in sides:
+        neighbour = padded[1 + dr:1 + dr + rows, 1 + dc:1 + dc + cols]
+        rr, cc = np.nonzero((centre > 0) & (neighbour != centre))
+        for r, c, label in zip(rr.tolist(), cc.tolist(), centre[rr, cc].tolist()):
+            start = (c + sc, r + sr)
+            end = (c + ec, r + er)
+            edges.setdefault(label, {}).setdefault(start, []).append(end)
+
+    outlines: Dict[int, List[List[Tuple[int, int]]]] = {}
+    for label, graph in edges.items():
+        rings = []
+        while graph:
+            first = next(iter(graph))
+            ring = [first]
+            vertex = first
+            while True:
+                ends = graph[vertex]
+                end = ends.pop()
+                if not ends:
+                    del graph[vertex]
+                if end == first:
+                    break
+                ring.append(end)
+                vertex = end
+            rings.append(ring)
+        # The outer ring encloses the largest (signed, positive) area
+        rings.sort(key=lambda ring: -_signed_area(ring))
+        outlines[label] = rings
+    return outlines
+
+
+def _signed_area(ring: Sequence[Tuple[float, float]]) -> float:
+    return 0.5 * sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1]))
+
+
+def heatmap(counts, max_side: int = 512):
+    """
+    (grid, factor): counts shrunk by an integer factor so neither side
+    exceeds max_side, each block keeping its minimum, as uint8 (255 = 255+).
+    The grid is padded with its maximum up to whole blocks, so the result
+    covers (rows, cols) rounded up to multiples of factor.
+    """
+    rows, cols = counts.shape
+    factor = max(1, math.ceil(max(rows, cols) / max_side))
+    if factor > 1:
+        pad_r, pad_c = (-rows) % factor, (-cols) % factor
+        fill = int(counts.max()) if counts.size else 0
+        padded = np.pad(counts, ((0, pad_r), (0, pad_c)), constant_values=fill)
+        counts = padded.reshape(padded.shape[0] // factor, factor, padded.shape[1] // factor, factor).min(axis=(1, 3))
+    return np.minimum(counts, 255).astype(np.uint8), factor
+
+
+def _along(quads, direction):
+    """Extent of each quad projected on per-quad unit directions, shape (N,)."""
+    proj = quads[:, :, 0] * direction[:, None, 0] + quads[:, :, 1] * direction[:, None, 1]
+    return proj.max(axis=1) - proj.min(axis=1)
+
+
+def track_overlap(centres, quads, turn_degrees: float = TURN_DEGREES) -> Dict[str, Optional[object]]:
+    """
+    Forward and side overlap estimates from camera centres in capture
+    order and their footprints (metres).
+
+    Forward overlap of consecutive images on a line is 1 - spacing / the
+    footprint's length along the track. Lines split where the track turns
+    by more than turn_degrees; lines of fewer than 3 images (turns) are
+    ignored. Side overlap of neighbouring lines is 1 - their perpendicular
+    distance / the footprint width across the track.
+    """
+    centres = np.asarray(centres, dtype=float)
+    quads = np.asarray(quads, dtype=float)
+    result: Dict[str, Optional[object]] = {"lines": 0, "forward": None, "side": None}
+    if len(centres) < 3:
+        return result
+    legs = np.diff(centres, axis=0)
+    lengths = np.hypot(legs[:, 0], legs[:, 1])
+    moving = lengths > 1e-6
+    unit = np.zeros_like(legs)
+    unit[moving] = legs[moving] / lengths[moving, None]
+
+    # A leg starts a new line when it turns away from the previous leg
+    turn = np.ones(len(legs), dtype=bool)
+    turn[1:] = (unit[1:] * unit[:-1]).sum(axis=1) < math.cos(math.radians(turn_degrees))
+    line_of_leg = np.cumsum(turn) - 1
+
+    forward = []
+    lines = []
+    for line in range(int(line_of_leg[-1]) + 1):
+        leg_ids = np.flatnonzero(line_of_leg == line)
+        if len(leg_ids) < 2:
+            continue
+        images = np.arange(leg_ids[0], leg_ids[-1] + 2)
+        direction = centres[images[-1]] - centres[images[0]]
+        norm = math.hypot(*direction)
+        if norm == 0:
+            continue
+        direction = direction / norm
+        along = _along(quads[images[:-1]], np.broadcast_to(direction, (len(images) - 1, 2)))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            forward.append(np.clip(1 - lengths[leg_ids] / along, 0, 1))
+        normal = np.array([-direction[1], direction[0]])
+        width = float(np.median(_along(quads[images], np.broadcast_to(normal, (len(images), 2)))))
+        lines.append((centres[images].mean(axis=0), direction, normal, width))
+
+    side = []
+    for (centre_a, dir_a, normal_a, width_a), (centre_b, _dir_b, _normal_b, width_b) in zip(lines, lines[1:]):
+        spacing = abs(float(np.dot(centre_b - centre_a, normal_a)))
+        side.append(max(0.0, min(1.0, 1 - spacing / ((width_a + width_b) / 2))))
+
+    def summary(values):
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        if not values.size:
+            return None
+        return {"min": round(float(values.min()), 3), "median": round(float(np.median(values)), 3),
+                "mean": round(float(values.mean()), 3)}
+
+    result["lines"] = len(lines)
+    result["forward"] = summary(np.concatenate(forward)) if forward else None
+    result["side"] = summary(side)
+    return result
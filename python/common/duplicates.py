@@ -0,0 +1,215 @@
+"""
+Content-based duplicate image detection.
+
+Card dumps are often copied into a mission folder twice. find_duplicates()
+narrows the candidates in stages so most files are never read at all:
+
+1. Group by file size; a file with a unique size has no duplicate.
+2. Hash the first HEAD_BYTES of every remaining file.
+3. Fully hash only files whose size and head hash both collide.
+
+Hashing runs on a thread pool with chunked reads (hashlib releases the GIL).
+Full hashes can be kept in a HashCache, a JSON file keyed by absolute path
+and validated by size and mtime, so repeated runs over the same folder only
+hash new or changed files.
+
+The first path of each duplicate set (in input order) is the one to keep;
+duplicate_paths() returns the others so exports and renames can skip them.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+HEAD_BYTES = 64 * 1024
+HASH_CHUNK = 1024 * 1024
+DEFAULT_WORKERS = 4
+CACHE_VERSION = 1
+
+
+def hash_file(path: str, limit: Optional[int] = None, chunk_size: int = HASH_CHUNK) -> str:
+    """
+    BLAKE2b hex digest of a file, or of its first `limit` bytes.
+    """
+    digest = hashlib.blake2b()
+    remaining = limit
+    with open(path, "rb", buffering=0) as f:
+        buffer = bytearray(chunk_size if limit is None else min(chunk_size, limit))
+        view = memoryview(buffer)
+        while remaining is None or remaining > 0:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            if remaining is not None:
+                n = min(n, remaining)
+                remaining -= n
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+
+class HashCache:
+    """
+    Full-file hashes keyed by absolute path and valid while size and mtime match.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.entries: Dict[str, List[Any]] = {}
+        self.hits = 0
+        self._dirty = False
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("version") == CACHE_VERSION and isinstance(data.get("entries"), dict):
+            self.entries = data["entries"]
+
+    def get(self, path: str, st: os.stat_result) -> Optional[str]:
+        entry = self.entries.get(os.path.abspath(path))
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            with self._lock:
+                self.hits += 1
+            return entry[2]
+        return None
+
+    def put(self, path: str, st: os.stat_result, digest: str) -> None:
+        with self._lock:
+            self.entries[os.path.abspath(path)] = [st.st_size, st.st_mtime_ns, digest]
+            self._dirty = True
+
+    def save(self) -> None:
+        if not self.path or not self._dirty:
+            return
+        folder = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(folder, exist_ok=True)
+        temp = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "entries": self.entries}, f)
+        os.replace(temp, self.path)
+        self._dirty = False
+
+
+def default_cache_path() -> str:
+    return os.path.join(tempfile.gettempdir(), "shamal-hashes.json")
+
+
+def open_cache(option: Any) -> Optional[HashCache]:
+    """
+    HashCache for a "hashCache" option: a path, true for the default
+    location, or false/None to hash without a cache.
+    """
+    if not option:
+        return None
+    return HashCache(option if isinstance(option, str) else default_cache_path())
+
+
+def _group(keys: Dict[str, Any]) -> List[List[str]]:
+    groups: Dict[Any, List[str]] = {}
+    for path, key in keys.items():
+        if key is not None:
+            groups.setdefault(key, []).append(path)
+    return [paths for paths in groups.values() if len(paths) > 1]
+
+
+def find_duplicates(paths: Iterable[str], workers: int = DEFAULT_WORKERS, cache: Optional[HashCache] = None,
+                    cancel=None) -> Dict[str, Any]:
+    """
+    Find sets of files with identical content.
+
+    Args:
+        paths: File paths; their order decides which copy is kept
+        workers: Hashing thread pool size
+        cache: Optional HashCache for full-file hashes
+        cancel: Optional token with is_set(); remaining files are not hashed
+
+    Returns:
+        dict: 'sets' (lists of paths, input order, first one is kept),
+              'duplicates' (number of redundant copies), 'bytesWasted',
+              'hashed' (files read in full), 'cacheHits' and 'cancelled'
+    """
+    order: Dict[str, int] = {}
+    stats: Dict[str, os.stat_result] = {}
+    for path in paths:
+        path = str(path)
+        if path in order:
+            continue
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        order[path] = len(order)
+        stats[path] = st
+
+    candidates = _group({path: st.st_size for path, st in stats.items() if st.st_size > 0})
+    hits_before = cache.hits if cache is not None else 0
+    hashed = 0
+    hashed_lock = threading.Lock()
+
+    def head(path: str) -> Optional[str]:
+        if cancel is not None and cancel.is_set():
+            return None
+        st = stats[path]
+        try:
+            # Small files are hashed whole right away and the result reused
+            return full(path) if st.st_size <= HEAD_BYTES else hash_file(path, HEAD_BYTES)
+        except OSError:
+            return None
+
+    def full(path: str) -> Optional[str]:
+        nonlocal hashed
+        if cancel is not None and cancel.is_set():
+            return None
+        st = stats[path]
+        digest = cache.get(path, st) if cache is not None else None
+        if digest is None:
+            try:
+                digest = hash_file(path)
+            except OSError:
+                return None
+            with hashed_lock:
+                hashed += 1
+            if cache is not None:
+                cache.put(path, st, digest)
+        return digest
+
+    sets: List[List[str]] = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        flat = [path for group in candidates for path in group]
+        heads = dict(zip(flat, executor.map(head, flat)))
+        # Key by size too, so equal heads of differently sized files never meet
+        head_groups = _group({p: (stats[p].st_size, h) for p, h in heads.items() if h is not None})
+        small = [group for group in head_groups if stats[group[0]].st_size <= HEAD_BYTES]
+        large = [group for group in head_groups if stats[group[0]].st_size > HEAD_BYTES]
+        sets.extend(small)
+        flat = [path for group in large for path in group]
+        digests = dict(zip(flat, executor.map(full, flat)))
+        sets.extend(_group({p: (stats[p].st_size, d) for p, d in digests.items() if d is not None}))
+
+    sets = sorted((sorted(group, key=order.__getitem__) for group in sets), key=lambda g: order[g[0]])
+    if cache is not None:
+        cache.save()
+    return {
+        "sets": sets,
+        "duplicates": sum(len(group) - 1 for group in sets),
+        "bytesWasted": sum(stats[group[0]].st_size * (len(group) - 1) for group in sets),
+        "hashed": hashed,
+        "cacheHits": (cache.hits - hits_before) if cache is not None else 0,
+        "cancelled": bool(cancel is not None and cancel.is_set()),
+    }
+
+
+def duplicate_paths(sets: Sequence[Sequence[str]]) -> Set[str]:
+    """
+    Every path of every set except the first, i.e. the copies to skip.
+    """
+    return {path for group in sets for path in group[1:]}
@@ -0,0 +1,402 @@
+"""
+Header-only EXIF reader.
+
+Reads just the metadata segments of JPEG and TIFF-based files (TIFF, DNG)
+and parses the TIFF structure directly, without decoding the image through
+Pillow. Other formats raise UnsupportedFormat so callers can fall back to
+Pillow.
+
+Files are read through HeaderReader: the first `budget` bytes in a single
+read, and anything past that (a longer APP1 segment, segment headers behind
+a large preview) only when the parser asks for it. Where the platform
+supports it the kernel is told to read ahead just that range and to drop
+the pages afterwards, so scanning a large archive neither pulls whole files
+through a network share nor evicts everything else from the page cache.
+"""
+
+import io
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# Bytes read up front per file. TIFF tag data can sit anywhere in the file,
+# but IFDs are usually near the start and a JPEG's APP1 is at most 64 KB
+HEADER_BUDGET = 64 * 1024
+# Smallest read past the budget, so walking segment headers stays cheap
+EXTEND_CHUNK = 4096
+
+_HAS_FADVISE = hasattr(os, "posix_fadvise")
+_HAS_PREAD = hasattr(os, "pread")
+
+TAG_IMAGE_WIDTH = 0x0100
+TAG_IMAGE_LENGTH = 0x0101
+TAG_MAKE = 0x010F
+TAG_MODEL = 0x0110
+TAG_ORIENTATION = 0x0112
+TAG_JPEG_IF_OFFSET = 0x0201
+TAG_JPEG_IF_LENGTH = 0x0202
+TAG_DATETIME = 0x0132
+TAG_EXIF_IFD = 0x8769
+TAG_GPS_IFD = 0x8825
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_USER_COMMENT = 0x9286
+TAG_SUBSEC_TIME_ORIGINAL = 0x9291
+
+GPS_LATITUDE_REF = 1
+GPS_LATITUDE = 2
+GPS_LONGITUDE_REF = 3
+GPS_LONGITUDE = 4
+GPS_ALTITUDE_REF = 5
+GPS_ALTITUDE = 6
+
+JPEG_SUFFIXES = {".jpg", ".jpeg", ".jfif"}
+TIFF_SUFFIXES = {".tif", ".tiff", ".dng"}
+
+# Start-of-frame markers carrying the image dimensions (not DHT/JPG/DAC)
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# type id -> (struct format char, size in bytes)
+_TYPES = {
+    1: ("B", 1),   # BYTE
+    2: ("s", 1),   # ASCII
+    3: ("H", 2),   # SHORT
+    4: ("L", 4),   # LONG
+    5: ("LL", 8),  # RATIONAL
+    7: ("s", 1),   # UNDEFINED
+    9: ("l", 4),   # SLONG
+    10: ("ll", 8), # SRATIONAL
+}
+
+Tags = Dict[str, Dict[int, Any]]
+
+
+class UnsupportedFormat(Exception):
+    pass
+
+
+def empty_tags() -> Tags:
+    return {"0th": {}, "Exif": {}, "GPS": {}}
+
+
+def _advise(fd: int, offset: int, length: int, advice: str) -> None:
+    if _HAS_FADVISE:
+        try:
+            os.posix_fadvise(fd, offset, length, getattr(os, advice))
+        except OSError:
+            pass
+
+
+class HeaderReader:
+    """
+    Minimal read-only file object for header parsing. Reads `budget` bytes
+    in one call, extends on demand, counts bytes_read and, with nocache,
+    keeps the data out of the page cache.
+    """
+
+    def __init__(self, path: Union[str, Path], budget: int = HEADER_BUDGET, nocache: bool = True):
+        self.budget = max(EXTEND_CHUNK, int(budget))
+        self.nocache = nocache
+        self.bytes_read = 0
+        self._pos = 0
+        self._end = 0
+        self._fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        try:
+            # Random access: no speculative readahead past what is asked for
+            _advise(self._fd, 0, 0, "POSIX_FADV_RANDOM")
+            _advise(self._fd, 0, self.budget, "POSIX_FADV_WILLNEED")
+            if nocache and fcntl is not None and hasattr(fcntl, "F_NOCACHE"):
+                fcntl.fcntl(self._fd, fcntl.F_NOCACHE, 1)  # macOS
+            self._head = self._pread(self.budget, 0)
+        except BaseException:
+            os.close(self._fd)
+            raise
+        # The most recent read past the head, reused by the next small read
+        self._extra = b""
+        self._extra_at = 0
+
+    def _pread(self, size: int, offset: int) -> bytes:
+        if _HAS_PREAD:
+            data = os.pread(self._fd, size, offset)
+        else:
+            os.lseek(self._fd, offset, os.SEEK_SET)
+            data = os.read(self._fd, size)
+        self.bytes_read += len(data)
+        self._end = max(self._end, offset + len(data))
+        return data
+
+    def read(self, size: int = -1) -> bytes:
+        pos = self._pos
+        if size < 0:
+            size = max(0, os.fstat(self._fd).st_size - pos)
+        head = self._head
+        if pos + size <= len(head) or len(head) < self.budget:
+            # Inside the head, or the whole file fit in it
+            data = head[pos:pos + size]
+        else:
+            data = head[pos:] if pos < len(head) else b""
+            start = pos + len(data)
+            need = size - len(data)
+            extra, at = self._extra, self._extra_at
+            if not (at <= start and start + need <= at + len(extra)):
+                extra, at = self._pread(max(need, EXTEND_CHUNK), start), start
+                self._extra, self._extra_at = extra, at
+            data += extra[start - at:start - at + need]
+        self._pos += len(data)
+        return data
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        if whence == 1:
+            offset += self._pos
+        elif whence == 2:
+            offset += os.fstat(self._fd).st_size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self) -> None:
+        if self._fd < 0:
+            return
+        if self.nocache:
+            _advise(self._fd, 0, self._end, "POSIX_FADV_DONTNEED")
+        os.close(self._fd)
+        self._fd = -1
+
+    def __enter__(self) -> "HeaderReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def header_budget(options: Dict[str, Any]) -> int:
+    """
+    The "headerBudget" option of a script, in bytes, or HEADER_BUDGET.
+    """
+    try:
+        budget = int(options.get("headerBudget") or 0)
+    except (TypeError, ValueError):
+        budget = 0
+    return budget if budget > 0 else HEADER_BUDGET
+
+
+def _scan_jpeg(f) -> Tuple[Optional[bytes], Optional[Tuple[int, int]]]:
+    """
+    Walk the JPEG marker segments up to the frame header.
+    Only the EXIF APP1 body is read; every other segment is skipped with a seek.
+    Returns (TIFF block or None, (width, height) or None).
+    """
+    if f.read(2) != b"\xff\xd8":
+        raise UnsupportedFormat("not a JPEG")
+    tiff: Optional[bytes] = None
+    while True:
+        header = f.read(4)
+        if len(header) < 4 or header[0] != 0xFF:
+            break
+        marker = header[1]
+        if marker in (0xD9, 0xDA):  # end of image / start of scan
+            break
+        length = struct.unpack(">H", header[2:4])[0]
+        if length < 2:
+            break
+        if marker == 0xE1 and tiff is None:
+            segment = f.read(length - 2)
+            if segment[:6] == b"Exif\x00\x00":
+                tiff = segment[6:]
+        elif marker in _SOF_MARKERS:
+            frame = f.read(5)
+            if len(frame) == 5:
+                height, width = struct.unpack(">HH", frame[1:5])
+                return tiff, (width, height)
+            break
+        else:
+            f.seek(length - 2, 1)
+    return tiff, None
+
+
+def jpeg_dimensions(data: bytes) -> Optional[Tuple[int, int]]:
+    """
+    (width, height) from the frame header of in-memory JPEG data, or None.
+    """
+    try:
+        return _scan_jpeg(io.BytesIO(data))[1]
+    except UnsupportedFormat:
+        return None
+
+
+def _parse_ifd(tiff: bytes, offset: int, endian: str) -> Dict[int, Any]:
+    tags: Dict[int, Any] = {}
+    if offset + 2 > len(tiff):
+        return tags
+    count = struct.unpack(endian + "H", tiff[offset:offset + 2])[0]
+    for i in range(count):
+        entry = offset + 2 + i * 12
+        if entry + 12 > len(tiff):
+            break
+        tag, typ, n = struct.unpack(endian + "HHL", tiff[entry:entry + 8])
+        spec = _TYPES.get(typ)
+        if spec is None:
+            continue
+        fmt, size = spec
+        total = size * n
+        if total <= 4:
+            data = tiff[entry + 8:entry + 8 + total]
+        else:
+            ptr = struct.unpack(endian + "L", tiff[entry + 8:entry + 12])[0]
+            data = tiff[ptr:ptr + total]
+            if len(data) < total:
+                continue
+        if fmt == "s" or (typ == 1 and n > 1):
+            # Byte arrays stay bytes, like Pillow returns them
+            value: Any = _decode_ascii(data) if typ == 2 else data
+        elif len(fmt) == 2:
+            parts = struct.unpack(endian + fmt[0] * (2 * n), data)
+            value = tuple((parts[j], parts[j + 1]) for j in range(0, len(parts), 2))
+            if n == 1:
+                value = value[0]
+        else:
+            parts = struct.unpack(endian + fmt * n, data)
+            value = parts[0] if n == 1 else parts
+        tags[tag] = value
+    return tags
+
+
+def _next_ifd(tiff: bytes, offset: int, endian: str) -> int:
+    """
+    Offset of the IFD chained after the one at `offset`, or 0.
+    """
+    if offset + 2 > len(tiff):
+        return 0
+    count = struct.unpack(endian + "H", tiff[offset:offset + 2])[0]
+    pointer = offset + 2 + count * 12
+    if pointer + 4 > len(tiff):
+        return 0
+    return struct.unpack(endian + "L", tiff[pointer:pointer + 4])[0]
+
+
+def _decode_ascii(data: bytes) -> str:
+    raw = data.split(b"\x00", 1)[0]
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw.decode("latin-1")
+
+
+def parse_tiff(tiff: bytes) -> Tags:
+    """
+    Parse IFD0, the Exif IFD and the GPS IFD of a TIFF-structured block.
+    Returns {"0th": {...}, "Exif": {...}, "GPS": {...}} keyed by numeric tag.
+    """
+    result = empty_tags()
+    if len(tiff) < 8:
+        return result
+    if tiff[:2] == b"II":
+        endian = "<"
+    elif tiff[:2] == b"MM":
+        endian = ">"
+    else:
+        return result
+    ifd0 = struct.unpack(endian + "L", tiff[4:8])[0]
+    result["0th"] = _parse_ifd(tiff, ifd0, endian)
+    exif_ptr = result["0th"].get(TAG_EXIF_IFD)
+    if isinstance(exif_ptr, int):
+        result["Exif"] = _parse_ifd(tiff, exif_ptr, endian)
+    gps_ptr = result["0th"].get(TAG_GPS_IFD)
+    if isinstance(gps_ptr, int):
+        result["GPS"] = _parse_ifd(tiff, gps_ptr, endian)
+    return result
+
+
+def read_header_counted(path: Union[str, Path], budget: int = HEADER_BUDGET) -> Tuple[Tags, Optional[Tuple[int, int]], int]:
+    """
+    read_header() plus the number of bytes read from the file.
+    """
+    path = Path(path)
+    suffix = path.suffix.lower()
+    with HeaderReader(path, budget) as f:
+        if suffix in TIFF_SUFFIXES:
+            tiff = f.read(f.budget)
+            if tiff[:2] not in (b"II", b"MM"):
+                raise UnsupportedFormat("not a TIFF")
+            tags = parse_tiff(tiff)
+            width, height = tags["0th"].get(TAG_IMAGE_WIDTH), tags["0th"].get(TAG_IMAGE_LENGTH)
+            size = (width, height) if isinstance(width, int) and isinstance(height, int) else None
+            return tags, size, f.bytes_read
+        tiff_block, size = _scan_jpeg(f)
+    return (parse_tiff(tiff_block) if tiff_block else empty_tags()), size, f.bytes_read
+
+
+def read_header(path: Union[str, Path], budget: int = HEADER_BUDGET) -> Tuple[Tags, Optional[Tuple[int, int]]]:
+    """
+    Read EXIF tags and the pixel size from the file header only, reading
+    `budget` bytes up front (see HeaderReader).
+    Raises UnsupportedFormat for files that are neither JPEG nor TIFF-based.
+    """
+    tags, size, _ = read_header_counted(path, budget)
+    return tags, size
+
+
+def _thumbnail_range(tiff: bytes) -> Optional[Tuple[int, int]]:
+    """
+    (offset, length) of the JPEG thumbnail referenced by IFD1, relative to
+    the start of the TIFF block, or None.
+    """
+    if len(tiff) < 8 or tiff[:2] not in (b"II", b"MM"):
+        return None
+    endian = "<" if tiff[:2] == b"II" else ">"
+    ifd1 = _next_ifd(tiff, struct.unpack(endian + "L", tiff[4:8])[0], endian)
+    if not ifd1:
+        return None
+    tags = _parse_ifd(tiff, ifd1, endian)
+    offset, length = tags.get(TAG_JPEG_IF_OFFSET), tags.get(TAG_JPEG_IF_LENGTH)
+    if not isinstance(offset, int) or not isinstance(length, int) or length <= 0:
+        return None
+    return offset, length
+
+
+def read_thumbnail(path: Union[str, Path]) -> Optional[bytes]:
+    """
+    Return the embedded EXIF (IFD1) JPEG thumbnail without decoding the image,
+    or None. For JPEGs the thumbnail sits inside the EXIF segment that is
+    read anyway; for TIFF-based files it may need one extra seek.
+    """
+    path = Path(path)
+    with HeaderReader(path) as f:
+        if path.suffix.lower() in TIFF_SUFFIXES:
+            tiff = f.read(f.budget)
+            span = _thumbnail_range(tiff)
+            if span is None:
+                return None
+            offset, length = span
+            if offset + length <= len(tiff):
+                data = tiff[offset:offset + length]
+            else:
+                f.seek(offset)
+                data = f.read(length)
+        else:
+            tiff, _ = _scan_jpeg(f)
+            span = _thumbnail_range(tiff) if tiff else None
+            if span is None:
+                return None
+            data = tiff[span[0]:span[0] + span[1]]
+    return data if len(data) == span[1] and data[:2] == b"\xff\xd8" else None
+
+
+def read_exif(path: Union[str, Path]) -> Tags:
+    return read_header(path)[0]
+
+
+def capture_time(tags: Tags) -> Tuple[str, str]:
+    """
+    Return (DateTimeOriginal or DateTime, SubSecTimeOriginal); empty strings when missing.
+    """
+    ts = tags["Exif"].get(TAG_DATETIME_ORIGINAL) or tags["0th"].get(TAG_DATETIME) or ""
+    subsec = tags["Exif"].get(TAG_SUBSEC_TIME_ORIGINAL) or ""
+    return (ts if isinstance(ts, str) else ""), (subsec.strip() if isinstance(subsec, str) else "")
@@ -0,0 +1,151 @@
+"""
+Ground footprints of aerial images.
+
+Every image's footprint is the quadrilateral where the rays through the
+four sensor corners meet flat ground, given the camera position (latitude,
+longitude, altitude), its orientation and the sensor / focal length. All
+images are computed at once with NumPy array arithmetic; there is no
+per-image Python loop, so 100k images take well under a second.
+
+Orientation angles are in degrees, as stored by write_gps.py:
+
+- kappa: heading, clockwise from north, of the image's top edge;
+- phi: pitch, positive tilts the view forward (towards the image top);
+- alpha: roll, positive tilts the view to the right.
+
+All zero is a nadir image with north up. Rays are rotated by roll, then
+pitch, then heading. Heights are altitude minus the ground elevation, and
+ground offsets are turned back into degrees with the local projection of
+common/geometry.py.
+
+NumPy is optional for the rest of the scripts; compute_footprints() raises
+RuntimeError when it is not installed.
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Only footprints and coverage need NumPy
+    np = None
+
+from .geometry import M_PER_DEG_LAT, M_PER_DEG_LON
+
+# Rays less than this far below the horizon (z of a unit ray, ~87 degrees
+# off nadir) never meet the ground within a sensible distance
+MIN_DOWN = 0.05
+
+# Corner order of every footprint: image top-left, top-right, bottom-right,
+# bottom-left, as (x right, y up) signs on the sensor
+CORNERS = ((-1.0, 1.0), (1.0, 1.0), (1.0, -1.0), (-1.0, -1.0))
+
+# Sensor width / height and focal length in mm, keyed by read_metadata()'s
+# "camera" value
+CAMERAS: Dict[str, Tuple[float, float, float]] = {
+    "DJI FC6310": (13.2, 8.8, 8.8),     # Phantom 4 Pro
+    "DJI FC6310S": (13.2, 8.8, 8.8),    # Phantom 4 Pro V2
+    "DJI FC330": (6.17, 4.55, 3.61),    # Phantom 4
+    "Hasselblad L1D-20c": (13.2, 8.8, 10.26),  # Mavic 2 Pro
+}
+
+
+class Camera:
+    """Sensor size and focal length in millimetres."""
+
+    __slots__ = ("sensor_width", "sensor_height", "focal_length")
+
+    def __init__(self, sensor_width: float, sensor_height: float, focal_length: float):
+        if sensor_width <= 0 or sensor_height <= 0 or focal_length <= 0:
+            raise ValueError("sensor size and focal length must be positive")
+        self.sensor_width = float(sensor_width)
+        self.sensor_height = float(sensor_height)
+        self.focal_length = float(focal_length)
+
+    @classmethod
+    def from_option(cls, option: Any) -> Optional["Camera"]:
+        """
+        Camera for a {"sensorWidth", "sensorHeight", "focalLength"} option, or
+        None when the option is missing. Raises ValueError when it is invalid.
+        """
+        if not option:
+            return None
+        try:
+            return cls(float(option["sensorWidth"]), float(option["sensorHeight"]), float(option["focalLength"]))
+        except (KeyError, TypeError) as exc:
+            raise ValueError("camera needs sensorWidth, sensorHeight and focalLength (mm)") from exc
+
+    @classmethod
+    def for_model(cls, name: Optional[str]) -> Optional["Camera"]:
+        preset = CAMERAS.get(name or "")
+        return cls(*preset) if preset else None
+
+
+def compute_footprints(latitude, longitude, height, phi=None, alpha=None, kappa=None,
+                       tan_x=None, tan_y=None):
+    """
+    Ground quadrilaterals for N images at once.
+
+    Args:
+        latitude, longitude: Camera positions in degrees, shape (N,)
+        height: Camera height above the ground in metres, shape (N,)
+        phi, alpha, kappa: Orientation in degrees, shape (N,); None or NaN
+            means 0 (nadir, north up)
+        tan_x, tan_y: Half the field of view as tangents, sensor width
+            (height) / (2 * focal length); scalars or shape (N,)
+
+    Returns:
+        (corners, valid): corners has shape (N, 4, 2) with (lon, lat) in
+        CORNERS order; valid is False for images without a usable height or
+        with a corner ray that does not reach the ground (their corners are NaN).
+    """
+    if np is None:
+        raise RuntimeError("NumPy is required for footprints")
+    lat = np.asarray(latitude, dtype=float)
+    lon = np.asarray(longitude, dtype=float)
+    h = np.asarray(height, dtype=float)
+    n = lat.shape[0]
+
+    def radians(angles):
+        if angles is None:
+            return np.zeros(n)
+        return np.radians(np.nan_to_num(np.asarray(angles, dtype=float), nan=0.0))
+
+    roll, pitch, heading = radians(alpha), radians(phi), radians(kappa)
+    signs = np.asarray(CORNERS)
+    # Unit-depth rays through the corners, camera looking straight down: (N, 4)
+    x = signs[:, 0] * np.asarray(tan_x, dtype=float).reshape(-1, 1)
+    y = signs[:, 1] * np.asarray(tan_y, dtype=float).reshape(-1, 1)
+    x, y = np.broadcast_to(x, (n, 4)), np.broadcast_to(y, (n, 4))
+    z = np.full((n, 4), -1.0)
+
+    c, s = np.cos(roll)[:, None], np.sin(roll)[:, None]
+    x, z = c * x - s * z, s * x + c * z
+    c, s = np.cos(pitch)[:, None], np.sin(pitch)[:, None]
+    y, z = c * y - s * z, s * y + c * z
+    c, s = np.cos(heading)[:, None], np.sin(heading)[:, None]
+    x, y = c * x + s * y, c * y - s * x
+
+    # Unit rays that still point down enough; depth scales them to the ground
+    norm = np.sqrt(x * x + y * y + z * z)
+    valid = np.all(z / norm < -MIN_DOWN, axis=1) & (h > 0) & np.isfinite(h) & np.isfinite(lat) & np.isfinite(lon)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        depth = np.where(valid[:, None], h[:, None] / -z, np.nan)
+    east, north = depth * x, depth * y
+
+    corners = np.empty((n, 4, 2))
+    corners[:, :, 0] = lon[:, None] + east / (M_PER_DEG_LON * np.cos(np.radians(lat)))[:, None]
+    corners[:, :, 1] = lat[:, None] + north / M_PER_DEG_LAT
+    return corners, valid
+
+
+def footprint_areas(corners, latitude=None):
+    """
+    Area in square metres of each (N, 4, 2) footprint (shoelace formula on
+    the local projection); NaN for invalid footprints.
+    """
+    if np is None:
+        raise RuntimeError("NumPy is required for footprints")
+    lat = corners[:, :, 1].mean(axis=1) if latitude is None else np.asarray(latitude, dtype=float)
+    x = corners[:, :, 0] * (M_PER_DEG_LON * np.cos(np.radians(lat)))[:, None]
+    y = corners[:, :, 1] * M_PER_DEG_LAT
+    return 0.5 * np.abs(np.sum(x * np.roll(y, -1, axis=1) - np.roll(x, -1, axis=1) * y, axis=1))
@@ -0,0 +1,166 @@
+"""
+Planar geometry helpers for map features.
+
+Coordinates come in as (lon, lat) degrees. Distances and areas are worked
+out on a local equirectangular projection in metres (LocalProjection), which
+is accurate to well under a percent across a survey site or a cadastral
+parcel and far cheaper than a proper geodesic.
+
+Line and ring simplification:
+
+- simplify_dp(): Douglas-Peucker, drops vertices closer than `tolerance`
+  metres to the simplified line; keeps the shape's extreme points;
+- simplify_visvalingam(): Visvalingam-Whyatt, repeatedly drops the vertex
+  whose triangle with its neighbours has the smallest area, while that area
+  is below tolerance**2; tends to keep shapes smoother.
+"""
+
+import heapq
+import math
+from typing import List, Optional, Sequence, Tuple
+
+# Metres per degree of latitude / of longitude at the equator (WGS84 means)
+M_PER_DEG_LAT = 110_574.0
+M_PER_DEG_LON = 111_320.0
+
+METHODS = ("douglas-peucker", "visvalingam")
+
+Point = Tuple[float, float]
+BBox = Tuple[float, float, float, float]
+
+
+class LocalProjection:
+    """
+    Equirectangular projection around (lon0, lat0): x east, y north, metres.
+    """
+
+    __slots__ = ("lon0", "lat0", "kx", "ky")
+
+    def __init__(self, lon0: float, lat0: float):
+        self.lon0 = lon0
+        self.lat0 = lat0
+        self.kx = M_PER_DEG_LON * math.cos(math.radians(lat0))
+        self.ky = M_PER_DEG_LAT
+
+    def forward(self, lon: float, lat: float) -> Point:
+        return (lon - self.lon0) * self.kx, (lat - self.lat0) * self.ky
+
+    def inverse(self, x: float, y: float) -> Point:
+        return self.lon0 + x / self.kx, self.lat0 + y / self.ky
+
+
+def bbox(points: Sequence[Point]) -> Optional[BBox]:
+    """(min_lon, min_lat, max_lon, max_lat) of (lon, lat) points, or None."""
+    if not points:
+        return None
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def merge_bbox(a: Optional[BBox], b: Optional[BBox]) -> Optional[BBox]:
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def _segment_distance2(p: Point, a: Point, b: Point) -> float:
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    length2 = dx * dx + dy * dy
+    if length2 == 0.0:
+        ex, ey = p[0] - a[0], p[1] - a[1]
+        return ex * ex + ey * ey
+    t = max(0.0, min(1.0, ((p[0] - a[0]) * dx + (p[1] - a[1]) * dy) / length2))
+    ex, ey = p[0] - (a[0] + t * dx), p[1] - (a[1] + t * dy)
+    return ex * ex + ey * ey
+
+
+def simplify_dp(xy: Sequence[Point], tolerance: float) -> List[int]:
+    """
+    Indices of the vertices Douglas-Peucker keeps, in order. xy is planar
+    (metres); the first and last vertex are always kept.
+    """
+    n = len(xy)
+    if n < 3 or tolerance <= 0:
+        return list(range(n))
+    tolerance2 = tolerance * tolerance
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    # An explicit stack; deep recursion fails on long survey lines
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        a, b = xy[first], xy[last]
+        worst, worst_d2 = -1, tolerance2
+        for i in range(first + 1, last):
+            d2 = _segment_distance2(xy[i], a, b)
+            if d2 > worst_d2:
+                worst, worst_d2 = i, d2
+        if worst >= 0:
+            keep[worst] = True
+            stack.append((first, worst))
+            stack.append((worst, last))
+    return [i for i in range(n) if keep[i]]
+
+
+def _triangle_area(a: Point, b: Point, c: Point) -> float:
+    return abs((b[0] - a[0]) * (c[1] - a[1]) - (c[0] - a[0]) * (b[1] - a[1])) / 2.0
+
+
+def simplify_visvalingam(xy: Sequence[Point], tolerance: float) -> List[int]:
+    """
+    Indices of the vertices Visvalingam-Whyatt keeps, in order: vertices
+    are removed smallest effective area first while it is below
+    tolerance**2 square metres. The end vertices are always kept.
+    """
+    n = len(xy)
+    if n < 3 or tolerance <= 0:
+        return list(range(n))
+    threshold = tolerance * tolerance
+    prev = list(range(-1, n - 1))
+    nxt = list(range(1, n + 1))
+    areas = [math.inf] * n
+    heap = []
+    for i in range(1, n - 1):
+        areas[i] = _triangle_area(xy[i - 1], xy[i], xy[i + 1])
+        heap.append((areas[i], i))
+    heapq.heapify(heap)
+    removed = [False] * n
+    while heap:
+        area, i = heapq.heappop(heap)
+        if removed[i] or area != areas[i]:
+            continue  # stale entry
+        if area >= threshold:
+            break
+        removed[i] = True
+        p, q = prev[i], nxt[i]
+        nxt[p], prev[q] = q, p
+        for j in (p, q):
+            if 0 < j < n - 1:
+                # A neighbour never gets a smaller area than the vertex just removed
+                areas[j] = max(area, _triangle_area(xy[prev[j]], xy[j], xy[nxt[j]]))
+                heapq.heappush(heap, (areas[j], j))
+    return [i for i in range(n) if not removed[i]]
+
+
+def simplify(points: Sequence[Point], tolerance: float, method: str = "douglas-peucker",
+             closed: bool = False) -> List[Point]:
+    """
+    Simplify (lon, lat) points with `tolerance` in metres. A closed ring
+    (first point repeated at the end) stays closed; when it would collapse
+    below a triangle the original ring is returned.
+    """
+    if tolerance <= 0 or len(points) < 3:
+        return list(points)
+    lon0, lat0 = points[0]
+    projection = LocalProjection(lon0, lat0)
+    xy = [projection.forward(lon, lat) for lon, lat in points]
+    if method == "visvalingam":
+        kept = simplify_visvalingam(xy, tolerance)
+    else:
+        kept = simplify_dp(xy, tolerance)
+    if closed and len(kept) < 4:
+        return list(points)
+    return [points[i] for i in kept]
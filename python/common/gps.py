@@ -0,0 +1,51 @@
+"""
+GPS value conversions shared by the readers and writers.
+"""
+
+import math
+from typing import Any, Optional
+
+
+def rational_to_float(value: Any) -> Optional[float]:
+    """
+    Convert an EXIF rational to float.
+    Accepts (numerator, denominator) tuples as well as Pillow's IFDRational
+    and plain numbers; returns None for zero denominators and junk.
+    """
+    try:
+        if isinstance(value, tuple):
+            if len(value) != 2 or not value[1]:
+                return None
+            result = float(value[0]) / float(value[1])
+        else:
+            result = float(value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return None
+    return None if math.isnan(result) else result
+
+
+def dms_to_decimal(dms: Any, ref: Any, digits: Optional[int] = 8) -> Optional[float]:
+    """
+    Convert GPS degrees/minutes/seconds to decimal degrees.
+
+    Args:
+        dms: Sequence of (degrees, minutes, seconds) rationals
+        ref: Reference direction ('N', 'S', 'E', 'W'); S and W are negative
+        digits: Decimal places to round to, or None to keep full precision
+
+    Returns:
+        Decimal degrees or None if conversion fails
+    """
+    try:
+        degrees, minutes, seconds = dms
+    except (TypeError, ValueError):
+        return None
+    parts = [rational_to_float(v) for v in (degrees, minutes, seconds)]
+    if any(p is None for p in parts):
+        return None
+    value = parts[0] + (parts[1] / 60.0) + (parts[2] / 3600.0)
+    if isinstance(ref, bytes):
+        ref = ref.decode("ascii", errors="ignore")
+    if isinstance(ref, str) and ref.strip().upper() in ("S", "W"):
+        value = -value
+    return round(value, digits) if digits is not None else value
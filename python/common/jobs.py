@@ -0,0 +1,211 @@
+"""
+Cancellation and progress reporting shared by the long-running scripts.
+
+A script calls install_cancel() once; SIGTERM, SIGINT and (when stdin is not
+the payload source) a "cancel" line on stdin then set the returned token. Work
+loops poll token.is_set() between items and, when cancelled, print their
+partial result with "cancelled": true and a "resumeCursor" that can be passed
+back as "resumeFrom" to continue where the job stopped.
+
+ProgressReporter replaces per-N-files progress lines with time-throttled ones
+carrying throughput and ETA. A background heartbeat re-emits the last state
+while a single item takes long, so the caller can watch for silence instead
+of enforcing a fixed wall-clock limit:
+
+    { "type": "progress", "processed": n, "total": m, "percent": p,
+      "status": "Scanning", "rate": files_per_s, "etaSeconds": s,
+      "elapsedSeconds": s }
+"""
+
+import json
+import signal
+import sys
+import threading
+import time
+from typing import Any, Dict, Optional
+
+DEFAULT_INTERVAL = 0.5
+DEFAULT_HEARTBEAT = 5.0
+
+_write_lock = threading.Lock()
+
+
+def write_line(payload: Dict[str, Any]) -> None:
+    """
+    Write one JSON line to stdout; lines from the heartbeat never interleave.
+    """
+    try:
+        line = json.dumps(payload) + "\n"
+        with _write_lock:
+            sys.stdout.write(line)
+            sys.stdout.flush()
+    except Exception:
+        pass
+
+
+def is_cancel_message(line: str) -> bool:
+    text = (line or "").strip()
+    if not text:
+        return False
+    if text.lower() == "cancel":
+        return True
+    try:
+        message = json.loads(text)
+    except ValueError:
+        return False
+    return isinstance(message, dict) and message.get("type") == "cancel"
+
+
+class CancelToken:
+    """
+    Thread-safe cancellation flag; compatible with threading.Event.is_set().
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def is_set(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._event.wait(timeout)
+
+    def _on_signal(self, signum, _frame) -> None:
+        try:
+            name = signal.Signals(signum).name
+        except ValueError:
+            name = str(signum)
+        self.cancel(name)
+
+    def _watch_stdin(self, stream) -> None:
+        try:
+            for line in stream:
+                if is_cancel_message(line):
+                    self.cancel("stdin")
+                    return
+        except Exception:
+            pass
+
+
+def install_cancel(stdin: bool = True) -> CancelToken:
+    """
+    Create a CancelToken set by SIGTERM/SIGINT (SIGBREAK on Windows) and,
+    unless stdin carries the payload, by a "cancel" line on stdin.
+    Must be called from the main thread.
+    """
+    token = CancelToken()
+    for name in ("SIGTERM", "SIGINT", "SIGBREAK"):
+        signum = getattr(signal, name, None)
+        if signum is None:
+            continue
+        try:
+            signal.signal(signum, token._on_signal)
+        except (OSError, ValueError):
+            pass
+    if stdin and sys.stdin is not None and not sys.stdin.isatty():
+        threading.Thread(target=token._watch_stdin, args=(sys.stdin,), name="cancel-stdin", daemon=True).start()
+    return token
+
+
+def resume_offset(value: Any, total: int) -> int:
+    """
+    Clamp a "resumeFrom" cursor to [0, total]; invalid values start from 0.
+    """
+    try:
+        offset = int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+    return min(max(0, offset), total)
+
+
+class ProgressReporter:
+    """
+    Emits progress lines at most every `interval` seconds, plus a heartbeat
+    every `heartbeat` seconds while no update arrives. Use as a context
+    manager so the heartbeat thread stops with the job.
+    """
+
+    def __init__(self, total: Optional[int], status: str = "Scanning", interval: float = DEFAULT_INTERVAL,
+                 heartbeat: float = DEFAULT_HEARTBEAT, enabled: bool = True, start: int = 0):
+        self.total = total
+        self.status = status
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.enabled = enabled
+        self.processed = start
+        # Throughput only counts items done in this run, not resumed ones
+        self._base = start
+        self._started = time.monotonic()
+        self._last_emit = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "ProgressReporter":
+        if self.enabled and self.heartbeat:
+            self._thread = threading.Thread(target=self._beat, name="progress-heartbeat", daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return False
+
+    def update(self, processed: int, force: bool = False) -> None:
+        with self._lock:
+            self.processed = processed
+            now = time.monotonic()
+            if not self.enabled or (not force and now - self._last_emit < self.interval):
+                return
+            self._last_emit = now
+            payload = self.snapshot(now)
+        write_line(payload)
+
+    def advance(self, count: int = 1) -> None:
+        self.update(self.processed + count)
+
+    def finish(self) -> None:
+        self.update(self.processed, force=True)
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        now = time.monotonic() if now is None else now
+        elapsed = now - self._started
+        done = self.processed
+        total = self.total
+        rate = (done - self._base) / elapsed if elapsed > 0 else 0.0
+        percent = None if total is None else 0
+        if total:
+            percent = int(min(100, max(0, (done / total) * 100)))
+        eta = None
+        if total is not None and rate > 0:
+            eta = round(max(0, total - done) / rate, 1)
+        elif total is not None and done >= total:
+            eta = 0.0
+        return {
+            "type": "progress",
+            "processed": done,
+            "total": total,
+            "percent": percent,
+            "status": self.status,
+            "rate": round(rate, 2),
+            "etaSeconds": eta,
+            "elapsedSeconds": round(elapsed, 1),
+        }
+
+    def _beat(self) -> None:
+        while not self._stop.wait(self.heartbeat / 2):
+            with self._lock:
+                now = time.monotonic()
+                if now - self._last_emit < self.heartbeat:
+                    continue
+                self._last_emit = now
+                payload = self.snapshot(now)
+            write_line(payload)
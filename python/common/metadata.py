@@ -0,0 +1,143 @@
+"""
+One metadata read per image: GPS, capture time, camera, orientation and size.
+
+JPEG and TIFF-based files are read header-only through common.exif, within
+a per-file byte budget; other formats fall back to Pillow when it is
+installed.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple, Union
+
+from .exif import (
+    GPS_ALTITUDE,
+    GPS_ALTITUDE_REF,
+    GPS_LATITUDE,
+    GPS_LATITUDE_REF,
+    GPS_LONGITUDE,
+    GPS_LONGITUDE_REF,
+    HEADER_BUDGET,
+    TAG_EXIF_IFD,
+    TAG_GPS_IFD,
+    TAG_MAKE,
+    TAG_MODEL,
+    TAG_ORIENTATION,
+    TAG_USER_COMMENT,
+    Tags,
+    UnsupportedFormat,
+    capture_time,
+    empty_tags,
+    read_header_counted,
+)
+from .gps import dms_to_decimal, rational_to_float
+
+
+def load_pillow():
+    try:
+        from PIL import Image  # type: ignore
+    except ImportError:
+        return None
+    return Image
+
+
+Image = load_pillow()
+
+
+def _pillow_header(path: Path) -> Tuple[Tags, Optional[Tuple[int, int]]]:
+    if Image is None:
+        return empty_tags(), None
+    with Image.open(path) as img:
+        exif = img.getexif()
+        tags = {"0th": dict(exif), "Exif": dict(exif.get_ifd(TAG_EXIF_IFD)), "GPS": dict(exif.get_ifd(TAG_GPS_IFD))}
+        width, height = img.size
+    return tags, (int(width), int(height))
+
+
+def read_tags_counted(path: Union[str, Path], budget: int = HEADER_BUDGET) -> Tuple[Tags, Optional[Tuple[int, int]], Optional[int]]:
+    """
+    read_tags() plus the bytes read from the file (None when Pillow read it).
+    """
+    path = Path(path)
+    try:
+        return read_header_counted(path, budget)
+    except UnsupportedFormat:
+        tags, size = _pillow_header(path)
+        return tags, size, None
+
+
+def read_tags(path: Union[str, Path], budget: int = HEADER_BUDGET) -> Tuple[Tags, Optional[Tuple[int, int]]]:
+    """
+    Return (tags, (width, height) or None) for any image, header-only where possible.
+    Raises OSError when the file cannot be read.
+    """
+    tags, size, _ = read_tags_counted(path, budget)
+    return tags, size
+
+
+def gps_position(tags: Tags, digits: Optional[int] = 8) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Return (latitude, longitude) in decimal degrees, or (None, None).
+    """
+    gps = tags["GPS"]
+    lat_data, lon_data = gps.get(GPS_LATITUDE), gps.get(GPS_LONGITUDE)
+    if not lat_data or not lon_data:
+        return None, None
+    lat = dms_to_decimal(lat_data, gps.get(GPS_LATITUDE_REF, "N"), digits)
+    lon = dms_to_decimal(lon_data, gps.get(GPS_LONGITUDE_REF, "E"), digits)
+    if lat is None or lon is None:
+        return None, None
+    return lat, lon
+
+
+def gps_altitude(tags: Tags) -> Optional[float]:
+    """
+    Return the GPS altitude in metres (negative below sea level), or None.
+    """
+    gps = tags["GPS"]
+    if GPS_ALTITUDE not in gps:
+        return None
+    altitude = rational_to_float(gps[GPS_ALTITUDE])
+    if altitude is None:
+        return None
+    if gps.get(GPS_ALTITUDE_REF) in (1, b"\x01"):
+        altitude = -altitude
+    return altitude
+
+
+def _text(value: Any) -> Optional[str]:
+    if isinstance(value, bytes):
+        value = value.decode("utf-8", errors="ignore")
+    return value if isinstance(value, str) and value else None
+
+
+def read_metadata(path: Union[str, Path], gps_digits: Optional[int] = 8, budget: int = HEADER_BUDGET) -> Dict[str, Any]:
+    """
+    Read everything the scripts need from one image in a single pass.
+
+    Returns a dict with latitude, longitude, altitude, timestamp (raw EXIF
+    "YYYY:MM:DD HH:MM:SS"), subsec, make, model, camera ("Make Model"),
+    orientation (EXIF 1-8), width, height, user_comment (raw bytes) and
+    bytes_read (None for formats read through Pillow). Missing values are
+    None. Raises OSError when the file cannot be read.
+    """
+    tags, size, bytes_read = read_tags_counted(path, budget)
+    lat, lon = gps_position(tags, gps_digits)
+    ts, subsec = capture_time(tags)
+    make, model = _text(tags["0th"].get(TAG_MAKE)), _text(tags["0th"].get(TAG_MODEL))
+    orientation = tags["0th"].get(TAG_ORIENTATION)
+    comment = tags["Exif"].get(TAG_USER_COMMENT)
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "altitude": gps_altitude(tags),
+        "timestamp": ts or None,
+        "subsec": subsec or None,
+        "make": make,
+        "model": model,
+        "camera": f"{make} {model}".strip() if make and model else (model or make),
+        "orientation": orientation if isinstance(orientation, int) else None,
+        "width": size[0] if size else None,
+        "height": size[1] if size else None,
+        "user_comment": comment if isinstance(comment, (bytes, str)) else None,
+        "bytes_read": bytes_read,
+    }
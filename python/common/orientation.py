@@ -0,0 +1,88 @@
+"""
+Camera orientation (phi / alpha / kappa, degrees) stored with an image.
+
+write_gps.py stores the angles in an XMP sidecar (<image>.xmp) and/or as a
+JSON UserComment; the sidecar wins when both exist.
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Any, Optional, Tuple
+
+
+def decode_user_comment(raw: Any) -> Optional[str]:
+    if raw is None:
+        return None
+    if isinstance(raw, bytes):
+        try:
+            prefix = raw[:8]
+            payload = raw
+            if prefix in {b"ASCII\x00\x00\x00", b"UNICODE\x00", b"UNICODE\x00"}:
+                payload = raw[8:]
+            try:
+                return payload.decode("utf-8", errors="ignore")
+            except Exception:
+                try:
+                    return payload.decode("utf-16", errors="ignore")
+                except Exception:
+                    return None
+        except Exception:
+            return None
+    try:
+        return str(raw)
+    except Exception:
+        return None
+
+
+def parse_orientation_comment(text: Optional[str]) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+    if not text:
+        return None, None, None
+    try:
+        data = json.loads(text)
+        phi = data.get("phi")
+        alpha = data.get("alpha")
+        kappa = data.get("kappa")
+        def to_float(v):
+            try:
+                return float(v)
+            except Exception:
+                return None
+        return to_float(phi), to_float(alpha), to_float(kappa)
+    except Exception:
+        return None, None, None
+
+
+def parse_xmp_sidecar(path: Path) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+    sidecar = path.with_suffix(path.suffix + ".xmp")
+    if not sidecar.exists():
+        return None, None, None
+    try:
+        text = sidecar.read_text(encoding="utf-8", errors="ignore")
+    except Exception:
+        return None, None, None
+
+    def find(tag: str) -> Optional[float]:
+        match = re.search(rf"<sgco:{tag}>(-?\d+(?:\.\d+)?)</sgco:{tag}>", text)
+        if match:
+            try:
+                return float(match.group(1))
+            except Exception:
+                return None
+        return None
+
+    phi = find("Phi")
+    alpha = find("Alpha")
+    kappa = find("Kappa")
+    return phi, alpha, kappa
+
+
+def extract_orientation(user_comment: Any, img_path: Optional[Path] = None) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+    # Preferred: XMP sidecar if present
+    if img_path is not None:
+        x_phi, x_alpha, x_kappa = parse_xmp_sidecar(img_path)
+        if any(v is not None for v in (x_phi, x_alpha, x_kappa)):
+            return x_phi, x_alpha, x_kappa
+    if user_comment is None:
+        return None, None, None
+    return parse_orientation_comment(decode_user_comment(user_comment))
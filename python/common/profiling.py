@@ -0,0 +1,232 @@
+"""
+Opt-in profiling shared by every script.
+
+A script wraps its main work in ``with Profiler.from_payload(payload):``,
+marks phases with ``with phase("walk"):`` and prints its final JSON with
+dumps(). Profiling is enabled by the payload's "profile" option or the
+SHAMAL_PROFILE environment variable:
+
+    "profile": true                           -> timings only
+    "profile": "scan.prof"                    -> timings + cProfile dump
+    "profile": {"output": "scan.txt",         -> timings + sampled summary
+                "format": "sampled",
+                "interval": 0.005, "top": 30}
+
+SHAMAL_PROFILE takes "1" or an output path; a .txt path selects the sampled
+summary, anything else a pstats dump. While enabled, the final JSON gets a
+"timings" section with per-phase durations in seconds. When disabled,
+phase() returns a shared no-op context manager.
+"""
+
+import cProfile
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+ENV_VAR = "SHAMAL_PROFILE"
+FORMATS = ("pstats", "sampled")
+DEFAULT_INTERVAL = 0.005
+DEFAULT_TOP = 30
+
+_NULL_PHASE = contextlib.nullcontext()
+_active: Optional["Profiler"] = None
+
+
+def phase(name: str):
+    """
+    Time a block under the given phase name on the active profiler.
+    Durations of repeated phases add up.
+    """
+    if _active is None:
+        return _NULL_PHASE
+    return _active.phase(name)
+
+
+def active() -> Optional["Profiler"]:
+    return _active
+
+
+def dumps(result: Any, **kwargs) -> str:
+    """
+    json.dumps that adds the active profiler's "timings" section, if any.
+    """
+    if _active is None:
+        return json.dumps(result, **kwargs)
+    return _active.dumps(result, **kwargs)
+
+
+class _Sampler:
+    """
+    Samples the main thread's stack at a fixed interval and counts where it is.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples = 0
+        self.own: Counter = Counter()
+        self.inclusive: Counter = Counter()
+        self._target = threading.main_thread().ident
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            self.samples += 1
+            code = frame.f_code
+            self.own[(code.co_filename, code.co_firstlineno, code.co_name)] += 1
+            seen = set()
+            while frame is not None:
+                code = frame.f_code
+                key = (code.co_filename, code.co_firstlineno, code.co_name)
+                if key not in seen:
+                    seen.add(key)
+                    self.inclusive[key] += 1
+                frame = frame.f_back
+
+    def summary(self, top: int) -> str:
+        total = max(1, self.samples)
+        lines = [
+            f"{self.samples} samples at {self.interval * 1000:.1f} ms",
+            f"{'self%':>7} {'total%':>7}  function",
+        ]
+        for key, count in self.own.most_common(top):
+            filename, lineno, name = key
+            lines.append(
+                f"{100.0 * count / total:7.1f} {100.0 * self.inclusive[key] / total:7.1f}  "
+                f"{name} ({os.path.basename(filename)}:{lineno})"
+            )
+        return "\n".join(lines) + "\n"
+
+
+class _Phase:
+    __slots__ = ("timings", "name", "start")
+
+    def __init__(self, timings: Dict[str, float], name: str):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timings[self.name] = self.timings.get(self.name, 0.0) + (time.perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    def __init__(self, spec: Any = None):
+        self.enabled = False
+        self.output: Optional[str] = None
+        self.format = "pstats"
+        self.interval = DEFAULT_INTERVAL
+        self.top = DEFAULT_TOP
+        self.timings: Dict[str, float] = {}
+        self._started = 0.0
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[_Sampler] = None
+        self._configure(spec)
+
+    @classmethod
+    def from_payload(cls, payload: Any) -> "Profiler":
+        spec = payload.get("profile") if isinstance(payload, dict) else None
+        if not spec:
+            spec = os.environ.get(ENV_VAR) or None
+        return cls(spec)
+
+    def _configure(self, spec: Any) -> None:
+        if isinstance(spec, str):
+            spec = spec.strip()
+            if spec.lower() in ("", "0", "false", "off"):
+                return
+            if spec.lower() in ("1", "true", "on"):
+                spec = True
+            else:
+                spec = {"output": spec}
+        if spec is True:
+            self.enabled = True
+        elif isinstance(spec, dict):
+            self.enabled = True
+            self.output = spec.get("output") or spec.get("path") or None
+            fmt = spec.get("format")
+            if fmt not in FORMATS:
+                fmt = "sampled" if (self.output or "").lower().endswith(".txt") else "pstats"
+            self.format = fmt
+            try:
+                self.interval = max(0.001, float(spec.get("interval") or DEFAULT_INTERVAL))
+                self.top = max(1, int(spec.get("top") or DEFAULT_TOP))
+            except (TypeError, ValueError):
+                pass
+
+    def phase(self, name: str):
+        return _Phase(self.timings, name) if self.enabled else _NULL_PHASE
+
+    def __enter__(self) -> "Profiler":
+        global _active
+        if not self.enabled:
+            return self
+        _active = self
+        self._started = time.perf_counter()
+        if self.output and self.format == "pstats":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        elif self.output:
+            self._sampler = _Sampler(self.interval)
+            self._sampler.start()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        global _active
+        if not self.enabled:
+            return False
+        _active = None
+        try:
+            if self._profile is not None:
+                self._profile.disable()
+                self._profile.dump_stats(self.output)
+            elif self._sampler is not None:
+                self._sampler.stop()
+                with open(self.output, "w", encoding="utf-8") as f:
+                    f.write(self._sampler.summary(self.top))
+        except Exception as exc:
+            # A bad profile path must never fail the actual job
+            sys.stderr.write(f"Warning: Could not write profile to {self.output}: {exc}\n")
+        return False
+
+    def report(self) -> Dict[str, Any]:
+        timings = {name: round(seconds, 6) for name, seconds in self.timings.items()}
+        timings["total"] = round(time.perf_counter() - self._started, 6)
+        if self.output:
+            timings["profile"] = self.output
+        return timings
+
+    def dumps(self, result: Any, **kwargs) -> str:
+        """
+        Serialize the final result, adding "timings" to dicts when enabled.
+        Serialization itself is timed, so the section is spliced in afterwards.
+        """
+        if not self.enabled:
+            return json.dumps(result, **kwargs)
+        with self.phase("serialize"):
+            body = json.dumps(result, **kwargs)
+        if not isinstance(result, dict):
+            return body
+        timings = json.dumps(self.report(), **kwargs)
+        if body == "{}":
+            return '{"timings": ' + timings + "}"
+        return body[:-1] + ', "timings": ' + timings + "}"
@@ -0,0 +1,47 @@
+"""
+Folder walking shared by the scripts.
+"""
+
+import os
+from typing import Collection, Iterator, List, Tuple
+
+
+def list_folder(folder: str, extensions: Collection[str], recursive: bool = False) -> Tuple[List[Tuple[str, str]], List[str]]:
+    """
+    One level of iter_image_files(): the (filename, filepath) pairs of a
+    folder and, when recursive, its subfolders, both in walk order.
+    """
+    try:
+        with os.scandir(folder) as it:
+            entries = sorted(it, key=lambda e: e.name.lower())
+    except OSError:
+        return [], []
+
+    files = []
+    subfolders = []
+    for entry in entries:
+        try:
+            if entry.is_file():
+                if os.path.splitext(entry.name)[1].lower() in extensions:
+                    files.append((entry.name, entry.path))
+            elif recursive and entry.is_dir(follow_symlinks=False):
+                subfolders.append(entry.path)
+        except OSError:
+            continue
+    return files, subfolders
+
+
+def iter_image_files(folder: str, extensions: Collection[str], recursive: bool = False) -> Iterator[Tuple[str, str]]:
+    """
+    Walk a folder and yield (filename, filepath) for files whose lower-cased
+    extension is in extensions.
+
+    Entries are sorted case-insensitively and the files of a folder come
+    before the contents of its subfolders, so the order is stable across
+    platforms. Symlinked folders are not followed and unreadable folders are
+    skipped.
+    """
+    files, subfolders = list_folder(folder, extensions, recursive)
+    yield from files
+    for subfolder in subfolders:
+        yield from iter_image_files(subfolder, extensions, recursive)
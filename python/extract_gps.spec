@@ -3,7 +3,7 @@
 
 a = Analysis(
     ['geotagging\\extract_gps.py'],
-    pathex=[],
+    pathex=[SPECPATH],  # python/common is shared by all scripts
     binaries=[],
     datas=[],
     hiddenimports=[],
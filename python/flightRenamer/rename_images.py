@@ -1,9 +1,24 @@
+import errno
 import json
+import math
+import os
 import shutil
 import sys
 import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# The shared metadata core lives in python/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common import iter_image_files, read_metadata
+from common.aio import open_scheduler
+from common.catalog import open_catalog
+from common.duplicates import duplicate_paths, find_duplicates, open_cache
+from common.profiling import Profiler, dumps, phase
 
 try:
     from PIL import Image, ExifTags  # type: ignore
@@ -11,8 +26,20 @@ except Exception:  # Pillow might not be present; proceed without EXIF timestamp
     Image = None  # type: ignore
     ExifTags = {}  # type: ignore
 
+try:
+    import numpy as np  # type: ignore
+except Exception:  # numpy is optional; flight segmentation falls back to plain Python
+    np = None  # type: ignore
+
 VALID_EXT = {".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp", ".webp"}
+DEFAULT_WORKERS = 8
+DEFAULT_FLIGHT_GAP_SECONDS = 300
+DEFAULT_ALTITUDE_BUCKET = 10
+TEMPLATE_TOKEN = re.compile(r"\{(flight|seq|date|time|model|alt|orig)(?::(\d+))?\}")
+META_TOKENS = {"date", "time", "model", "alt"}
+EARTH_RADIUS_M = 6371008.8
 MANIFEST_NAME = ".shamal_flight_rename_last.json"
+JOURNAL_NAME = ".shamal_flight_rename_journal.json"
 
 
 def parse_flight_filename(filename: str) -> Tuple[int, int]:
@@ -45,13 +72,28 @@ def load_payload() -> Dict[str, Any]:
 
 
 def iter_images(folder: Path) -> List[Path]:
-    imgs: List[Path] = []
-    if not folder.exists() or not folder.is_dir():
-        return imgs
-    for child in sorted(folder.iterdir(), key=lambda p: p.name.lower()):
-        if child.is_file() and child.suffix.lower() in VALID_EXT:
-            imgs.append(child)
-    return imgs
+    with phase("walk"):
+        return [Path(path) for _name, path in iter_image_files(str(folder), VALID_EXT)]
+
+
+def find_duplicate_images(images: List[Path], options: Dict[str, Any]) -> Dict[str, Any]:
+    with phase("hash"):
+        return find_duplicates(
+            [str(p) for p in images],
+            safe_int(options.get("workers"), DEFAULT_WORKERS),
+            open_cache(options.get("hashCache", True)),
+        )
+
+
+def drop_duplicate_images(images: List[Path], options: Dict[str, Any]) -> Tuple[List[Path], List[str]]:
+    """
+    With options.skipDuplicates, leave out images whose content duplicates an
+    earlier image (e.g. a card dump copied twice). Returns (kept, skipped paths).
+    """
+    if not options.get("skipDuplicates"):
+        return images, []
+    skip = duplicate_paths(find_duplicate_images(images, options)["sets"])
+    return [p for p in images if str(p) not in skip], [str(p) for p in images if str(p) in skip]
 
 
 def safe_int(value: Any, default: int) -> int:
@@ -63,45 +105,130 @@ def safe_int(value: Any, default: int) -> int:
         return default
 
 
-def build_name(options: Dict[str, Any], idx: int, ext: str, original: str, ts: str) -> Tuple[str, int, int]:
-    pattern_raw = (options.get("pattern") or "").strip()
-    prefix = (options.get("prefix") or "").strip()
-    suffix = (options.get("suffix") or "").strip()
-
+def base_flight_number(options: Dict[str, Any]) -> int:
     # Support new configuration keys with backward compatibility to the old UI names.
-    flight_no = safe_int(options.get("flightNumber"), safe_int(options.get("startFlight"), 0))
-    start_image_no = safe_int(options.get("startImageNumber"), safe_int(options.get("startImage"), 1))
-    image_no = start_image_no + idx
+    return safe_int(options.get("flightNumber"), safe_int(options.get("startFlight"), 0))
+
+
+class NameTemplate:
+    """
+    Naming pattern compiled once into a str.format template.
+
+    Besides the legacy ## (flight) and #### (image) placeholders the pattern
+    may contain {flight[:width]}, {seq[:width]}, {date}, {time}, {model},
+    {alt[:bucket]} and {orig}; date, time, model and alt come from the
+    per-image metadata read.
+    """
+
+    __slots__ = (
+        "fmt", "fields", "extension", "prefix", "suffix", "include_orig", "include_ts",
+        "start_image_no", "default_flight_no", "alt_buckets",
+    )
+
+    def __init__(self, options: Dict[str, Any]):
+        pattern_raw = (options.get("pattern") or "").strip()
+        self.prefix = (options.get("prefix") or "").strip()
+        self.suffix = (options.get("suffix") or "").strip()
+        self.include_orig = bool(options.get("includeOriginal"))
+        self.include_ts = bool(options.get("includeTimestamp"))
+        self.default_flight_no = base_flight_number(options)
+        self.start_image_no = safe_int(options.get("startImageNumber"), safe_int(options.get("startImage"), 1))
+        self.alt_buckets: Dict[str, int] = {}
+
+        self.extension = Path(pattern_raw).suffix
+        pattern_body = pattern_raw[:-len(self.extension)] if self.extension else pattern_raw
+
+        fields: set = set()
+        pieces: List[str] = [_escape_braces(self.prefix)]
+        pos = 0
+        for match in TEMPLATE_TOKEN.finditer(pattern_body):
+            pieces.append(_compile_hashes(pattern_body[pos:match.start()], fields))
+            pieces.append(self._compile_token(match.group(1), match.group(2), options, fields))
+            pos = match.end()
+        pieces.append(_compile_hashes(pattern_body[pos:], fields))
+        self.fmt = "".join(pieces)
+        self.fields = frozenset(fields)
+
+    def _compile_token(self, name: str, arg: Optional[str], options: Dict[str, Any], fields: set) -> str:
+        if name == "flight":
+            fields.add("flight")
+            return "{flight:0%dd}" % safe_int(arg, 2)
+        if name == "seq":
+            fields.add("image")
+            return "{image:0%dd}" % safe_int(arg, 4)
+        if name == "alt":
+            bucket = max(1, safe_int(arg, safe_int(options.get("altitudeBucket"), DEFAULT_ALTITUDE_BUCKET)))
+            key = f"alt{bucket}"
+            self.alt_buckets[key] = bucket
+            fields.add(key)
+            return "{%s}" % key
+        fields.add(name)
+        return "{%s}" % name
+
+    @property
+    def needs_meta(self) -> bool:
+        return self.include_ts or bool(self.fields & META_TOKENS) or bool(self.alt_buckets)
 
-    include_orig = bool(options.get("includeOriginal"))
-    include_ts = bool(options.get("includeTimestamp"))
+    def render(
+        self, idx: int, ext: str, original: str, meta: Optional[Dict[str, Any]], flight_no: Optional[int] = None
+    ) -> Tuple[str, int, int]:
+        if flight_no is None:
+            flight_no = self.default_flight_no
+        image_no = self.start_image_no + idx
+        meta = meta or {}
+        ts = meta.get("timestamp") or ""
+        fields = self.fields
+        values: Dict[str, Any] = {"flight": flight_no, "image": image_no}
+        if "orig" in fields:
+            values["orig"] = Path(original).stem
+        if "date" in fields:
+            values["date"] = ts[:10].replace(":", "") if ts else "unknown"
+        if "time" in fields:
+            values["time"] = ts[11:19].replace(":", "") if len(ts) >= 19 else "unknown"
+        if "model" in fields:
+            values["model"] = re.sub(r"[^A-Za-z0-9-]+", "-", meta.get("model") or "").strip("-") or "unknown"
+        if self.alt_buckets:
+            altitude = meta.get("altitude")
+            for key, bucket in self.alt_buckets.items():
+                values[key] = f"{int(altitude // bucket * bucket)}m" if altitude is not None else "unknown"
 
-    pattern_path = Path(pattern_raw)
-    pattern_ext = pattern_path.suffix
-    pattern_body = pattern_raw[:-len(pattern_ext)] if pattern_ext else pattern_raw
+        # Build name parts in a fixed, readable order:
+        # prefix/pattern → original (optional) → timestamp (optional) → suffix → extension
+        base_parts = [self.fmt.format(**values)]
+        if self.include_orig and original:
+            base_parts.append(Path(original).stem)
+        if self.include_ts and ts:
+            base_parts.append(ts.replace(":", "").replace(" ", "_"))
+        name_body = "_".join([p for p in base_parts if p])
+        if self.suffix:
+            name_body = f"{name_body}{self.suffix}"
+        return f"{name_body}{self.extension or ext}", flight_no, image_no
 
-    flight_str = str(flight_no).zfill(2)
-    image_str = str(image_no).zfill(4)
 
-    # Replace explicit placeholders while keeping the pattern flexible for future formats
-    replaced = pattern_body
-    replaced = re.sub(r"#{4}", image_str, replaced)
-    replaced = re.sub(r"#{2}", flight_str, replaced)
+def _compile_hashes(text: str, fields: set) -> str:
+    # Same left-to-right semantics as the old re.sub chain: #### first, then ##
+    chunks = []
+    for i, part in enumerate(text.split("####")):
+        if i:
+            chunks.append("{image:04d}")
+            fields.add("image")
+        for j, sub in enumerate(part.split("##")):
+            if j:
+                chunks.append("{flight:02d}")
+                fields.add("flight")
+            chunks.append(_escape_braces(sub))
+    return "".join(chunks)
 
-    # Build name parts in a fixed, readable order:
-    # prefix/pattern → original (optional) → timestamp (optional) → suffix → extension
-    base_parts: List[str] = [f"{prefix}{replaced}"]
-    if include_orig and original:
-        base_parts.append(Path(original).stem)
-    if include_ts and ts:
-        base_parts.append(ts.replace(":", "").replace(" ", "_"))
 
-    name_body = "_".join([p for p in base_parts if p])
-    if suffix:
-        name_body = f"{name_body}{suffix}"
+def _escape_braces(text: str) -> str:
+    return text.replace("{", "{{").replace("}", "}}")
 
-    extension = pattern_ext or ext
-    return f"{name_body}{extension}", flight_no, image_no
+
+def build_name(
+    options: Dict[str, Any], idx: int, ext: str, original: str, ts: str, flight_no: Optional[int] = None
+) -> Tuple[str, int, int]:
+    # One-off convenience wrapper; planners compile the template once instead
+    return NameTemplate(options).render(idx, ext, original, {"timestamp": ts}, flight_no)
 
 
 def load_timestamp(img_path: Path) -> str:
@@ -123,17 +250,266 @@ def load_timestamp(img_path: Path) -> str:
         return ""
 
 
-def ensure_unique(target_dir: Path, filename: str) -> Path:
+def read_header_meta(img_path: Path, info: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    # Header-only read for JPEG/TIFF; Pillow only for formats the reader does not parse
+    if info is None:
+        try:
+            info = read_metadata(img_path)
+        except Exception:
+            return {"timestamp": "", "subsec": "", "lat": None, "lon": None, "altitude": None, "model": ""}
+    return {
+        "timestamp": info["timestamp"] or "",
+        "subsec": info["subsec"] or "",
+        "lat": info["latitude"],
+        "lon": info["longitude"],
+        "altitude": info["altitude"],
+        "model": info["model"] or "",
+    }
+
+
+def load_header_meta(images: List[Path], workers: int, options: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    # Images with a current catalog entry (options.catalog) are not read again
+    options = options or {}
+    known: Dict[str, Dict[str, Any]] = {}
+    catalog = open_catalog(options.get("catalog"))
+    if catalog is not None:
+        with phase("io"), catalog:
+            known = catalog.lookup(str(img) for img in images)
+
+    def read(img: Path) -> Dict[str, Any]:
+        return read_header_meta(img, known.get(str(img)))
+
+    with phase("decode"):
+        if len(images) - len(known) < 2:
+            return [read(img) for img in images]
+        # options.ioConcurrency: per-mount limits for network shares, see common/aio.py
+        scheduler = open_scheduler(options)
+        if scheduler is not None:
+            with scheduler:
+                return scheduler.map(read, images)
+        if workers <= 1:
+            return [read(img) for img in images]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(read, images))
+
+
+def order_by_capture_time(images: List[Path], metas: List[Dict[str, Any]]) -> Tuple[List[Path], List[Dict[str, Any]]]:
+    # Untimed images keep their name order after all timed ones
+    def key(i: int):
+        ts, subsec = metas[i]["timestamp"], metas[i]["subsec"]
+        return (0, ts, subsec.ljust(6, "0"), images[i].name.lower()) if ts else (1, "", "", images[i].name.lower())
+
+    order = sorted(range(len(images)), key=key)
+    return [images[i] for i in order], [metas[i] for i in order]
+
+
+def exif_epoch(ts: str, subsec: str = "") -> Optional[float]:
+    try:
+        dt = datetime.strptime(ts.strip()[:19], "%Y:%m:%d %H:%M:%S").replace(tzinfo=timezone.utc)
+    except (ValueError, AttributeError):
+        return None
+    fraction = float(f"0.{subsec}") if subsec.isdigit() else 0.0
+    return dt.timestamp() + fraction
+
+
+def flight_boundaries(epochs: List[float], lats: List[Optional[float]], lons: List[Optional[float]],
+                      gap_seconds: float, jump_meters: float) -> List[int]:
+    """
+    Return the indices where a new flight starts within time-ordered images.
+    A flight ends when the capture-time gap exceeds gap_seconds or, if
+    jump_meters > 0, when consecutive positions are further apart than that.
+    """
+    if len(epochs) < 2:
+        return []
+    if np is not None:
+        t = np.asarray(epochs, dtype=float)
+        split = np.diff(t) > gap_seconds
+        if jump_meters > 0:
+            lat = np.radians(np.array([np.nan if v is None else v for v in lats], dtype=float))
+            lon = np.radians(np.array([np.nan if v is None else v for v in lons], dtype=float))
+            a = np.sin(np.diff(lat) / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2) ** 2
+            dist = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+            # Missing positions compare as NaN and never split a flight
+            split |= dist > jump_meters
+        return [int(i) + 1 for i in np.flatnonzero(split)]
+
+    starts: List[int] = []
+    for i in range(1, len(epochs)):
+        split = epochs[i] - epochs[i - 1] > gap_seconds
+        if not split and jump_meters > 0 and None not in (lats[i - 1], lons[i - 1], lats[i], lons[i]):
+            p1, p2 = math.radians(lats[i - 1]), math.radians(lats[i])
+            dp, dl = p2 - p1, math.radians(lons[i] - lons[i - 1])
+            a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+            split = 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(1.0, a))) > jump_meters
+        if split:
+            starts.append(i)
+    return starts
+
+
+def segment_flights(images: List[Path], metas: List[Dict[str, Any]], options: Dict[str, Any]) -> Tuple[List[Tuple[int, int]], List[Dict[str, Any]]]:
+    """
+    Split capture-time ordered images into flights.
+    Returns ((flight number, index within flight) per image, segment summaries).
+    Images without a capture time form a final segment of their own.
+    """
+    gap = float(options.get("flightGapSeconds") or DEFAULT_FLIGHT_GAP_SECONDS)
+    jump = float(options.get("flightJumpMeters") or 0)
+    epochs: List[float] = []
+    for meta in metas:
+        epoch = exif_epoch(meta["timestamp"], meta["subsec"]) if meta["timestamp"] else None
+        if epoch is None:
+            break  # untimed images are sorted last
+        epochs.append(epoch)
+    timed = len(epochs)
+
+    starts = [0] + flight_boundaries(epochs, [m["lat"] for m in metas[:timed]], [m["lon"] for m in metas[:timed]], gap, jump)
+    ranges = [(start, end) for start, end in zip(starts, starts[1:] + [timed]) if end > start]
+    if timed < len(images):
+        ranges.append((timed, len(images)))
+
+    first_flight = base_flight_number(options)
+    numbering: List[Tuple[int, int]] = []
+    segments: List[Dict[str, Any]] = []
+    for seg_idx, (start, end) in enumerate(ranges):
+        flight_no = first_flight + seg_idx
+        numbering.extend((flight_no, i) for i in range(end - start))
+        has_time = start < timed
+        segments.append({
+            "flightNumber": flight_no,
+            "count": end - start,
+            "firstImage": images[start].name,
+            "lastImage": images[end - 1].name,
+            "start": metas[start]["timestamp"] if has_time else None,
+            "end": metas[end - 1]["timestamp"] if has_time else None,
+            "durationSeconds": round(epochs[end - 1] - epochs[start], 3) if has_time else None,
+        })
+    return numbering, segments
+
+
+def list_taken_names(folder: Optional[Path]) -> set:
+    # One directory listing replaces a stat per candidate name. Keys are
+    # lower-cased so names that differ only by case count as clashes, like on
+    # Windows/macOS volumes.
+    if folder is None:
+        return set()
+    try:
+        return {name.lower() for name in os.listdir(folder)}
+    except OSError:
+        return set()
+
+
+def claim_unique(filename: str, taken: set, next_suffix: Dict[str, int]) -> str:
+    # Same result as probing name, name_1, name_2, ... on disk: names are only
+    # ever added to taken, so the first free suffix for a base never goes down
+    # and the search can resume where the previous one stopped.
+    if filename.lower() not in taken:
+        taken.add(filename.lower())
+        return filename
     base = Path(filename).stem
     ext = Path(filename).suffix
-    candidate = target_dir / filename
-    counter = 1
-    while candidate.exists():
-        candidate = target_dir / f"{base}_{counter}{ext}"
+    key = f"{base}{ext}".lower()
+    counter = next_suffix.get(key, 1)
+    candidate = f"{base}_{counter}{ext}"
+    while candidate.lower() in taken:
         counter += 1
+        candidate = f"{base}_{counter}{ext}"
+    next_suffix[key] = counter + 1
+    taken.add(candidate.lower())
     return candidate
 
 
+def plan_renames(
+    images: List[Path],
+    options: Dict[str, Any],
+    target_dir: Optional[Path],
+    in_place: bool,
+    flag_duplicates: bool,
+    metas: Optional[List[Dict[str, Any]]] = None,
+    numbering: Optional[List[Tuple[int, int]]] = None,
+    window: Optional[Tuple[int, int]] = None,
+    summary: Optional[Dict[str, Any]] = None,
+    reserved: Optional[Tuple[set, Dict[str, int]]] = None,
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Compute the complete rename plan before any file is touched.
+    The target folder is listed once; every new name and _N suffix is then
+    resolved against an in-memory set, so preview and execute agree exactly.
+    metas, when given, holds the header metadata of each image in order;
+    numbering holds (flight number, index within flight) per image.
+    window, as (start, stop), limits the entries and errors that are built
+    while names and conflicts are still resolved over the whole set; the
+    global conflict counts are written into summary when it is given.
+    reserved, as (taken names, suffix cache), lets several plans share one
+    target folder; it is updated in place.
+    Returns (entries, errors).
+    """
+    if reserved is not None:
+        taken, next_suffix = reserved
+    else:
+        taken = list_taken_names(target_dir)
+        next_suffix = {}
+    if in_place:
+        # Sources are renamed away, so their current names become free
+        taken -= {img.name.lower() for img in images}
+    seen_names = set()
+    errors: List[str] = []
+    entries: List[Dict[str, Any]] = []
+    template = NameTemplate(options)
+    start, stop = window if window else (0, len(images))
+    duplicates = 0
+    suffixed = 0
+    first_conflict: Optional[int] = None
+
+    for idx, img in enumerate(images):
+        if metas is not None:
+            meta = metas[idx]
+        elif template.include_ts:
+            meta = {"timestamp": load_timestamp(img)}
+        else:
+            meta = None
+        if numbering is not None:
+            flight_override, number_idx = numbering[idx]
+        else:
+            flight_override, number_idx = None, idx
+        new_name, flight_no, image_no = template.render(number_idx, img.suffix, img.name, meta, flight_override)
+        final_name = claim_unique(new_name, taken, next_suffix) if target_dir else new_name
+        duplicate = False
+        if flag_duplicates:
+            key = new_name.lower()
+            duplicate = key in seen_names
+            seen_names.add(key)
+        if duplicate:
+            duplicates += 1
+        elif final_name != new_name:
+            suffixed += 1
+        if (duplicate or final_name != new_name) and first_conflict is None:
+            first_conflict = idx
+        if not start <= idx < stop:
+            continue
+        entry = {
+            "originalName": img.name,
+            "newName": final_name,
+            "flightNumber": flight_no,
+            "imageNumber": image_no,
+            "sourcePath": str(img),
+            "targetPath": str(target_dir / final_name) if target_dir else str(img),
+            "ok": True
+        }
+        if duplicate:
+            entry["ok"] = False
+            entry["error"] = "Duplicate target filename in preview"
+            errors.append(f"Duplicate name: {new_name}")
+        entries.append(entry)
+    if summary is not None:
+        summary.update({
+            "total": len(images),
+            "duplicates": duplicates,
+            "suffixed": suffixed,
+            "firstConflict": first_conflict,
+        })
+    return entries, errors
+
+
 def write_manifest(output_dir: Path, files: List[Dict[str, Any]]) -> None:
     manifest = output_dir / MANIFEST_NAME
     try:
@@ -170,7 +546,355 @@ def undo_last(output_dir: Path) -> Dict[str, Any]:
     return {"removed": removed, "errors": errors, "outputFolder": str(output_dir)}
 
 
+def journal_temp_name(token: str, index: int) -> str:
+    return f".shamal_rename_{token}_{index}.tmp"
+
+
+def write_journal(folder: Path, journal: Dict[str, Any]) -> None:
+    # Write-then-replace so a crash never leaves a truncated journal behind
+    path = folder / JOURNAL_NAME
+    tmp = folder / (JOURNAL_NAME + ".tmp")
+    tmp.write_text(json.dumps(journal, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(str(tmp), str(path))
+
+
+def rename_two_phase(
+    folder: Path,
+    pairs: List[Tuple[str, str]],
+    token: str,
+    on_staged: Optional[Callable[[], None]] = None,
+) -> List[Tuple[int, str]]:
+    """
+    Rename (old, new) pairs inside folder without intermediate collisions.
+    Phase 1 moves every file to a unique temporary name, phase 2 moves the
+    temporaries to their final names, so swaps and cycles are safe.
+    Nothing is ever renamed onto an existing path: a pair whose target is
+    taken fails, and a failed file goes back to its old name only while
+    that name is free, otherwise it stays at its temporary name for
+    undo_in_place() to recover.
+    Returns (index, error) for every pair that could not be renamed.
+    """
+    failures: List[Tuple[int, str]] = []
+    staged: List[int] = []
+    for idx, (old, _new) in enumerate(pairs):
+        try:
+            os.rename(str(folder / old), str(folder / journal_temp_name(token, idx)))
+            staged.append(idx)
+        except OSError as exc:
+            failures.append((idx, str(exc)))
+    if on_staged:
+        on_staged()
+    for idx in staged:
+        old, new = pairs[idx]
+        temp = folder / journal_temp_name(token, idx)
+        try:
+            if (folder / new).exists():
+                raise FileExistsError(errno.EEXIST, "Target already exists", new)
+            os.rename(str(temp), str(folder / new))
+        except OSError as exc:
+            error = str(exc)
+            try:
+                if (folder / old).exists():
+                    raise FileExistsError(errno.EEXIST, "Original name is taken", old)
+                os.rename(str(temp), str(folder / old))
+            except OSError:
+                error += f" (left as {temp.name})"
+            failures.append((idx, error))
+    return failures
+
+
+def undo_in_place(folder: Path) -> Dict[str, Any]:
+    journal_path = folder / JOURNAL_NAME
+    if not journal_path.exists():
+        return {"restored": 0, "errors": ["No rename journal found"], "outputFolder": str(folder)}
+    try:
+        journal = json.loads(journal_path.read_text(encoding="utf-8"))
+    except Exception as exc:
+        return {"restored": 0, "errors": [f"Failed to read journal: {exc}"], "outputFolder": str(folder)}
+
+    token = journal.get("token") or ""
+    status = journal.get("status")
+    reverse: List[Tuple[str, str]] = []
+    errors: List[str] = []
+    for idx, entry in enumerate(journal.get("renames") or []):
+        old, new = entry.get("old"), entry.get("new")
+        if not old or not new:
+            continue
+        # An interrupted run leaves files at their temporary names, and so does
+        # a failed rename whose old name was taken; in phase 1 files that were
+        # not staged yet are still at their old names
+        temp = journal_temp_name(token, idx)
+        if token and (folder / temp).exists():
+            reverse.append((temp, old))
+        elif entry.get("failed"):
+            continue
+        elif status in ("staged", "complete") and (folder / new).exists():
+            reverse.append((new, old))
+        elif not (folder / old).exists():
+            errors.append(f"{new}: file not found")
+
+    failures = rename_two_phase(folder, reverse, uuid.uuid4().hex[:12])
+    for idx, err in failures:
+        errors.append(f"{reverse[idx][0]}: {err}")
+    if not failures:
+        try:
+            journal_path.unlink()
+        except Exception:
+            pass
+    return {"restored": len(reverse) - len(failures), "errors": errors, "outputFolder": str(folder)}
+
+
+def execute_in_place(src_path: Path, files: List[Dict[str, Any]], errors: List[str]) -> Tuple[int, int]:
+    pairs = [(entry["originalName"], entry["newName"]) for entry in files if entry["originalName"] != entry["newName"]]
+    entry_by_old = {entry["originalName"]: entry for entry in files}
+    token = uuid.uuid4().hex[:12]
+    journal: Dict[str, Any] = {
+        "version": 1,
+        "token": token,
+        "status": "pending",
+        "renames": [{"old": old, "new": new} for old, new in pairs],
+    }
+    try:
+        write_journal(src_path, journal)
+    except Exception as exc:
+        errors.append(f"Failed to write journal: {exc}")
+        for entry in files:
+            entry["ok"] = False
+            entry["error"] = "Journal not written"
+        return 0, len(files)
+
+    def mark_staged() -> None:
+        journal["status"] = "staged"
+        try:
+            write_journal(src_path, journal)
+        except Exception:
+            pass
+
+    failures = rename_two_phase(src_path, pairs, token, on_staged=mark_staged)
+    for idx, err in failures:
+        old = pairs[idx][0]
+        journal["renames"][idx]["failed"] = True
+        entry = entry_by_old[old]
+        entry["ok"] = False
+        entry["error"] = err
+        errors.append(f"{old}: {err}")
+
+    journal["status"] = "complete"
+    try:
+        write_journal(src_path, journal)
+    except Exception as exc:
+        errors.append(f"Failed to update journal: {exc}")
+    return len(files) - len(failures), len(failures)
+
+
+def validate_pattern(options: Dict[str, Any]) -> Optional[str]:
+    pattern_raw = (options.get("pattern") or "").strip()
+    if not pattern_raw:
+        return "Pattern is required"
+    has_flight = "##" in pattern_raw or "{flight" in pattern_raw
+    has_image = "####" in pattern_raw or "{seq" in pattern_raw
+    if not has_flight or not has_image:
+        return "Invalid pattern: include ## for flight and #### for image"
+    return None
+
+
+def emit_progress(done: int, total: int, status: str, folder: Optional[str] = None) -> None:
+    percent = int(min(100, max(0, (done / total) * 100))) if total else 100
+    line = {"type": "progress", "processed": done, "total": total, "percent": percent, "status": status}
+    if folder is not None:
+        line["folder"] = folder
+    sys.stdout.write(json.dumps(line, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+def copy_entry(entry: Dict[str, Any]) -> Optional[str]:
+    try:
+        shutil.copy2(entry["sourcePath"], entry["targetPath"])
+        return None
+    except Exception as exc:
+        return str(exc)
+
+
+def process_batch(payload: Dict[str, Any], progress: bool = True) -> Dict[str, Any]:
+    """
+    Rename several source folders (one per card) in one invocation.
+
+    options.numbering is "perFolder" (default: every folder is the next
+    flight and restarts image numbering) or "continuous" (one flight whose
+    image numbers run on across folders). With autoFlights, detected flights
+    are numbered consecutively across all folders either way.
+
+    Header reads and copies for all folders share one worker pool. When an
+    output folder is given, every folder is planned against it together and
+    a single combined manifest is written there; otherwise each folder uses
+    its own renamed/ folder (or itself, in place) as for a single source.
+    """
+    mode = payload.get("mode", "preview")
+    output = payload.get("output")
+    options = payload.get("options") or {}
+    sources = [str(s) for s in payload.get("sources") or [] if s]
+    if not sources:
+        return {"ok": False, "error": "Source folder is required"}
+
+    if mode == "undo" and output and not options.get("inPlace"):
+        # A shared output folder holds one combined manifest; undo it once
+        res = undo_last(Path(output))
+        res["ok"] = not bool(res.get("errors"))
+        return {"ok": res["ok"], "folders": [res]}
+    if mode == "duplicates":
+        # Copies of the same card often land in different source folders
+        images = [img for src in sources if Path(src).is_dir() for img in iter_images(Path(src))]
+        return {"ok": True, **find_duplicate_images(images, options)}
+    if mode in ("scan", "undo"):
+        folders = [process(dict(payload, source=src, sources=None)) for src in sources]
+        for src, res in zip(sources, folders):
+            res["source"] = src
+        return {"ok": all(res.get("ok") for res in folders), "folders": folders}
+
+    pattern_error = validate_pattern(options)
+    if pattern_error:
+        return {"ok": False, "error": pattern_error}
+
+    in_place = bool(options.get("inPlace"))
+    continuous = options.get("numbering") == "continuous"
+    auto_flights = bool(options.get("autoFlights"))
+    sort_by = "captureTime" if auto_flights else (options.get("sortBy") or "name")
+    workers = safe_int(options.get("workers"), DEFAULT_WORKERS)
+    shared_out = Path(output) if output and not in_place else None
+
+    folders: List[Dict[str, Any]] = []
+    batches: List[Tuple[Dict[str, Any], List[Path]]] = []
+    for src in sources:
+        src_path = Path(src)
+        if not src_path.is_dir():
+            folders.append({"source": src, "ok": False, "processed": 0, "errors": [f"{src}: Source folder invalid"]})
+            continue
+        folder = {"source": src, "ok": True}
+        folders.append(folder)
+        batches.append((folder, iter_images(src_path)))
+
+    if options.get("skipDuplicates"):
+        # Checked across all folders, so a card copied into two of them counts once
+        kept, _skipped = drop_duplicate_images([img for _folder, imgs in batches for img in imgs], options)
+        keep = set(kept)
+        for folder, imgs in batches:
+            folder["skippedDuplicates"] = [str(img) for img in imgs if img not in keep]
+            imgs[:] = [img for img in imgs if img in keep]
+
+    # One pool reads the headers of every folder
+    all_metas: Optional[List[Dict[str, Any]]] = None
+    if sort_by == "captureTime" or NameTemplate(options).needs_meta:
+        all_metas = load_header_meta([img for _folder, imgs in batches for img in imgs], workers, options)
+
+    total = sum(len(imgs) for _folder, imgs in batches)
+    reserved = (list_taken_names(shared_out), {}) if shared_out else None
+    next_flight = base_flight_number(options)
+    next_image = 0
+    planned = 0
+    files: List[Dict[str, Any]] = []
+    for folder, images in batches:
+        src_path = Path(folder["source"])
+        metas = None
+        if all_metas is not None:
+            metas, all_metas = all_metas[:len(images)], all_metas[len(images):]
+            if sort_by == "captureTime":
+                images, metas = order_by_capture_time(images, metas)
+
+        if auto_flights:
+            numbering, segments = segment_flights(images, metas, dict(options, flightNumber=next_flight))
+            folder["segments"] = segments
+            next_flight += len(segments)
+        elif continuous:
+            numbering = [(next_flight, next_image + i) for i in range(len(images))]
+            next_image += len(images)
+        else:
+            numbering = [(next_flight, i) for i in range(len(images))]
+            next_flight += 1
+
+        if in_place:
+            target_dir: Optional[Path] = src_path
+        else:
+            target_dir = shared_out or src_path / "renamed"
+        summary: Dict[str, Any] = {}
+        entries, folder_errors = plan_renames(
+            images,
+            options,
+            target_dir,
+            in_place,
+            flag_duplicates=(mode == "preview"),
+            metas=metas,
+            numbering=numbering,
+            summary=summary,
+            reserved=reserved,
+        )
+        folder.update({"processed": len(entries), "outputFolder": str(target_dir), "errors": folder_errors})
+        if mode == "preview":
+            folder["summary"] = summary
+        folder["_entries"] = entries
+        files.extend(entries)
+        planned += len(entries)
+        if progress:
+            emit_progress(planned, total, "Planning", folder["source"])
+
+    with phase("io"):
+        if mode == "execute":
+            done = 0
+            if in_place:
+                for folder, _images in batches:
+                    updated, skipped = execute_in_place(Path(folder["source"]), folder["_entries"], folder["errors"])
+                    folder.update({"renamed": updated, "failed": skipped})
+                    done += len(folder["_entries"])
+                    if progress:
+                        emit_progress(done, total, "Renaming", folder["source"])
+            else:
+                for folder, _images in batches:
+                    Path(folder["outputFolder"]).mkdir(parents=True, exist_ok=True)
+                # Copies from every folder run on one pool, in plan order
+                with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+                    for folder, _images in batches:
+                        copied = failed = 0
+                        for entry, error in zip(folder["_entries"], pool.map(copy_entry, folder["_entries"])):
+                            if error is None:
+                                copied += 1
+                            else:
+                                entry["ok"] = False
+                                entry["error"] = error
+                                folder["errors"].append(f"{entry['originalName']}: {error}")
+                                failed += 1
+                        folder.update({"copied": copied, "failed": failed})
+                        done += len(folder["_entries"])
+                        if progress:
+                            emit_progress(done, total, "Copying", folder["source"])
+                if shared_out:
+                    write_manifest(shared_out, files)
+                else:
+                    for folder, _images in batches:
+                        write_manifest(Path(folder["outputFolder"]), folder["_entries"])
+
+    errors = [err for folder in folders for err in folder.get("errors", [])]
+    for folder in folders:
+        folder.pop("_entries", None)
+        folder["updated"] = folder.get("renamed", folder.get("copied", 0))
+        if folder.get("ok") and folder.get("failed"):
+            folder["ok"] = False
+
+    result: Dict[str, Any] = {
+        "ok": True,
+        "files": files,
+        "processed": len(files),
+        "updated": sum(folder.get("updated", 0) for folder in folders),
+        "skipped": sum(folder.get("failed", 0) for folder in folders) if mode == "execute" else 0,
+        "errors": errors,
+        "folders": folders,
+    }
+    if shared_out:
+        result["outputFolder"] = str(shared_out)
+    return result
+
+
 def process(payload: Dict[str, Any]) -> Dict[str, Any]:
+    if payload.get("sources"):
+        return process_batch(payload)
     mode = payload.get("mode", "preview")
     source = payload.get("source")
     output = payload.get("output")
@@ -185,13 +909,15 @@ def process(payload: Dict[str, Any]) -> Dict[str, Any]:
 
     images = iter_images(src_path)
 
+    if mode == "duplicates":
+        return {"ok": True, **find_duplicate_images(images, options)}
+    images, skipped_duplicates = drop_duplicate_images(images, options)
+
     # Validate pattern for operations that require it
-    pattern_raw = (options.get("pattern") or "").strip()
     if mode != "scan":
-        if not pattern_raw:
-            return {"ok": False, "error": "Pattern is required"}
-        if "##" not in pattern_raw or "####" not in pattern_raw:
-            return {"ok": False, "error": "Invalid pattern: include ## for flight and #### for image"}
+        pattern_error = validate_pattern(options)
+        if pattern_error:
+            return {"ok": False, "error": pattern_error}
 
     if mode == "scan":
         files = [
@@ -208,71 +934,107 @@ def process(payload: Dict[str, Any]) -> Dict[str, Any]:
         ]
         return {"ok": True, "files": files, "processed": len(files)}
 
+    # In-place mode renames inside the source folder instead of copying to an output folder
+    in_place = bool(options.get("inPlace"))
+
     # Determine output folder
-    if mode in ("execute", "undo"):
+    if in_place:
+        output = str(src_path)
+    elif mode in ("execute", "undo"):
         if not output:
             output = str(src_path / "renamed")
     out_path = Path(output) if output else None
     if mode in ("execute", "undo") and out_path:
         out_path.mkdir(parents=True, exist_ok=True)
 
-    files: List[Dict[str, Any]] = []
     updated = 0
     skipped = 0
-    errors: List[str] = []
-    seen_names = set()
+
+    if mode == "undo" and in_place:
+        res = undo_in_place(src_path)
+        res["ok"] = not bool(res.get("errors"))
+        return res
 
     if mode == "undo" and out_path:
         res = undo_last(out_path)
         res["ok"] = not bool(res.get("errors"))
         return res
 
-    for idx, img in enumerate(images):
-        ts = load_timestamp(img) if options.get("includeTimestamp") else ""
-        new_name, flight_no, image_no = build_name(options, idx, img.suffix, img.name, ts)
-        if mode == "preview":
-            target_path = Path(new_name)
-        else:
-            target_path = ensure_unique(out_path or src_path, new_name) if out_path else img
-        entry = {
-            "originalName": img.name,
-            "newName": new_name if mode == "preview" else target_path.name,
-            "flightNumber": flight_no,
-            "imageNumber": image_no,
-            "sourcePath": str(img),
-            "targetPath": str(target_path),
-            "ok": True
-        }
-        if entry["newName"].lower() in seen_names:
-            entry["ok"] = False
-            entry["error"] = "Duplicate target filename in preview"
-            errors.append(f"Duplicate name: {entry['newName']}")
-        else:
-            seen_names.add(entry["newName"].lower())
+    # Preview plans against the folder execute would write to, without creating it
+    target_dir = out_path
+    if mode == "preview" and target_dir is None:
+        target_dir = src_path / "renamed"
+    # Capture times are read once, header-only, on a worker pool
+    metas: Optional[List[Dict[str, Any]]] = None
+    numbering: Optional[List[Tuple[int, int]]] = None
+    segments: Optional[List[Dict[str, Any]]] = None
+    auto_flights = bool(options.get("autoFlights"))
+    sort_by = "captureTime" if auto_flights else (options.get("sortBy") or "name")
+    if sort_by == "captureTime" or NameTemplate(options).needs_meta:
+        workers = safe_int(options.get("workers"), DEFAULT_WORKERS)
+        metas = load_header_meta(images, workers, options)
+        if sort_by == "captureTime":
+            images, metas = order_by_capture_time(images, metas)
+        if auto_flights:
+            numbering, segments = segment_flights(images, metas, options)
 
-        if mode == "preview":
-            files.append(entry)
-            continue
-        # execute
-        try:
-            shutil.copy2(str(img), str(target_path))
-            updated += 1
-        except Exception as exc:
-            entry["ok"] = False
-            entry["error"] = str(exc)
-            errors.append(f"{img.name}: {exc}")
-            skipped += 1
-        files.append(entry)
+    # Previews can be paged: only the requested window is serialized,
+    # while conflicts are still counted over the whole folder
+    window: Optional[Tuple[int, int]] = None
+    summary: Dict[str, Any] = {}
+    if mode == "preview" and payload.get("limit") is not None:
+        offset = max(0, safe_int(payload.get("offset"), 0))
+        limit = max(0, safe_int(payload.get("limit"), 0))
+        window = (offset, offset + limit)
+
+    files, errors = plan_renames(
+        images,
+        options,
+        target_dir,
+        in_place,
+        flag_duplicates=(mode == "preview"),
+        metas=metas,
+        numbering=numbering,
+        window=window,
+        summary=summary,
+    )
+
+    with phase("io"):
+        if mode == "execute" and not in_place:
+            for entry in files:
+                try:
+                    shutil.copy2(entry["sourcePath"], entry["targetPath"])
+                    updated += 1
+                except Exception as exc:
+                    entry["ok"] = False
+                    entry["error"] = str(exc)
+                    errors.append(f"{entry['originalName']}: {exc}")
+                    skipped += 1
+
+        if mode == "execute" and in_place:
+            updated, skipped = execute_in_place(src_path, files, errors)
 
     result: Dict[str, Any] = {
         "ok": True,
         "files": files,
-        "processed": len(files),
+        "processed": summary["total"],
         "updated": updated if mode == "execute" else 0,
         "skipped": skipped if mode == "execute" else 0,
         "errors": errors,
     }
-    if mode == "execute" and out_path:
+    if mode == "preview":
+        result["summary"] = summary
+        if window:
+            result["offset"], result["limit"] = window[0], window[1] - window[0]
+    if segments is not None:
+        result["segments"] = segments
+    if options.get("skipDuplicates"):
+        result["skippedDuplicates"] = skipped_duplicates
+    if mode == "execute" and in_place:
+        result["outputFolder"] = str(src_path)
+        result["renamed"] = updated
+        result["failed"] = skipped
+    elif mode == "execute" and out_path:
         write_manifest(out_path, files)
         result["outputFolder"] = str(out_path)
         result["copied"] = updated
@@ -282,8 +1044,9 @@ def process(payload: Dict[str, Any]) -> Dict[str, Any]:
 
 def main():
     payload = load_payload()
-    res = process(payload)
-    print(json.dumps(res, ensure_ascii=False))
+    with Profiler.from_payload(payload):
+        res = process(payload)
+        print(dumps(res, ensure_ascii=False))
 
 
 if __name__ == "__main__":
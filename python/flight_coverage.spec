@@ -0,0 +1,41 @@
+# -*- mode: python ; coding: utf-8 -*-
+
+# Coverage analysis needs NumPy (see requirements.txt); fail the build without it
+import numpy  # noqa: F401
+
+
+a = Analysis(
+    ['mapOrganizer\\flight_coverage.py'],
+    pathex=[SPECPATH],  # python/common is shared by all scripts
+    binaries=[],
+    datas=[],
+    hiddenimports=['numpy'],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=[],
+    noarchive=False,
+    optimize=0,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    a.binaries,
+    a.datas,
+    [],
+    name='flight_coverage',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=True,
+    upx_exclude=[],
+    runtime_tmpdir=None,
+    console=True,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+)
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Streaming export of scan results to CSV, GeoJSON and KML.
+
+Each exporter writes one record at a time, so a scan of a million images is
+exported without building the rows, features or placemarks in memory.
+Records are process_image() dicts; `columns` selects which of their keys are
+written (CSV columns, GeoJSON properties, KML ExtendedData).
+
+Sorting by filename goes through sorted_on_disk(): records are buffered in
+runs of RUN_SIZE, each run is sorted and spilled to a temporary file, and
+the runs are merged back with heapq.merge, so memory stays bounded by the
+run size rather than the number of images.
+DiskSorter does the same for records pushed during a scan, so the runs are
+already on disk when the scan ends and only the merge is left.
+
+GeoJSON and KML only contain images with GPS; KML Placemarks load back into
+the Map Organizer through its KML import.
+"""
+
+import csv
+import heapq
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+from xml.sax.saxutils import escape
+
+FORMATS = ("csv", "geojson", "kml")
+
+# Keys of a process_image() record, in output order
+COLUMNS = (
+    "filename", "path", "latitude", "longitude", "altitude", "phi", "alpha", "kappa",
+    "timestamp", "camera", "width", "height", "hasGps", "writable", "exifStatus", "bytesRead",
+)
+DEFAULT_COLUMNS = ("filename", "latitude", "longitude", "altitude", "phi", "alpha", "kappa")
+# Written with 6 decimals, as the CSV export always has
+FLOAT_COLUMNS = {"latitude", "longitude", "altitude", "phi", "alpha", "kappa"}
+
+# Records per sorted run kept in memory before spilling to disk
+RUN_SIZE = 50_000
+
+
+def format_value(key: str, value: Any) -> str:
+    if value is None:
+        return ""
+    if key in FLOAT_COLUMNS:
+        try:
+            return f"{float(value):.6f}"
+        except Exception:
+            return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def resolve_columns(columns: Optional[Iterable[str]]) -> List[str]:
+    """
+    Known columns from `columns` in the order given, or DEFAULT_COLUMNS.
+    Raises ValueError when none of them is known.
+    """
+    if not columns:
+        return list(DEFAULT_COLUMNS)
+    if isinstance(columns, str):
+        columns = [c.strip() for c in columns.split(",")]
+    selected = []
+    for column in columns:
+        if column in COLUMNS and column not in selected:
+            selected.append(column)
+    if not selected:
+        raise ValueError(f"No known export columns; choose from {', '.join(COLUMNS)}")
+    return selected
+
+
+def format_of(path: Union[str, Path], fmt: Optional[str] = None) -> str:
+    """
+    Export format from `fmt`, else from the file extension (default csv).
+    Raises ValueError for an unknown format.
+    """
+    if fmt:
+        fmt = fmt.lower()
+    else:
+        suffix = Path(path).suffix.lower()
+        fmt = {".geojson": "geojson", ".json": "geojson", ".kml": "kml"}.get(suffix, "csv")
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    return fmt
+
+
+def _write_run(items: List[Any], directory: Optional[str]) -> str:
+    fd, path = tempfile.mkstemp(prefix="shamal-sort-", suffix=".jsonl", dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        for item in items:
+            f.write(json.dumps(item, ensure_ascii=False))
+            f.write("\n")
+    return path
+
+
+def _read_run(path: str) -> Iterator[Any]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def filename_key(record: Dict[str, Any]) -> str:
+    """Export order: case-insensitive filename."""
+    return (record.get("filename") or "").lower()
+
+
+class DiskSorter:
+    """
+    Sorts records pushed one at a time with add(), e.g. while a scan
+    produces them, holding at most `run_size` in memory (see
+    sorted_on_disk). Iterate once, after the last add(), for the records in
+    key order; close() removes the spilled runs when they are not needed.
+    """
+
+    def __init__(self, key: Callable[[Dict[str, Any]], str], run_size: int = RUN_SIZE,
+                 directory: Optional[str] = None):
+        self.key = key
+        self.run_size = run_size
+        self.directory = directory
+        self._run: List[Any] = []
+        self._paths: List[str] = []
+        self._seq = 0
+
+    def add(self, record: Dict[str, Any]) -> None:
+        # The sequence number keeps equal keys in input order
+        self._run.append((self.key(record), self._seq, record))
+        self._seq += 1
+        if len(self._run) >= self.run_size:
+            self._run.sort(key=lambda item: item[:2])
+            self._paths.append(_write_run(self._run, self.directory))
+            self._run = []
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        try:
+            self._run.sort(key=lambda item: item[:2])
+            if not self._paths:
+                for _key, _seq, record in self._run:
+                    yield record
+                return
+            runs = [_read_run(path) for path in self._paths]
+            runs.append(iter(self._run))
+            for _key, _seq, record in heapq.merge(*runs, key=lambda item: (item[0], item[1])):
+                yield record
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        for path in self._paths:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._paths = []
+        self._run = []
+
+
+def sorted_on_disk(records: Iterable[Dict[str, Any]], key: Callable[[Dict[str, Any]], str],
+                   run_size: int = RUN_SIZE, directory: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield JSON-serializable records sorted by key(record), stable like
+    sorted(). Only run_size records are held at a time; larger inputs are
+    merged from sorted runs in temporary files, removed when done.
+    """
+    sorter = DiskSorter(key, run_size, directory)
+    try:
+        for record in records:
+            sorter.add(record)
+        yield from sorter
+    finally:
+        sorter.close()
+
+
+class Exporter:
+    """
+    Writes records to an open text file; call begin(), write() per record,
+    then end(). `written` counts the records that made it into the file.
+    """
+
+    def __init__(self, f: IO[str], columns: Sequence[str]):
+        self.f = f
+        self.columns = list(columns)
+        self.written = 0
+
+    def begin(self) -> None:
+        pass
+
+    def write(self, record: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def end(self) -> None:
+        pass
+
+
+class CsvExporter(Exporter):
+    def begin(self) -> None:
+        self.writer = csv.writer(self.f)
+        self.writer.writerow(self.columns)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self.writer.writerow([format_value(key, record.get(key)) for key in self.columns])
+        self.written += 1
+
+
+def _position(record: Dict[str, Any]) -> Optional[List[float]]:
+    lat, lon = record.get("latitude"), record.get("longitude")
+    if lat is None or lon is None:
+        return None
+    alt = record.get("altitude")
+    return [lon, lat] if alt is None else [lon, lat, alt]
+
+
+class GeoJsonExporter(Exporter):
+    """FeatureCollection of Point features; the columns become properties."""
+
+    def begin(self) -> None:
+        self.f.write('{"type": "FeatureCollection", "features": [\n')
+
+    def write(self, record: Dict[str, Any]) -> None:
+        position = _position(record)
+        if position is None:
+            return
+        feature = {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": position},
+            "properties": {key: record.get(key) for key in self.columns},
+        }
+        if self.written:
+            self.f.write(",\n")
+        self.f.write(json.dumps(feature, ensure_ascii=False))
+        self.written += 1
+
+    def end(self) -> None:
+        self.f.write("\n]}\n")
+
+
+class KmlExporter(Exporter):
+    """Document of Point Placemarks named by filename; the columns become ExtendedData."""
+
+    def begin(self) -> None:
+        self.f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                     '<kml xmlns="http://www.opengis.net/kml/2.2">\n<Document>\n')
+
+    def write(self, record: Dict[str, Any]) -> None:
+        position = _position(record)
+        if position is None:
+            return
+        data = "".join(
+            f'<Data name="{escape(key)}"><value>{escape(format_value(key, record.get(key)))}</value></Data>'
+            for key in self.columns
+        )
+        coordinates = ",".join(repr(float(v)) for v in position)
+        self.f.write(
+            f"<Placemark><name>{escape(str(record.get('filename') or ''))}</name>"
+            f"<ExtendedData>{data}</ExtendedData>"
+            f"<Point><coordinates>{coordinates}</coordinates></Point></Placemark>\n"
+        )
+        self.written += 1
+
+    def end(self) -> None:
+        self.f.write("</Document>\n</kml>\n")
+
+
+EXPORTERS = {"csv": CsvExporter, "geojson": GeoJsonExporter, "kml": KmlExporter}
+
+
+def export_records(records: Iterable[Dict[str, Any]], path: Union[str, Path], fmt: Optional[str] = None,
+                   columns: Optional[Iterable[str]] = None, sort: bool = True,
+                   run_size: int = RUN_SIZE) -> Dict[str, Any]:
+    """
+    Stream records into `path` as CSV, GeoJSON or KML (see format_of),
+    sorted case-insensitively by filename unless sort is False (e.g. for a
+    DiskSorter already keyed by filename_key).
+
+    Returns {"path", "format", "columns", "exported"}. Raises ValueError
+    for an unknown format or column selection and OSError on write errors.
+    """
+    fmt = format_of(path, fmt)
+    columns = resolve_columns(columns)
+    if sort:
+        records = sorted_on_disk(records, filename_key, run_size, directory=str(Path(path).parent))
+    newline = "" if fmt == "csv" else None
+    with open(path, "w", newline=newline, encoding="utf-8") as f:
+        exporter = EXPORTERS[fmt](f, columns)
+        exporter.begin()
+        for record in records:
+            exporter.write(record)
+        exporter.end()
+    return {"path": str(path), "format": fmt, "columns": columns, "exported": exporter.written}
@@ -7,40 +7,65 @@ Input JSON (argv[1]):
   "recursive": bool,
   "mode": "scan" | ...,
   "exportCsv": bool,
-  "csvPath": "..."
+  "csvPath": "...",
+  "exportFormat": "csv" | "geojson" | "kml",  // export in this format; exportCsv
+                               // means "csv", see exporters.py
+  "exportPath": "...",         // same as csvPath, for any format
+  "exportColumns": [...],      // record keys to write (default: filename, latitude,
+                               // longitude, altitude, phi, alpha, kappa)
+  "resumeFrom": int,           // skip images before this walk position
+  "catalog": bool|str,         // read metadata from the image catalog where it is current
+                               // (true: default location), see common/catalog.py
+  "ioConcurrency": int,        // list folders and read headers concurrently, per mount
+  "mountConcurrency": {...},   // { "<mount path>": limit } overrides, see common/aio.py
+  "headerBudget": int,         // bytes read up front per image header (default 64 KiB),
+                               // see common/exif.py
+  "profile": bool|str|object   // timings / profile dump, see common/profiling.py
 }
 
-Progress messages (stdout lines):
-{ "type": "progress", "processed": n, "total": m, "percent": p, "status": "Scanning" }
+Progress messages (stdout lines, time-throttled with a heartbeat, see common/jobs.py):
+{ "type": "progress", "processed": n, "total": m, "percent": p, "status": "Scanning",
+  "rate": r, "etaSeconds": s, "elapsedSeconds": s }
+
+SIGTERM or a "cancel" line on stdin stops the scan after the current image;
+the partial result then has "cancelled": true and "resumeCursor", the walk
+position to send back as "resumeFrom". Nothing is exported for a partial scan.
+
+Export records are sorted by filename as the scan produces them (runs
+spilled next to the export file, see exporters.DiskSorter); the file itself
+is written once the scan is complete, so a cancelled scan leaves no
+half-written export behind.
 
 Final output JSON:
 {
   "images": [...],
-  "stats": { total, withGps, missingGps, writable },
+  "stats": { total, withGps, missingGps, writable, bytesRead },
   "success": true,
-  "csvPath": "...?" // optional
+  "csvPath": "...?", // optional: the exported file, whatever its format
+  "exportFormat": "...?",
+  "exported": n      // optional: rows / features / placemarks written
 }
 """
 
-import csv
 import json
 import os
 import sys
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
-
-XMP_NAMESPACE = "http://shamal.tools/ns/cameraorientation/1.0/"
+from typing import Any, Dict, List, Optional, Union
 
+# The shared metadata core lives in python/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-def load_pillow():
-    try:
-        from PIL import Image, ExifTags  # type: ignore
-    except ImportError:
-        return None, None
-    return Image, ExifTags
-
+from common import HEADER_BUDGET, header_budget, iter_image_files, read_metadata
+from common.aio import open_scheduler
+from common.catalog import open_catalog
+from common.orientation import extract_orientation
+from common.jobs import ProgressReporter, install_cancel, resume_offset
+from common.profiling import Profiler, active, phase
+from exporters import DiskSorter, export_records, filename_key, format_of
+from image_records import ImageRecords, iter_json
 
-Image, ExifTags = load_pillow()
+XMP_NAMESPACE = "http://shamal.tools/ns/cameraorientation/1.0/"
 
 SUPPORTED_EXT = {
     ".jpg",
@@ -66,178 +91,13 @@ def parse_args() -> Dict[str, Any]:
         return {}
 
 
-def dms_to_decimal(dms: Tuple[Any, Any, Any], ref: str) -> Optional[float]:
-    try:
-        degrees, minutes, seconds = dms
-
-        def to_float(x):
-            if isinstance(x, tuple) and len(x) == 2 and x[1]:
-                return float(x[0]) / float(x[1])
-            return float(x)
-
-        deg = to_float(degrees)
-        mins = to_float(minutes)
-        secs = to_float(seconds)
-        value = deg + (mins / 60.0) + (secs / 3600.0)
-        if ref in ["S", "W"]:
-            value *= -1
-        return round(value, 8)
-    except Exception:
-        return None
-
-
-def extract_gps_info(exif: Dict[int, Any]) -> Tuple[Optional[float], Optional[float], Optional[float]]:
-    if not exif:
-        return None, None, None
-    gps_info = exif.get(34853)  # GPSInfo tag
-    if not gps_info:
-        return None, None, None
-
-    gps_tags = {}
-    if ExifTags:
-        gps_tags = {ExifTags.GPSTAGS.get(k, k): v for k, v in gps_info.items()}
-
-    lat = lon = alt = None
-    try:
-        lat_data = gps_tags.get("GPSLatitude")
-        lat_ref = gps_tags.get("GPSLatitudeRef", "N")
-        lon_data = gps_tags.get("GPSLongitude")
-        lon_ref = gps_tags.get("GPSLongitudeRef", "E")
-        alt_data = gps_tags.get("GPSAltitude")
-
-        if lat_data and lon_data:
-            lat = dms_to_decimal(lat_data, lat_ref)
-            lon = dms_to_decimal(lon_data, lon_ref)
-        if alt_data is not None:
-            if isinstance(alt_data, tuple) and len(alt_data) == 2 and alt_data[1]:
-                alt = round(float(alt_data[0]) / float(alt_data[1]), 2)
-            else:
-                alt = round(float(alt_data), 2)
-    except Exception:
-        pass
-
-    return lat, lon, alt
-
-
-def decode_user_comment(raw: Any) -> Optional[str]:
-    if raw is None:
-        return None
-    if isinstance(raw, bytes):
-        try:
-            prefix = raw[:8]
-            payload = raw
-            if prefix in {b"ASCII\x00\x00\x00", b"UNICODE\x00", b"UNICODE\x00"}:
-                payload = raw[8:]
-            try:
-                return payload.decode("utf-8", errors="ignore")
-            except Exception:
-                try:
-                    return payload.decode("utf-16", errors="ignore")
-                except Exception:
-                    return None
-        except Exception:
-            return None
-    try:
-        return str(raw)
-    except Exception:
-        return None
-
-
-def parse_orientation_comment(text: Optional[str]) -> Tuple[Optional[float], Optional[float], Optional[float]]:
-    if not text:
-        return None, None, None
-    try:
-        data = json.loads(text)
-        phi = data.get("phi")
-        alpha = data.get("alpha")
-        kappa = data.get("kappa")
-        def to_float(v):
-            try:
-                return float(v)
-            except Exception:
-                return None
-        return to_float(phi), to_float(alpha), to_float(kappa)
-    except Exception:
-        return None, None, None
-
-
-def parse_xmp_sidecar(path: Path) -> Tuple[Optional[float], Optional[float], Optional[float]]:
-    sidecar = path.with_suffix(path.suffix + ".xmp")
-    if not sidecar.exists():
-        return None, None, None
-    try:
-        text = sidecar.read_text(encoding="utf-8", errors="ignore")
-    except Exception:
-        return None, None, None
-
-    def find(tag: str) -> Optional[float]:
-        import re
-        match = re.search(rf"<sgco:{tag}>(-?\d+(?:\.\d+)?)</sgco:{tag}>", text)
-        if match:
-            try:
-                return float(match.group(1))
-            except Exception:
-                return None
-        return None
-
-    phi = find("Phi")
-    alpha = find("Alpha")
-    kappa = find("Kappa")
-    return phi, alpha, kappa
-
-
-def extract_orientation(exif: Dict[int, Any], img_path: Optional[Path] = None) -> Tuple[Optional[float], Optional[float], Optional[float]]:
-    # Preferred: XMP sidecar if present
-    if img_path is not None:
-        x_phi, x_alpha, x_kappa = parse_xmp_sidecar(img_path)
-        if any(v is not None for v in (x_phi, x_alpha, x_kappa)):
-            return x_phi, x_alpha, x_kappa
-    if not exif:
-        return None, None, None
-    if ExifTags:
-        for key, val in exif.items():
-            if ExifTags.TAGS.get(key) == "UserComment":
-                comment = decode_user_comment(val)
-                return parse_orientation_comment(comment)
-    return None, None, None
-
-
-def extract_timestamp(exif: Dict[int, Any]) -> Optional[str]:
-    if not exif:
-        return None
-    for tag_name in ("DateTimeOriginal", "DateTime"):
-        for key, val in exif.items():
-            if ExifTags and ExifTags.TAGS.get(key) == tag_name:
-                try:
-                    return str(val)
-                except Exception:
-                    return None
-    return None
-
-
-def extract_camera(exif: Dict[int, Any]) -> Optional[str]:
-    if not exif or not ExifTags:
-        return None
-    model = None
-    make = None
-    for key, val in exif.items():
-        tag = ExifTags.TAGS.get(key)
-        if tag == "Model":
-            model = str(val)
-        elif tag == "Make":
-            make = str(val)
-    if model and make:
-        return f"{make} {model}".strip()
-    return model or make
-
-
 def is_writable_image(path: Path) -> bool:
     if path.suffix.lower() not in {".jpg", ".jpeg"}:
         return False
     return os.access(path, os.W_OK)
 
 
-def process_image(path: Path) -> Dict[str, Any]:
+def process_image(path: Path, meta: Optional[Dict[str, Any]] = None, budget: int = HEADER_BUDGET) -> Dict[str, Any]:
     writable = is_writable_image(path)
     base = {
         "filename": path.name,
@@ -255,102 +115,86 @@ def process_image(path: Path) -> Dict[str, Any]:
         "camera": None,
         "width": None,
         "height": None,
+        "bytesRead": None,
     }
 
-    if not Image:
-        return base
-
-    try:
-        with Image.open(path) as img:
-            exif = {}
-            try:
-                exif = img._getexif() or {}
-            except Exception:
-                exif = {}
-
-            lat, lon, alt = extract_gps_info(exif)
-            phi, alpha, kappa = extract_orientation(exif, path)
-            ts = extract_timestamp(exif)
-            camera = extract_camera(exif)
-
-            base["latitude"] = lat
-            base["longitude"] = lon
-            base["altitude"] = alt
-            base["phi"] = phi
-            base["alpha"] = alpha
-            base["kappa"] = kappa
-            base["timestamp"] = ts
-            base["camera"] = camera
-            try:
-                w, h = img.size
-                base["width"], base["height"] = int(w), int(h)
-            except Exception:
-                pass
-            base["hasGps"] = lat is not None and lon is not None
-
-            if writable:
-                base["exifStatus"] = "OK" if base["hasGps"] else "NO_EXIF"
-            else:
-                base["exifStatus"] = "READ_ONLY"
-    except Exception:
-        pass
+    if meta is None:
+        try:
+            meta = read_metadata(path, budget=budget)
+        except Exception:
+            return base
+
+    lat, lon, alt = meta["latitude"], meta["longitude"], meta["altitude"]
+    phi, alpha, kappa = extract_orientation(meta["user_comment"], path)
+
+    base["latitude"] = lat
+    base["longitude"] = lon
+    base["altitude"] = round(alt, 2) if alt is not None else None
+    base["phi"] = phi
+    base["alpha"] = alpha
+    base["kappa"] = kappa
+    base["timestamp"] = meta["timestamp"]
+    base["camera"] = meta["camera"]
+    base["width"], base["height"] = meta["width"], meta["height"]
+    base["hasGps"] = lat is not None and lon is not None
+    # Catalog entries cost no read at all
+    base["bytesRead"] = meta.get("bytes_read", 0)
+
+    if writable:
+        base["exifStatus"] = "OK" if base["hasGps"] else "NO_EXIF"
+    else:
+        base["exifStatus"] = "READ_ONLY"
 
     return base
 
 
-def fmt_num(value: Optional[float]) -> str:
-    if value is None:
-        return ""
-    try:
-        return f"{float(value):.6f}"
-    except Exception:
-        return ""
-
-
 def iter_image_paths(folder: Path, recursive: bool) -> List[Path]:
-    pattern = "**/*" if recursive else "*"
-    paths: List[Path] = []
-    for path in folder.glob(pattern):
-        if path.is_file() and path.suffix.lower() in SUPPORTED_EXT:
-            paths.append(path)
-    return paths
-
-
-def scan_folder(folder: Path, recursive: bool, progress_every: int = 10) -> Dict[str, Any]:
-    images: List[Dict[str, Any]] = []
-    paths = iter_image_paths(folder, recursive)
+    return [Path(p) for _name, p in iter_image_files(str(folder), SUPPORTED_EXT, recursive)]
+
+
+def scan_folder(folder: Path, recursive: bool, resume_from: int = 0, cancel=None, catalog=None,
+                scheduler=None, budget: int = HEADER_BUDGET, on_record=None) -> Dict[str, Any]:
+    # Column-wise records keep very large scans small; see image_records.py
+    images = ImageRecords()
+    with phase("walk"):
+        if scheduler is not None:
+            paths = [Path(p) for _name, p in scheduler.walk(str(folder), SUPPORTED_EXT, recursive)]
+        else:
+            paths = iter_image_paths(folder, recursive)
     total = len(paths)
-    if total == 0:
-        emit_progress(0, 0)
-        return {"images": images, "stats": compute_stats(images)}
-    for idx, path in enumerate(paths, start=1):
-        images.append(process_image(path))
-        if progress_every and idx % progress_every == 0:
-            emit_progress(idx, total)
-    emit_progress(total, total)
-    stats = compute_stats(images)
-    return {"images": images, "stats": stats}
-
-
-def emit_progress(done: int, total: int) -> None:
-    try:
-        percent = 0
-        if total:
-            percent = int(min(100, max(0, (done / total) * 100)))
-        payload = {
-            "type": "progress",
-            "processed": done,
-            "total": total,
-            "percent": percent,
-            "status": "Scanning",
-        }
-        sys.stdout.write(json.dumps(payload) + "\n")
-        sys.stdout.flush()
-    except Exception:
-        pass
-
-
-def compute_stats(images: List[Dict[str, Any]]) -> Dict[str, int]:
+    start = resume_offset(resume_from, total)
+    done = start
+    known: Dict[str, Dict[str, Any]] = {}
+    if catalog is not None:
+        with phase("io"):
+            known = catalog.lookup(str(path) for path in paths[start:])
+
+    def read(path: Path) -> Dict[str, Any]:
+        return process_image(path, known.get(str(path)), budget)
+
+    with phase("decode"), ProgressReporter(total, start=start) as reporter:
+        # The scheduler keeps several header reads in flight; results stay in walk order
+        results = scheduler.imap(read, paths[start:]) if scheduler is not None else map(read, paths[start:])
+        for _path in paths[start:]:
+            if cancel is not None and cancel.is_set():
+                break
+            images.append(next(results))
+            if on_record is not None:
+                # The record as it reads back from the column store, as a later export would see it
+                on_record(images.record(len(images) - 1))
+            done += 1
+            reporter.update(done)
+        reporter.finish()
+    result: Dict[str, Any] = {"images": images, "stats": compute_stats(images)}
+    if done < total:
+        result["cancelled"] = True
+        result["resumeCursor"] = done
+    return result
+
+
+def compute_stats(images: Union[ImageRecords, List[Dict[str, Any]]]) -> Dict[str, int]:
+    if isinstance(images, ImageRecords):
+        return images.stats()
     total = len(images)
     with_gps = sum(1 for i in images if i.get("hasGps"))
     writable = sum(1 for i in images if i.get("writable"))
@@ -362,12 +206,36 @@ def compute_stats(images: List[Dict[str, Any]]) -> Dict[str, int]:
     }
 
 
+def print_result(result: Dict[str, Any]) -> None:
+    """
+    Write the final JSON line, serializing the image records one at a time
+    instead of building the whole string in memory.
+    """
+    profiler = active()
+    if profiler is not None and profiler.enabled:
+        result = {**result, "timings": profiler.report()}
+    images = result.get("images")
+    if not isinstance(images, ImageRecords):
+        sys.stdout.write(json.dumps(result, ensure_ascii=False) + "\n")
+        return
+    for chunk in iter_json(result, images, ensure_ascii=False):
+        sys.stdout.write(chunk)
+    sys.stdout.write("\n")
+
+
 def main():
     payload = parse_args()
+    cancel = install_cancel()
+    with Profiler.from_payload(payload):
+        run(payload, cancel)
+
+
+def run(payload: Dict[str, Any], cancel=None) -> None:
     folder = payload.get("folder")
     recursive = bool(payload.get("recursive", True))
-    export_csv = bool(payload.get("exportCsv"))
-    csv_path = payload.get("csvPath")
+    # "exportCsv" predates the other formats
+    export_format = payload.get("exportFormat") or ("csv" if payload.get("exportCsv") else None)
+    export_path = payload.get("exportPath") or payload.get("csvPath")
     mode = payload.get("mode")
 
     if not folder:
@@ -379,58 +247,76 @@ def main():
         print(json.dumps({"error": "Folder not found", "images": [], "stats": {}}))
         return
 
-    if not Image:
-        print(json.dumps({"error": "Pillow not installed", "images": [], "stats": {}}))
-        return
-
-    result_scan = scan_folder(folder_path, recursive)
-    images = result_scan.get("images", [])
-    stats = result_scan.get("stats", compute_stats(images))
+    target_path = None
+    sorter = None
+    if export_format and mode != "scan":
+        fmt = str(export_format).lower()
+        target_path = Path(export_path) if export_path else folder_path / f"gps_export.{fmt}"
+        # Records are sorted into runs on disk as the scan produces them, so
+        # only the merge is left for the export once the scan is complete
+        directory = str(target_path.parent) if target_path.parent.is_dir() else None
+        sorter = DiskSorter(filename_key, directory=directory)
+
+    catalog = open_catalog(payload.get("catalog"))
+    scheduler = open_scheduler(payload)
+    try:
+        result_scan = scan_folder(folder_path, recursive, payload.get("resumeFrom"), cancel, catalog, scheduler,
+                                  header_budget(payload), sorter.add if sorter is not None else None)
+    except BaseException:
+        if sorter is not None:
+            sorter.close()
+        raise
+    finally:
+        if catalog is not None:
+            catalog.close()
+        if scheduler is not None:
+            scheduler.close()
+    images = result_scan["images"]
+    stats = result_scan["stats"]
+    partial = {key: result_scan[key] for key in ("cancelled", "resumeCursor") if key in result_scan}
 
     if mode == "scan":
-        complete_payload = {"type": "complete", "success": True, "images": images, "stats": stats}
-        print(json.dumps(complete_payload, ensure_ascii=False))
+        complete_payload = {"type": "complete", "success": True, "images": images, "stats": stats, **partial}
+        print_result(complete_payload)
         return
 
-    if export_csv:
-        target_path = Path(csv_path) if csv_path else folder_path / "gps_export.csv"
+    if partial:
+        if sorter is not None:
+            sorter.close()
+        print_result({"images": images, "stats": stats, **partial})
+        return
+
+    if sorter is not None:
         try:
-            ordered = sorted(images, key=lambda x: (x.get("filename") or "").lower())
-            with target_path.open("w", newline="", encoding="utf-8") as f:
-                writer = csv.writer(f)
-                writer.writerow(["filename", "latitude", "longitude", "altitude", "phi", "alpha", "kappa"])
-                for img in ordered:
-                    writer.writerow(
-                        [
-                            img.get("filename", ""),
-                            fmt_num(img.get("latitude")),
-                            fmt_num(img.get("longitude")),
-                            fmt_num(img.get("altitude")),
-                            fmt_num(img.get("phi")),
-                            fmt_num(img.get("alpha")),
-                            fmt_num(img.get("kappa")),
-                        ]
-                    )
+            fmt = format_of(target_path, fmt)
+            with phase("io"):
+                # Merges the sorted runs straight into the file
+                exported = export_records(sorter, target_path, fmt, payload.get("exportColumns"), sort=False)
         except Exception as exc:
-            print(
-                json.dumps(
-                    {
-                        "error": f"CSV export failed: {exc}",
-                        "images": images,
-                        "stats": stats,
-                        "csvPath": str(target_path),
-                    },
-                    ensure_ascii=False,
-                )
+            print_result(
+                {
+                    "error": f"{fmt.upper()} export failed: {exc}",
+                    "images": images,
+                    "stats": stats,
+                    "csvPath": str(target_path),
+                }
             )
             return
-
-        result = {"images": images, "stats": stats, "csvPath": str(target_path)}
-        print(json.dumps(result, ensure_ascii=False))
+        finally:
+            sorter.close()
+
+        result = {
+            "images": images,
+            "stats": stats,
+            "csvPath": exported["path"],
+            "exportFormat": exported["format"],
+            "exported": exported["exported"],
+        }
+        print_result(result)
         return
 
     result = {"images": images, "stats": stats}
-    print(json.dumps(result, ensure_ascii=False))
+    print_result(result)
 
 
 if __name__ == "__main__":
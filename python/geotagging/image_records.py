@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Compact storage for per-image scan results.
+
+A scan of a few hundred thousand images used to keep one 15-key dict per
+image, plus the whole JSON string, in memory. ImageRecords stores the same
+fields column-wise instead: numbers in typed arrays (NaN / -1 mark missing
+values), directories and camera names in an interned string table referenced
+by index, and flags in a byte array. Derived fields (path, hasGps,
+exifStatus) are rebuilt on demand.
+
+Records are turned back into the familiar dicts one at a time, so stats, CSV
+export and the JSON result can all be streamed without materializing them.
+"""
+
+import json
+import math
+import os
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+FLAG_WRITABLE = 1
+FLAG_HAS_GPS = 2
+
+# Records serialized per json.dumps call when streaming
+JSON_BLOCK = 512
+
+FLOAT_FIELDS = ("latitude", "longitude", "altitude", "phi", "alpha", "kappa")
+
+
+def _to_float(value: Any) -> float:
+    return math.nan if value is None else float(value)
+
+
+def _from_float(value: float) -> Optional[float]:
+    return None if value != value else value
+
+
+class StringTable:
+    """
+    Interns repeated strings (directories, camera models) as small integers.
+    Index 0 is reserved for None.
+    """
+
+    __slots__ = ("values", "_index")
+
+    def __init__(self):
+        self.values: List[Optional[str]] = [None]
+        self._index: Dict[str, int] = {}
+
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+        index = self._index.get(value)
+        if index is None:
+            index = self._index[value] = len(self.values)
+            self.values.append(value)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.values) - 1
+
+
+class ImageRecords:
+    """
+    Column-oriented list of scan results; append() takes a process_image() dict.
+    """
+
+    def __init__(self):
+        self.strings = StringTable()
+        self.names: List[str] = []
+        self.timestamps: List[Optional[str]] = []
+        self.dirs = array("I")
+        self.cameras = array("I")
+        self.flags = array("B")
+        self.sizes = array("l")
+        self.reads = array("l")
+        self.floats = {name: array("d") for name in FLOAT_FIELDS}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        path = record.get("path") or ""
+        directory, name = os.path.split(path)
+        # Filenames are unique within a folder, so they are not interned
+        self.names.append(name or record.get("filename") or "")
+        self.dirs.append(self.strings.add(directory))
+        self.cameras.append(self.strings.add(record.get("camera")))
+        self.timestamps.append(record.get("timestamp"))
+        flags = (FLAG_WRITABLE if record.get("writable") else 0) | (FLAG_HAS_GPS if record.get("hasGps") else 0)
+        self.flags.append(flags)
+        width, height = record.get("width"), record.get("height")
+        self.sizes.append(-1 if width is None else int(width))
+        self.sizes.append(-1 if height is None else int(height))
+        bytes_read = record.get("bytesRead")
+        self.reads.append(-1 if bytes_read is None else int(bytes_read))
+        for name in FLOAT_FIELDS:
+            self.floats[name].append(_to_float(record.get(name)))
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> None:
+        for record in records:
+            self.append(record)
+
+    def record(self, i: int) -> Dict[str, Any]:
+        """Rebuild the process_image() dict for record i, with the same key order."""
+        name = self.names[i]
+        directory = self.strings.values[self.dirs[i]]
+        flags = self.flags[i]
+        writable = bool(flags & FLAG_WRITABLE)
+        has_gps = bool(flags & FLAG_HAS_GPS)
+        if not writable:
+            status = "READ_ONLY"
+        else:
+            status = "OK" if has_gps else "NO_EXIF"
+        width, height = self.sizes[2 * i], self.sizes[2 * i + 1]
+        bytes_read = self.reads[i]
+        values = {key: _from_float(self.floats[key][i]) for key in FLOAT_FIELDS}
+        return {
+            "filename": name,
+            "path": os.path.join(directory, name) if directory else name,
+            "hasGps": has_gps,
+            **values,
+            "writable": writable,
+            "exifStatus": status,
+            "timestamp": self.timestamps[i],
+            "camera": self.strings.values[self.cameras[i]],
+            "width": None if width < 0 else width,
+            "height": None if height < 0 else height,
+            "bytesRead": None if bytes_read < 0 else bytes_read,
+        }
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self.names)):
+            yield self.record(i)
+
+    def order_by_name(self) -> List[int]:
+        """Record indices sorted case-insensitively by filename."""
+        names = self.names
+        return sorted(range(len(names)), key=lambda i: names[i].lower())
+
+    def stats(self) -> Dict[str, int]:
+        total = len(self.flags)
+        with_gps = sum(1 for f in self.flags if f & FLAG_HAS_GPS)
+        writable = sum(1 for f in self.flags if f & FLAG_WRITABLE)
+        return {
+            "total": total,
+            "withGps": with_gps,
+            "missingGps": total - with_gps,
+            "writable": writable,
+            "bytesRead": sum(n for n in self.reads if n > 0),
+        }
+
+
+def iter_json(result: Dict[str, Any], records: ImageRecords, key: str = "images", **kwargs) -> Iterator[str]:
+    """
+    Yield the JSON text of `result` with `records` serialized under `key`,
+    one record at a time. Output matches json.dumps(result with the list).
+    """
+    item_sep, key_sep = kwargs.get("separators") or (", ", ": ")
+    head = dict(result)
+    head[key] = []
+    body = json.dumps(head, **kwargs)
+    placeholder = json.dumps(key, **kwargs) + key_sep + "[]"
+    before, _, after = body.partition(placeholder)
+    yield before + placeholder[:-1]
+    # Serializing a block of records at once is much faster than one by one
+    for start in range(0, len(records), JSON_BLOCK):
+        block = [records.record(i) for i in range(start, min(start + JSON_BLOCK, len(records)))]
+        text = json.dumps(block, **kwargs)[1:-1]
+        yield text if start == 0 else item_sep + text
+    yield "]" + after
@@ -6,9 +6,19 @@ Input JSON via argv[1]:
 {
   "folder": "...",
   "csv": "...",
-  "recursive": bool
+  "recursive": bool,
+  "resumeFrom": int,           # skip CSV rows before this position
+  "catalog": bool|str,         # re-index written images in the image catalog
+                               # (true: default location), see common/catalog.py
+  "ioConcurrency": int,        # write several images at once, per mount, and list
+  "mountConcurrency": {...},   # folders concurrently; see common/aio.py
+  "profile": bool|str|object   # timings / profile dump, see common/profiling.py
 }
 
+Progress lines ({"type": "progress", ..., "status": "Writing"}) are
+time-throttled with a heartbeat, see common/jobs.py. SIGTERM or a "cancel"
+line on stdin stops before the next row; images already written stay written.
+
 CSV columns (case-insensitive header supported; positional fallback):
 col0: filename (required)
 col1: latitude (required)
@@ -23,7 +33,9 @@ Output JSON:
   "processed": <int>,   # CSV rows processed
   "updated": <int>,     # images written
   "skipped": <int>,     # rows skipped (missing coords, not found, read-only, errors)
-  "errors": [ { "row": <int>, "reason": <string> } ]
+  "errors": [ { "row": <int>, "reason": <string> } ],
+  "cancelled": true,    # only when stopped early
+  "resumeCursor": <int> # CSV row position to send back as "resumeFrom"
 }
 """
 
@@ -31,9 +43,19 @@ import csv
 import json
 import os
 import sys
+from collections import deque
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+# The shared metadata core lives in python/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common import iter_image_files
+from common.aio import open_scheduler
+from common.catalog import open_catalog
+from common.jobs import ProgressReporter, install_cancel, resume_offset
+from common.profiling import Profiler, dumps, phase
+
 ORIENTATION_JSON_KEY = "camera_orientation"
 XMP_NAMESPACE = "http://shamal.tools/ns/cameraorientation/1.0/"
 
@@ -148,13 +170,10 @@ def normalize_float(value: Any) -> Optional[float]:
         return None
 
 
-def iter_images(folder: Path, recursive: bool) -> List[Path]:
-    pattern = "**/*" if recursive else "*"
-    images: List[Path] = []
-    for path in folder.glob(pattern):
-        if path.is_file() and path.suffix.lower() in {".jpg", ".jpeg"}:
-            images.append(path)
-    return images
+def iter_images(folder: Path, recursive: bool, scheduler=None) -> List[Path]:
+    if scheduler is not None:
+        return [Path(p) for _name, p in scheduler.walk(str(folder), {".jpg", ".jpeg"}, recursive)]
+    return [Path(p) for _name, p in iter_image_files(str(folder), {".jpg", ".jpeg"}, recursive)]
 
 
 def decode_user_comment(raw: Any) -> Optional[str]:
@@ -269,6 +288,12 @@ def write_gps_to_image(
 
 def main():
     payload = parse_args()
+    cancel = install_cancel()
+    with Profiler.from_payload(payload):
+        run(payload, cancel)
+
+
+def run(payload: Dict[str, Any], cancel=None) -> None:
     folder = payload.get("folder")
     csv_path = payload.get("csv")
     recursive = bool(payload.get("recursive", True))
@@ -294,12 +319,15 @@ def main():
 
     load_errors: List[Dict[str, Any]] = []
     try:
-        rows, load_errors = load_csv(csv_file)
+        with phase("io"):
+            rows, load_errors = load_csv(csv_file)
     except Exception as exc:
         print(json.dumps({"error": f"Failed to read CSV: {exc}", "processed": 0, "updated": 0, "skipped": 0, "errors": []}))
         return
 
-    images = iter_images(folder_path, recursive)
+    scheduler = open_scheduler(payload)
+    with phase("walk"):
+        images = iter_images(folder_path, recursive, scheduler)
     image_map = {p.name.lower(): p for p in images}
 
     updated = 0
@@ -307,106 +335,144 @@ def main():
     total_rows = len(rows)
     errors: List[Dict[str, Any]] = list(load_errors)
     logs: List[Dict[str, Any]] = []
-
-    for row in rows:
-        name_raw = (row.get("image_name") or "").strip()
-        name = name_raw.lower()
-        lat_raw = (row.get("latitude") or "").strip()
-        lon_raw = (row.get("longitude") or "").strip()
-        alt_raw = (row.get("altitude") or "").strip()
-        phi_raw = (row.get("phi") or "").strip()
-        alpha_raw = (row.get("alpha") or "").strip()
-        kappa_raw = (row.get("kappa") or "").strip()
-
-        # Name check
-        if name == "":
-            skipped += 1
-            errors.append({"row": row.get("_row", "?"), "reason": "Missing image name"})
-            continue
-
-        # Presence check for lat/lon
-        if lat_raw == "":
-            skipped += 1
-            errors.append({"row": row.get("_row", "?"), "reason": "Invalid latitude"})
-            continue
-        if lon_raw == "":
-            skipped += 1
-            errors.append({"row": row.get("_row", "?"), "reason": "Invalid longitude"})
-            continue
-
-        # Numeric parse
-        lat = normalize_float(lat_raw)
-        lon = normalize_float(lon_raw)
-        alt = normalize_float(alt_raw) if alt_raw != "" else None
-        # Optional orientation; parse but do not warn on missing; warn on invalid
-        phi = normalize_float(phi_raw) if phi_raw else None
-        alpha = normalize_float(alpha_raw) if alpha_raw else None
-        kappa = normalize_float(kappa_raw) if kappa_raw else None
-
-        if lat is None:
-            skipped += 1
-            errors.append({"row": row.get("_row", "?"), "reason": "Invalid latitude"})
-            logs.append({"row": row.get("_row", "?"), "image": name_raw, "success": False, "reason": "Invalid latitude"})
-            continue
-        if lon is None:
-            skipped += 1
-            errors.append({"row": row.get("_row", "?"), "reason": "Invalid longitude"})
-            logs.append({"row": row.get("_row", "?"), "image": name_raw, "success": False, "reason": "Invalid longitude"})
-            continue
-        if not (-90.0 <= lat <= 90.0):
-            skipped += 1
-            errors.append({"row": row.get("_row", "?"), "reason": "Latitude out of range"})
-            logs.append({"row": row.get("_row", "?"), "image": name_raw, "success": False, "reason": "Latitude out of range"})
-            continue
-        if not (-180.0 <= lon <= 180.0):
-            skipped += 1
-            errors.append({"row": row.get("_row", "?"), "reason": "Longitude out of range"})
-            logs.append({"row": row.get("_row", "?"), "image": name_raw, "success": False, "reason": "Longitude out of range"})
-            continue
-        orientation_warnings: List[str] = []
-        if phi_raw and phi is None:
-            orientation_warnings.append("Invalid phi")
-        if alpha_raw and alpha is None:
-            orientation_warnings.append("Invalid alpha")
-        if kappa_raw and kappa is None:
-            orientation_warnings.append("Invalid kappa")
-        # If invalid orientation values were provided, drop them but keep GPS write
-        if phi is None:
-            phi = None
-        if alpha is None:
-            alpha = None
-        if kappa is None:
-            kappa = None
-        img_path = image_map.get(name)
-        if not img_path:
-            skipped += 1
-            errors.append({"row": row.get("_row", "?"), "reason": f"Image not found for {name_raw}"})
-            logs.append({"row": row.get("_row", "?"), "image": name_raw, "success": False, "reason": "Image not found"})
-            continue
-        if not os.access(img_path, os.W_OK):
-            skipped += 1
-            errors.append({"row": row.get("_row", "?"), "reason": f"Read-only file skipped: {img_path}"})
-            logs.append({"row": row.get("_row", "?"), "image": name_raw, "success": False, "reason": "Read-only file"})
-            continue
-        orientation = (phi, alpha, kappa)
-        success, err = write_gps_to_image(img_path, piexif_mod, lat, lon, alt, orientation)
+    written: List[str] = []
+    # With a scheduler, writes run ahead of the loop; results are recorded in row order
+    pending: deque = deque()
+    window = scheduler.concurrency * 2 if scheduler is not None else 0
+
+    def record(row: Dict[str, Any], name_raw: str, img_path: Path, warnings: List[str],
+               outcome: Tuple[bool, Optional[str]]) -> None:
+        nonlocal updated, skipped
+        success, err = outcome
         if success:
             updated += 1
-            reason = "; ".join(orientation_warnings) if orientation_warnings else "OK"
+            written.append(str(img_path))
+            reason = "; ".join(warnings) if warnings else "OK"
             logs.append({"row": row.get("_row", "?"), "image": name_raw, "success": True, "reason": reason})
         else:
             skipped += 1
             errors.append({"row": row.get("_row", "?"), "reason": f"Failed to write GPS for {img_path}: {err or 'unknown error'}"})
             logs.append({"row": row.get("_row", "?"), "image": name_raw, "success": False, "reason": err or "write failed"})
 
+    def settle(limit: int) -> None:
+        while len(pending) > limit:
+            row, name_raw, img_path, warnings, future = pending.popleft()
+            record(row, name_raw, img_path, warnings, future.result())
+
+    def fail(row: Dict[str, Any], name_raw: str, reason: str, log_reason: Optional[str] = None) -> None:
+        nonlocal skipped
+        settle(0)
+        skipped += 1
+        errors.append({"row": row.get("_row", "?"), "reason": reason})
+        if log_reason is not None:
+            logs.append({"row": row.get("_row", "?"), "image": name_raw, "success": False, "reason": log_reason})
+
+    start = resume_offset(payload.get("resumeFrom"), total_rows)
+    cursor = start
+    with ProgressReporter(total_rows, status="Writing", start=start) as reporter:
+        for row in rows[start:]:
+            if cancel is not None and cancel.is_set():
+                break
+            reporter.update(cursor)
+            cursor += 1
+            name_raw = (row.get("image_name") or "").strip()
+            name = name_raw.lower()
+            lat_raw = (row.get("latitude") or "").strip()
+            lon_raw = (row.get("longitude") or "").strip()
+            alt_raw = (row.get("altitude") or "").strip()
+            phi_raw = (row.get("phi") or "").strip()
+            alpha_raw = (row.get("alpha") or "").strip()
+            kappa_raw = (row.get("kappa") or "").strip()
+
+            # Name check
+            if name == "":
+                fail(row, name_raw, "Missing image name")
+                continue
+
+            # Presence check for lat/lon
+            if lat_raw == "":
+                fail(row, name_raw, "Invalid latitude")
+                continue
+            if lon_raw == "":
+                fail(row, name_raw, "Invalid longitude")
+                continue
+
+            # Numeric parse
+            lat = normalize_float(lat_raw)
+            lon = normalize_float(lon_raw)
+            alt = normalize_float(alt_raw) if alt_raw != "" else None
+            # Optional orientation; parse but do not warn on missing; warn on invalid
+            phi = normalize_float(phi_raw) if phi_raw else None
+            alpha = normalize_float(alpha_raw) if alpha_raw else None
+            kappa = normalize_float(kappa_raw) if kappa_raw else None
+
+            if lat is None:
+                fail(row, name_raw, "Invalid latitude", "Invalid latitude")
+                continue
+            if lon is None:
+                fail(row, name_raw, "Invalid longitude", "Invalid longitude")
+                continue
+            if not (-90.0 <= lat <= 90.0):
+                fail(row, name_raw, "Latitude out of range", "Latitude out of range")
+                continue
+            if not (-180.0 <= lon <= 180.0):
+                fail(row, name_raw, "Longitude out of range", "Longitude out of range")
+                continue
+            orientation_warnings: List[str] = []
+            if phi_raw and phi is None:
+                orientation_warnings.append("Invalid phi")
+            if alpha_raw and alpha is None:
+                orientation_warnings.append("Invalid alpha")
+            if kappa_raw and kappa is None:
+                orientation_warnings.append("Invalid kappa")
+            # If invalid orientation values were provided, drop them but keep GPS write
+            if phi is None:
+                phi = None
+            if alpha is None:
+                alpha = None
+            if kappa is None:
+                kappa = None
+            img_path = image_map.get(name)
+            if not img_path:
+                fail(row, name_raw, f"Image not found for {name_raw}", "Image not found")
+                continue
+            if not os.access(img_path, os.W_OK):
+                fail(row, name_raw, f"Read-only file skipped: {img_path}", "Read-only file")
+                continue
+            orientation = (phi, alpha, kappa)
+            args = (img_path, piexif_mod, lat, lon, alt, orientation)
+            if scheduler is not None:
+                if any(entry[2] == img_path for entry in pending):
+                    # Two rows for one image: the later write must not overlap the earlier
+                    settle(0)
+                pending.append((row, name_raw, img_path, orientation_warnings, scheduler.submit(str(img_path), write_gps_to_image, *args)))
+                settle(window)
+            else:
+                with phase("io"):
+                    record(row, name_raw, img_path, orientation_warnings, write_gps_to_image(*args))
+        with phase("io"):
+            settle(0)
+        reporter.update(cursor, force=True)
+    if scheduler is not None:
+        scheduler.close()
+
+    catalog = open_catalog(payload.get("catalog"))
+    if catalog is not None:
+        # New GPS tags changed the files; store their new metadata right away
+        with phase("io"), catalog:
+            catalog.refresh(written)
+
     result = {
-        "processed": total_rows,
+        "processed": cursor - start,
         "updated": updated,
         "skipped": skipped,
         "errors": errors,
         "logs": logs,
     }
-    print(json.dumps(result, ensure_ascii=False))
+    if cursor < total_rows:
+        result["cancelled"] = True
+        result["resumeCursor"] = cursor
+    print(dumps(result, ensure_ascii=False))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,564 @@
+#!/usr/bin/env python3
+"""
+Parallel file copy engine shared by the Map Organizer export scripts.
+
+Files are copied on a thread pool. Where the platform supports it the data is
+moved kernel-side (os.copy_file_range, then os.sendfile on Linux), which avoids
+round-tripping every byte through Python and lets filesystems that support it
+(NFS 4.2, SMB3, Btrfs, XFS) copy server-side. Metadata is preserved with
+shutil.copystat, matching shutil.copy2.
+
+Besides copying, files can be placed as hardlinks, reflinks (copy-on-write
+clones) or symlinks. Hardlinks and reflinks need source and destination on the
+same filesystem; whenever a link cannot be made the file is copied instead and
+the per-file result records which method was actually used.
+
+In sync mode, destinations that already match their source by size and
+modification time are skipped. An optional verification pass hashes source and
+destination of every exported file on the pool with chunked reads.
+
+Progress messages (stdout lines):
+{ "type": "progress", "processed": n, "total": m, "percent": p, "status": "Copying",
+  "bytes": b, "mbPerSec": s, "rate": files_per_s, "etaSeconds": s }
+
+copy_files() takes an optional cancel token (anything with is_set(), such as
+threading.Event). Once set, jobs that have not started are dropped and the
+result reports "cancelled" and a "cursor": the number of leading jobs that
+finished, so a rerun can skip exactly those.
+
+copy_files() can also hand its jobs to a common.aio.IOScheduler instead of
+its own pool, so copies from a network share respect that share's
+concurrency limit.
+"""
+
+import errno
+import hashlib
+import json
+import os
+import shutil
+import stat
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
+
+DEFAULT_WORKERS = 4
+MAX_WORKERS = 32
+
+EXPORT_MODES = ("copy", "hardlink", "reflink", "symlink")
+
+# FAT/exFAT store modification times with two-second resolution
+SYNC_MTIME_TOLERANCE = 2.0
+
+HASH_CHUNK = 1024 * 1024
+
+# Linux ioctl that clones a whole file (Btrfs, XFS, bcachefs, ...)
+FICLONE = 0x40049409
+
+# Jobs read from the input per scheduling round; bounds memory for huge manifests
+CHUNK_JOBS = 1024
+
+# Upper bound for a single copy_file_range/sendfile call
+KERNEL_CHUNK = 64 * 1024 * 1024
+
+# Errors that mean "this copy method is not available here", not "the copy failed"
+_UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.ENOTSUP,
+    errno.EOPNOTSUPP,
+    errno.EBADF,
+}
+
+_HAS_COPY_FILE_RANGE = hasattr(os, "copy_file_range")
+_HAS_FILE_SENDFILE = hasattr(os, "sendfile") and sys.platform.startswith("linux")
+
+
+def resolve_workers(value, default=DEFAULT_WORKERS):
+    """
+    Normalize a user-supplied worker count.
+
+    Args:
+        value: Requested worker count (any type)
+        default (int): Value used when the request is missing or invalid
+
+    Returns:
+        int: Worker count between 1 and MAX_WORKERS
+    """
+    try:
+        workers = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        workers = default
+    return max(1, min(MAX_WORKERS, workers))
+
+
+def _kernel_copy(fd_in, fd_out, size):
+    """
+    Copy size bytes between file descriptors without user-space buffers.
+
+    Returns:
+        int: Number of bytes copied; may be short if no kernel method applies
+    """
+    offset = 0
+
+    if _HAS_COPY_FILE_RANGE:
+        try:
+            while offset < size:
+                sent = os.copy_file_range(fd_in, fd_out, min(KERNEL_CHUNK, size - offset), offset, offset)
+                if sent == 0:
+                    break
+                offset += sent
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+
+    if offset < size and _HAS_FILE_SENDFILE:
+        try:
+            os.lseek(fd_out, offset, os.SEEK_SET)
+            while offset < size:
+                sent = os.sendfile(fd_out, fd_in, offset, min(KERNEL_CHUNK, size - offset))
+                if sent == 0:
+                    break
+                offset += sent
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+
+    return offset
+
+
+def copy_file(source, destination):
+    """
+    Copy a file and its metadata, like shutil.copy2, using kernel-side copying.
+
+    Args:
+        source (str): Source file path
+        destination (str): Destination file path
+
+    Returns:
+        int: Number of bytes copied
+    """
+    if not (_HAS_COPY_FILE_RANGE or _HAS_FILE_SENDFILE):
+        # shutil already uses the native fast path on macOS and Windows
+        shutil.copyfile(source, destination)
+        shutil.copystat(source, destination)
+        return os.path.getsize(destination)
+
+    with open(source, "rb") as fsrc:
+        size = os.fstat(fsrc.fileno()).st_size
+        with open(destination, "wb") as fdst:
+            copied = _kernel_copy(fsrc.fileno(), fdst.fileno(), size)
+            if copied < size:
+                # Fall back to buffered copying for whatever is left
+                fsrc.seek(copied)
+                fdst.seek(copied)
+                shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+    shutil.copystat(source, destination)
+    return size
+
+
+def reflink_file(source, destination):
+    """
+    Create a copy-on-write clone of a file and copy its metadata.
+
+    Args:
+        source (str): Source file path
+        destination (str): Destination file path
+
+    Raises:
+        OSError: If the platform or filesystem cannot clone the file
+    """
+    if sys.platform.startswith("linux"):
+        import fcntl
+
+        with open(source, "rb") as fsrc, open(destination, "wb") as fdst:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    elif sys.platform == "darwin":
+        import ctypes
+
+        libc = ctypes.CDLL(None, use_errno=True)
+        if os.path.lexists(destination):
+            os.unlink(destination)
+        if libc.clonefile(os.fsencode(source), os.fsencode(destination), 0) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+    else:
+        raise OSError(errno.ENOTSUP, "Reflinks are not supported on this platform")
+    shutil.copystat(source, destination)
+
+
+def _replace_with_link(link_func, source, destination):
+    """
+    Create a link at destination, replacing an existing file like a copy would.
+    """
+    try:
+        link_func(source, destination)
+    except FileExistsError:
+        os.unlink(destination)
+        link_func(source, destination)
+
+
+def _place_file(source, destination, mode, same_filesystem):
+    """
+    Place a single file using the requested mode, falling back to copying.
+
+    Returns:
+        tuple: (method used, bytes copied)
+    """
+    try:
+        if mode == "hardlink" and same_filesystem:
+            _replace_with_link(os.link, source, destination)
+            return "hardlink", 0
+        if mode == "reflink" and same_filesystem:
+            reflink_file(source, destination)
+            return "reflink", 0
+        if mode == "symlink":
+            _replace_with_link(os.symlink, os.path.abspath(source), destination)
+            return "symlink", 0
+    except (OSError, NotImplementedError):
+        # Unsupported filesystem, missing privilege, link count limit, ...
+        pass
+    return "copy", copy_file(source, destination)
+
+
+def _destination_device(destination, cache):
+    """
+    Return st_dev of a destination's folder, caching one stat per folder.
+    """
+    folder = os.path.dirname(os.path.abspath(destination))
+    if folder not in cache:
+        try:
+            cache[folder] = os.stat(folder).st_dev
+        except OSError:
+            cache[folder] = None
+    return cache[folder]
+
+
+def is_up_to_date(source_stat, destination_stat):
+    """
+    Decide whether an existing destination already matches its source.
+
+    Args:
+        source_stat (os.stat_result): Source file stat
+        destination_stat (os.stat_result): Destination file stat
+
+    Returns:
+        bool: True if size matches and mtimes are within SYNC_MTIME_TOLERANCE
+    """
+    if not stat.S_ISREG(destination_stat.st_mode):
+        return False
+    if source_stat.st_size != destination_stat.st_size:
+        return False
+    return abs(source_stat.st_mtime - destination_stat.st_mtime) <= SYNC_MTIME_TOLERANCE
+
+
+def _copy_job(source, destination, mode="copy", device_cache=None, sync=False):
+    """
+    Validate and copy a single file, returning a result dict instead of raising.
+    """
+    try:
+        st = os.stat(source)
+    except FileNotFoundError:
+        return {"ok": False, "reason": "missing", "error": "Source file does not exist", "bytes": 0}
+    except PermissionError:
+        return {"ok": False, "reason": "permission", "error": "Permission denied", "bytes": 0}
+    except OSError as e:
+        return {"ok": False, "reason": "error", "error": str(e), "bytes": 0}
+
+    if not stat.S_ISREG(st.st_mode):
+        return {"ok": False, "reason": "not_file", "error": "Source path is not a file", "bytes": 0}
+
+    try:
+        if os.path.islink(destination):
+            if mode == "symlink" and os.path.exists(destination) and os.path.samefile(destination, source):
+                # Already linked by a previous export
+                return {"ok": True, "bytes": 0, "method": mode}
+            # Never write through a stale link into whatever it points at
+            os.unlink(destination)
+    except OSError as e:
+        return {"ok": False, "reason": "error", "error": str(e), "bytes": 0}
+
+    try:
+        dest_st = os.stat(destination)
+    except OSError:
+        dest_st = None
+    if dest_st is not None and os.path.samestat(st, dest_st):
+        same_path = os.path.normcase(os.path.abspath(source)) == os.path.normcase(os.path.abspath(destination))
+        if mode == "hardlink" and not same_path:
+            return {"ok": True, "bytes": 0, "method": mode}
+        if same_path:
+            # Copying a file onto itself would truncate it
+            return {"ok": False, "reason": "same_file", "error": "Source and destination are the same file", "bytes": 0}
+
+    if sync and dest_st is not None and is_up_to_date(st, dest_st):
+        return {"ok": True, "bytes": 0, "method": "skipped"}
+
+    try:
+        if dest_st is not None and stat.S_ISREG(dest_st.st_mode) and dest_st.st_nlink > 1:
+            # A hard link from an earlier export: writing into it would change
+            # every other name of the file, typically the original image
+            os.unlink(destination)
+    except OSError as e:
+        return {"ok": False, "reason": "error", "error": str(e), "bytes": 0}
+
+    same_filesystem = False
+    if mode in ("hardlink", "reflink"):
+        same_filesystem = st.st_dev == _destination_device(destination, device_cache if device_cache is not None else {})
+
+    try:
+        method, copied = _place_file(source, destination, mode, same_filesystem)
+        return {"ok": True, "bytes": copied, "method": method}
+    except PermissionError:
+        return {"ok": False, "reason": "permission", "error": "Permission denied", "bytes": 0}
+    except Exception as e:
+        return {"ok": False, "reason": "error", "error": str(e), "bytes": 0}
+
+
+def _run_group(jobs, indices, mode, device_cache, sync):
+    """
+    Run jobs that share a destination one after another, in input order.
+    """
+    return [(index, _copy_job(jobs[index][0], jobs[index][1], mode, device_cache, sync)) for index in indices]
+
+
+def hash_file(path, chunk_size=HASH_CHUNK):
+    """
+    Hash a file with BLAKE2b using fixed-size chunked reads.
+
+    Args:
+        path (str): File path
+        chunk_size (int): Read size in bytes
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.blake2b()
+    with open(path, "rb", buffering=0) as f:
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+
+def _verify_pair(source, destination):
+    """
+    Compare source and destination contents by hash.
+
+    Returns:
+        tuple: (matches, error message or None)
+    """
+    try:
+        if os.path.samefile(source, destination):
+            # Hardlinks and symlinks share their data with the source
+            return True, None
+        return hash_file(source) == hash_file(destination), None
+    except OSError as e:
+        return False, str(e)
+
+
+def verify_copies(pairs, workers=DEFAULT_WORKERS, progress=True, progress_every=25):
+    """
+    Hash sources and destinations on a thread pool and report mismatches.
+
+    Args:
+        pairs (list): (source, destination) tuples of exported files
+        workers (int): Thread pool size
+        progress (bool): Whether to emit progress lines to stdout
+        progress_every (int): Emit progress after this many verified files
+
+    Returns:
+        dict: 'verified' count and 'mismatched' list of dicts with 'file',
+              'target' and optionally 'error'
+    """
+    total = len(pairs)
+    mismatched = []
+    start = time.monotonic()
+    done = 0
+
+    with ThreadPoolExecutor(max_workers=resolve_workers(workers)) as executor:
+        # map() keeps results in input order so the mismatch list is stable
+        for (source, destination), (matches, error) in zip(
+            pairs, executor.map(lambda pair: _verify_pair(*pair), pairs)
+        ):
+            done += 1
+            if not matches:
+                entry = {"file": source, "target": destination}
+                if error:
+                    entry["error"] = error
+                mismatched.append(entry)
+            if progress and (done % progress_every == 0 or done == total):
+                emit_progress(done, total, 0, time.monotonic() - start, status="Verifying")
+
+    return {"verified": total, "mismatched": mismatched}
+
+
+def emit_progress(done, total, copied_bytes, elapsed, status="Copying"):
+    """
+    Write a copy progress line to stdout.
+
+    Args:
+        done (int): Files finished so far
+        total (int): Total files, or None while still unknown
+        copied_bytes (int): Bytes copied so far
+        elapsed (float): Seconds since the copy started
+        status (str): Status label shown by the UI
+    """
+    try:
+        percent = None if total is None else 0
+        if total:
+            percent = int(min(100, max(0, (done / total) * 100)))
+        payload = {
+            "type": "progress",
+            "processed": done,
+            "total": total,
+            "percent": percent,
+            "status": status,
+            "bytes": copied_bytes,
+            "mbPerSec": throughput_mb_s(copied_bytes, elapsed),
+        }
+        rate = done / elapsed if elapsed > 0 else 0.0
+        payload["rate"] = round(rate, 2)
+        payload["etaSeconds"] = round(max(0, total - done) / rate, 1) if total is not None and rate > 0 else None
+        sys.stdout.write(json.dumps(payload) + "\n")
+        sys.stdout.flush()
+    except Exception:
+        pass
+
+
+def throughput_mb_s(copied_bytes, elapsed):
+    """
+    Convert a byte count and duration to MB/s (1 MB = 1024 * 1024 bytes).
+    """
+    if elapsed <= 0:
+        return 0.0
+    return round(copied_bytes / (1024 * 1024) / elapsed, 2)
+
+
+def copy_files(jobs, workers=DEFAULT_WORKERS, progress=True, progress_every=25, mode="copy", total=None,
+               on_result=None, progress_interval=1.0, sync=False, cancel=None, scheduler=None):
+    """
+    Copy (or link) many files on a thread pool.
+
+    Jobs are consumed lazily in chunks of CHUNK_JOBS, so an iterator over a
+    huge manifest is never materialized. Jobs writing to the same destination
+    are run sequentially in input order, so the last source wins exactly as
+    with a serial copy loop.
+
+    Args:
+        jobs (iterable): (source, destination) path tuples
+        workers (int): Thread pool size
+        progress (bool): Whether to emit progress lines to stdout
+        progress_every (int): Emit progress after this many finished files
+        mode (str): One of EXPORT_MODES
+        total (int): Number of jobs, if known; defaults to len(jobs) for sequences
+        on_result (callable): Called as on_result(job, result) in job order; when
+            given, per-file results are not kept in memory
+        progress_interval (float): Also emit progress after this many seconds
+        sync (bool): Skip destinations that already match by size and mtime;
+            their results use the method "skipped"
+        cancel: Optional token with is_set(); when set, unstarted jobs are dropped
+        scheduler: Optional common.aio.IOScheduler; jobs then run under the
+            per-mount limit of their source instead of on the local pool
+
+    Returns:
+        dict: 'results' (one dict per job, in job order, with 'ok', 'bytes',
+              'method' on success and 'reason' and 'error' on failure; None when
+              on_result is used), 'methods' (count per method used),
+              'processed', 'bytes_copied', 'elapsed_seconds', 'throughput_mb_s',
+              'cancelled' and 'cursor' (jobs finished in input order)
+    """
+    if mode not in EXPORT_MODES:
+        raise ValueError(f"Unknown export mode: {mode}")
+
+    if total is None and hasattr(jobs, "__len__"):
+        total = len(jobs)
+    results = [] if on_result is None else None
+    start = time.monotonic()
+    copied_bytes = 0
+    done = 0
+    methods = {}
+    device_cache = {}
+    last_emit = 0
+    last_emit_time = start
+    cancelled = False
+    cursor = 0
+
+    job_iter = iter(jobs)
+    with ThreadPoolExecutor(max_workers=resolve_workers(workers)) as executor:
+        while True:
+            if cancel is not None and cancel.is_set():
+                cancelled = True
+                break
+            chunk = list(islice(job_iter, CHUNK_JOBS))
+            if not chunk:
+                break
+
+            groups = {}
+            for index, (_, destination) in enumerate(chunk):
+                key = os.path.normcase(os.path.abspath(destination))
+                groups.setdefault(key, []).append(index)
+
+            chunk_results = [None] * len(chunk)
+            if scheduler is not None:
+                pending = {
+                    scheduler.submit(chunk[indices[0]][0], _run_group, chunk, indices, mode, device_cache, sync)
+                    for indices in groups.values()
+                }
+            else:
+                pending = {executor.submit(_run_group, chunk, indices, mode, device_cache, sync) for indices in groups.values()}
+            while pending:
+                if cancel is not None and cancel.is_set():
+                    cancelled = True
+                    for future in pending:
+                        future.cancel()
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if future.cancelled():
+                        continue
+                    for index, result in future.result():
+                        chunk_results[index] = result
+                        copied_bytes += result["bytes"]
+                        done += 1
+                        if result["ok"]:
+                            methods[result["method"]] = methods.get(result["method"], 0) + 1
+
+                now = time.monotonic()
+                if progress and (done - last_emit >= progress_every or now - last_emit_time >= progress_interval):
+                    last_emit, last_emit_time = done, now
+                    emit_progress(done, total, copied_bytes, now - start)
+
+            if cancelled:
+                # Only the finished prefix counts, so the cursor is exact;
+                # files finished past it are simply redone on resume
+                prefix = next((i for i, r in enumerate(chunk_results) if r is None), len(chunk_results))
+                chunk, chunk_results = chunk[:prefix], chunk_results[:prefix]
+            cursor += len(chunk)
+
+            if on_result is None:
+                results.extend(chunk_results)
+            else:
+                for job, result in zip(chunk, chunk_results):
+                    on_result(job, result)
+            if cancelled:
+                break
+
+    elapsed = time.monotonic() - start
+    if progress:
+        emit_progress(done, total if total is not None else done, copied_bytes, elapsed)
+
+    return {
+        "results": results,
+        "methods": methods,
+        "processed": done,
+        "bytes_copied": copied_bytes,
+        "elapsed_seconds": round(elapsed, 3),
+        "throughput_mb_s": throughput_mb_s(copied_bytes, elapsed),
+        "cancelled": cancelled,
+        "cursor": cursor,
+    }
@@ -5,18 +5,51 @@ Selective image copying script for the Map Organizer module.
 This script accepts three command-line arguments:
 1. Source folder path
 2. Destination folder path
-3. JSON-formatted list of filenames
+3. The selection: a JSON-formatted list of filenames, "-" to read the
+   selection from stdin, or "@<path>" to read it from a manifest file
+
+A selection read from stdin or a manifest is either a JSON array or NDJSON
+(one JSON string, or object with a "filename" key, per line). NDJSON is
+streamed: copying starts right away and the list is never held in memory,
+which avoids command-line length limits for very large selections.
+
+An optional fourth argument is a JSON object of options:
+{ "workers": int,             # number of copy threads
+  "resumeFrom": int,           # skip this many entries of the selection
+  "skipDuplicates": bool,      # leave out content duplicates of earlier files
+  "hashCache": bool|str,       # hash cache for skipDuplicates, see common/duplicates.py
+  "ioConcurrency": int,        # copy under a per-mount limit for network shares,
+  "mountConcurrency": {...},   # with { "<mount path>": limit } overrides, see common/aio.py
+  "profile": bool|str|object } # timings / profile dump, see common/profiling.py
 
 It validates the source folder, creates the destination folder if needed,
-and copies only the specified files from source to destination.
+and copies only the specified files from source to destination. Progress
+lines are written to stdout before the final JSON result:
+{ "type": "progress", "processed": n, "total": m, "percent": p, "status": "Copying",
+  "bytes": b, "mbPerSec": s }
+For streamed stdin selections "total" and "percent" are null.
+
+SIGTERM, or a "cancel" line on stdin when the selection is not read from
+stdin, stops the copy after the files in flight. The result then carries
+"cancelled": true and a "resumeCursor" to pass back as "resumeFrom".
 """
 
 import json
 import os
-import shutil
 import sys
+from itertools import islice
 from pathlib import Path
 
+from copy_engine import DEFAULT_WORKERS, copy_files, resolve_workers
+
+# The shared core (profiling) lives in python/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common.aio import open_scheduler
+from common.duplicates import duplicate_paths, find_duplicates, open_cache
+from common.jobs import install_cancel
+from common.profiling import Profiler, dumps, phase
+
 
 def validate_source_folder(source_path):
     """
@@ -61,85 +94,219 @@ def create_destination_folder(destination_path):
         return False, f"Error creating destination folder: {str(e)}"
 
 
-def copy_selected_files(source_path, destination_path, filenames):
+def skip_duplicate_names(source_path, filenames, workers=DEFAULT_WORKERS, hash_cache=None):
+    """
+    Drop filenames whose content duplicates an earlier file in the selection.
+    A streamed selection is read completely first.
+    
+    Returns:
+        tuple: (remaining filenames, skipped filenames)
+    """
+    source_dir = Path(source_path)
+    names = list(filenames)
+    with phase("hash"):
+        found = find_duplicates([str(source_dir / name) for name in names], resolve_workers(workers),
+                                open_cache(hash_cache))
+    skip = duplicate_paths(found["sets"])
+    kept = [name for name in names if str(source_dir / name) not in skip]
+    skipped = [name for name in names if str(source_dir / name) in skip]
+    return kept, skipped
+
+
+def copy_selected_files(source_path, destination_path, filenames, workers=DEFAULT_WORKERS, progress=True,
+                        total=None, resume_from=0, cancel=None, scheduler=None):
     """
     Copy selected files from source to destination.
-    Processes files in batches for better memory handling with large datasets.
+    Files are copied in parallel by the copy engine.
     
     Args:
         source_path (str): Path to the source folder
         destination_path (str): Path to the destination folder
-        filenames (list): List of filenames to copy
+        filenames (iterable): Filenames to copy; may be a lazy iterator
+        workers (int): Number of copy threads
+        progress (bool): Whether to emit progress lines to stdout
+        total (int): Number of filenames, if known and filenames is an iterator
+        resume_from (int): Number of leading filenames to skip
+        cancel: Optional cancel token, see copy_engine.copy_files
+        scheduler: Optional common.aio.IOScheduler, see copy_engine.copy_files
         
     Returns:
-        dict: Result with success status and copied count
+        dict: Result with success status, copied count and throughput
     """
-    copied_count = 0
     source_dir = Path(source_path)
     dest_dir = Path(destination_path)
+    copied_count = 0
     
-    # Process in batches to handle large datasets efficiently
-    batch_size = 100
-    total_files = len(filenames)
+    def jobs():
+        for filename in filenames:
+            yield str(source_dir / filename), str(dest_dir / filename)
     
-    # Process in batches
-    for i in range(0, total_files, batch_size):
-        batch = filenames[i:i + batch_size]
-        
-        # Process each file in the batch
-        for filename in batch:
-            try:
-                # Construct full source path
-                source_file = source_dir / filename
-                
-                # Verify file exists in source folder
-                if not source_file.exists():
-                    print(f"Warning: File not found in source folder: {filename}", file=sys.stderr)
-                    continue
-                    
-                if not source_file.is_file():
-                    print(f"Warning: Not a file: {filename}", file=sys.stderr)
-                    continue
-                    
-                # Construct full destination path
-                dest_file = dest_dir / filename
-                
-                # Copy file preserving metadata
-                shutil.copy2(source_file, dest_file)
-                copied_count += 1
-                
-            except PermissionError:
-                print(f"Error: Permission denied copying {filename}", file=sys.stderr)
-            except Exception as e:
-                print(f"Error copying {filename}: {str(e)}", file=sys.stderr)
-    
-    return {
+    def report(job, file_result):
+        nonlocal copied_count
+        filename = os.path.relpath(job[0], source_dir)
+        if file_result["ok"]:
+            copied_count += 1
+        elif file_result["reason"] == "missing":
+            print(f"Warning: File not found in source folder: {filename}", file=sys.stderr)
+        elif file_result["reason"] == "not_file":
+            print(f"Warning: Not a file: {filename}", file=sys.stderr)
+        elif file_result["reason"] == "permission":
+            print(f"Error: Permission denied copying {filename}", file=sys.stderr)
+        else:
+            print(f"Error copying {filename}: {file_result['error']}", file=sys.stderr)
+    
+    if total is None and hasattr(filenames, "__len__"):
+        total = len(filenames)
+    if resume_from:
+        filenames = islice(filenames, resume_from, None)
+        if total is not None:
+            total = max(0, total - resume_from)
+    with phase("io"):
+        copy_result = copy_files(jobs(), workers=workers, progress=progress, total=total, on_result=report,
+                                 cancel=cancel, scheduler=scheduler)
+    
+    result = {
         "success": True,
-        "copied_count": copied_count
+        "copied_count": copied_count,
+        "processed": copy_result["processed"],
+        "bytes_copied": copy_result["bytes_copied"],
+        "elapsed_seconds": copy_result["elapsed_seconds"],
+        "throughput_mb_s": copy_result["throughput_mb_s"]
     }
+    if copy_result["cancelled"]:
+        result["cancelled"] = True
+        result["resumeCursor"] = resume_from + copy_result["cursor"]
+    return result
+
+
+def _manifest_name(value):
+    """
+    Extract a filename from a decoded manifest entry, or None if invalid.
+    """
+    if isinstance(value, dict):
+        value = value.get("filename") or value.get("name")
+    if isinstance(value, str) and value:
+        return value
+    return None
+
+
+def iter_ndjson_names(stream, first_line=""):
+    """
+    Lazily yield filenames from an NDJSON stream.
+    
+    Args:
+        stream: Text stream positioned at the start of a line (or mid-way
+                through first_line)
+        first_line (str): Already-consumed beginning of the first line
+        
+    Yields:
+        str: One filename per valid line; invalid lines are reported on stderr
+    """
+    line_number = 0
+    pending = first_line + stream.readline() if first_line else stream.readline()
+    while pending:
+        line_number += 1
+        line = pending.strip()
+        if line:
+            try:
+                name = _manifest_name(json.loads(line))
+            except json.JSONDecodeError:
+                name = None
+            if name is None:
+                print(f"Warning: Skipping invalid manifest line {line_number}", file=sys.stderr)
+            else:
+                yield name
+        pending = stream.readline()
+
+
+def count_manifest_lines(path):
+    """
+    Count non-empty lines in a manifest file without decoding it.
+    """
+    count = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                count += 1
+    return count
+
+
+def open_selection(spec):
+    """
+    Resolve the selection argument into filenames.
+    
+    Args:
+        spec (str): JSON array string, "-" for stdin or "@<path>" for a manifest file
+        
+    Returns:
+        tuple: (filenames iterable, total or None, stream to close or None)
+        
+    Raises:
+        json.JSONDecodeError: If a JSON array selection is malformed
+        ValueError: If the selection is not a list of filenames
+        OSError: If the manifest file cannot be opened
+    """
+    if spec == "-":
+        stream, from_file = sys.stdin, False
+    elif spec.startswith("@"):
+        stream, from_file = open(spec[1:], encoding="utf-8-sig"), True
+    else:
+        filenames = json.loads(spec)
+        if not isinstance(filenames, list):
+            raise ValueError("Filenames must be a JSON array")
+        return filenames, len(filenames), None
+    
+    # Peek at the first non-blank character to tell a JSON array from NDJSON
+    head = ""
+    while True:
+        ch = stream.read(1)
+        if not ch or not ch.isspace():
+            head = ch
+            break
+    
+    if head == "[":
+        try:
+            values = json.loads(head + stream.read())
+        finally:
+            if from_file:
+                stream.close()
+        filenames = [_manifest_name(v) for v in values]
+        if any(name is None for name in filenames):
+            raise ValueError("Filenames must be a JSON array of strings")
+        return filenames, len(filenames), None
+    
+    total = count_manifest_lines(spec[1:]) if from_file else None
+    return iter_ndjson_names(stream, head), total, stream if from_file else None
 
 
 def main():
     """Main function to run the script."""
     # Check command line arguments
-    if len(sys.argv) != 4:
+    if len(sys.argv) not in (4, 5):
         result = {
             "success": False,
             "copied_count": 0,
-            "error": "Usage: python copy_selected.py <source_folder> <destination_folder> <json_filenames>"
+            "error": "Usage: python copy_selected.py <source_folder> <destination_folder> <json_filenames|-|@manifest> [json_options]"
         }
         print(json.dumps(result))
         sys.exit(1)
     
     source_folder = sys.argv[1]
     destination_folder = sys.argv[2]
-    filenames_json = sys.argv[3]
+    selection = sys.argv[3]
+    
+    options = {}
+    if len(sys.argv) == 5:
+        try:
+            options = json.loads(sys.argv[4]) or {}
+        except json.JSONDecodeError:
+            options = {}
+        if not isinstance(options, dict):
+            options = {}
     
     try:
-        # Parse JSON filenames
-        filenames = json.loads(filenames_json)
-        if not isinstance(filenames, list):
-            raise ValueError("Filenames must be a JSON array")
+        # Parse JSON filenames (inline, stdin or manifest file)
+        filenames, total, manifest_stream = open_selection(selection)
     except json.JSONDecodeError as e:
         result = {
             "success": False,
@@ -156,6 +323,14 @@ def main():
         }
         print(json.dumps(result))
         sys.exit(1)
+    except OSError as e:
+        result = {
+            "success": False,
+            "copied_count": 0,
+            "error": f"Cannot read manifest: {str(e)}"
+        }
+        print(json.dumps(result))
+        sys.exit(1)
     
     # Validate source folder
     is_valid, error_msg = validate_source_folder(source_folder)
@@ -179,10 +354,39 @@ def main():
         print(json.dumps(result))
         sys.exit(1)
     
+    try:
+        resume_from = max(0, int(options.get("resumeFrom") or 0))
+    except (TypeError, ValueError):
+        resume_from = 0
+    # A selection streamed on stdin leaves no room for a cancel message
+    cancel = install_cancel(stdin=selection != "-")
+    scheduler = open_scheduler(options)
+    
     # Copy selected files
     try:
-        result = copy_selected_files(source_folder, destination_folder, filenames)
-        print(json.dumps(result))
+        with Profiler.from_payload(options):
+            skipped = None
+            if options.get("skipDuplicates"):
+                filenames, skipped = skip_duplicate_names(
+                    source_folder,
+                    filenames,
+                    workers=options.get("workers", DEFAULT_WORKERS),
+                    hash_cache=options.get("hashCache", True)
+                )
+                total = len(filenames)
+            result = copy_selected_files(
+                source_folder,
+                destination_folder,
+                filenames,
+                workers=options.get("workers", DEFAULT_WORKERS),
+                total=total,
+                resume_from=resume_from,
+                cancel=cancel,
+                scheduler=scheduler
+            )
+            if skipped is not None:
+                result["duplicates_skipped"] = skipped
+            print(dumps(result))
     except Exception as e:
         result = {
             "success": False,
@@ -191,6 +395,11 @@ def main():
         }
         print(json.dumps(result))
         sys.exit(1)
+    finally:
+        if manifest_stream is not None:
+            manifest_stream.close()
+        if scheduler is not None:
+            scheduler.close()
 
 
 if __name__ == "__main__":
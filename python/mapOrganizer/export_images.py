@@ -6,10 +6,19 @@ Export selected images to a new folder with timestamp-based naming.
 import os
 import sys
 import json
-import shutil
 from datetime import datetime
 from pathlib import Path
 
+from copy_engine import DEFAULT_WORKERS, EXPORT_MODES, copy_files, resolve_workers, verify_copies
+
+# The shared core (profiling) lives in python/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common.aio import open_scheduler
+from common.duplicates import duplicate_paths, find_duplicates, open_cache
+from common.jobs import install_cancel
+from common.profiling import Profiler, dumps, phase
+
 
 INVALID_CHARS = '<>:"/\\|?*'
 
@@ -72,14 +81,44 @@ def make_export_folder_name(names):
     return folder
 
 
-def export_images(source_paths, destination_folder, export_label=None):
+def export_images(source_paths, destination_folder, export_label=None, workers=DEFAULT_WORKERS, progress=True,
+                  mode="copy", sync=False, verify=False, resume_from=0, cancel=None, skip_duplicates=False,
+                  hash_cache=None, scheduler=None):
     """
     Export selected images to a new folder with timestamp-based naming.
-    Handles large datasets efficiently by processing in batches.
+    Files are copied in parallel by the copy engine.
+    
+    With mode "hardlink" or "reflink", images on the same filesystem as the
+    destination are linked instead of copied; "symlink" links every image.
+    Note that a hardlinked export shares its data with the original, so later
+    in-place edits (e.g. writing GPS tags) affect both.
+    
+    With sync enabled, files already in the export folder with the same size
+    and modification time are skipped, so re-exporting a polygon only copies
+    new or changed images. With verify enabled, every exported file is hashed
+    against its source afterwards.
+    
+    With skip_duplicates, images whose content duplicates an earlier source
+    image (a card copied twice) are left out and listed in the result.
+    
+    When cancelled (SIGTERM), files in flight finish, verification is skipped
+    and the result carries "cancelled" and a "resumeCursor" into source_paths
+    that can be sent back as "resumeFrom".
     
     Args:
         source_paths (list): List of full file paths to source images
         destination_folder (str): Path to destination folder
+        export_label: Polygon name or list of names used for the folder name
+        workers (int): Number of copy threads
+        progress (bool): Whether to emit progress lines to stdout
+        mode (str): "copy", "hardlink", "reflink" or "symlink"
+        sync (bool): Skip files that are already up to date in the export folder
+        verify (bool): Hash source and destination of every exported file
+        resume_from (int): Number of leading source paths already exported
+        cancel: Optional cancel token, see copy_engine.copy_files
+        skip_duplicates (bool): Leave out content duplicates of earlier images
+        hash_cache: "hashCache" option for the duplicate check, see common/duplicates.py
+        scheduler: Optional common.aio.IOScheduler for sources on network shares
         
     Returns:
         dict: Result with success status and details
@@ -88,6 +127,9 @@ def export_images(source_paths, destination_folder, export_label=None):
         # Validate inputs
         if not source_paths:
             return {"success": False, "error": "No source images provided"}
+        
+        if mode not in EXPORT_MODES:
+            return {"success": False, "error": f"Invalid export mode: {mode}"}
             
         if not destination_folder:
             return {"success": False, "error": "Destination folder not specified"}
@@ -112,60 +154,82 @@ def export_images(source_paths, destination_folder, export_label=None):
         except Exception as e:
             return {"success": False, "error": f"Failed to create export folder: {str(e)}"}
         
-        # Process files in batches to handle large datasets efficiently
-        batch_size = 100
-        total_files = len(source_paths)
+        skipped_duplicates = []
+        if skip_duplicates:
+            with phase("hash"):
+                found = find_duplicates([str(p) for p in source_paths], resolve_workers(workers), open_cache(hash_cache))
+            skip = duplicate_paths(found["sets"])
+            skipped_duplicates = [str(p) for p in source_paths if str(p) in skip]
+            source_paths = [p for p in source_paths if str(p) not in skip]
+        
+        # Copy files preserving metadata
+        jobs = [
+            (str(source_path), str(export_folder_path / os.path.basename(str(source_path))))
+            for source_path in source_paths[resume_from:]
+        ]
+        with phase("io"):
+            copy_result = copy_files(jobs, workers=workers, progress=progress, mode=mode, sync=sync, cancel=cancel,
+                                     scheduler=scheduler)
+        cancelled = copy_result["cancelled"]
+        
         exported_count = 0
+        skipped_count = 0
+        exported_files = []
         failed_files = []
+        for (source_path_str, dest_file_path), file_result in zip(jobs, copy_result["results"]):
+            if file_result["ok"]:
+                exported_count += 1
+                if file_result["method"] == "skipped":
+                    skipped_count += 1
+                exported_files.append({
+                    "file": source_path_str,
+                    "target": dest_file_path,
+                    "method": file_result["method"]
+                })
+            else:
+                failed_files.append({
+                    "file": source_path_str,
+                    "error": file_result["error"]
+                })
         
-        # Process in batches
-        for i in range(0, total_files, batch_size):
-            batch = source_paths[i:i + batch_size]
-            
-            # Process each file in the batch
-            for source_path_str in batch:
-                try:
-                    source_path = Path(source_path_str)
-                    
-                    # Validate source file
-                    if not source_path.exists():
-                        failed_files.append({
-                            "file": source_path_str,
-                            "error": "Source file does not exist"
-                        })
-                        continue
-                        
-                    if not source_path.is_file():
-                        failed_files.append({
-                            "file": source_path_str,
-                            "error": "Source path is not a file"
-                        })
-                        continue
-                    
-                    # Get filename
-                    filename = source_path.name
-                    
-                    # Destination path
-                    dest_file_path = export_folder_path / filename
-                    
-                    # Copy file preserving metadata
-                    shutil.copy2(source_path, dest_file_path)
-                    exported_count += 1
-                    
-                except Exception as e:
-                    failed_files.append({
-                        "file": source_path_str,
-                        "error": str(e)
-                    })
+        mismatched_files = []
+        if verify and not cancelled:
+            with phase("verify"):
+                verify_result = verify_copies(
+                    [(f["file"], f["target"]) for f in exported_files],
+                    workers=workers,
+                    progress=progress
+                )
+            mismatched_files = verify_result["mismatched"]
         
         # Prepare result
         result = {
             "success": True,
             "exported_count": exported_count,
+            "copied_count": exported_count - skipped_count,
+            "skipped_count": skipped_count,
             "export_folder_name": export_folder_name,
-            "export_folder_path": str(export_folder_path)
+            "export_folder_path": str(export_folder_path),
+            "mode": mode,
+            "methods": copy_result["methods"],
+            "files": exported_files,
+            "bytes_copied": copy_result["bytes_copied"],
+            "elapsed_seconds": copy_result["elapsed_seconds"],
+            "throughput_mb_s": copy_result["throughput_mb_s"]
         }
         
+        if skip_duplicates:
+            result["duplicates_skipped"] = skipped_duplicates
+        
+        if cancelled:
+            result["cancelled"] = True
+            result["resumeCursor"] = resume_from + copy_result["cursor"]
+        elif verify:
+            result["verified"] = True
+            result["mismatched_count"] = len(mismatched_files)
+            if mismatched_files:
+                result["mismatched_files"] = mismatched_files
+        
         # Include failed files if any
         if failed_files:
             result["failed_files"] = failed_files
@@ -186,12 +250,41 @@ def main():
         source_paths = input_data.get("sourcePaths", [])
         destination_folder = input_data.get("destination", "")
         export_label = input_data.get("exportLabel") or input_data.get("exportName")
+        workers = input_data.get("workers", DEFAULT_WORKERS)
+        mode = input_data.get("mode") or "copy"
+        sync = bool(input_data.get("sync", False))
+        verify = bool(input_data.get("verify", False))
+        skip_duplicates = bool(input_data.get("skipDuplicates", False))
+        try:
+            resume_from = max(0, int(input_data.get("resumeFrom") or 0))
+        except (TypeError, ValueError):
+            resume_from = 0
+        # The payload came in on stdin, so only signals can cancel
+        cancel = install_cancel(stdin=False)
+        # ioConcurrency / mountConcurrency, see common/aio.py
+        scheduler = open_scheduler(input_data)
         
-        # Execute export
-        result = export_images(source_paths, destination_folder, export_label)
-        
-        # Output result as JSON
-        print(json.dumps(result))
+        with Profiler.from_payload(input_data):
+            # Execute export
+            result = export_images(
+                source_paths,
+                destination_folder,
+                export_label,
+                workers=workers,
+                mode=mode,
+                sync=sync,
+                verify=verify,
+                resume_from=resume_from,
+                cancel=cancel,
+                skip_duplicates=skip_duplicates,
+                hash_cache=input_data.get("hashCache", True),
+                scheduler=scheduler
+            )
+            if scheduler is not None:
+                scheduler.close()
+            
+            # Output result as JSON
+            print(dumps(result))
         
     except json.JSONDecodeError as e:
         error_result = {
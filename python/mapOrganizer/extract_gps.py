@@ -8,49 +8,21 @@ skips any images that don't contain GPS data, and outputs a JSON array of object
 and its corresponding GPS coordinates.
 
 Usage: python extract_gps.py <folder_path>
+
+Set SHAMAL_PROFILE to write a profile dump (see common/profiling.py).
 """
 
 import json
 import os
 import sys
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional
 
-try:
-    from PIL import Image, ExifTags
-except ImportError:
-    print(json.dumps({"error": "Pillow library is required but not installed"}))
-    sys.exit(1)
+# The shared metadata core lives in python/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-
-def dms_to_decimal(dms: Tuple[Any, Any, Any], ref: str) -> Optional[float]:
-    """
-    Convert GPS degrees/minutes/seconds to decimal degrees.
-    
-    Args:
-        dms: Tuple of (degrees, minutes, seconds)
-        ref: Reference direction ('N', 'S', 'E', 'W')
-        
-    Returns:
-        Decimal degrees or None if conversion fails
-    """
-    try:
-        degrees, minutes, seconds = dms
-
-        def to_float(x):
-            if isinstance(x, tuple) and len(x) == 2 and x[1]:
-                return float(x[0]) / float(x[1])
-            return float(x)
-
-        deg = to_float(degrees)
-        mins = to_float(minutes)
-        secs = to_float(seconds)
-        value = deg + (mins / 60.0) + (secs / 3600.0)
-        if ref in ["S", "W"]:
-            value *= -1
-        return round(value, 8)
-    except Exception:
-        return None
+from common import iter_image_files, read_metadata
+from common.profiling import Profiler, dumps, phase
 
 
 def extract_gps_from_image(image_path: Path) -> Optional[Dict[str, Any]]:
@@ -64,43 +36,17 @@ def extract_gps_from_image(image_path: Path) -> Optional[Dict[str, Any]]:
         Dictionary with filename, lat, and lng or None if no GPS data
     """
     try:
-        with Image.open(image_path) as img:
-            exif = img._getexif()
-            if not exif:
-                return None
-
-            # Extract GPS info
-            gps_info = exif.get(34853)  # GPSInfo tag
-            if not gps_info:
-                return None
-
-            # Parse GPS tags
-            gps_tags = {ExifTags.GPSTAGS.get(k, k): v for k, v in gps_info.items()}
-
-            # Extract latitude and longitude data
-            lat_data = gps_tags.get("GPSLatitude")
-            lat_ref = gps_tags.get("GPSLatitudeRef", "N")
-            lon_data = gps_tags.get("GPSLongitude")
-            lon_ref = gps_tags.get("GPSLongitudeRef", "E")
-
-            if not lat_data or not lon_data:
-                return None
-
-            # Convert to decimal degrees
-            lat = dms_to_decimal(lat_data, lat_ref)
-            lng = dms_to_decimal(lon_data, lon_ref)
-
-            if lat is None or lng is None:
-                return None
-
-            return {
-                "filename": image_path.name,
-                "lat": lat,
-                "lng": lng
-            }
-    except Exception as e:
+        meta = read_metadata(image_path)
+    except Exception:
         # Silently skip files with errors
         return None
+    if meta["latitude"] is None or meta["longitude"] is None:
+        return None
+    return {
+        "filename": image_path.name,
+        "lat": meta["latitude"],
+        "lng": meta["longitude"]
+    }
 
 
 def find_jpg_files(folder_path: Path, recursive: bool = True) -> List[Path]:
@@ -114,20 +60,7 @@ def find_jpg_files(folder_path: Path, recursive: bool = True) -> List[Path]:
     Returns:
         List of JPG file paths
     """
-    jpg_extensions = {'.jpg', '.jpeg'}
-    jpg_files = []
-    
-    if recursive:
-        pattern = "**/*"
-        paths = folder_path.glob(pattern)
-    else:
-        paths = folder_path.iterdir()
-    
-    for path in paths:
-        if path.is_file() and path.suffix.lower() in jpg_extensions:
-            jpg_files.append(path)
-            
-    return jpg_files
+    return [Path(p) for _name, p in iter_image_files(str(folder_path), {'.jpg', '.jpeg'}, recursive)]
 
 
 def extract_gps_from_folder(folder_path: str) -> List[Dict[str, Any]]:
@@ -148,7 +81,8 @@ def extract_gps_from_folder(folder_path: str) -> List[Dict[str, Any]]:
             return []
 
         # Find all JPG files
-        jpg_files = find_jpg_files(path, recursive=True)
+        with phase("walk"):
+            jpg_files = find_jpg_files(path, recursive=True)
         
         # Process in batches to handle large datasets efficiently
         batch_size = 1000
@@ -180,11 +114,13 @@ def main():
     
     folder_path = sys.argv[1]
     
-    # Extract GPS data
-    gps_data = extract_gps_from_folder(folder_path)
-    
-    # Output as JSON
-    print(json.dumps(gps_data, ensure_ascii=False))
+    with Profiler.from_payload(None):
+        # Extract GPS data
+        with phase("decode"):
+            gps_data = extract_gps_from_folder(folder_path)
+        
+        # Output as JSON
+        print(dumps(gps_data, ensure_ascii=False))
 
 
 if __name__ == "__main__":
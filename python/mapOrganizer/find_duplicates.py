@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Duplicate image detection for the Map Organizer module.
+
+Finds images with identical content in a folder (e.g. a card dump copied
+into the mission folder twice), see common/duplicates.py.
+
+Usage:
+    python find_duplicates.py <payload_json>
+
+Payload:
+    {
+      "folder": "...",            # folder to check, or
+      "paths": ["...", ...],      # an explicit list of files
+      "recursive": bool,          # default: true
+      "workers": int,             # hashing threads (default 4)
+      "hashCache": bool|str,      # reuse full-file hashes (default: true,
+                                  # stored in the temp folder)
+      "profile": bool|str|object  # timings / profile dump, see common/profiling.py
+    }
+
+Returns:
+    { "sets": [[kept, duplicate, ...], ...], "duplicates": n, "bytesWasted": b,
+      "total": files checked, "hashed": n, "cacheHits": n, "cancelled": bool }
+
+Long runs print { "type": "progress", ... } heartbeat lines (see
+common/jobs.py) every few seconds before the final JSON.
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+# The shared metadata core lives in python/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common import iter_image_files
+from common.duplicates import DEFAULT_WORKERS, find_duplicates, open_cache
+from common.jobs import ProgressReporter, install_cancel
+from common.profiling import Profiler, dumps, phase
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.dng', '.jfif')
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(json.dumps({'error': 'Payload argument required'}))
+        sys.exit(1)
+    try:
+        payload = json.loads(sys.argv[1])
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        print(json.dumps({'error': 'Invalid payload JSON'}))
+        sys.exit(1)
+
+    cancel = install_cancel()
+    with Profiler.from_payload(payload):
+        paths = payload.get('paths')
+        if not isinstance(paths, list):
+            folder = payload.get('folder')
+            if not folder or not os.path.isdir(folder):
+                print(json.dumps({'error': 'paths[] or an existing folder is required'}))
+                sys.exit(1)
+            with phase('walk'):
+                recursive = bool(payload.get('recursive', True))
+                paths = [p for _name, p in iter_image_files(folder, IMAGE_EXTENSIONS, recursive)]
+        try:
+            workers = max(1, int(payload.get('workers') or DEFAULT_WORKERS))
+        except (TypeError, ValueError):
+            workers = DEFAULT_WORKERS
+
+        # Heartbeat only, so the app's idle watchdog leaves long hash runs alone
+        with phase('hash'), ProgressReporter(None, status='Hashing'):
+            result = find_duplicates(paths, workers, open_cache(payload.get('hashCache', True)), cancel)
+        result['total'] = len(paths)
+        print(dumps(result))
+
+
+if __name__ == "__main__":
+    main()
+    try:
+        sys.stdout.flush()
+    except Exception:
+        pass
+    sys.exit(0)
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Coverage and overlap analysis for the Map Organizer module (flight QA).
+
+Rasterizes the images' ground footprints (see footprints.py) onto a grid of
+`cellSize` metre cells and counts how many images see every cell, see
+common/coverage.py. Inside the survey area - the boundary polygon when one
+is given, otherwise the convex hull of the camera positions - it reports
+overlap statistics, the regions seen by fewer than `minOverlap` images as
+GeoJSON polygons, and a compact heatmap the map can overlay. Forward and
+side overlap are estimated from the images in capture order.
+
+The grid is capped at common.coverage.MAX_CELLS cells (the cell grows when a
+site is too large for the requested size; the result reports the size used)
+and footprints are rasterized in bounded chunks, so 50k images need a few
+hundred MB at most.
+
+Usage:
+    python flight_coverage.py <payload_json>
+
+Payload:
+    {
+      "folder": "...",            # images to read, or
+      "images": [ {...}, ... ],   # records as for footprints.py (plus "timestamp")
+      "recursive": bool,          # default: true
+      "camera": { "sensorWidth": mm, "sensorHeight": mm, "focalLength": mm },
+      "groundElevation": float,   # ground height (m) above the altitude datum (default 0)
+      "cellSize": float,          # grid cell in metres (default 5)
+      "minOverlap": int,          # images per cell below which it is a gap (default 2)
+      "boundary": [[lon, lat], ...],  # survey area (default: hull of the camera positions)
+      "maxGaps": int,             # largest gap regions returned (default 500)
+      "precision": int,           # decimals kept per coordinate (default 7)
+      "catalog": bool|str,        # read metadata from the image catalog where it is current
+      "workers": int,             # header-reading threads (default 4)
+      "ioConcurrency": int,       # list folders and read headers concurrently, per mount
+      "mountConcurrency": {...},  # { "<mount path>": limit } overrides, see common/aio.py
+      "profile": bool|str|object  # timings / profile dump, see common/profiling.py
+    }
+
+Returns:
+    { "grid": { "cellSize": m, "rows": n, "cols": n, "bbox": [minLon, minLat, maxLon, maxLat] } | null,
+      "stats": { "areaM2", "coveredPercent", "minOverlap", "overlapPercent", "meanOverlap",
+                 "medianOverlap", "maxOverlap", "histogram": [cells seen 0, 1, ..., 10+ times],
+                 "gapRegions": n, "gapAreaM2" },
+      "overlap": { "lines": n, "forward": {min, median, mean} | null, "side": {...} | null },
+      "gaps": { "type": "FeatureCollection",
+                "features": [ { "type": "Feature", "geometry": { "type": "Polygon", ... },
+                                "properties": { "areaM2", "cells", "maxOverlap" } }, ... ] },
+      "heatmap": { "rows", "cols", "noData": 255, "data": base64 of rows * cols bytes, north row first,
+                   "bbox": extent of the heatmap cells, which may reach past the grid's } | null,
+      "footprints": { "total", "footprints", "noPosition", "noAltitude", "noCamera", "aboveHorizon" },
+      "cancelled": true }           # only when cancelled: the analysis of the images read so far
+
+Progress lines, with a heartbeat while headers are read, precede the final
+JSON, see common/jobs.py.
+"""
+
+import base64
+import json
+import math
+import re
+import sys
+from pathlib import Path
+
+# The shared metadata core lives in python/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common.coverage import (MAX_CELLS, Grid, convex_hull, heatmap, label_regions, polygon_mask,
+                             rasterize, region_outlines, track_overlap)
+from common.footprints import Camera, np
+from common.geometry import LocalProjection, simplify
+from common.jobs import install_cancel
+from common.profiling import Profiler, dumps, phase
+from footprints import _number, footprint_arrays, load_records
+
+DEFAULT_CELL_SIZE = 5.0
+DEFAULT_MIN_OVERLAP = 2
+DEFAULT_MAX_GAPS = 500
+DEFAULT_PRECISION = 7
+
+# Histogram buckets: cells seen 0, 1, ... times; the last one is "or more"
+HISTOGRAM_MAX = 10
+
+NO_DATA = 255
+
+
+def capture_key(record):
+    """Sort key putting records in capture order; undated ones go last, by name."""
+    stamp = re.sub(r'\D', '', str(record.get('timestamp') or ''))
+    subsec = str(record.get('subsec') or '').ljust(6, '0')
+    return (not stamp, stamp, subsec, record.get('filename') or '')
+
+
+def analyze_coverage(records, camera=None, ground=0.0, cell_size=DEFAULT_CELL_SIZE,
+                     min_overlap=DEFAULT_MIN_OVERLAP, boundary=None, max_gaps=DEFAULT_MAX_GAPS,
+                     precision=DEFAULT_PRECISION, max_cells=MAX_CELLS):
+    """Coverage report for the records (see module docstring)."""
+    with phase('footprints'):
+        usable, _cameras, corners, valid, _height, footprint_stats = footprint_arrays(records, camera, ground)
+    result = {
+        'grid': None, 'stats': None, 'overlap': {'lines': 0, 'forward': None, 'side': None},
+        'gaps': {'type': 'FeatureCollection', 'features': []}, 'heatmap': None, 'footprints': footprint_stats,
+    }
+    keep = np.flatnonzero(valid)
+    if not len(keep):
+        return result
+    keep = np.array(sorted(keep.tolist(), key=lambda i: capture_key(usable[i])), dtype=np.int64)
+    corners = corners[keep]
+    centres = np.array([[float(usable[i]['longitude']), float(usable[i]['latitude'])] for i in keep])
+
+    lo, hi = corners.reshape(-1, 2).min(axis=0), corners.reshape(-1, 2).max(axis=0)
+    projection = LocalProjection((lo[0] + hi[0]) / 2, (lo[1] + hi[1]) / 2)
+    scale = np.array([projection.kx, projection.ky])
+    origin = np.array([projection.lon0, projection.lat0])
+    quads = (corners - origin) * scale
+    centres_xy = (centres - origin) * scale
+    area_ring = (np.asarray(boundary, dtype=float)[:, :2] - origin) * scale if boundary else None
+
+    with phase('rasterize'):
+        extent = quads.reshape(-1, 2) if area_ring is None else np.concatenate([quads.reshape(-1, 2), area_ring])
+        xmin, ymin = extent.min(axis=0)
+        xmax, ymax = extent.max(axis=0)
+        grid = Grid.covering(xmin, ymin, xmax, ymax, cell_size, max_cells)
+        counts = rasterize(quads, grid)
+        if area_ring is None:
+            hull = convex_hull(map(tuple, centres_xy.tolist()))
+            # Too few distinct positions for a hull: the footprints are the area
+            area = polygon_mask(hull, grid) if len(hull) >= 3 else counts > 0
+        else:
+            area = polygon_mask(area_ring, grid)
+
+    def to_lonlat(col, row):
+        return projection.inverse(grid.x0 + col * grid.cell, grid.y0 + row * grid.cell)
+
+    west, south = to_lonlat(0, 0)
+    east, north = to_lonlat(grid.cols, grid.rows)
+    grid_bbox = [round(float(value), precision) for value in (west, south, east, north)]
+    cell_area = grid.cell * grid.cell
+    result['grid'] = {'cellSize': round(float(grid.cell), 3), 'rows': grid.rows, 'cols': grid.cols, 'bbox': grid_bbox}
+
+    with phase('stats'):
+        seen = counts[area]
+        histogram = np.bincount(np.minimum(seen, HISTOGRAM_MAX), minlength=HISTOGRAM_MAX + 1)
+        cells = int(seen.size)
+        result['stats'] = {
+            'areaM2': round(cells * cell_area, 1),
+            'coveredPercent': round(100.0 * int(np.count_nonzero(seen)) / cells, 2) if cells else None,
+            'minOverlap': min_overlap,
+            'overlapPercent': round(100.0 * int(np.count_nonzero(seen >= min_overlap)) / cells, 2) if cells else None,
+            'meanOverlap': round(float(seen.mean()), 2) if cells else None,
+            'medianOverlap': float(np.median(seen)) if cells else None,
+            'maxOverlap': int(seen.max()) if cells else 0,
+            'histogram': histogram.tolist(),
+            'gapRegions': 0,
+            'gapAreaM2': 0.0,
+        }
+        result['overlap'] = track_overlap(centres_xy, quads)
+
+    with phase('gaps'):
+        labels, count = label_regions(area & (counts < min_overlap))
+        if count:
+            flat = labels.ravel()
+            sizes = np.bincount(flat, minlength=count + 1)
+            peak = np.zeros(count + 1, dtype=np.int64)
+            np.maximum.at(peak, flat, counts.ravel())
+            largest = sorted(range(1, count + 1), key=lambda k: -sizes[k])[:max_gaps]
+            keep_labels = np.zeros(count + 1, dtype=bool)
+            keep_labels[largest] = True
+            outlines = region_outlines(np.where(keep_labels[labels], labels, 0))
+            features = []
+            for label in largest:
+                rings = []
+                for ring in outlines[label]:
+                    points = [to_lonlat(col, row) for col, row in ring]
+                    points = simplify(points + points[:1], grid.cell / 2, closed=True)
+                    rings.append([[round(float(lon), precision), round(float(lat), precision)] for lon, lat in points])
+                features.append({
+                    'type': 'Feature',
+                    'geometry': {'type': 'Polygon', 'coordinates': rings},
+                    'properties': {'areaM2': round(float(sizes[label]) * cell_area, 1), 'cells': int(sizes[label]),
+                                   'maxOverlap': int(peak[label])},
+                })
+            result['gaps']['features'] = features
+            result['stats']['gapRegions'] = count
+            result['stats']['gapAreaM2'] = round(float(sizes[1:].sum()) * cell_area, 1)
+
+    with phase('heatmap'):
+        shown = np.where(area, np.minimum(counts, NO_DATA - 1), NO_DATA)
+        small, factor = heatmap(shown)
+        small = small[::-1]
+        # The last block row / column is padded (with NO_DATA), so the heatmap
+        # covers whole blocks and reaches past the grid on the north and east
+        north_east = to_lonlat(small.shape[1] * factor, small.shape[0] * factor)
+        heat_bbox = grid_bbox[:2] + [round(float(value), precision) for value in north_east]
+        result['heatmap'] = {
+            'rows': int(small.shape[0]), 'cols': int(small.shape[1]), 'bbox': heat_bbox, 'noData': NO_DATA,
+            'data': base64.b64encode(np.ascontiguousarray(small).tobytes()).decode('ascii'),
+        }
+    return result
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(json.dumps({'error': 'Payload argument required'}))
+        sys.exit(1)
+    try:
+        payload = json.loads(sys.argv[1])
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        print(json.dumps({'error': 'Invalid payload JSON'}))
+        sys.exit(1)
+    if np is None:
+        print(json.dumps({'error': 'NumPy is required for coverage analysis'}))
+        sys.exit(1)
+
+    def option(key, default, kind):
+        value = payload.get(key)
+        return default if value is None else kind(value)
+
+    try:
+        camera = Camera.from_option(payload.get('camera'))
+        ground = _number(payload.get('groundElevation')) or 0.0
+        cell_size = option('cellSize', DEFAULT_CELL_SIZE, float)
+        min_overlap = option('minOverlap', DEFAULT_MIN_OVERLAP, int)
+        max_gaps = option('maxGaps', DEFAULT_MAX_GAPS, int)
+        precision = option('precision', DEFAULT_PRECISION, int)
+        boundary = payload.get('boundary') or None
+        if not math.isfinite(cell_size) or cell_size <= 0 or min_overlap < 1:
+            raise ValueError('cellSize and minOverlap must be positive')
+        if boundary is not None and (len(boundary) < 3 or any(len(p) < 2 for p in boundary)):
+            raise ValueError('boundary needs at least 3 [lon, lat] points')
+    except (TypeError, ValueError) as exc:
+        print(json.dumps({'error': f'Invalid coverage options: {exc}'}))
+        sys.exit(1)
+
+    cancel = install_cancel()
+    with Profiler.from_payload(payload):
+        try:
+            records, cancelled = load_records(payload, cancel)
+        except ValueError as exc:
+            print(json.dumps({'error': str(exc)}))
+            sys.exit(1)
+        result = analyze_coverage(records, camera, ground, cell_size, min_overlap, boundary, max_gaps, precision)
+        if cancelled:
+            result['cancelled'] = True
+        print(dumps(result))
+
+if __name__ == "__main__":
+    main()
+    try:
+        sys.stdout.flush()
+    except Exception:
+        pass
+    sys.exit(0)
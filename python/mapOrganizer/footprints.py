@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Ground footprints for the Map Organizer module.
+
+Works out what each image covers on the ground from its GPS position,
+altitude and phi / alpha / kappa orientation, see common/footprints.py,
+and returns them as GeoJSON polygons the map can draw and select against.
+
+Usage:
+    python footprints.py <payload_json>
+
+Payload:
+    {
+      "folder": "...",            # images to read, or
+      "images": [ {...}, ... ],   # records with filename, filepath (or path), latitude,
+                                  # longitude and optionally altitude, phi, alpha, kappa,
+                                  # camera; images without altitude are read from the file
+      "recursive": bool,          # default: true
+      "camera": { "sensorWidth": mm, "sensorHeight": mm, "focalLength": mm },
+                                  # default: a preset for the image's camera model
+      "groundElevation": float,   # ground height (m) above the altitude datum (default 0)
+      "precision": int,           # decimals kept per coordinate (default 7)
+      "catalog": bool|str,        # read metadata from the image catalog where it is current
+      "workers": int,             # header-reading threads (default 4)
+      "ioConcurrency": int,       # list folders and read headers concurrently, per mount
+      "mountConcurrency": {...},  # { "<mount path>": limit } overrides, see common/aio.py
+      "profile": bool|str|object  # timings / profile dump, see common/profiling.py
+    }
+
+Returns:
+    { "type": "FeatureCollection",
+      "features": [ { "type": "Feature", "bbox": [minLon, minLat, maxLon, maxLat],
+                      "geometry": { "type": "Polygon", "coordinates": [[[lon, lat], ...]] },
+                      "properties": { "filename", "filepath", "heightM", "areaM2", "gsdCm" } }, ... ],
+      "bbox": [...] | null,
+      "stats": { "total": n, "footprints": n, "noPosition": n, "noAltitude": n,
+                 "noCamera": n, "aboveHorizon": n },
+      "cancelled": true }           # only when cancelled: the images read so far
+
+Progress lines, with a heartbeat while headers are read, precede the final
+JSON, see common/jobs.py.
+"""
+
+import json
+import math
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# The shared metadata core lives in python/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common import iter_image_files, read_metadata
+from common.aio import open_scheduler
+from common.catalog import open_catalog
+from common.footprints import Camera, compute_footprints, footprint_areas, np
+from common.geometry import merge_bbox
+from common.jobs import ProgressReporter, install_cancel
+from common.orientation import extract_orientation
+from common.profiling import Profiler, dumps, phase
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.dng', '.jfif')
+
+DEFAULT_PRECISION = 7
+DEFAULT_WORKERS = 4
+
+
+def _number(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _column(records, key):
+    """Float array of records[*][key], NaN where missing."""
+    values = (_number(record.get(key)) for record in records)
+    return np.array([math.nan if value is None else value for value in values])
+
+
+def _read_record(path, meta=None):
+    record = {'filename': os.path.basename(path), 'filepath': path}
+    if meta is None:
+        try:
+            meta = read_metadata(path, gps_digits=None)
+        except Exception:
+            return record
+    phi, alpha, kappa = extract_orientation(meta.get('user_comment'), Path(path))
+    record.update({
+        'latitude': meta['latitude'],
+        'longitude': meta['longitude'],
+        'altitude': meta['altitude'],
+        'phi': phi,
+        'alpha': alpha,
+        'kappa': kappa,
+        'camera': meta['camera'],
+        'width': meta['width'],
+        'timestamp': meta['timestamp'],
+        'subsec': meta['subsec'],
+    })
+    return record
+
+
+def read_records(paths, catalog=None, workers=DEFAULT_WORKERS, scheduler=None, reporter=None, cancel=None):
+    """
+    Footprint inputs for image files: filename, filepath, position,
+    altitude, orientation, camera and pixel width. Unreadable files keep
+    only their name and path.
+
+    Headers are read on `workers` threads, or through the optional
+    common.aio scheduler, and come back in input order. The optional
+    ProgressReporter advances per file (its total is set here); once the
+    cancel token is set the records read so far are returned.
+    """
+    paths = list(paths)
+    known = catalog.lookup(paths, gps_digits=None) if catalog is not None else {}
+    if reporter is not None:
+        reporter.total = len(paths)
+
+    def read(path):
+        if cancel is not None and cancel.is_set():
+            return None
+        return _read_record(path, known.get(path))
+
+    records = []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        results = scheduler.imap(read, paths) if scheduler is not None else executor.map(read, paths)
+        for record in results:
+            if record is None:
+                break
+            records.append(record)
+            if reporter is not None:
+                reporter.advance()
+    return records
+
+
+def complete_records(images, catalog=None, **read_options):
+    """
+    Normalise "images" payload records; the ones without an altitude are
+    read from their file so their orientation is known too. `read_options`
+    go to read_records(); records it did not get to stay as given.
+    """
+    records = []
+    missing = []
+    for image in images:
+        if not isinstance(image, dict):
+            continue
+        record = dict(image)
+        record['filepath'] = record.get('filepath') or record.get('path')
+        if _number(record.get('altitude')) is None and record['filepath']:
+            missing.append(len(records))
+        records.append(record)
+    if missing:
+        read = read_records([records[i]['filepath'] for i in missing], catalog, **read_options)
+        for index, record in zip(missing, read):
+            known = {k: v for k, v in records[index].items() if v is not None}
+            records[index] = {**record, **known}
+    return records
+
+
+def load_records(payload, cancel=None):
+    """
+    Footprint records for a script payload ("images" or "folder", see the
+    module docstring) and whether reading them was cancelled.
+
+    The walk and the header reads run inside a ProgressReporter whose
+    heartbeat keeps the app's idle watchdog from stopping large folders. Raises
+    ValueError when there is neither an "images" list nor an existing folder.
+    """
+    images = payload.get('images')
+    folder = payload.get('folder')
+    if not isinstance(images, list) and (not folder or not os.path.isdir(folder)):
+        raise ValueError('images[] or an existing folder is required')
+    try:
+        workers = max(1, int(payload.get('workers') or DEFAULT_WORKERS))
+    except (TypeError, ValueError):
+        workers = DEFAULT_WORKERS
+
+    catalog = open_catalog(payload.get('catalog'))
+    scheduler = open_scheduler(payload)
+    try:
+        with ProgressReporter(None, status='Reading') as reporter:
+            if isinstance(images, list):
+                paths = None
+            else:
+                with phase('walk'):
+                    recursive = bool(payload.get('recursive', True))
+                    if scheduler is not None:
+                        paths = [p for _name, p in scheduler.walk(folder, IMAGE_EXTENSIONS, recursive)]
+                    else:
+                        paths = [p for _name, p in iter_image_files(folder, IMAGE_EXTENSIONS, recursive)]
+            with phase('decode'):
+                options = {'workers': workers, 'scheduler': scheduler, 'reporter': reporter, 'cancel': cancel}
+                if paths is None:
+                    records = complete_records(images, catalog, **options)
+                else:
+                    records = read_records(paths, catalog, **options)
+            reporter.finish()
+    finally:
+        if catalog is not None:
+            catalog.close()
+        if scheduler is not None:
+            scheduler.close()
+    # read_records() sets the total, so fewer files processed means it was cancelled
+    return records, reporter.total is not None and reporter.processed < reporter.total
+
+
+def footprint_arrays(records, camera=None, ground=0.0):
+    """
+    Footprints of the records as arrays: (usable, cameras, corners, valid,
+    height, stats) where usable are the records with a position, altitude
+    and camera, and the arrays follow their order (see compute_footprints).
+    `stats` counts the records left out, see the module docstring.
+    """
+    stats = {'total': len(records), 'footprints': 0, 'noPosition': 0, 'noAltitude': 0,
+             'noCamera': 0, 'aboveHorizon': 0}
+    usable = []
+    cameras = []
+    for record in records:
+        if _number(record.get('latitude')) is None or _number(record.get('longitude')) is None:
+            stats['noPosition'] += 1
+            continue
+        if _number(record.get('altitude')) is None:
+            stats['noAltitude'] += 1
+            continue
+        record_camera = camera or Camera.for_model(record.get('camera'))
+        if record_camera is None:
+            stats['noCamera'] += 1
+            continue
+        usable.append(record)
+        cameras.append(record_camera)
+    if not usable:
+        return usable, cameras, np.empty((0, 4, 2)), np.zeros(0, dtype=bool), np.empty(0), stats
+
+    focal = np.array([c.focal_length for c in cameras])
+    tan_x = np.array([c.sensor_width for c in cameras]) / (2 * focal)
+    tan_y = np.array([c.sensor_height for c in cameras]) / (2 * focal)
+    height = _column(usable, 'altitude') - ground
+    angles = [_column(usable, key) for key in ('phi', 'alpha', 'kappa')]
+    corners, valid = compute_footprints(_column(usable, 'latitude'), _column(usable, 'longitude'), height,
+                                        *angles, tan_x, tan_y)
+    for i in np.flatnonzero(~valid):
+        if height[i] > 0:
+            stats['aboveHorizon'] += 1
+        else:
+            stats['noAltitude'] += 1
+    stats['footprints'] = int(valid.sum())
+    return usable, cameras, corners, valid, height, stats
+
+
+def footprint_collection(records, camera=None, ground=0.0, precision=DEFAULT_PRECISION):
+    """
+    GeoJSON FeatureCollection of the records' footprints (see module docstring).
+    `camera` overrides the per-model presets in common/footprints.py.
+    """
+    usable, cameras, corners, valid, height, stats = footprint_arrays(records, camera, ground)
+    features = []
+    total_bbox = None
+    if usable:
+        latitude = _column(usable, 'latitude')
+        areas = footprint_areas(corners, latitude)
+        # Ground sample distance at the image centre, as if nadir
+        focal = np.array([c.focal_length for c in cameras])
+        sensor_width = np.array([c.sensor_width for c in cameras])
+        width = _column(usable, 'width')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            gsd = height * sensor_width / (focal * width) * 100
+
+        # Rounding and tolist() in one go is much faster than per coordinate
+        rings = np.round(corners, precision).tolist()
+        bboxes = np.round(np.concatenate([corners.min(axis=1), corners.max(axis=1)], axis=1), precision).tolist()
+        for i in np.flatnonzero(valid):
+            record = usable[i]
+            ring, feature_bbox = rings[i], bboxes[i]
+            features.append({
+                'type': 'Feature',
+                'bbox': feature_bbox,
+                'geometry': {'type': 'Polygon', 'coordinates': [ring + [ring[0]]]},
+                'properties': {
+                    'filename': record.get('filename'),
+                    'filepath': record.get('filepath'),
+                    'heightM': round(float(height[i]), 2),
+                    'areaM2': round(float(areas[i]), 1),
+                    'gsdCm': round(float(gsd[i]), 2) if math.isfinite(gsd[i]) else None,
+                },
+            })
+            total_bbox = merge_bbox(total_bbox, feature_bbox)
+    return {'type': 'FeatureCollection', 'features': features,
+            'bbox': list(total_bbox) if total_bbox else None, 'stats': stats}
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(json.dumps({'error': 'Payload argument required'}))
+        sys.exit(1)
+    try:
+        payload = json.loads(sys.argv[1])
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        print(json.dumps({'error': 'Invalid payload JSON'}))
+        sys.exit(1)
+    if np is None:
+        print(json.dumps({'error': 'NumPy is required for footprints'}))
+        sys.exit(1)
+    try:
+        camera = Camera.from_option(payload.get('camera'))
+        ground = _number(payload.get('groundElevation')) or 0.0
+        precision = int(payload.get('precision') if payload.get('precision') is not None else DEFAULT_PRECISION)
+    except (TypeError, ValueError) as exc:
+        print(json.dumps({'error': f'Invalid footprint options: {exc}'}))
+        sys.exit(1)
+
+    cancel = install_cancel()
+    with Profiler.from_payload(payload):
+        try:
+            records, cancelled = load_records(payload, cancel)
+        except ValueError as exc:
+            print(json.dumps({'error': str(exc)}))
+            sys.exit(1)
+        result = footprint_collection(records, camera, ground, precision)
+        if cancelled:
+            result['cancelled'] = True
+        print(dumps(result))
+
+
+if __name__ == "__main__":
+    main()
+    try:
+        sys.stdout.flush()
+    except Exception:
+        pass
+    sys.exit(0)
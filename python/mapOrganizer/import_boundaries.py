@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Boundary import for the Map Organizer module.
+
+Reads polygons and paths from KML or GeoJSON files off the renderer thread
+and returns compact geometry for the map: optionally simplified, rounded to
+`precision` decimals, rings without the repeated closing vertex and a
+bounding box per feature, so large cadastral files stay cheap to draw and
+to select against. Points (e.g. a geotagging KML export) come back as image
+points with the "path" they carry.
+
+KML is stream-parsed with ElementTree.iterparse, one Placemark at a time;
+GeoJSON is loaded with the json module.
+
+Usage:
+    python import_boundaries.py <payload_json>
+
+Payload:
+    {
+      "path": "...",                # .kml or .geojson/.json file
+      "tolerance": float,           # simplification tolerance in metres (default 0: off)
+      "method": "douglas-peucker" | "visvalingam",   # see common/geometry.py
+      "precision": int,             # decimals kept per coordinate (default 7, ~1 cm)
+      "profile": bool|str|object    # timings / profile dump, see common/profiling.py
+    }
+
+Returns:
+    { "features": [ { "name": str, "type": "polygon", "bbox": [minLon, minLat, maxLon, maxLat],
+                      "rings": [[[lat, lng], ...], ...] },     # outer ring, then holes
+                    { "name": str, "type": "path", "bbox": [...], "coordinates": [[lat, lng], ...] },
+                    { "name": str, "type": "point", "coordinates": [lat, lng], "path": str|null },
+                    ... ],
+      "bbox": [...] | null,
+      "stats": { "polygons": n, "paths": n, "points": n, "skipped": n,
+                 "vertices": n, "verticesKept": n },
+      "cancelled": true }           # only when cancelled: the features read so far
+
+Long runs print { "type": "progress", ... } heartbeat lines (see
+common/jobs.py) every few seconds before the final JSON.
+"""
+
+import json
+import os
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+# The shared metadata core lives in python/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common.geometry import METHODS, bbox, merge_bbox, simplify
+from common.jobs import ProgressReporter, install_cancel
+from common.profiling import Profiler, dumps, phase
+
+DEFAULT_PRECISION = 7
+
+
+def _local(tag):
+    """Tag name without its XML namespace."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def parse_kml_coordinates(text):
+    """
+    Parse a KML <coordinates> string into (lon, lat) tuples, ignoring altitude
+    and malformed tuples.
+    """
+    points = []
+    for chunk in (text or '').split():
+        parts = chunk.split(',')
+        if len(parts) < 2:
+            continue
+        try:
+            points.append((float(parts[0]), float(parts[1])))
+        except ValueError:
+            continue
+    return points
+
+
+def _coordinates_of(elem):
+    for child in elem.iter():
+        if _local(child.tag) == 'coordinates':
+            return parse_kml_coordinates(child.text)
+    return []
+
+
+def _kml_geometries(placemark):
+    """Yield ('polygon', [ring, ...]), ('path', points) or ('point', points) for a Placemark."""
+    for elem in placemark.iter():
+        tag = _local(elem.tag)
+        if tag == 'Polygon':
+            rings = []
+            for boundary in elem:
+                name = _local(boundary.tag)
+                if name not in ('outerBoundaryIs', 'innerBoundaryIs'):
+                    continue
+                ring = _coordinates_of(boundary)
+                if name == 'outerBoundaryIs':
+                    rings.insert(0, ring)
+                else:
+                    rings.append(ring)
+            yield 'polygon', rings
+        elif tag == 'LineString':
+            yield 'path', _coordinates_of(elem)
+        elif tag == 'Point':
+            yield 'point', _coordinates_of(elem)
+
+
+def _kml_data(placemark):
+    """ExtendedData <Data name="..."><value> pairs of a Placemark."""
+    data = {}
+    for elem in placemark.iter():
+        if _local(elem.tag) == 'Data' and elem.get('name'):
+            value = next((c.text for c in elem if _local(c.tag) == 'value'), None)
+            data[elem.get('name')] = value
+    return data
+
+
+def iter_kml(path):
+    """
+    Yield (name, kind, geometry, properties) per geometry in a KML file,
+    parsing one Placemark at a time and discarding it afterwards.
+    """
+    index = 0
+    for _event, elem in ET.iterparse(path, events=('end',)):
+        if _local(elem.tag) != 'Placemark':
+            continue
+        index += 1
+        name = None
+        for child in elem:
+            if _local(child.tag) == 'name':
+                name = (child.text or '').strip() or None
+                break
+        properties = _kml_data(elem)
+        for kind, geometry in _kml_geometries(elem):
+            yield name or f'Placemark {index}', kind, geometry, properties
+        # Keeps memory flat for files with many Placemarks
+        elem.clear()
+
+
+def _geojson_geometries(geometry):
+    kind = geometry.get('type') if isinstance(geometry, dict) else None
+    coords = geometry.get('coordinates') if kind else None
+    if kind == 'Polygon':
+        yield 'polygon', coords
+    elif kind == 'MultiPolygon':
+        for polygon in coords:
+            yield 'polygon', polygon
+    elif kind == 'LineString':
+        yield 'path', coords
+    elif kind == 'MultiLineString':
+        for line in coords:
+            yield 'path', line
+    elif kind == 'GeometryCollection':
+        for member in geometry.get('geometries') or []:
+            yield from _geojson_geometries(member)
+    elif kind == 'Point':
+        yield 'point', [coords]
+    elif kind == 'MultiPoint':
+        for point in coords:
+            yield 'point', [point]
+
+
+def iter_geojson(path):
+    """Yield (name, kind, geometry, properties) per geometry in a GeoJSON file."""
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('type') == 'FeatureCollection':
+        features = data.get('features') or []
+    elif data.get('type') == 'Feature':
+        features = [data]
+    else:
+        features = [{'geometry': data}]
+    for index, feature in enumerate(features, 1):
+        properties = feature.get('properties') or {}
+        name = (properties.get('name') or properties.get('Name') or properties.get('filename')
+                or feature.get('id') or f'Feature {index}')
+        for kind, geometry in _geojson_geometries(feature.get('geometry')):
+            if kind == 'polygon':
+                geometry = [[(float(p[0]), float(p[1])) for p in ring] for ring in geometry or []]
+            else:
+                geometry = [(float(p[0]), float(p[1])) for p in geometry or []]
+            yield str(name), kind, geometry, properties
+
+
+def _compact(points, precision):
+    """(lon, lat) points as rounded [lat, lng] pairs for Leaflet."""
+    return [[round(lat, precision), round(lon, precision)] for lon, lat in points]
+
+
+def import_boundaries(path, tolerance=0.0, method='douglas-peucker', precision=DEFAULT_PRECISION, cancel=None):
+    """
+    Read a KML or GeoJSON file into compact map features (see module docstring).
+    Once the optional cancel token is set, the features read so far are returned.
+    Raises ValueError for unsupported files and OSError when it cannot be read.
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix == '.kml':
+        geometries = iter_kml(path)
+    elif suffix in ('.geojson', '.json'):
+        geometries = iter_geojson(path)
+    else:
+        raise ValueError(f'Unsupported boundary file: {Path(path).name}')
+
+    features = []
+    stats = {'polygons': 0, 'paths': 0, 'points': 0, 'skipped': 0, 'vertices': 0, 'verticesKept': 0}
+    total_bbox = None
+    cancelled = False
+    for name, kind, geometry, properties in geometries:
+        if cancel is not None and cancel.is_set():
+            cancelled = True
+            break
+        if kind == 'polygon':
+            rings = []
+            for i, ring in enumerate(geometry):
+                if len(ring) < 3:
+                    continue
+                if ring[0] != ring[-1]:
+                    ring = ring + [ring[0]]
+                stats['vertices'] += len(ring) - 1
+                ring = simplify(ring, tolerance, method, closed=True)[:-1]
+                if i == 0 or len(ring) >= 3:
+                    rings.append(ring)
+            if not rings or len(rings[0]) < 3:
+                stats['skipped'] += 1
+                continue
+            stats['verticesKept'] += sum(len(ring) for ring in rings)
+            feature_bbox = bbox(rings[0])
+            features.append({
+                'name': name,
+                'type': 'polygon',
+                'bbox': list(feature_bbox),
+                'rings': [_compact(ring, precision) for ring in rings],
+            })
+            stats['polygons'] += 1
+        elif kind == 'path':
+            if len(geometry) < 2:
+                stats['skipped'] += 1
+                continue
+            stats['vertices'] += len(geometry)
+            geometry = simplify(geometry, tolerance, method)
+            stats['verticesKept'] += len(geometry)
+            feature_bbox = bbox(geometry)
+            features.append({
+                'name': name,
+                'type': 'path',
+                'bbox': list(feature_bbox),
+                'coordinates': _compact(geometry, precision),
+            })
+            stats['paths'] += 1
+        elif kind == 'point' and geometry:
+            lon, lat = geometry[0]
+            features.append({
+                'name': name,
+                'type': 'point',
+                'coordinates': [round(lat, precision), round(lon, precision)],
+                'path': properties.get('path') or properties.get('filepath'),
+            })
+            feature_bbox = (lon, lat, lon, lat)
+            stats['points'] += 1
+        else:
+            stats['skipped'] += 1
+            continue
+        total_bbox = merge_bbox(total_bbox, feature_bbox)
+
+    result = {
+        'features': features,
+        'bbox': list(total_bbox) if total_bbox else None,
+        'stats': stats,
+    }
+    if cancelled:
+        result['cancelled'] = True
+    return result
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(json.dumps({'error': 'Payload argument required'}))
+        sys.exit(1)
+    try:
+        payload = json.loads(sys.argv[1])
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        print(json.dumps({'error': 'Invalid payload JSON'}))
+        sys.exit(1)
+
+    path = payload.get('path')
+    if not path or not os.path.isfile(path):
+        print(json.dumps({'error': 'Boundary file not found'}))
+        sys.exit(1)
+    method = payload.get('method') or METHODS[0]
+    if method not in METHODS:
+        print(json.dumps({'error': f'Unknown simplification method: {method}'}))
+        sys.exit(1)
+    try:
+        tolerance = max(0.0, float(payload.get('tolerance') or 0))
+        precision = int(payload.get('precision') if payload.get('precision') is not None else DEFAULT_PRECISION)
+    except (TypeError, ValueError):
+        print(json.dumps({'error': 'tolerance and precision must be numbers'}))
+        sys.exit(1)
+
+    cancel = install_cancel()
+    with Profiler.from_payload(payload):
+        try:
+            # Heartbeat only, so the app's idle watchdog leaves long imports alone
+            with phase('decode'), ProgressReporter(None, status='Importing'):
+                result = import_boundaries(path, tolerance, method, precision, cancel)
+        except (ValueError, OSError, ET.ParseError) as exc:
+            print(json.dumps({'error': f'Boundary import failed: {exc}'}))
+            sys.exit(1)
+        print(dumps(result))
+
+
+if __name__ == "__main__":
+    main()
+    try:
+        sys.stdout.flush()
+    except Exception:
+        pass
+    sys.exit(0)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Image catalog indexing and queries, see common/catalog.py.
+
+"index" walks the given folders and stores the header metadata of new or
+changed images; the other scripts then read metadata from the catalog
+(their "catalog" option) instead of decoding it again. "query" answers
+time / area / camera / folder questions from the catalog alone.
+
+Usage:
+    python index_catalog.py <payload_json>
+
+Payload:
+    {
+      "mode": "index"|"query"|"summary",   # default: index
+      "catalog": "...",                    # database file (default: <temp>/shamal-catalog.sqlite)
+
+      # index
+      "folders": ["...", ...],             # or "folder": "..."
+      "recursive": bool,                   # default: true
+      "workers": int,                      # header-reading threads (default 4)
+      "progress": bool,                    # progress lines, see common/jobs.py
+
+      # query (all filters optional and combined)
+      "folder": "...", "recursive": bool,
+      "camera": "DJI FC6310",
+      "bbox": [minLon, minLat, maxLon, maxLat],
+      "start": "2024-05-07", "end": "2024-05-08",   # ISO 8601, end exclusive
+      "geotagged": bool,
+      "limit": int,
+
+      "profile": bool|str|object           # timings / profile dump, see common/profiling.py
+    }
+
+Returns:
+    index:   { "folders": [ { "folder", "total", "added", "updated", "unchanged",
+                              "removed", "unreadable", "cancelled" } ], "catalog": "..." }
+    query:   { "images": [ { "filename", "path", "folder", "capturedAt", "latitude", ... } ],
+               "count": n }
+    summary: { "files", "withMetadata", "geotagged", "firstCapture", "lastCapture",
+               "folders", "cameras", "rtree" }
+"""
+
+import json
+import os
+import sys
+from pathlib import Path
+
+# The shared metadata core lives in python/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common.catalog import DEFAULT_WORKERS, Catalog
+from common.jobs import ProgressReporter, install_cancel
+from common.profiling import Profiler, dumps, phase
+
+
+def run_index(catalog, payload, cancel):
+    folders = payload.get('folders')
+    if not isinstance(folders, list):
+        folders = [payload.get('folder')] if payload.get('folder') else []
+    missing = [folder for folder in folders if not folder or not os.path.isdir(folder)]
+    if not folders or missing:
+        return {'error': f"Folder not found: {missing[0]}" if missing else 'folders[] or folder is required'}
+    try:
+        workers = max(1, int(payload.get('workers') or DEFAULT_WORKERS))
+    except (TypeError, ValueError):
+        workers = DEFAULT_WORKERS
+    recursive = bool(payload.get('recursive', True))
+
+    results = []
+    for folder in folders:
+        if cancel.is_set():
+            break
+        with ProgressReporter(None, status='Indexing', enabled=bool(payload.get('progress'))) as reporter:
+            with phase('decode'):
+                stats = catalog.index(folder, recursive, workers=workers, reporter=reporter, cancel=cancel)
+            reporter.finish()
+        results.append({'folder': folder, **stats})
+    return {'folders': results, 'catalog': catalog.path}
+
+
+def run_query(catalog, payload):
+    bbox = payload.get('bbox')
+    if bbox is not None and (not isinstance(bbox, list) or len(bbox) != 4):
+        return {'error': 'bbox must be [minLon, minLat, maxLon, maxLat]'}
+    geotagged = payload.get('geotagged')
+    with phase('io'):
+        images = catalog.query(
+            folder=payload.get('folder'),
+            recursive=bool(payload.get('recursive', True)),
+            camera=payload.get('camera'),
+            bbox=bbox,
+            start=payload.get('start'),
+            end=payload.get('end'),
+            geotagged=None if geotagged is None else bool(geotagged),
+            limit=payload.get('limit'),
+        )
+    return {'images': images, 'count': len(images)}
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(json.dumps({'error': 'Payload argument required'}))
+        sys.exit(1)
+    try:
+        payload = json.loads(sys.argv[1])
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        print(json.dumps({'error': 'Invalid payload JSON'}))
+        sys.exit(1)
+
+    mode = payload.get('mode') or 'index'
+    cancel = install_cancel()
+    with Profiler.from_payload(payload):
+        try:
+            catalog = Catalog(payload.get('catalog'))
+        except Exception as exc:
+            print(json.dumps({'error': f'Cannot open catalog: {exc}'}))
+            sys.exit(1)
+        with catalog:
+            if mode == 'index':
+                result = run_index(catalog, payload, cancel)
+            elif mode == 'query':
+                result = run_query(catalog, payload)
+            elif mode == 'summary':
+                result = catalog.summary()
+            else:
+                result = {'error': f'Unknown mode: {mode}'}
+        print(dumps(result))
+
+
+if __name__ == "__main__":
+    main()
+    try:
+        sys.stdout.flush()
+    except Exception:
+        pass
+    sys.exit(0)
@@ -6,190 +6,300 @@ This script scans a folder for image files, extracts GPS coordinates from EXIF d
 and returns a JSON list of geotagged images.
 
 Usage:
-    python map_loader.py <folder_path>
+    python map_loader.py <folder_path> [options_json]
+
+Options (optional JSON object in argv[2]):
+    {
+      "recursive": bool,          # also scan subfolders (default: false)
+      "workers": int,             # worker pool size; 0/1 keeps the serial path
+      "pool": "process"|"thread", # worker pool type (default: process)
+      "progress": bool,           # emit progress lines before the final JSON
+      "resumeFrom": int,          # skip files before this walk position
+      "catalog": bool|str,        # read metadata from the image catalog where it is
+                                  # current (true: default location), see common/catalog.py
+      "ioConcurrency": int,       # list folders and read headers concurrently, per mount
+      "mountConcurrency": {...},  # { "<mount path>": limit } overrides, see common/aio.py
+      "headerBudget": int,        # bytes read up front per image header (default 64 KiB),
+                                  # see common/exif.py
+      "profile": bool|str|object  # timings / profile dump, see common/profiling.py
+    }
+
+Progress messages (stdout lines, only when "progress" is set; time-throttled
+with a heartbeat, see common/jobs.py):
+    { "type": "progress", "processed": n, "total": m, "percent": p, "status": "Scanning",
+      "rate": r, "etaSeconds": s, "elapsedSeconds": s }
+
+SIGTERM or a "cancel" line on stdin stops the scan between batches. The
+partial result then carries "cancelled": true and "resumeCursor", the walk
+position to pass back as "resumeFrom".
 
 Returns:
-    JSON list of geotagged images with filename, filepath, latitude, and longitude
+    JSON list of geotagged images with filename, filepath, latitude, longitude,
+    timestamp and bytesRead (header bytes read; 0 for catalog hits, null for
+    formats read through Pillow), plus "bytesRead" for every file scanned
 """
 
 import os
 import sys
 import json
+import multiprocessing
+from functools import partial
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from pathlib import Path
-from PIL import Image
-from PIL.ExifTags import TAGS, GPSTAGS
 from datetime import datetime
 
+# The shared metadata core lives in python/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common import HEADER_BUDGET, header_budget, iter_image_files as walk_image_files, read_metadata
+from common.aio import open_scheduler
+from common.catalog import open_catalog
+from common.jobs import ProgressReporter, install_cancel, resume_offset
+from common.profiling import Profiler, phase
+
+
+def to_iso_timestamp(ts_raw):
+    """
+    Convert an EXIF "YYYY:MM:DD HH:MM:SS" capture time to ISO 8601.
+    Returns None when missing or malformed.
+    """
+    if not ts_raw or not isinstance(ts_raw, str):
+        return None
+    try:
+        ts_clean = ts_raw.strip().replace(":", "-", 2)
+        dt = datetime.strptime(ts_clean, "%Y-%m-%d %H:%M:%S")
+        return dt.isoformat()
+    except Exception:
+        return None
+
+
+# Supported image formats
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Files handed to a worker per task; keeps IPC overhead low for process pools
+CHUNK_SIZE = 64
 
-def convert_to_degrees(value):
+
+def iter_image_files(folder_path, recursive=False):
     """
-    Convert GPS coordinates stored in EXIF to degrees in float format
+    Walk a folder and yield image files in a stable (sorted) order
     
     Args:
-        value: GPS coordinate in degrees/minutes/seconds format
+        folder_path (str): Path to folder containing images
+        recursive (bool): Whether to descend into subfolders
         
-    Returns:
-        float: Decimal degrees
+    Yields:
+        tuple: (filename, filepath) for each supported image
     """
-    d = float(value[0])
-    m = float(value[1])
-    s = float(value[2])
-    return d + (m / 60.0) + (s / 3600.0)
+    return walk_image_files(folder_path, IMAGE_EXTENSIONS, recursive)
 
 
-def get_gps_info(exif_data):
+def scan_images_for_gps(folder_path, recursive=False, workers=0, pool='process', progress=False,
+                        resume_from=0, cancel=None, catalog=None, scheduler=None, budget=HEADER_BUDGET):
     """
-    Extract GPS information from EXIF data
+    Scan folder for image files and extract GPS coordinates
     
     Args:
-        exif_data: Dictionary of EXIF data
+        folder_path (str): Path to folder containing images
+        recursive (bool): Whether to scan subfolders as well
+        workers (int): Worker pool size; 0 or 1 processes files serially
+        pool (str): 'process' or 'thread' worker pool
+        progress (bool): Whether to emit progress lines to stdout
+        resume_from (int): Walk position to start from (a previous resumeCursor)
+        cancel: Optional cancel token; checked between batches
+        catalog (Catalog): Optional image catalog; files with a current
+            entry are not decoded
+        scheduler (IOScheduler): Optional I/O scheduler for network shares;
+            walks concurrently and, without a worker pool, reads batches
+            concurrently (see common/aio.py)
+        budget (int): Bytes read up front per image header (see common/exif.py)
         
     Returns:
-        tuple: (latitude, longitude) or (None, None) if not found
+        dict: Contains 'images' list, 'total_count' integer and 'bytesRead'
+              (header bytes read for all scanned files); a cancelled scan
+              adds 'cancelled' and 'resumeCursor'
     """
-    gps_info = {}
-    
-    if not exif_data:
-        return None, None
-        
-    for tag, value in exif_data.items():
-        tag_name = TAGS.get(tag, tag)
-        if tag_name == "GPSInfo":
-            for gps_tag, gps_value in value.items():
-                gps_tag_name = GPSTAGS.get(gps_tag, gps_tag)
-                gps_info[gps_tag_name] = gps_value
-            break
-    
-    if not gps_info:
-        return None, None
-        
-    # Check if GPSLatitude and GPSLongitude exist
-    if 'GPSLatitude' not in gps_info or 'GPSLongitude' not in gps_info:
-        return None, None
-        
-    # Get latitude
-    gps_latitude = gps_info['GPSLatitude']
-    gps_latitude_ref = gps_info.get('GPSLatitudeRef', 'N')
-    
-    # Get longitude
-    gps_longitude = gps_info['GPSLongitude']
-    gps_longitude_ref = gps_info.get('GPSLongitudeRef', 'E')
-    
-    # Convert to decimal degrees
-    lat = convert_to_degrees(gps_latitude)
-    if gps_latitude_ref != "N":
-        lat = 0 - lat
-        
-    lon = convert_to_degrees(gps_longitude)
-    if gps_longitude_ref != "E":
-        lon = 0 - lon
-        
-    return lat, lon
+    with phase('walk'):
+        if scheduler is not None:
+            files = scheduler.walk(folder_path, IMAGE_EXTENSIONS, recursive)
+        else:
+            files = list(iter_image_files(folder_path, recursive))
+    total_images = len(files)
+    start = resume_offset(resume_from, total_images)
+
+    if catalog is not None:
+        # Catalog metadata rides along in the batch so workers skip the read
+        with phase('io'):
+            known = catalog.lookup((path for _name, path in files[start:]), gps_digits=None)
+        files = [(name, path, known.get(path)) for name, path in files]
+
+    # Process in batches to handle large datasets efficiently
+    batches = [files[i:i + CHUNK_SIZE] for i in range(start, total_images, CHUNK_SIZE)]
+
+    # A partial of a module-level function still pickles for process pools
+    extract = partial(extract_batch, budget=budget)
+
+    with phase('decode'), ProgressReporter(total_images, enabled=progress, start=start) as reporter:
+        if workers and workers > 1 and len(batches) > 1:
+            batch_results = run_batches_parallel(batches, workers, pool, reporter, cancel, extract)
+        else:
+            batch_results = []
+            if scheduler is not None:
+                serial = scheduler.imap(extract, batches, path_of=lambda batch: batch[0][1])
+            else:
+                serial = map(extract, batches)
+            for batch in batches:
+                if cancel is not None and cancel.is_set():
+                    break
+                batch_results.append(next(serial))
+                reporter.advance(len(batch))
+        reporter.finish()
+
+    # Batches are merged in walk order regardless of completion order
+    geotagged_images = []
+    bytes_read = 0
+    for batch_images, batch_bytes in batch_results:
+        geotagged_images.extend(batch_images)
+        bytes_read += batch_bytes
+
+    result = {
+        'images': geotagged_images,
+        'total_count': total_images,
+        'bytesRead': bytes_read
+    }
+    done = sum(len(batch) for batch in batches[:len(batch_results)])
+    if start + done < total_images:
+        result['cancelled'] = True
+        result['resumeCursor'] = start + done
+    return result
 
 
-def get_capture_timestamp(exif_data):
+def run_batches_parallel(batches, workers, pool, reporter, cancel=None, extract=None):
     """
-    Extract capture timestamp from EXIF if available.
-    Returns an ISO 8601 string or None.
+    Process batches on a worker pool with a bounded number of in-flight tasks
+    
+    Args:
+        batches (list): List of batches of (filename, filepath) tuples
+        workers (int): Worker pool size
+        pool (str): 'process' or 'thread' worker pool
+        reporter (ProgressReporter): Receives the per-batch progress
+        cancel: Optional cancel token; once set no new batches are submitted
+        extract (callable): Batch function run on the pool (default extract_batch)
+        
+    Returns:
+        list: Per-batch (images, bytes read) results, in the same order as the
+              input batches; after a cancel only the contiguous finished
+              prefix is returned
     """
-    if not exif_data:
-        return None
-    ts_raw = None
-    for tag, value in exif_data.items():
-        tag_name = TAGS.get(tag, tag)
-        if tag_name in ("DateTimeOriginal", "DateTime"):
-            ts_raw = value
-            break
-    if not ts_raw or not isinstance(ts_raw, str):
-        return None
-    try:
-        # EXIF format: "YYYY:MM:DD HH:MM:SS"
-        ts_clean = ts_raw.strip().replace(":", "-", 2)
-        dt = datetime.strptime(ts_clean, "%Y-%m-%d %H:%M:%S")
-        return dt.isoformat()
-    except Exception:
-        return None
+    extract = extract or extract_batch
+    executor_cls = ThreadPoolExecutor if pool == 'thread' else ProcessPoolExecutor
+    max_in_flight = workers * 2
+    results = [None] * len(batches)
+
+    with executor_cls(max_workers=workers) as executor:
+        pending = {}
+        next_index = 0
+        while next_index < len(batches) or pending:
+            if cancel is not None and cancel.is_set():
+                # Let in-flight batches finish, but queue nothing new
+                next_index = len(batches)
+            # Keep at most max_in_flight batches queued so memory stays bounded
+            while next_index < len(batches) and len(pending) < max_in_flight:
+                future = executor.submit(extract, batches[next_index])
+                pending[future] = next_index
+                next_index += 1
+            if not pending:
+                break
 
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    results[index] = future.result()
+                except Exception:
+                    # A crashed worker only loses its own batch
+                    results[index] = ([], 0)
+                reporter.advance(len(batches[index]))
 
-def scan_images_for_gps(folder_path):
+    if None in results:
+        results = results[:results.index(None)]
+    return results
+
+
+def extract_batch(batch, budget=HEADER_BUDGET):
     """
-    Scan folder for image files and extract GPS coordinates
+    Extract GPS coordinates for a batch of images
     
     Args:
-        folder_path (str): Path to folder containing images
+        batch (list): List of (filename, filepath) tuples
+        budget (int): Bytes read up front per image header
         
     Returns:
-        dict: Contains 'images' list and 'total_count' integer
+        tuple: Geotagged image dicts for the batch, in input order, and the
+               header bytes read for the whole batch
     """
-    # Supported image formats
-    image_extensions = ('.jpg', '.jpeg', '.png')
-    
-    # Results
     geotagged_images = []
-    total_images = 0
-    
-    # Process in batches to handle large datasets efficiently
-    batch_size = 1000
-    current_batch = []
-    
-    # Only scan the top-level contents of the selected folder (no recursion)
-    for entry in Path(folder_path).iterdir():
-        if not entry.is_file():
-            continue  # Skip subfolders and non-file entries
-            
-        # Check if file is an image
-        if entry.suffix.lower() in image_extensions:
-            total_images += 1
-            file_path = str(entry)
-            
-            # Add to current batch
-            current_batch.append((entry.name, file_path))
-            
-            # Process batch when it reaches the batch size
-            if len(current_batch) >= batch_size:
-                process_batch(current_batch, geotagged_images)
-                current_batch = []  # Reset batch
-    
-    # Process remaining files in the final batch
-    if current_batch:
-        process_batch(current_batch, geotagged_images)
-    
-    return {
-        'images': geotagged_images,
-        'total_count': total_images
-    }
+    bytes_read = process_batch(batch, geotagged_images, budget)
+    return geotagged_images, bytes_read
 
 
-def process_batch(batch, geotagged_images):
+def process_batch(batch, geotagged_images, budget=HEADER_BUDGET):
     """
     Process a batch of images to extract GPS coordinates
     
     Args:
-        batch (list): List of (filename, filepath) tuples
+        batch (list): List of (filename, filepath) or (filename, filepath, metadata) tuples
         geotagged_images (list): List to append geotagged images to
+        budget (int): Bytes read up front per image header
+        
+    Returns:
+        int: Header bytes read for the batch, images without GPS included
+    """
+    total_bytes = 0
+    for file, file_path, *known in batch:
+        meta = known[0] if known else None
+        if meta is None:
+            try:
+                # One header-only read per image; full precision as before
+                meta = read_metadata(file_path, gps_digits=None, budget=budget)
+            except Exception:
+                # Skip files that can't be processed
+                continue
+        lat, lon = meta['latitude'], meta['longitude']
+        # Catalog entries were not read at all
+        bytes_read = meta.get('bytes_read', 0)
+        total_bytes += bytes_read or 0
+
+        # If GPS data exists, add to results
+        if lat is not None and lon is not None:
+            geotagged_images.append({
+                'filename': file,
+                'filepath': file_path,
+                'latitude': lat,
+                'longitude': lon,
+                'timestamp': to_iso_timestamp(meta['timestamp']),
+                'bytesRead': bytes_read
+            })
+    return total_bytes
+
+
+def parse_options(raw):
+    """
+    Parse the optional JSON options argument
+    
+    Args:
+        raw (str): JSON object string or None
+        
+    Returns:
+        dict: Parsed options (empty if missing or invalid)
     """
-    for file, file_path in batch:
-        try:
-            # Open image and get EXIF data
-            with Image.open(file_path) as image:
-                exif_data = image._getexif()
-                
-                # Extract GPS info
-                lat, lon = get_gps_info(exif_data)
-                timestamp = get_capture_timestamp(exif_data)
-                
-                # If GPS data exists, add to results
-                if lat is not None and lon is not None:
-                    geotagged_images.append({
-                        'filename': file,
-                        'filepath': file_path,
-                        'latitude': lat,
-                        'longitude': lon,
-                        'timestamp': timestamp
-                    })
-        except Exception as e:
-            # Skip files that can't be processed
-            continue
+    if not raw:
+        return {}
+    try:
+        options = json.loads(raw)
+    except Exception:
+        return {}
+    return options if isinstance(options, dict) else {}
 
 
 def main():
@@ -197,11 +307,12 @@ def main():
     Main function to process folder and output JSON result
     """
     # Check if folder path provided
-    if len(sys.argv) != 2:
+    if len(sys.argv) not in (2, 3):
         print(json.dumps({'error': 'Folder path argument required'}))
         sys.exit(1)
         
     folder_path = sys.argv[1]
+    options = parse_options(sys.argv[2] if len(sys.argv) == 3 else None)
     
     # Check if folder exists
     if not os.path.exists(folder_path):
@@ -212,14 +323,41 @@ def main():
         print(json.dumps({'error': 'Path is not a directory'}))
         sys.exit(1)
     
-    # Scan images and get GPS data
-    result = scan_images_for_gps(folder_path)
+    try:
+        workers = int(options.get('workers') or 0)
+    except (TypeError, ValueError):
+        workers = 0
     
-    # Output as JSON
-    print(json.dumps(result))
+    cancel = install_cancel()
+    catalog = open_catalog(options.get('catalog'))
+    scheduler = open_scheduler(options)
+    
+    with Profiler.from_payload(options) as profiler:
+        # Scan images and get GPS data
+        result = scan_images_for_gps(
+            folder_path,
+            recursive=bool(options.get('recursive', False)),
+            workers=workers,
+            pool=options.get('pool') or 'process',
+            progress=bool(options.get('progress', False)),
+            resume_from=options.get('resumeFrom'),
+            cancel=cancel,
+            catalog=catalog,
+            scheduler=scheduler,
+            budget=header_budget(options)
+        )
+        if catalog is not None:
+            catalog.close()
+        if scheduler is not None:
+            scheduler.close()
+        
+        # Output as JSON
+        print(profiler.dumps(result))
 
 
 if __name__ == "__main__":
+    # Required for process pools in the frozen (PyInstaller) executable
+    multiprocessing.freeze_support()
     main()
     try:
         sys.stdout.flush()
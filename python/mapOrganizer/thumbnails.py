@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Thumbnail service for the Map Organizer and Geotagging previews.
+
+Each thumbnail comes from the cheapest source available:
+1. The on-disk cache, keyed by path, requested size, file size and mtime;
+   the source's EXIF orientation is cached next to it, so a hit does not
+   touch the source file at all.
+2. The embedded EXIF (IFD1) JPEG thumbnail, read from the file header
+   without decoding the main image.
+3. Pillow with draft() reduced-DCT decoding, which decodes a JPEG directly
+   at 1/2, 1/4 or 1/8 scale instead of the full 20 MP frame.
+
+The cache is size-bounded: once it grows past maxCacheMB the least recently
+used entries are removed. Many files are handled at once on a thread pool
+(Pillow releases the GIL while decoding).
+
+Usage:
+    python thumbnails.py <payload_json>
+
+Payload:
+    {
+      "paths": ["...", ...],      # images to preview, or
+      "folder": "...",            # every image in a folder
+      "recursive": bool,
+      "size": int,                # longest side in pixels (default 256)
+      "cacheDir": "...",          # default: <temp>/shamal-thumbnails
+      "maxCacheMB": int,          # default 256
+      "workers": int,             # thread pool size (default 4)
+      "progress": bool,           # progress lines, see common/jobs.py
+      "profile": bool|str|object  # timings / profile dump, see common/profiling.py
+    }
+
+Returns:
+    { "thumbnails": [ { "path", "thumbnail", "source": "cache"|"embedded"|"decoded",
+                        "width", "height", "orientation" } | { "path", "error" } ],
+      "stats": { "total", "cache", "embedded", "decoded", "failed" },
+      "cacheDir": "..." }
+
+Thumbnails are not rotated; "orientation" is the EXIF orientation of the
+source image so the UI can rotate the preview.
+"""
+
+import hashlib
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# The shared metadata core lives in python/common
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from common import iter_image_files, read_header, read_thumbnail
+from common.exif import TAG_ORIENTATION, UnsupportedFormat, jpeg_dimensions
+from common.jobs import ProgressReporter, install_cancel
+from common.profiling import Profiler, dumps, phase
+
+try:
+    from PIL import Image
+except ImportError:  # Embedded thumbnails and the cache still work without Pillow
+    Image = None
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff', '.dng', '.jfif')
+
+DEFAULT_SIZE = 256
+DEFAULT_CACHE_MB = 256
+DEFAULT_WORKERS = 4
+JPEG_QUALITY = 80
+
+# An embedded thumbnail is used as-is while it is at most this much larger
+# than requested; beyond that it is downscaled first
+EMBEDDED_SLACK = 2.0
+
+# Sidecar holding the source's EXIF orientation next to each cached thumbnail
+ORIENTATION_SUFFIX = '.orientation'
+
+
+def default_cache_dir():
+    return os.path.join(tempfile.gettempdir(), 'shamal-thumbnails')
+
+
+def cache_key(path, size, st):
+    """
+    Cache file name for an image; changes whenever the file does.
+    """
+    raw = f"{os.path.abspath(path)}|{size}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.sha1(raw.encode('utf-8', 'surrogatepass')).hexdigest() + '.jpg'
+
+
+def read_orientation(path):
+    try:
+        tags, _ = read_header(path)
+    except (UnsupportedFormat, OSError):
+        return None
+    value = tags['0th'].get(TAG_ORIENTATION)
+    return value if isinstance(value, int) else None
+
+
+def encode_jpeg(img):
+    if img.mode not in ('RGB', 'L'):
+        img = img.convert('RGB')
+    out = io.BytesIO()
+    img.save(out, 'JPEG', quality=JPEG_QUALITY)
+    return out.getvalue(), img.size
+
+
+def from_embedded(path, size):
+    """
+    Thumbnail bytes and size from the EXIF thumbnail, or None when there is
+    none or it is too small for the requested size.
+    """
+    try:
+        data = read_thumbnail(path)
+    except (UnsupportedFormat, OSError):
+        return None
+    if not data:
+        return None
+    dims = jpeg_dimensions(data)
+    if not dims or max(dims) < size:
+        return None
+    if max(dims) <= size * EMBEDDED_SLACK or Image is None:
+        return data, dims
+    with Image.open(io.BytesIO(data)) as img:
+        img.thumbnail((size, size))
+        return encode_jpeg(img)
+
+
+def from_decoded(path, size):
+    """
+    Decode the image at reduced scale with Pillow and shrink it to size.
+    """
+    if Image is None:
+        raise RuntimeError('Pillow is required to decode images without an embedded thumbnail')
+    with Image.open(path) as img:
+        # JPEG only: pick the smallest DCT scale that still covers size
+        img.draft('RGB', (size, size))
+        img.thumbnail((size, size))
+        return encode_jpeg(img)
+
+
+class ThumbnailCache:
+    """
+    Directory of cached thumbnails with a total size limit (LRU by mtime).
+    Every thumbnail has an ORIENTATION_SUFFIX sidecar with the source's
+    EXIF orientation (empty when it has none).
+    """
+
+    def __init__(self, folder, max_bytes):
+        self.folder = Path(folder)
+        self.max_bytes = max_bytes
+        self.folder.mkdir(parents=True, exist_ok=True)
+
+    def lookup(self, key):
+        """
+        (thumbnail path, orientation) for a cached entry, or None on a miss.
+        """
+        target = self.folder / key
+        try:
+            # Touch on hit so eviction removes the least recently used entries
+            os.utime(target)
+            orientation = target.with_suffix(ORIENTATION_SUFFIX).read_text(encoding='ascii').strip()
+        except OSError:
+            return None
+        return target, int(orientation) if orientation.isdigit() else None
+
+    def _write(self, target, data):
+        temp = target.with_suffix(f'.{os.getpid()}.{threading.get_ident()}.tmp')
+        temp.write_bytes(data)
+        os.replace(temp, target)
+
+    def store(self, key, data, orientation=None):
+        target = self.folder / key
+        # Sidecar first: a thumbnail without one is treated as a miss
+        self._write(target.with_suffix(ORIENTATION_SUFFIX), b'' if orientation is None else str(orientation).encode())
+        self._write(target, data)
+        return target
+
+    def prune(self):
+        """
+        Remove the oldest entries until the cache fits in max_bytes.
+        Returns the number of files removed.
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if not entry.name.endswith('.jpg'):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        removed = 0
+        entries.sort()
+        for _mtime, file_size, entry_path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(entry_path)
+            except OSError:
+                continue
+            try:
+                os.remove(os.path.splitext(entry_path)[0] + ORIENTATION_SUFFIX)
+            except OSError:
+                pass
+            total -= file_size
+            removed += 1
+        return removed
+
+
+def make_thumbnail(path, size, cache):
+    """
+    Return the result dict for one image, generating and caching as needed.
+    """
+    try:
+        st = os.stat(path)
+        key = cache_key(path, size, st)
+        cached = cache.lookup(key)
+        if cached is not None:
+            target, orientation = cached
+            dims = jpeg_dimensions(target.read_bytes())
+            source = 'cache'
+        else:
+            orientation = read_orientation(path)
+            with phase('decode'):
+                made = from_embedded(path, size)
+                source = 'embedded'
+                if made is None:
+                    made = from_decoded(path, size)
+                    source = 'decoded'
+            data, dims = made
+            target = cache.store(key, data, orientation)
+    except Exception as exc:
+        return {'path': str(path), 'error': str(exc)}
+    width, height = dims if dims else (None, None)
+    return {
+        'path': str(path),
+        'thumbnail': str(target),
+        'source': source,
+        'width': width,
+        'height': height,
+        'orientation': orientation,
+    }
+
+
+def generate_thumbnails(paths, size=DEFAULT_SIZE, cache_dir=None, max_cache_mb=DEFAULT_CACHE_MB,
+                        workers=DEFAULT_WORKERS, progress=False, cancel=None):
+    """
+    Create thumbnails for many images on a thread pool.
+
+    Args:
+        paths (list): Image paths
+        size (int): Longest side of the thumbnails in pixels
+        cache_dir (str): Cache folder; defaults to default_cache_dir()
+        max_cache_mb (int): Cache size limit in megabytes
+        workers (int): Thread pool size
+        progress (bool): Whether to emit progress lines to stdout
+        cancel: Optional cancel token; unstarted images are skipped once set
+
+    Returns:
+        dict: 'thumbnails' (in input order), 'stats' and 'cacheDir'
+    """
+    cache = ThumbnailCache(cache_dir or default_cache_dir(), int(max_cache_mb * 1024 * 1024))
+    paths = [str(p) for p in paths]
+
+    def work(path):
+        if cancel is not None and cancel.is_set():
+            return None
+        return make_thumbnail(path, size, cache)
+
+    results = []
+    with ProgressReporter(len(paths), status='Thumbnails', enabled=progress) as reporter:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for result in executor.map(work, paths):
+                if result is None:
+                    break
+                results.append(result)
+                reporter.advance()
+        reporter.finish()
+
+    with phase('io'):
+        cache.prune()
+
+    stats = {'total': len(results), 'cache': 0, 'embedded': 0, 'decoded': 0, 'failed': 0}
+    for result in results:
+        stats[result.get('source', 'failed')] += 1
+    output = {'thumbnails': results, 'stats': stats, 'cacheDir': str(cache.folder)}
+    if len(results) < len(paths):
+        output['cancelled'] = True
+        output['resumeCursor'] = len(results)
+    return output
+
+
+def main():
+    if len(sys.argv) != 2:
+        print(json.dumps({'error': 'Payload argument required'}))
+        sys.exit(1)
+    try:
+        payload = json.loads(sys.argv[1])
+    except ValueError:
+        payload = None
+    if not isinstance(payload, dict):
+        print(json.dumps({'error': 'Invalid payload JSON'}))
+        sys.exit(1)
+
+    cancel = install_cancel()
+    with Profiler.from_payload(payload):
+        paths = payload.get('paths')
+        if not isinstance(paths, list):
+            folder = payload.get('folder')
+            if not folder or not os.path.isdir(folder):
+                print(json.dumps({'error': 'paths[] or an existing folder is required'}))
+                sys.exit(1)
+            with phase('walk'):
+                paths = [p for _name, p in iter_image_files(folder, IMAGE_EXTENSIONS, bool(payload.get('recursive')))]
+        try:
+            size = max(16, int(payload.get('size') or DEFAULT_SIZE))
+            max_cache_mb = max(1, int(payload.get('maxCacheMB') or DEFAULT_CACHE_MB))
+            workers = max(1, int(payload.get('workers') or DEFAULT_WORKERS))
+        except (TypeError, ValueError):
+            print(json.dumps({'error': 'size, maxCacheMB and workers must be numbers'}))
+            sys.exit(1)
+        result = generate_thumbnails(
+            paths,
+            size=size,
+            cache_dir=payload.get('cacheDir'),
+            max_cache_mb=max_cache_mb,
+            workers=workers,
+            progress=bool(payload.get('progress')),
+            cancel=cancel
+        )
+        print(dumps(result))
+
+
+if __name__ == "__main__":
+    main()
+    try:
+        sys.stdout.flush()
+    except Exception:
+        pass
+    sys.exit(0)
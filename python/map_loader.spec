@@ -3,7 +3,7 @@
 
 a = Analysis(
     ['mapOrganizer\\map_loader.py'],
-    pathex=[],
+    pathex=[SPECPATH],  # python/common is shared by all scripts
     binaries=[],
     datas=[],
     hiddenimports=[],
@@ -3,7 +3,7 @@
 
 a = Analysis(
     ['flightRenamer\\rename_images.py'],
-    pathex=[],
+    pathex=[SPECPATH],  # python/common is shared by all scripts
     binaries=[],
     datas=[],
     hiddenimports=[],
@@ -3,7 +3,7 @@
 
 a = Analysis(
     ['geotagging\\write_gps.py'],
-    pathex=[],
+    pathex=[SPECPATH],  # python/common is shared by all scripts
     binaries=[],
     datas=[],
     hiddenimports=[],
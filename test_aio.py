@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test script for the asyncio I/O scheduler (python/common/aio.py)
+
+slow_mount() injects a fixed delay into every stat, directory listing and
+open under a local folder, which is roughly how an SMB/NFS share behaves.
+"""
+
+import builtins
+import importlib.util
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image
+from PIL.TiffImagePlugin import IFDRational
+
+# Add the python, geotagging and mapOrganizer directories to the path so we can import the modules
+sys.path.insert(0, str(Path(__file__).parent / "python"))
+sys.path.insert(0, str(Path(__file__).parent / "python" / "geotagging"))
+sys.path.insert(0, str(Path(__file__).parent / "python" / "mapOrganizer"))
+
+from common import iter_image_files
+from common.aio import IOScheduler, open_scheduler
+from copy_engine import copy_files
+
+# mapOrganizer has an extract_gps.py too, so load the geotagging one by path
+_spec = importlib.util.spec_from_file_location(
+    "geotagging_extract_gps", Path(__file__).parent / "python" / "geotagging" / "extract_gps.py")
+extract_gps = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(extract_gps)
+SUPPORTED_EXT, scan_folder = extract_gps.SUPPORTED_EXT, extract_gps.scan_folder
+
+LATENCY = 0.005
+
+
+def slow_mount(monkeypatch, root, latency=LATENCY):
+    """Delay os.stat, os.scandir and open for paths under root."""
+    root = str(root)
+
+    def delayed(real):
+        def call(path, *args, **kwargs):
+            if isinstance(path, (str, os.PathLike)) and os.fspath(path).startswith(root):
+                time.sleep(latency)
+            return real(path, *args, **kwargs)
+        return call
+
+    monkeypatch.setattr(os, "stat", delayed(os.stat))
+    monkeypatch.setattr(os, "scandir", delayed(os.scandir))
+    monkeypatch.setattr(builtins, "open", delayed(builtins.open))
+
+
+def make_jpeg(path, lat, lon):
+    exif = Image.Exif()
+    exif.get_ifd(0x8825).update({
+        1: "N", 2: (IFDRational(round(lat * 1000), 1000), IFDRational(0), IFDRational(0)),
+        3: "E", 4: (IFDRational(round(lon * 1000), 1000), IFDRational(0), IFDRational(0)),
+    })
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", (8, 8)).save(path, exif=exif)
+
+
+@pytest.fixture
+def share(tmp_path):
+    root = tmp_path / "share"
+    for f in range(4):
+        for i in range(10):
+            make_jpeg(root / f"flight_{f}" / "raw" / f"IMG_{i:03d}.JPG", 25 + f, 55 + i / 100)
+    make_jpeg(root / "Top.jpg", 24, 54)
+    return root
+
+
+def test_walk_matches_serial_order(share):
+    expected = list(iter_image_files(str(share), SUPPORTED_EXT, recursive=True))
+    with IOScheduler(8) as scheduler:
+        assert scheduler.walk(str(share), SUPPORTED_EXT, recursive=True) == expected
+        assert scheduler.walk(str(share), SUPPORTED_EXT) == [("Top.jpg", str(share / "Top.jpg"))]
+
+
+def test_scan_is_faster_on_a_slow_mount(share, monkeypatch):
+    slow_mount(monkeypatch, share)
+
+    began = time.perf_counter()
+    serial = scan_folder(share, recursive=True)
+    serial_seconds = time.perf_counter() - began
+
+    with open_scheduler({"ioConcurrency": 16}) as scheduler:
+        began = time.perf_counter()
+        concurrent = scan_folder(share, recursive=True, scheduler=scheduler)
+        concurrent_seconds = time.perf_counter() - began
+
+    assert list(concurrent["images"]) == list(serial["images"])
+    assert concurrent["stats"]["withGps"] == 41
+    assert serial_seconds / concurrent_seconds > 3, (serial_seconds, concurrent_seconds)
+
+
+def test_each_mount_has_its_own_limit(tmp_path):
+    busy = {"nas": 0, "usb": 0}
+    peak = {"nas": 0, "usb": 0}
+    lock = threading.Lock()
+
+    def touch(path):
+        key = "nas" if "nas" in path else "usb"
+        with lock:
+            busy[key] += 1
+            peak[key] = max(peak[key], busy[key])
+        time.sleep(0.01)
+        with lock:
+            busy[key] -= 1
+        return path
+
+    paths = [str(tmp_path / name / f"{i}.jpg") for i in range(12) for name in ("nas", "usb")]
+    mounts = {str(tmp_path / "nas"): 6, str(tmp_path / "usb"): 2}
+    with IOScheduler(3, mounts) as scheduler:
+        assert scheduler.map(touch, paths) == paths
+        assert scheduler.limit(scheduler.mount_of(paths[0])) == 6
+
+    assert peak == {"nas": 6, "usb": 2}
+
+
+def test_copies_through_the_scheduler(share, tmp_path):
+    sources = [p for _name, p in iter_image_files(str(share), SUPPORTED_EXT, recursive=True)]
+    jobs = [(src, str(tmp_path / "out" / f"{i:03d}.jpg")) for i, src in enumerate(sources)]
+    (tmp_path / "out").mkdir()
+
+    with IOScheduler(4) as scheduler:
+        result = copy_files(jobs, progress=False, scheduler=scheduler)
+
+    assert result["processed"] == len(jobs) and result["cursor"] == len(jobs)
+    assert all(r["ok"] for r in result["results"])
+    assert all(Path(dst).read_bytes() == Path(src).read_bytes() for src, dst in jobs)
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test script for cancellation, resume cursors and throttled progress (python/common/jobs.py)
+"""
+
+import io
+import json
+import os
+import signal
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the python and mapOrganizer directories to the path so we can import the modules
+sys.path.insert(0, str(Path(__file__).parent / "python"))
+sys.path.insert(0, str(Path(__file__).parent / "python" / "mapOrganizer"))
+
+import copy_engine
+from common import jobs
+from common.jobs import CancelToken, ProgressReporter, install_cancel, is_cancel_message
+
+
+class CancelAfter:
+    """Token that reports cancelled from the n-th check on"""
+
+    def __init__(self, checks):
+        self.checks = checks
+
+    def is_set(self):
+        self.checks -= 1
+        return self.checks < 0
+
+
+def progress_lines(text):
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def test_reporter_throttles_and_reports_eta(capsys, monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(jobs.time, "monotonic", lambda: clock[0])
+    reporter = ProgressReporter(100, interval=1.0, heartbeat=0)
+    for done in range(1, 11):
+        clock[0] += 0.05
+        reporter.update(done)
+    clock[0] += 1.0
+    reporter.update(20)
+    reporter.finish()
+
+    lines = progress_lines(capsys.readouterr().out)
+    assert [line["processed"] for line in lines] == [1, 20, 20]
+    last = lines[-1]
+    assert last["percent"] == 20 and last["status"] == "Scanning"
+    assert last["rate"] == pytest.approx(20 / 1.5, abs=0.01)
+    assert last["etaSeconds"] == pytest.approx(80 / (20 / 1.5), abs=0.1)
+
+
+def test_reporter_heartbeat_repeats_last_state(capsys):
+    with ProgressReporter(10, interval=0, heartbeat=0.05) as reporter:
+        reporter.update(3)
+        CancelToken().wait(0.3)
+    lines = progress_lines(capsys.readouterr().out)
+    assert len(lines) >= 3
+    assert {line["processed"] for line in lines} == {3}
+
+
+def test_cancel_message_formats():
+    assert is_cancel_message("cancel\n")
+    assert is_cancel_message('{"type": "cancel"}')
+    assert not is_cancel_message('{"type": "progress"}')
+    assert not is_cancel_message("")
+
+
+def test_sigterm_and_stdin_set_the_token(monkeypatch):
+    previous = signal.getsignal(signal.SIGTERM)
+    previous_int = signal.getsignal(signal.SIGINT)
+    try:
+        token = install_cancel(stdin=False)
+        os.kill(os.getpid(), signal.SIGTERM)
+        assert token.wait(1) and token.reason == "SIGTERM"
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+        signal.signal(signal.SIGINT, previous_int)
+
+    monkeypatch.setattr(sys, "stdin", io.StringIO("noise\ncancel\n"))
+    try:
+        token = install_cancel()
+        assert token.wait(1) and token.reason == "stdin"
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+        signal.signal(signal.SIGINT, previous_int)
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_cancelled_scan_resumes_where_it_stopped(tmp_path, workers):
+    pytest.importorskip("PIL")
+    from test_map_loader import make_geotagged_jpeg
+    from map_loader import CHUNK_SIZE, scan_images_for_gps
+
+    for i in range(CHUNK_SIZE * 6 + 5):
+        make_geotagged_jpeg(tmp_path / f"img_{i:03d}.jpg", 10, 20)
+
+    full = scan_images_for_gps(str(tmp_path))
+    partial = scan_images_for_gps(str(tmp_path), workers=workers, pool="thread", cancel=CancelAfter(1))
+    assert partial["cancelled"] is True
+    cursor = partial["resumeCursor"]
+    assert 0 < cursor < full["total_count"] and cursor % CHUNK_SIZE == 0
+    assert partial["images"] == full["images"][:cursor]
+
+    rest = scan_images_for_gps(str(tmp_path), workers=workers, pool="thread", resume_from=cursor)
+    assert "cancelled" not in rest
+    assert partial["images"] + rest["images"] == full["images"]
+
+
+def test_copy_files_cursor_covers_reported_jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(copy_engine, "CHUNK_JOBS", 10)
+    source_dir = tmp_path / "src"
+    dest_dir = tmp_path / "dst"
+    source_dir.mkdir()
+    dest_dir.mkdir()
+    jobs_list = []
+    for i in range(35):
+        (source_dir / f"{i}.jpg").write_bytes(b"x" * i)
+        jobs_list.append((str(source_dir / f"{i}.jpg"), str(dest_dir / f"{i}.jpg")))
+
+    token = CancelToken()
+    reported = []
+
+    def on_result(job, result):
+        reported.append(job)
+        if len(reported) == 10:
+            token.cancel()
+
+    result = copy_engine.copy_files(iter(jobs_list), workers=2, progress=False, on_result=on_result, cancel=token)
+    assert result["cancelled"] is True
+    assert result["cursor"] == len(reported) == 10
+    assert reported == jobs_list[:10]
+
+    rest = copy_engine.copy_files(jobs_list[result["cursor"]:], workers=2, progress=False)
+    assert rest["cancelled"] is False and rest["cursor"] == 25
+    assert sorted(os.listdir(dest_dir), key=lambda n: int(n.split(".")[0])) == [f"{i}.jpg" for i in range(35)]
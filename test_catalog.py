@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test script for the SQLite image catalog (python/common/catalog.py)
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image
+from PIL.TiffImagePlugin import IFDRational
+
+# Add the python and mapOrganizer directories to the path so we can import the modules
+sys.path.insert(0, str(Path(__file__).parent / "python"))
+sys.path.insert(0, str(Path(__file__).parent / "python" / "mapOrganizer"))
+
+import map_loader
+from common.catalog import Catalog
+
+
+def make_jpeg(path, lat=None, lon=None, timestamp=None, camera=None):
+    exif = Image.Exif()
+    if camera:
+        exif[0x010F], exif[0x0110] = camera
+    if timestamp:
+        exif.get_ifd(0x8769)[0x9003] = timestamp
+    if lat is not None:
+        gps = exif.get_ifd(0x8825)
+        gps.update({
+            1: "N" if lat >= 0 else "S",
+            2: (IFDRational(round(abs(lat) * 10000), 10000), IFDRational(0), IFDRational(0)),
+            3: "E" if lon >= 0 else "W",
+            4: (IFDRational(round(abs(lon) * 10000), 10000), IFDRational(0), IFDRational(0)),
+        })
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", (8, 8)).save(path, exif=exif)
+    return str(path)
+
+
+@pytest.fixture
+def library(tmp_path):
+    root = tmp_path / "survey"
+    make_jpeg(root / "mon" / "a.jpg", 25.1, 55.1, "2024:05:06 09:00:00", ("DJI", "FC6310"))
+    make_jpeg(root / "tue" / "b.jpg", 25.2, 55.2, "2024:05:07 10:00:00", ("DJI", "FC6310"))
+    make_jpeg(root / "tue" / "c.jpg", 25.9, 55.9, "2024:05:07 11:00:00", ("DJI", "FC6310"))
+    make_jpeg(root / "tue" / "thermal" / "d.jpg", 25.2, 55.2, "2024:05:07 10:00:01", ("DJI", "XT2"))
+    make_jpeg(root / "tue" / "e.jpg", timestamp="2024:05:07 12:00:00", camera=("DJI", "FC6310"))
+    return root
+
+
+@pytest.mark.parametrize("rtree", [True, False])
+def test_index_and_query(library, tmp_path, monkeypatch, rtree):
+    if not rtree:
+        monkeypatch.setattr(Catalog, "_create_rtree", lambda self: False)
+    with Catalog(str(tmp_path / "catalog.sqlite")) as catalog:
+        stats = catalog.index(str(library))
+        assert (stats["total"], stats["added"], stats["unreadable"]) == (5, 5, 0)
+
+        names = lambda rows: [row["filename"] for row in rows]
+        # "All images from camera X in this bbox last Tuesday"
+        rows = catalog.query(camera="DJI FC6310", bbox=[55.0, 25.0, 55.5, 25.5],
+                             start="2024-05-07", end="2024-05-08")
+        assert names(rows) == ["b.jpg"]
+        assert rows[0]["latitude"] == pytest.approx(25.2) and rows[0]["capturedAt"] == "2024-05-07T10:00:00"
+
+        assert names(catalog.query(folder=str(library / "tue"))) == ["b.jpg", "d.jpg", "c.jpg", "e.jpg"]
+        assert names(catalog.query(folder=str(library / "tue"), recursive=False)) == ["b.jpg", "c.jpg", "e.jpg"]
+        assert names(catalog.query(geotagged=False)) == ["e.jpg"]
+        assert catalog.summary()["cameras"] == ["DJI FC6310", "DJI XT2"]
+        if not rtree:
+            assert not catalog.has_rtree
+
+
+def test_reindex_only_reads_changes(library, tmp_path):
+    with Catalog(str(tmp_path / "catalog.sqlite")) as catalog:
+        catalog.index(str(library))
+        make_jpeg(library / "tue" / "b.jpg", 24.0, 54.0, "2024:05:07 10:00:00", ("DJI", "FC6310"))
+        os.utime(library / "tue" / "b.jpg", ns=(1, 1))
+        os.remove(library / "mon" / "a.jpg")
+
+        stats = catalog.index(str(library))
+        assert (stats["unchanged"], stats["updated"], stats["removed"], stats["added"]) == (3, 1, 1, 0)
+        assert catalog.query(bbox=[53.9, 23.9, 54.1, 24.1])[0]["filename"] == "b.jpg"
+        assert catalog.query(bbox=[55.0, 25.0, 55.5, 25.5], camera="DJI FC6310") == []
+
+
+def test_map_loader_reads_current_entries_from_catalog(library, tmp_path, monkeypatch):
+    with Catalog(str(tmp_path / "catalog.sqlite")) as catalog:
+        catalog.index(str(library))
+        stale = make_jpeg(library / "tue" / "c.jpg", 20.0, 50.0)
+        os.utime(stale, ns=(1, 1))
+
+        decoded = []
+        real_read = map_loader.read_metadata
+        monkeypatch.setattr(map_loader, "read_metadata",
+                            lambda path, **kw: decoded.append(path) or real_read(path, **kw))
+        result = map_loader.scan_images_for_gps(str(library / "tue"), recursive=True, catalog=catalog)
+
+    # Only the file changed since indexing is decoded again
+    assert decoded == [stale]
+    positions = {img["filename"]: (img["latitude"], img["longitude"]) for img in result["images"]}
+    assert positions["c.jpg"] == pytest.approx((20.0, 50.0))
+    assert positions["b.jpg"] == pytest.approx((25.2, 55.2))
+    assert sorted(positions) == ["b.jpg", "c.jpg", "d.jpg"]
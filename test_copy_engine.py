@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Test script for the Map Organizer copy engine
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the mapOrganizer directory to the path so we can import the module
+sys.path.insert(0, str(Path(__file__).parent / "python" / "mapOrganizer"))
+
+import copy_engine
+from copy_engine import copy_file, copy_files, verify_copies
+
+
+@pytest.mark.parametrize("kernel", [True, False])
+def test_copy_file_preserves_content_and_metadata(tmp_path, monkeypatch, kernel):
+    if not kernel:
+        monkeypatch.setattr(copy_engine, "_HAS_COPY_FILE_RANGE", False)
+        monkeypatch.setattr(copy_engine, "_HAS_FILE_SENDFILE", False)
+    source = tmp_path / "source.jpg"
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    source.write_bytes(data)
+    os.utime(source, (1_600_000_000, 1_600_000_000))
+    os.chmod(source, 0o640)
+
+    destination = tmp_path / "copy.jpg"
+    assert copy_file(str(source), str(destination)) == len(data)
+    assert destination.read_bytes() == data
+    assert destination.stat().st_mtime == source.stat().st_mtime
+    assert (destination.stat().st_mode & 0o777) == 0o640
+
+
+def test_copy_files_reports_results_in_job_order(tmp_path):
+    source_dir = tmp_path / "src"
+    dest_dir = tmp_path / "dst"
+    source_dir.mkdir()
+    dest_dir.mkdir()
+    for i in range(40):
+        (source_dir / f"img_{i}.jpg").write_bytes(b"x" * (i + 1))
+    (source_dir / "folder.jpg").mkdir()
+
+    names = [f"img_{i}.jpg" for i in range(40)] + ["missing.jpg", "folder.jpg"]
+    jobs = [(str(source_dir / n), str(dest_dir / n)) for n in names]
+    result = copy_files(jobs, workers=4, progress=False)
+
+    assert [r["ok"] for r in result["results"][:40]] == [True] * 40
+    assert result["results"][40]["reason"] == "missing"
+    assert result["results"][41]["reason"] == "not_file"
+    assert result["bytes_copied"] == sum(range(1, 41))
+    assert result["throughput_mb_s"] >= 0
+
+
+def test_same_destination_last_source_wins(tmp_path):
+    first = tmp_path / "a" / "img.jpg"
+    second = tmp_path / "b" / "img.jpg"
+    for path, content in ((first, b"first"), (second, b"second")):
+        path.parent.mkdir()
+        path.write_bytes(content)
+    destination = tmp_path / "img.jpg"
+
+    result = copy_files([(str(first), str(destination)), (str(second), str(destination))], workers=8, progress=False)
+
+    assert all(r["ok"] for r in result["results"])
+    assert destination.read_bytes() == b"second"
+
+
+@pytest.mark.parametrize("mode", ["hardlink", "symlink", "reflink"])
+def test_link_modes_on_same_filesystem(tmp_path, mode):
+    source = tmp_path / "img.jpg"
+    source.write_bytes(b"pixels")
+    destination = tmp_path / "export" / "img.jpg"
+    destination.parent.mkdir()
+
+    result = copy_files([(str(source), str(destination))], progress=False, mode=mode)
+    file_result = result["results"][0]
+
+    assert file_result["ok"]
+    assert destination.read_bytes() == b"pixels"
+    if mode == "hardlink":
+        assert file_result["method"] == "hardlink"
+        assert os.path.samefile(source, destination)
+    elif mode == "symlink":
+        assert file_result["method"] == "symlink"
+        assert destination.is_symlink()
+    else:
+        # Falls back to a copy on filesystems without clone support
+        assert file_result["method"] in ("reflink", "copy")
+    assert result["methods"] == {file_result["method"]: 1}
+
+
+def test_copy_replaces_previous_symlink_export(tmp_path):
+    source = tmp_path / "img.jpg"
+    source.write_bytes(b"pixels")
+    destination = tmp_path / "export.jpg"
+    copy_files([(str(source), str(destination))], progress=False, mode="symlink")
+
+    result = copy_files([(str(source), str(destination))], progress=False, mode="copy")
+
+    assert result["results"][0]["method"] == "copy"
+    assert not destination.is_symlink()
+    assert source.read_bytes() == b"pixels"
+
+
+@pytest.mark.parametrize("mode", ["copy", "reflink"])
+def test_copy_replaces_previous_hardlink_export(tmp_path, mode):
+    first = tmp_path / "a" / "img.jpg"
+    second = tmp_path / "b" / "img.jpg"
+    for path, content in ((first, b"first"), (second, b"second")):
+        path.parent.mkdir()
+        path.write_bytes(content)
+    destination = tmp_path / "img.jpg"
+    copy_files([(str(first), str(destination))], progress=False, mode="hardlink")
+
+    result = copy_files([(str(second), str(destination))], progress=False, mode=mode)
+
+    assert result["results"][0]["ok"]
+    assert destination.read_bytes() == b"second"
+    # The earlier export's source is untouched
+    assert first.read_bytes() == b"first" and first.stat().st_nlink == 1
+
+    # Copying a file over its own hard link replaces the link with a copy
+    copy_files([(str(first), str(destination))], progress=False, mode="hardlink")
+    result = copy_files([(str(first), str(destination))], progress=False, mode=mode)
+    assert result["results"][0]["ok"] and destination.read_bytes() == b"first"
+    assert not os.path.samefile(first, destination)
+
+
+def test_copy_onto_itself_is_refused(tmp_path):
+    source = tmp_path / "img.jpg"
+    source.write_bytes(b"pixels")
+
+    result = copy_files([(str(source), str(source))], progress=False)
+
+    assert result["results"][0]["reason"] == "same_file"
+    assert source.read_bytes() == b"pixels"
+
+
+def test_sync_skips_up_to_date_files(tmp_path):
+    source_dir = tmp_path / "src"
+    dest_dir = tmp_path / "dst"
+    source_dir.mkdir()
+    dest_dir.mkdir()
+    for name in ("a.jpg", "b.jpg", "c.jpg"):
+        (source_dir / name).write_bytes(name.encode() * 10)
+    jobs = [(str(source_dir / n), str(dest_dir / n)) for n in ("a.jpg", "b.jpg", "c.jpg")]
+    copy_files(jobs, progress=False)
+
+    # b.jpg changed size, c.jpg was removed from the export
+    (source_dir / "b.jpg").write_bytes(b"changed")
+    (dest_dir / "c.jpg").unlink()
+
+    result = copy_files(jobs, progress=False, sync=True)
+
+    assert [r["method"] for r in result["results"]] == ["skipped", "copy", "copy"]
+    assert (dest_dir / "b.jpg").read_bytes() == b"changed"
+
+
+def test_verify_reports_mismatches(tmp_path):
+    pairs = []
+    for i, damaged in enumerate((False, True, False)):
+        source = tmp_path / f"src_{i}.jpg"
+        destination = tmp_path / f"dst_{i}.jpg"
+        source.write_bytes(os.urandom(2 * 1024 * 1024))
+        destination.write_bytes(b"corrupt" if damaged else source.read_bytes())
+        pairs.append((str(source), str(destination)))
+    pairs.append((str(tmp_path / "gone.jpg"), str(tmp_path / "gone_copy.jpg")))
+
+    result = verify_copies(pairs, workers=3, progress=False)
+
+    assert result["verified"] == 4
+    assert [m["file"] for m in result["mismatched"]] == [pairs[1][0], pairs[3][0]]
+    assert "error" in result["mismatched"][1]
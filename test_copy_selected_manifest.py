@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Test script for copy_selected.py manifest and stdin selections
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPT = Path(__file__).parent / "python" / "mapOrganizer" / "copy_selected.py"
+
+
+@pytest.fixture
+def folders(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    for i in range(2500):
+        (source / f"img_{i:05d}.jpg").write_bytes(b"x" * 100)
+    return source, tmp_path / "dest"
+
+
+def run(source, dest, selection, stdin=None):
+    completed = subprocess.run(
+        [sys.executable, str(SCRIPT), str(source), str(dest), selection],
+        input=stdin,
+        capture_output=True,
+        text=True,
+    )
+    lines = [json.loads(line) for line in completed.stdout.splitlines() if line.strip()]
+    return completed, lines[:-1], lines[-1]
+
+
+def test_ndjson_from_stdin_is_streamed(folders):
+    source, dest = folders
+    names = [f"img_{i:05d}.jpg" for i in range(2500)]
+    stdin = "\n".join(json.dumps(n) for n in names) + "\n" + json.dumps({"filename": "missing.jpg"}) + "\nnot json\n"
+
+    completed, progress, result = run(source, dest, "-", stdin)
+
+    assert result["success"] is True
+    assert result["copied_count"] == 2500
+    assert result["processed"] == 2501
+    assert "throughput_mb_s" in result
+    assert progress and progress[0]["total"] is None
+    assert progress[-1]["processed"] == 2501
+    assert "missing.jpg" in completed.stderr
+    assert "invalid manifest line 2502" in completed.stderr
+    assert len(list(dest.iterdir())) == 2500
+
+
+def test_json_array_manifest_file(folders, tmp_path):
+    source, dest = folders
+    manifest = tmp_path / "selection.json"
+    manifest.write_text(json.dumps(["img_00001.jpg", "img_00002.jpg"]))
+
+    _, progress, result = run(source, dest, f"@{manifest}")
+
+    assert result["copied_count"] == 2
+    assert progress[-1]["total"] == 2
+    assert progress[-1]["percent"] == 100
+
+
+def test_ndjson_manifest_file_reports_total(folders, tmp_path):
+    source, dest = folders
+    manifest = tmp_path / "selection.ndjson"
+    manifest.write_text("\n".join(json.dumps(f"img_{i:05d}.jpg") for i in range(10)) + "\n\n")
+
+    _, progress, result = run(source, dest, f"@{manifest}")
+
+    assert result["copied_count"] == 10
+    assert progress[-1]["total"] == 10
+
+
+def test_missing_manifest_file(folders, tmp_path):
+    source, dest = folders
+    completed, _, result = run(source, dest, f"@{tmp_path / 'nope.ndjson'}")
+
+    assert completed.returncode == 1
+    assert result["success"] is False
+    assert "Cannot read manifest" in result["error"]
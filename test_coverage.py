@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test script for coverage analysis (python/common/coverage.py and
+python/mapOrganizer/flight_coverage.py)
+"""
+
+import base64
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add the python and mapOrganizer directories to the path so we can import the modules
+sys.path.insert(0, str(Path(__file__).parent / "python"))
+sys.path.insert(0, str(Path(__file__).parent / "python" / "mapOrganizer"))
+
+from common.coverage import Grid, label_regions, rasterize, region_outlines
+from common.geometry import LocalProjection
+from flight_coverage import analyze_coverage
+
+SCRIPT = Path(__file__).parent / "python" / "mapOrganizer" / "flight_coverage.py"
+
+
+def mission(lines=6, per_line=12, forward=60.0, side=90.0, skip=()):
+    """
+    Serpentine survey with a Phantom 4 Pro at 100 m: footprints are 150 m
+    east-west and 100 m north-south, lines run north-south `side` metres
+    apart, images are `forward` metres apart (40% forward and side overlap).
+    """
+    projection = LocalProjection(55.0, 25.0)
+    records = []
+    for line in range(lines):
+        steps = range(per_line) if line % 2 == 0 else reversed(range(per_line))
+        for step in steps:
+            n = len(records)
+            lon, lat = projection.inverse(line * side, step * forward)
+            if (line, step) in skip:
+                records.append(None)
+                continue
+            records.append({"filename": f"IMG_{n:04d}.JPG", "latitude": lat, "longitude": lon, "altitude": 100.0,
+                            "camera": "DJI FC6310", "timestamp": f"2024:05:01 10:{n // 60:02d}:{n % 60:02d}"})
+    return [r for r in records if r is not None]
+
+
+def test_rasterize_matches_brute_force():
+    rng = np.random.default_rng(3)
+    centres = rng.random((200, 2)) * 400
+    angles = rng.random(200) * np.pi
+    local = np.array([[-30, -12], [30, -12], [30, 12], [-30, 12]], dtype=float)
+    rotation = np.stack([np.stack([np.cos(angles), -np.sin(angles)], 1), np.stack([np.sin(angles), np.cos(angles)], 1)], 1)
+    quads = centres[:, None, :] + np.einsum("nij,kj->nki", rotation, local)
+    quads[::2] = quads[::2, ::-1]  # both windings
+    grid = Grid.covering(-50, -50, 450, 450, 5.0)
+
+    counts = rasterize(quads, grid)
+    assert np.array_equal(rasterize(quads, grid, chunk_cells=500), counts)
+
+    xs, ys = np.meshgrid(grid.centres_x(), grid.centres_y())
+    expected = np.zeros_like(xs, dtype=int)
+    for quad in quads:
+        a, b = quad, np.roll(quad, -1, axis=0)
+        edges = [(b[k, 0] - a[k, 0]) * (ys - a[k, 1]) - (b[k, 1] - a[k, 1]) * (xs - a[k, 0]) for k in range(4)]
+        expected += np.all(np.array(edges) >= 0, axis=0) | np.all(np.array(edges) <= 0, axis=0)
+    assert np.array_equal(counts, expected)
+
+
+def test_regions_and_outlines():
+    mask = np.zeros((6, 8), dtype=bool)
+    mask[1:5, 1:5] = True
+    mask[2:4, 2:4] = False          # a square ring with a hole
+    mask[0, 6:8] = mask[1, 7] = True  # an L
+    mask[5, 7] = True               # touches nothing
+
+    labels, count = label_regions(mask)
+    assert count == 3
+    assert sorted(np.bincount(labels.ravel())[1:].tolist()) == [1, 3, 12]
+
+    outlines = region_outlines(labels)
+    ring_label = labels[1, 1]
+    outer, hole = outlines[ring_label]
+    area = lambda ring: 0.5 * sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(ring, ring[1:] + ring[:1]))
+    assert (area(outer), area(hole)) == (16, -4)
+    assert len(outlines[labels[0, 6]]) == 1 and area(outlines[labels[0, 6]][0]) == 3
+
+
+def test_mission_overlap_and_gaps():
+    full = analyze_coverage(mission(), min_overlap=1)
+    stats = full["stats"]
+    assert stats["coveredPercent"] == 100 and stats["gapRegions"] == 0
+    assert full["overlap"]["lines"] == 6
+    assert full["overlap"]["forward"]["median"] == pytest.approx(0.4, abs=0.01)
+    assert full["overlap"]["side"]["median"] == pytest.approx(0.4, abs=0.01)
+    assert stats["histogram"][0] == 0 and stats["maxOverlap"] == 4
+    assert full["footprints"]["footprints"] == 72
+
+    # Three missing images in the middle of line 2 leave a hole between lines 1 and 3
+    holed = analyze_coverage(mission(skip={(2, 5), (2, 6), (2, 7)}), min_overlap=1)
+    assert holed["stats"]["coveredPercent"] < 100 and holed["stats"]["gapRegions"] == 1
+    gap = holed["gaps"]["features"][0]
+    lon, lat = np.array(gap["geometry"]["coordinates"][0]).mean(axis=0)
+    x, y = LocalProjection(55.0, 25.0).forward(lon, lat)
+    assert x == pytest.approx(180, abs=10) and y == pytest.approx(360, abs=20)
+    assert gap["properties"]["maxOverlap"] == 0 and gap["properties"]["areaM2"] == holed["stats"]["gapAreaM2"]
+
+    heat = holed["heatmap"]
+    data = np.frombuffer(base64.b64decode(heat["data"]), dtype=np.uint8).reshape(heat["rows"], heat["cols"])
+    assert (data == 0).any() and (data == heat["noData"]).any()
+
+
+def test_grid_is_capped():
+    result = analyze_coverage(mission(), cell_size=0.1, max_cells=20_000)
+    grid = result["grid"]
+    assert grid["rows"] * grid["cols"] <= 20_000 and grid["cellSize"] > 4
+    assert result["heatmap"]["rows"] == grid["rows"]
+
+
+def test_heatmap_bbox_covers_whole_blocks():
+    # 845 x 667 cells shrink by 2 to 423 x 334: the last block row / column is padded
+    result = analyze_coverage(mission(), cell_size=0.9)
+    grid, heat = result["grid"], result["heatmap"]
+    assert (grid["rows"], grid["cols"], heat["rows"], heat["cols"]) == (845, 667, 423, 334)
+
+    projection = LocalProjection(55.0, 25.0)
+    west, south, east, north = heat["bbox"]
+    assert heat["bbox"][:2] == grid["bbox"][:2]
+    assert (north - south) * projection.ky == pytest.approx(846 * grid["cellSize"], abs=0.05)
+    assert (east - west) * projection.kx == pytest.approx(668 * grid["cellSize"], abs=0.05)
+
+
+def test_script_with_boundary():
+    projection = LocalProjection(55.0, 25.0)
+    boundary = [projection.inverse(x, y) for x, y in [(0, 0), (600, 0), (600, 660), (0, 660)]]
+    payload = {"images": mission(), "boundary": boundary, "cellSize": 10}
+    proc = subprocess.run([sys.executable, str(SCRIPT), json.dumps(payload)], capture_output=True, text=True, check=True)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    # The boundary reaches past the last line's footprints on the east
+    assert result["stats"]["areaM2"] == pytest.approx(600 * 660, rel=0.05)
+    assert result["stats"]["gapRegions"] >= 1 and result["grid"]["cellSize"] == 10
+
+    proc = subprocess.run([sys.executable, str(SCRIPT), json.dumps({"images": [], "cellSize": -1})],
+                          capture_output=True, text=True)
+    assert proc.returncode == 1 and "Invalid coverage options" in json.loads(proc.stdout)["error"]
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script for duplicate image detection (python/common/duplicates.py)
+"""
+
+import os
+import sys
+from pathlib import Path
+
+# Add the python, flightRenamer and mapOrganizer directories to the path so we can import the modules
+sys.path.insert(0, str(Path(__file__).parent / "python"))
+sys.path.insert(0, str(Path(__file__).parent / "python" / "flightRenamer"))
+sys.path.insert(0, str(Path(__file__).parent / "python" / "mapOrganizer"))
+
+from common import duplicates
+from common.duplicates import HEAD_BYTES, HashCache, duplicate_paths, find_duplicates
+
+
+def write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_sets_keep_input_order_and_only_hash_collisions(tmp_path, monkeypatch):
+    big = os.urandom(HEAD_BYTES * 3)
+    # Same size and same head, different tail: only a full hash tells them apart
+    near = big[:-1] + bytes([big[-1] ^ 1])
+    paths = [
+        write(tmp_path / "card" / "DJI_0001.JPG", big),
+        write(tmp_path / "card" / "DJI_0002.JPG", near),
+        write(tmp_path / "card" / "small.jpg", b"abc"),
+        write(tmp_path / "unique.jpg", os.urandom(HEAD_BYTES * 2)),
+        write(tmp_path / "card copy" / "DJI_0001.JPG", big),
+        write(tmp_path / "card copy" / "small.jpg", b"abc"),
+        write(tmp_path / "empty1.jpg", b""),
+        write(tmp_path / "empty2.jpg", b""),
+    ]
+    hashed = []
+    real_hash = duplicates.hash_file
+    monkeypatch.setattr(duplicates, "hash_file", lambda p, limit=None: hashed.append((p, limit)) or real_hash(p, limit))
+
+    result = find_duplicates(paths, workers=3)
+
+    assert result["sets"] == [[paths[0], paths[4]], [paths[2], paths[5]]]
+    assert result["duplicates"] == 2 and result["bytesWasted"] == len(big) + 3
+    assert duplicate_paths(result["sets"]) == {paths[4], paths[5]}
+    # The unique-size file is never read; equal heads need a full hash
+    assert not any(p == paths[3] for p, _ in hashed)
+    assert sorted(p for p, limit in hashed if limit is None) == sorted([paths[0], paths[1], paths[2], paths[4], paths[5]])
+
+
+def test_hash_cache_reuses_and_invalidates(tmp_path):
+    data = os.urandom(HEAD_BYTES * 2)
+    a = write(tmp_path / "a.jpg", data)
+    b = write(tmp_path / "b.jpg", data)
+    cache_file = str(tmp_path / "cache" / "hashes.json")
+
+    first = find_duplicates([a, b], cache=HashCache(cache_file))
+    assert first["hashed"] == 2 and first["cacheHits"] == 0
+
+    second = find_duplicates([a, b], cache=HashCache(cache_file))
+    assert second["sets"] == first["sets"]
+    assert second["hashed"] == 0 and second["cacheHits"] == 2
+
+    os.utime(b, ns=(1, 1))
+    third = find_duplicates([a, b], cache=HashCache(cache_file))
+    assert third["hashed"] == 1 and third["cacheHits"] == 1
+
+
+def test_renamer_and_export_skip_duplicates(tmp_path):
+    from export_images import export_images
+    from rename_images import process
+
+    source = tmp_path / "mission"
+    for name, data in (("DJI_0001.JPG", b"one"), ("DJI_0002.JPG", b"two"), ("DJI_0003.JPG", b"one")):
+        write(source / name, data)
+    options = {"pattern": "F_##_####.jpg", "flightNumber": 1, "skipDuplicates": True, "hashCache": False}
+
+    preview = process({"mode": "preview", "source": str(source), "options": options})
+    assert [f["originalName"] for f in preview["files"]] == ["DJI_0001.JPG", "DJI_0002.JPG"]
+    assert preview["skippedDuplicates"] == [str(source / "DJI_0003.JPG")]
+
+    found = process({"mode": "duplicates", "source": str(source), "options": options})
+    assert found["sets"] == [[str(source / "DJI_0001.JPG"), str(source / "DJI_0003.JPG")]]
+
+    dest = tmp_path / "export"
+    dest.mkdir()
+    sources = sorted(str(p) for p in source.iterdir())
+    result = export_images(sources, str(dest), "area", progress=False, skip_duplicates=True)
+    assert result["exported_count"] == 2
+    assert result["duplicates_skipped"] == [str(source / "DJI_0003.JPG")]
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming scan exporters (python/geotagging/exporters.py)
+"""
+
+import csv
+import json
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+import pytest
+
+# Add the geotagging directory to the path so we can import the modules
+sys.path.insert(0, str(Path(__file__).parent / "python" / "geotagging"))
+
+from exporters import DiskSorter, export_records, sorted_on_disk
+from image_records import ImageRecords
+
+SCRIPT = Path(__file__).parent / "python" / "geotagging" / "extract_gps.py"
+KML = "{http://www.opengis.net/kml/2.2}"
+
+
+def make_records(count):
+    records = ImageRecords()
+    for i in range(count):
+        # Names repeat case-insensitively so the sort has ties to keep stable
+        name = f"{'IMG' if i % 2 else 'img'}_{(i * 7919) % (count // 2 or 1):05d}.jpg"
+        has_gps = i % 3 != 0
+        records.append({
+            "filename": name, "path": f"/data/f{i % 4}/{name}", "hasGps": has_gps,
+            "latitude": 25 + i / 1e4 if has_gps else None, "longitude": 55 + i / 1e4 if has_gps else None,
+            "altitude": 80.5 if i % 5 else None, "phi": None, "alpha": None, "kappa": None,
+            "writable": True, "exifStatus": "OK" if has_gps else "NO_EXIF",
+            "timestamp": "2024:05:01 10:20:30", "camera": "DJI FC6310 \"<&>\"",
+            "width": 8, "height": 8, "bytesRead": 65536,
+        })
+    return records
+
+
+def test_sort_spills_runs_and_matches_sorted(tmp_path):
+    records = make_records(1000)
+    key = lambda r: r["filename"].lower()
+    expected = [records.record(i) for i in records.order_by_name()]
+
+    merged = sorted_on_disk(records, key, run_size=64, directory=str(tmp_path))
+    first = next(merged)
+    # 15 full runs on disk; the last 40 records merge straight from memory
+    assert len(list(tmp_path.iterdir())) == 15
+    assert [first, *merged] == expected
+    assert list(tmp_path.iterdir()) == []
+
+    # Records pushed during a scan; a cancelled scan drops its runs
+    sorter = DiskSorter(key, run_size=64, directory=str(tmp_path))
+    for record in records:
+        sorter.add(record)
+    assert len(list(tmp_path.iterdir())) == 15
+    sorter.close()
+    assert list(tmp_path.iterdir()) == [] and list(sorter) == []
+
+
+def test_csv_columns(tmp_path):
+    records = make_records(10)
+    out = tmp_path / "out.csv"
+
+    result = export_records(records, out, columns=["filename", "path", "latitude", "hasGps", "bogus"], run_size=3)
+
+    rows = list(csv.reader(out.open(encoding="utf-8", newline="")))
+    assert result["columns"] == rows[0] == ["filename", "path", "latitude", "hasGps"]
+    assert result["exported"] == 10 and len(rows) == 11
+    assert [row[0] for row in rows[1:]] == [records.record(i)["filename"] for i in records.order_by_name()]
+    first = records.record(records.order_by_name()[0])
+    if first["hasGps"]:
+        assert rows[1][1:] == [first["path"], f"{first['latitude']:.6f}", "true"]
+    else:
+        assert rows[1][1:] == [first["path"], "", "false"]
+    with pytest.raises(ValueError):
+        export_records(records, out, columns=["bogus"])
+
+
+def test_geojson_and_kml_contain_geotagged_images(tmp_path):
+    records = make_records(30)
+    geotagged = [records.record(i) for i in records.order_by_name() if records.record(i)["hasGps"]]
+
+    result = export_records(records, tmp_path / "out.geojson", columns=["filename", "path", "camera"], run_size=7)
+    collection = json.loads((tmp_path / "out.geojson").read_text(encoding="utf-8"))
+    features = collection["features"]
+    assert result["format"] == "geojson" and result["exported"] == len(features) == len(geotagged)
+    assert features[0]["properties"] == {k: geotagged[0][k] for k in ("filename", "path", "camera")}
+    assert features[0]["geometry"]["coordinates"][:2] == [geotagged[0]["longitude"], geotagged[0]["latitude"]]
+
+    export_records(records, tmp_path / "out.kml", columns=["filename", "path", "camera"])
+    placemarks = ET.parse(tmp_path / "out.kml").getroot().iter(KML + "Placemark")
+    names = []
+    for placemark in placemarks:
+        names.append(placemark.findtext(KML + "name"))
+        data = {d.get("name"): d.findtext(KML + "value") for d in placemark.iter(KML + "Data")}
+        assert data["camera"] == "DJI FC6310 \"<&>\""
+    assert names == [r["filename"] for r in geotagged]
+
+
+def test_script_exports_geojson(tmp_path):
+    pytest.importorskip("PIL")
+    from PIL import Image
+    from test_map_loader import make_geotagged_jpeg
+
+    make_geotagged_jpeg(tmp_path / "b.jpg", 25, 55)
+    Image.new("RGB", (8, 8)).save(tmp_path / "A.jpg")
+    out = tmp_path / "export" / "images.geojson"
+    out.parent.mkdir()
+    payload = {"folder": str(tmp_path), "exportFormat": "geojson", "exportPath": str(out),
+               "exportColumns": ["filename", "path"]}
+
+    proc = subprocess.run([sys.executable, str(SCRIPT), json.dumps(payload)], capture_output=True, text=True, check=True)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    assert (result["csvPath"], result["exportFormat"], result["exported"]) == (str(out), "geojson", 1)
+    feature = json.loads(out.read_text(encoding="utf-8"))["features"][0]
+    assert feature["properties"] == {"filename": "b.jpg", "path": str(tmp_path / "b.jpg")}
+    assert feature["geometry"]["coordinates"][:2] == pytest.approx([55, 25])
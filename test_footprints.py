@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Test script for ground footprints (python/common/footprints.py and
+python/mapOrganizer/footprints.py)
+"""
+
+import json
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add the python and mapOrganizer directories to the path so we can import the modules
+sys.path.insert(0, str(Path(__file__).parent / "python"))
+sys.path.insert(0, str(Path(__file__).parent / "python" / "mapOrganizer"))
+
+from common.footprints import Camera, compute_footprints, footprint_areas
+from common.geometry import LocalProjection
+from footprints import footprint_collection, read_records
+
+SCRIPT = Path(__file__).parent / "python" / "mapOrganizer" / "footprints.py"
+
+# Phantom 4 Pro: 13.2 x 8.8 mm sensor, 8.8 mm lens
+P4P = Camera(13.2, 8.8, 8.8)
+TAN_X, TAN_Y = 13.2 / 17.6, 8.8 / 17.6
+
+
+def offsets(corners, lon0, lat0):
+    """Corner offsets (east, north) in metres from the camera position."""
+    projection = LocalProjection(lon0, lat0)
+    return np.array([projection.forward(lon, lat) for lon, lat in corners])
+
+
+def test_nadir_and_heading():
+    corners, valid = compute_footprints([25.0, 25.0], [55.0, 55.0], [100.0, 100.0],
+                                        kappa=[0.0, 90.0], tan_x=TAN_X, tan_y=TAN_Y)
+    assert valid.tolist() == [True, True]
+
+    # North up: 150 m across, 100 m along; top-left is north-west
+    assert offsets(corners[0], 55.0, 25.0) == pytest.approx(np.array([[-75, 50], [75, 50], [75, -50], [-75, -50]]), abs=0.01)
+    # Heading east: the image top faces east, so top-left is north-east
+    assert offsets(corners[1], 55.0, 25.0) == pytest.approx(np.array([[50, 75], [50, -75], [-50, -75], [-50, 75]]), abs=0.01)
+    assert footprint_areas(corners) == pytest.approx([15000, 15000], rel=1e-3)
+
+
+def test_tilt_and_horizon():
+    corners, valid = compute_footprints([25.0] * 3, [55.0] * 3, [100.0, 100.0, 100.0],
+                                        phi=[20.0, 0.0, 80.0], alpha=[0.0, 20.0, 0.0], tan_x=TAN_X, tan_y=TAN_Y)
+    forward, right = offsets(corners[0], 55.0, 25.0), offsets(corners[1], 55.0, 25.0)
+
+    # Pitching forward moves the footprint north and widens its far (top) edge
+    assert forward[:, 1].mean() > 30
+    assert forward[1, 0] - forward[0, 0] > forward[2, 0] - forward[3, 0]
+    # Rolling right moves it east
+    assert right[:, 0].mean() > 30 and abs(right[:, 1].mean()) < 5
+    # 80 degrees of pitch puts the top corners above the horizon
+    assert valid.tolist() == [True, True, False] and np.isnan(corners[2]).all()
+
+
+def test_matches_one_at_a_time():
+    rng = np.random.default_rng(7)
+    n = 500
+    lat, lon = 25 + rng.random(n), 55 + rng.random(n)
+    height = 50 + rng.random(n) * 100
+    phi, alpha, kappa = rng.normal(0, 5, n), rng.normal(0, 5, n), rng.random(n) * 360
+    tan_x = np.where(rng.random(n) < 0.5, TAN_X, 6.17 / 7.22)
+
+    batch, _ = compute_footprints(lat, lon, height, phi, alpha, kappa, tan_x, TAN_Y)
+    for i in range(0, n, 50):
+        single, _ = compute_footprints(lat[i:i + 1], lon[i:i + 1], height[i:i + 1], phi[i:i + 1],
+                                       alpha[i:i + 1], kappa[i:i + 1], tan_x[i], TAN_Y)
+        assert single[0] == pytest.approx(batch[i])
+
+
+def test_collection_stats_and_presets():
+    records = [
+        {"filename": "a.jpg", "filepath": "/d/a.jpg", "latitude": 25, "longitude": 55, "altitude": 130,
+         "camera": "DJI FC6310", "width": 5472},
+        {"filename": "b.jpg", "latitude": 25, "longitude": 55, "altitude": None, "camera": "DJI FC6310"},
+        {"filename": "c.jpg", "latitude": 25, "longitude": 55, "altitude": 100, "camera": "Unknown"},
+        {"filename": "d.jpg", "latitude": None, "longitude": 55, "altitude": 100},
+        {"filename": "e.jpg", "latitude": 25, "longitude": 55, "altitude": 100, "camera": "DJI FC6310", "phi": 85},
+    ]
+    result = footprint_collection(records, ground=30)
+
+    assert result["stats"] == {"total": 5, "footprints": 1, "noPosition": 1, "noAltitude": 1,
+                               "noCamera": 1, "aboveHorizon": 1}
+    feature = result["features"][0]
+    assert feature["properties"] == {"filename": "a.jpg", "filepath": "/d/a.jpg", "heightM": 100.0,
+                                     "areaM2": pytest.approx(15000, rel=1e-3), "gsdCm": 2.74}
+    ring = feature["geometry"]["coordinates"][0]
+    assert len(ring) == 5 and ring[0] == ring[-1]
+    assert result["bbox"] == feature["bbox"]
+
+    assert footprint_collection(records, camera=Camera(6.17, 4.55, 3.61))["stats"]["footprints"] == 2
+
+
+def test_script_reads_altitude_and_orientation(tmp_path):
+    pytest.importorskip("PIL")
+    from test_metadata_parity import make_exif
+    from PIL import Image
+
+    comment = json.dumps({"phi": 0, "alpha": 0, "kappa": 90})
+    Image.new("RGB", (64, 48)).save(tmp_path / "a.jpg", exif=make_exif(25, 55, alt=100, camera=("DJI", "FC6310"),
+                                                                       comment=comment))
+    Image.new("RGB", (64, 48)).save(tmp_path / "b.jpg", exif=make_exif(25, 55))
+
+    proc = subprocess.run([sys.executable, str(SCRIPT), json.dumps({"folder": str(tmp_path)})],
+                          capture_output=True, text=True, check=True)
+    lines = [json.loads(line) for line in proc.stdout.splitlines() if line.strip()]
+    result = lines[-1]
+    # Progress lines keep the app's idle watchdog quiet
+    assert lines[0]["type"] == "progress" and "cancelled" not in result
+
+    assert (result["stats"]["footprints"], result["stats"]["noAltitude"]) == (1, 1)
+    ring = result["features"][0]["geometry"]["coordinates"][0]
+    # kappa 90: the footprint is 100 m east-west and 150 m north-south
+    east_west = (max(p[0] for p in ring) - min(p[0] for p in ring)) * LocalProjection(55, 25).kx
+    assert east_west == pytest.approx(100, abs=0.5)
+
+    paths = [str(tmp_path / "a.jpg"), str(tmp_path / "b.jpg")]
+    assert [r["altitude"] for r in read_records(paths * 5, workers=3)] == [100, None] * 5
+    cancel = threading.Event()
+    cancel.set()
+    assert read_records(paths, cancel=cancel) == []
+
+    proc = subprocess.run([sys.executable, str(SCRIPT), json.dumps({"folder": str(tmp_path), "camera": {"focalLength": 8}})],
+                          capture_output=True, text=True)
+    assert "Invalid footprint options" in json.loads(proc.stdout)["error"]
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test script for budgeted header reads (HeaderReader in python/common/exif.py)
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image
+from PIL.TiffImagePlugin import IFDRational
+
+# Add the python directory to the path so we can import the modules
+sys.path.insert(0, str(Path(__file__).parent / "python"))
+
+from common import read_metadata
+from common import exif as exif_module
+from common.exif import EXTEND_CHUNK, HeaderReader
+
+
+def make_jpeg(path, size=(64, 48), comment=b"", noise=False):
+    exif = Image.Exif()
+    exif[0x010F], exif[0x0110] = "DJI", "FC6310"
+    exif.get_ifd(0x8825).update({
+        1: "S", 2: (IFDRational(33), IFDRational(51), IFDRational(2448, 100)),
+        3: "E", 4: (IFDRational(151), IFDRational(12), IFDRational(5508, 100)),
+    })
+    if comment:
+        exif.get_ifd(0x8769)[0x9286] = b"ASCII\x00\x00\x00" + comment
+    image = Image.frombytes("RGB", size, os.urandom(size[0] * size[1] * 3)) if noise else Image.new("RGB", size)
+    image.save(path, exif=exif, quality=95)
+    return path
+
+
+def test_segments_past_the_budget_are_still_read(tmp_path):
+    # A 40 KB UserComment pushes the APP1 segment well past a 4 KB budget
+    path = make_jpeg(tmp_path / "long.jpg", size=(256, 256), comment=b"x" * 40000, noise=True)
+
+    full = read_metadata(path)
+    small = read_metadata(path, budget=EXTEND_CHUNK)
+
+    assert small["bytes_read"] > EXTEND_CHUNK
+    assert small["bytes_read"] < path.stat().st_size
+    for key in ("latitude", "longitude", "camera", "width", "height", "user_comment"):
+        assert small[key] == full[key], key
+
+
+def test_reads_stay_within_the_budget(tmp_path):
+    path = make_jpeg(tmp_path / "big.jpg", size=(1024, 1024), noise=True)
+    assert path.stat().st_size > 1024 * 1024
+
+    meta = read_metadata(path, budget=16 * 1024)
+
+    assert meta["latitude"] == pytest.approx(-33.8568, abs=1e-6)
+    assert (meta["width"], meta["height"]) == (1024, 1024)
+    assert meta["bytes_read"] == 16 * 1024
+
+
+def test_png_reports_no_byte_count(tmp_path):
+    Image.new("RGB", (7, 5)).save(tmp_path / "a.png")
+    assert read_metadata(tmp_path / "a.png")["bytes_read"] is None
+
+
+@pytest.mark.skipif(not hasattr(os, "posix_fadvise"), reason="posix_fadvise not available")
+def test_page_cache_hints(tmp_path, monkeypatch):
+    path = make_jpeg(tmp_path / "a.jpg")
+    calls = []
+    monkeypatch.setattr(exif_module.os, "posix_fadvise", lambda fd, offset, length, advice: calls.append(advice))
+
+    with HeaderReader(path, budget=8192) as reader:
+        reader.read(2)
+    assert calls == [os.POSIX_FADV_RANDOM, os.POSIX_FADV_WILLNEED, os.POSIX_FADV_DONTNEED]
+
+    calls.clear()
+    with HeaderReader(path, nocache=False):
+        pass
+    assert os.POSIX_FADV_DONTNEED not in calls
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Test script for the compact image records used by geotagging/extract_gps.py
+"""
+
+import csv
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the geotagging directory to the path so we can import the module
+sys.path.insert(0, str(Path(__file__).parent / "python" / "geotagging"))
+
+from image_records import ImageRecords, iter_json
+
+SCRIPT = Path(__file__).parent / "python" / "geotagging" / "extract_gps.py"
+
+
+def sample_records():
+    return [
+        {
+            "filename": "DJI_0002.JPG", "path": "/data/flight 1/DJI_0002.JPG", "hasGps": True,
+            "latitude": -33.8568, "longitude": 151.2153, "altitude": 87.25,
+            "phi": 1.5, "alpha": -2.0, "kappa": 90.0, "writable": True, "exifStatus": "OK",
+            "timestamp": "2024:05:01 10:20:30", "camera": "DJI FC6310", "width": 5472, "height": 3648,
+            "bytesRead": 65536,
+        },
+        {
+            "filename": "a.png", "path": "/data/flight 1/a.png", "hasGps": False,
+            "latitude": None, "longitude": None, "altitude": None,
+            "phi": None, "alpha": None, "kappa": None, "writable": False, "exifStatus": "READ_ONLY",
+            "timestamp": None, "camera": None, "width": None, "height": None,
+            "bytesRead": None,
+        },
+        {
+            "filename": "Ünïcode.jpg", "path": "/data/flight 2/Ünïcode.jpg", "hasGps": False,
+            "latitude": None, "longitude": None, "altitude": 0.0,
+            "phi": None, "alpha": None, "kappa": None, "writable": True, "exifStatus": "NO_EXIF",
+            "timestamp": None, "camera": "DJI FC6310", "width": 8, "height": 8,
+            "bytesRead": 0,
+        },
+    ]
+
+
+def test_records_round_trip_with_key_order():
+    dicts = sample_records()
+    records = ImageRecords()
+    records.extend(dicts)
+
+    assert len(records) == 3
+    assert list(records) == dicts
+    assert [list(r) for r in records] == [list(d) for d in dicts]
+    # Directories and camera names are stored once
+    assert len(records.strings) == 3
+    assert records.order_by_name() == [1, 0, 2]
+    assert records.stats() == {"total": 3, "withGps": 1, "missingGps": 2, "writable": 2, "bytesRead": 65536}
+
+
+@pytest.mark.parametrize("block", [2, 512])
+def test_streamed_json_matches_json_dumps(monkeypatch, block):
+    import image_records
+
+    monkeypatch.setattr(image_records, "JSON_BLOCK", block)
+    dicts = sample_records()
+    records = ImageRecords()
+    records.extend(dicts)
+    result = {"type": "complete", "images": records, "stats": records.stats(), "note": '"images": []'}
+
+    for kwargs in ({}, {"ensure_ascii": False}, {"separators": (",", ":")}):
+        expected = json.dumps({**result, "images": dicts}, **kwargs)
+        assert "".join(iter_json(result, records, **kwargs)) == expected
+
+    empty = ImageRecords()
+    assert "".join(iter_json({"images": empty}, empty)) == '{"images": []}'
+
+
+def test_script_output_and_csv_are_unchanged(tmp_path):
+    pytest.importorskip("PIL")
+    from PIL import Image
+    from test_map_loader import make_geotagged_jpeg
+
+    make_geotagged_jpeg(tmp_path / "b.jpg", 25, 55)
+    Image.new("RGB", (8, 8)).save(tmp_path / "A.jpg")
+    csv_path = tmp_path / "out.csv"
+    payload = {"folder": str(tmp_path), "exportCsv": True, "csvPath": str(csv_path)}
+
+    proc = subprocess.run([sys.executable, str(SCRIPT), json.dumps(payload)], capture_output=True, text=True, check=True)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    assert [img["filename"] for img in result["images"]] == ["A.jpg", "b.jpg"]
+    assert result["stats"]["total"] == 2 and result["stats"]["withGps"] == 1
+    rows = list(csv.reader(csv_path.open(encoding="utf-8")))
+    assert [row[0] for row in rows] == ["filename", "A.jpg", "b.jpg"]
+    assert rows[2][1:3] == [f"{result['images'][1]['latitude']:.6f}", f"{result['images'][1]['longitude']:.6f}"]
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Test script for the boundary importer (python/mapOrganizer/import_boundaries.py)
+and the simplification in python/common/geometry.py
+"""
+
+import json
+import math
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add the python, geotagging and mapOrganizer directories to the path so we can import the modules
+sys.path.insert(0, str(Path(__file__).parent / "python"))
+sys.path.insert(0, str(Path(__file__).parent / "python" / "geotagging"))
+sys.path.insert(0, str(Path(__file__).parent / "python" / "mapOrganizer"))
+
+from common.geometry import LocalProjection, simplify
+from exporters import export_records
+from import_boundaries import import_boundaries
+
+SCRIPT = Path(__file__).parent / "python" / "mapOrganizer" / "import_boundaries.py"
+
+
+def wavy_circle(lon0=55.3, lat0=25.2, radius=200.0, n=2000):
+    """A closed ring of n vertices with 0.2 m noise around a 200 m circle."""
+    projection = LocalProjection(lon0, lat0)
+    ring = []
+    for i in range(n):
+        angle = 2 * math.pi * i / n
+        r = radius + 0.2 * math.sin(i * 1.7)
+        ring.append(projection.inverse(r * math.cos(angle), r * math.sin(angle)))
+    return ring + [ring[0]]
+
+
+def kml_coordinates(ring):
+    return " ".join(f"{lon!r},{lat!r},0" for lon, lat in ring)
+
+
+@pytest.mark.parametrize("method", ["douglas-peucker", "visvalingam"])
+def test_simplify_keeps_the_shape_within_tolerance(method):
+    ring = wavy_circle()
+    simplified = simplify(ring, 1.0, method, closed=True)
+
+    assert 8 < len(simplified) < len(ring) / 5
+    assert simplified[0] == simplified[-1] == ring[0]
+    projection = LocalProjection(55.3, 25.2)
+    radii = [math.hypot(*projection.forward(lon, lat)) for lon, lat in simplified]
+    assert all(195 < r < 201 for r in radii)
+    assert simplify(ring, 0, method) == ring
+
+
+def test_kml_polygons_paths_and_holes(tmp_path):
+    outer = wavy_circle()
+    hole = list(reversed(wavy_circle(radius=50.0, n=200)))
+    path = tmp_path / "parcels.kml"
+    path.write_text(f"""<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2"><Document><Folder>
+  <Placemark><name>Parcel 7</name><MultiGeometry>
+    <Polygon>
+      <outerBoundaryIs><LinearRing><coordinates>{kml_coordinates(outer)}</coordinates></LinearRing></outerBoundaryIs>
+      <innerBoundaryIs><LinearRing><coordinates>{kml_coordinates(hole)}</coordinates></LinearRing></innerBoundaryIs>
+    </Polygon>
+    <LineString><coordinates>55.1,25.1 55.2,25.1 55.2,25.2</coordinates></LineString>
+  </MultiGeometry></Placemark>
+  <Placemark><Polygon><outerBoundaryIs><LinearRing><coordinates>1,1</coordinates></LinearRing></outerBoundaryIs></Polygon></Placemark>
+</Folder></Document></kml>""", encoding="utf-8")
+
+    full = import_boundaries(str(path))
+    polygon, line = full["features"]
+    assert (polygon["name"], polygon["type"], line["type"]) == ("Parcel 7", "polygon", "path")
+    # Closing vertices are dropped; coordinates are [lat, lng]
+    assert [len(r) for r in polygon["rings"]] == [2000, 200]
+    assert polygon["rings"][0][0] == [round(outer[0][1], 7), round(outer[0][0], 7)]
+    assert line["coordinates"] == [[25.1, 55.1], [25.1, 55.2], [25.2, 55.2]]
+    assert full["bbox"][:2] == [55.1, 25.1]
+    assert full["bbox"][2:] == pytest.approx([max(p[0] for p in outer), max(p[1] for p in outer)])
+    assert full["stats"] == {"polygons": 1, "paths": 1, "points": 0, "skipped": 1,
+                             "vertices": 2203, "verticesKept": 2203}
+
+    simplified = import_boundaries(str(path), tolerance=1.0, method="visvalingam", precision=6)
+    assert simplified["stats"]["verticesKept"] < 300
+    assert simplified["features"][0]["bbox"] == pytest.approx(polygon["bbox"], abs=1e-5)
+
+
+def test_geojson_and_exported_points(tmp_path):
+    collection = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "properties": {"name": "Field"},
+         "geometry": {"type": "MultiPolygon", "coordinates": [
+             [[[55, 25], [55.01, 25], [55.01, 25.01], [55, 25]]],
+             [[[56, 26], [56.01, 26], [56.01, 26.01]]],
+         ]}},
+        {"type": "Feature", "properties": None, "geometry": {"type": "LineString", "coordinates": [[1, 2]]}},
+    ]}
+    (tmp_path / "fields.geojson").write_text(json.dumps(collection), encoding="utf-8")
+
+    result = import_boundaries(str(tmp_path / "fields.geojson"))
+    assert [f["rings"][0][1] for f in result["features"]] == [[25, 55.01], [26, 56.01]]
+    assert result["bbox"] == [55, 25, 56.01, 26.01]
+    assert (result["stats"]["polygons"], result["stats"]["skipped"]) == (2, 1)
+
+    cancel = threading.Event()
+    cancel.set()
+    cancelled = import_boundaries(str(tmp_path / "fields.geojson"), cancel=cancel)
+    assert cancelled["cancelled"] is True and cancelled["features"] == [] and "cancelled" not in result
+
+    # A geotagging KML export comes back as image points
+    images = [{"filename": "a.jpg", "path": "/data/a.jpg", "latitude": 25.5, "longitude": 55.5, "altitude": 90.0}]
+    export_records(images, tmp_path / "images.kml", columns=["filename", "path"])
+    points = import_boundaries(str(tmp_path / "images.kml"))["features"]
+    assert points == [{"name": "a.jpg", "type": "point", "coordinates": [25.5, 55.5], "path": "/data/a.jpg"}]
+
+
+def test_script_reports_errors(tmp_path):
+    bad = tmp_path / "bad.kml"
+    bad.write_text("<kml><Placemark>", encoding="utf-8")
+    proc = subprocess.run([sys.executable, str(SCRIPT), json.dumps({"path": str(bad)})],
+                          capture_output=True, text=True)
+    assert proc.returncode == 1 and "Boundary import failed" in json.loads(proc.stdout)["error"]
+
+    proc = subprocess.run([sys.executable, str(SCRIPT), json.dumps({"path": str(bad), "method": "nope"})],
+                          capture_output=True, text=True)
+    assert "Unknown simplification method" in json.loads(proc.stdout)["error"]
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test script for map_loader.py recursive and worker-pool scanning
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image
+from PIL.TiffImagePlugin import IFDRational
+
+# Add the mapOrganizer directory to the path so we can import the module
+sys.path.insert(0, str(Path(__file__).parent / "python" / "mapOrganizer"))
+
+from map_loader import scan_images_for_gps
+
+SCRIPT = Path(__file__).parent / "python" / "mapOrganizer" / "map_loader.py"
+
+
+def make_geotagged_jpeg(path, lat, lon):
+    """Write a tiny JPEG with a GPS IFD"""
+    exif = Image.Exif()
+    gps = exif.get_ifd(0x8825)
+    gps.update({
+        1: "N" if lat >= 0 else "S",
+        2: (IFDRational(int(abs(lat))), IFDRational(0), IFDRational(0)),
+        3: "E" if lon >= 0 else "W",
+        4: (IFDRational(int(abs(lon))), IFDRational(0), IFDRational(0)),
+    })
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", (8, 8)).save(path, exif=exif)
+
+
+@pytest.fixture
+def mission(tmp_path):
+    for i in range(150):
+        make_geotagged_jpeg(tmp_path / f"img_{i:03d}.jpg", 10 + i % 5, 20)
+    for i in range(80):
+        make_geotagged_jpeg(tmp_path / "flight_2" / f"img_{i:03d}.jpg", -10, -20)
+    (tmp_path / "notes.txt").write_text("not an image")
+    return tmp_path
+
+
+def test_top_level_only_by_default(mission):
+    result = scan_images_for_gps(str(mission))
+    assert result["total_count"] == 150
+    assert len(result["images"]) == 150
+    assert all(img["bytesRead"] > 0 for img in result["images"])
+    assert result["bytesRead"] == sum(img["bytesRead"] for img in result["images"])
+
+
+def test_recursive_scan(mission):
+    result = scan_images_for_gps(str(mission), recursive=True)
+    assert result["total_count"] == 230
+    nested = [img for img in result["images"] if "flight_2" in img["filepath"]]
+    assert len(nested) == 80
+    assert nested[0]["latitude"] == -10.0
+    assert nested[0]["longitude"] == -20.0
+
+
+@pytest.mark.parametrize("pool", ["thread", "process"])
+def test_parallel_matches_serial_order(mission, pool):
+    serial = scan_images_for_gps(str(mission), recursive=True)
+    parallel = scan_images_for_gps(str(mission), recursive=True, workers=3, pool=pool)
+    assert parallel == serial
+
+
+def test_cli_progress_lines_precede_result(mission):
+    options = json.dumps({"recursive": True, "workers": 2, "pool": "thread", "progress": True})
+    completed = subprocess.run(
+        [sys.executable, str(SCRIPT), str(mission), options],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    lines = [json.loads(line) for line in completed.stdout.splitlines() if line.strip()]
+    progress = [line for line in lines[:-1] if line.get("type") == "progress"]
+    assert progress
+    assert progress[-1]["processed"] == 230
+    assert progress[-1]["percent"] == 100
+    assert lines[-1]["total_count"] == 230
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Parity tests for the shared metadata core in python/common against the
+Pillow-based readers it replaced
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import ExifTags, Image
+from PIL.TiffImagePlugin import IFDRational
+
+# Add the python directory to the path so we can import the shared package
+sys.path.insert(0, str(Path(__file__).parent / "python"))
+
+from common import dms_to_decimal, iter_image_files, read_metadata
+
+
+def legacy_dms_to_decimal(dms, ref):
+    # Previous geotagging/extract_gps.py implementation
+    def to_float(x):
+        if isinstance(x, tuple) and len(x) == 2 and x[1]:
+            return float(x[0]) / float(x[1])
+        return float(x)
+
+    value = to_float(dms[0]) + to_float(dms[1]) / 60.0 + to_float(dms[2]) / 3600.0
+    if ref in ["S", "W"]:
+        value *= -1
+    return round(value, 8)
+
+
+def legacy_read(path):
+    # Previous Pillow-based readers, condensed. TIFF has no _getexif (the old
+    # readers reported nothing for it), so use the equivalent flattened getexif
+    with Image.open(path) as img:
+        if hasattr(img, "_getexif"):
+            exif = img._getexif() or {}
+        else:
+            raw = img.getexif()
+            exif = {**dict(raw), **dict(raw.get_ifd(0x8769)), 34853: dict(raw.get_ifd(0x8825))}
+        size = img.size
+    tags = {ExifTags.TAGS.get(k, k): v for k, v in exif.items()}
+    gps = {ExifTags.GPSTAGS.get(k, k): v for k, v in (exif.get(34853) or {}).items()}
+    lat = lon = alt = None
+    if gps.get("GPSLatitude") and gps.get("GPSLongitude"):
+        lat = legacy_dms_to_decimal(gps["GPSLatitude"], gps.get("GPSLatitudeRef", "N"))
+        lon = legacy_dms_to_decimal(gps["GPSLongitude"], gps.get("GPSLongitudeRef", "E"))
+    if gps.get("GPSAltitude") is not None:
+        alt = float(gps["GPSAltitude"])
+    make, model = tags.get("Make"), tags.get("Model")
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "altitude": alt,
+        "timestamp": tags.get("DateTimeOriginal") or tags.get("DateTime"),
+        "camera": f"{make} {model}".strip() if make and model else (model or make),
+        "orientation": tags.get("Orientation"),
+        "width": size[0],
+        "height": size[1],
+        "user_comment": tags.get("UserComment"),
+    }
+
+
+def dms(value):
+    value = abs(value)
+    degrees = int(value)
+    minutes = int((value - degrees) * 60)
+    seconds = round(((value - degrees) * 60 - minutes) * 60 * 10000)
+    return (IFDRational(degrees), IFDRational(minutes), IFDRational(seconds, 10000))
+
+
+def make_exif(lat, lon, alt=None, timestamp=None, camera=None, orientation=None, comment=None):
+    exif = Image.Exif()
+    if camera:
+        exif[0x010F], exif[0x0110] = camera
+    if orientation:
+        exif[0x0112] = orientation
+    if timestamp:
+        exif[0x0132] = "2000:01:01 00:00:00"
+        exif.get_ifd(0x8769)[0x9003] = timestamp
+    if comment:
+        exif.get_ifd(0x8769)[0x9286] = b"ASCII\x00\x00\x00" + comment.encode()
+    gps = exif.get_ifd(0x8825)
+    gps.update({1: "N" if lat >= 0 else "S", 2: dms(lat), 3: "E" if lon >= 0 else "W", 4: dms(lon)})
+    if alt is not None:
+        gps[5] = b"\x00"
+        gps[6] = IFDRational(round(alt * 100), 100)
+    return exif
+
+
+@pytest.fixture
+def samples(tmp_path):
+    full = dict(
+        lat=-33.8568, lon=151.2153, alt=87.25, timestamp="2024:05:01 10:20:30", camera=("DJI", "FC6310"),
+        comment=json.dumps({"phi": 1.5, "alpha": -2.0, "kappa": 90.0}),
+    )
+    paths = {
+        "full.jpg": (make_exif(orientation=6, **full), (64, 48)),
+        "west.jpg": (make_exif(51.5007, -0.1246), (16, 16)),
+        # Pillow reports rotated sizes for TIFF orientations 5-8; the header reader keeps stored sizes
+        "full.tif": (make_exif(**full), (20, 10)),
+    }
+    for name, (exif, size) in paths.items():
+        Image.new("RGB", size).save(tmp_path / name, exif=exif)
+    Image.new("RGB", (30, 20)).save(tmp_path / "plain.jpg")
+    return tmp_path
+
+
+@pytest.mark.parametrize("name", ["full.jpg", "west.jpg", "full.tif", "plain.jpg"])
+def test_reader_matches_pillow(samples, name):
+    path = samples / name
+    expected = legacy_read(path)
+    actual = read_metadata(path)
+    for key, value in expected.items():
+        if isinstance(value, float):
+            assert actual[key] == pytest.approx(value, abs=1e-9), key
+        else:
+            assert actual[key] == value, key
+
+
+def test_png_falls_back_to_pillow(tmp_path):
+    path = tmp_path / "a.png"
+    Image.new("RGB", (7, 5)).save(path)
+    meta = read_metadata(path)
+    assert (meta["width"], meta["height"], meta["latitude"]) == (7, 5, None)
+
+
+def test_dms_accepts_rational_tuples():
+    # map_loader previously failed on raw (num, den) tuples
+    assert dms_to_decimal(((25, 1), (30, 1), (36, 1)), "S") == -25.51
+    assert dms_to_decimal((IFDRational(25), IFDRational(30), IFDRational(36)), "N") == 25.51
+    assert dms_to_decimal(((1, 0), (0, 1), (0, 1)), "N") is None
+
+
+def test_walker_order_and_filter(tmp_path):
+    for rel in ("b.JPG", "A.jpg", "notes.txt", "sub/c.jpeg", "a_sub/d.jpg"):
+        (tmp_path / rel).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel).write_bytes(b"x")
+    names = [name for name, _ in iter_image_files(str(tmp_path), {".jpg", ".jpeg"}, recursive=True)]
+    assert names == ["A.jpg", "b.JPG", "d.jpg", "c.jpeg"]
+    assert [name for name, _ in iter_image_files(str(tmp_path), {".jpg"})] == ["A.jpg", "b.JPG"]
+
+
+def test_scripts_agree_on_coordinates(samples):
+    sys.path.insert(0, str(Path(__file__).parent / "python" / "geotagging"))
+    import extract_gps as geotag_extract
+    sys.path.pop(0)
+    sys.modules.pop("extract_gps", None)
+    sys.path.insert(0, str(Path(__file__).parent / "python" / "mapOrganizer"))
+    import map_loader
+    sys.path.pop(0)
+
+    image = geotag_extract.process_image(samples / "full.jpg")
+    scanned = map_loader.scan_images_for_gps(str(samples))
+    by_name = {img["filename"]: img for img in scanned["images"]}
+
+    assert (image["latitude"], image["longitude"], image["altitude"]) == (-33.8568, 151.2153, 87.25)
+    assert (image["phi"], image["alpha"], image["kappa"]) == (1.5, -2.0, 90.0)
+    assert (image["width"], image["height"], image["camera"]) == (64, 48, "DJI FC6310")
+    assert by_name["full.jpg"]["latitude"] == pytest.approx(-33.8568, abs=1e-9)
+    assert by_name["full.jpg"]["timestamp"] == "2024-05-01T10:20:30"
+    assert "plain.jpg" not in by_name
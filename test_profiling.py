@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared profiling hooks in python/common/profiling.py
+"""
+
+import json
+import os
+import pstats
+import subprocess
+import sys
+from pathlib import Path
+
+# Add the python directory to the path so we can import the shared package
+sys.path.insert(0, str(Path(__file__).parent / "python"))
+
+from common import profiling
+from common.profiling import Profiler, dumps, phase
+
+RENAMER = Path(__file__).parent / "python" / "flightRenamer" / "rename_images.py"
+
+
+def test_disabled_profiler_adds_nothing(monkeypatch):
+    monkeypatch.delenv(profiling.ENV_VAR, raising=False)
+    with Profiler.from_payload({}) as profiler:
+        assert phase("walk") is profiling._NULL_PHASE
+        assert dumps({"a": 1}) == json.dumps({"a": 1})
+    assert not profiler.enabled and profiler.timings == {}
+
+
+def test_timings_section_and_pstats_dump(tmp_path):
+    output = tmp_path / "run.prof"
+    with Profiler.from_payload({"profile": str(output)}):
+        with phase("walk"):
+            sum(range(1000))
+        with phase("walk"):
+            pass
+        text = dumps({"images": []})
+    data = json.loads(text)
+    assert set(data["timings"]) >= {"walk", "serialize", "total", "profile"}
+    assert pstats.Stats(str(output)).total_calls > 0
+    assert profiling.active() is None
+
+
+def test_sampled_summary_via_environment(tmp_path):
+    source = tmp_path / "card"
+    source.mkdir()
+    for i in range(3):
+        (source / f"DJI_{i}.JPG").write_bytes(b"x")
+    summary = tmp_path / "rename.txt"
+    payload = {"mode": "preview", "source": str(source), "options": {"pattern": "F_##_####.jpg"}}
+
+    completed = subprocess.run(
+        [sys.executable, str(RENAMER), json.dumps(payload)],
+        capture_output=True,
+        text=True,
+        env={**os.environ, profiling.ENV_VAR: str(summary)},
+    )
+
+    result = json.loads(completed.stdout.splitlines()[-1])
+    assert result["processed"] == 3
+    assert {"walk", "serialize", "total"} <= set(result["timings"])
+    assert summary.read_text().splitlines()[0].endswith("ms")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test script for multi-folder batch renaming in rename_images.py
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add the flightRenamer directory to the path so we can import the module
+sys.path.insert(0, str(Path(__file__).parent / "python" / "flightRenamer"))
+
+from rename_images import MANIFEST_NAME, process_batch
+
+
+def make_cards(root, counts):
+    cards = []
+    for c, count in enumerate(counts, start=1):
+        card = root / f"card{c}"
+        card.mkdir()
+        for i in range(1, count + 1):
+            (card / f"DJI_{i:04d}.JPG").write_bytes(f"{c}-{i}".encode())
+        cards.append(str(card))
+    return cards
+
+
+def run(mode, sources, output=None, **options):
+    opts = {"pattern": "Flight_##_####.jpg", "flightNumber": 1}
+    opts.update(options)
+    return process_batch({"mode": mode, "sources": sources, "output": output, "options": opts}, progress=False)
+
+
+def test_per_folder_numbering_into_shared_output(tmp_path):
+    cards = make_cards(tmp_path, [2, 3])
+    output = tmp_path / "out"
+
+    result = run("execute", cards, str(output))
+
+    assert result["updated"] == 5 and [f["copied"] for f in result["folders"]] == [2, 3]
+    assert sorted(p.name for p in output.glob("*.jpg")) == [
+        "Flight_01_0001.jpg", "Flight_01_0002.jpg",
+        "Flight_02_0001.jpg", "Flight_02_0002.jpg", "Flight_02_0003.jpg",
+    ]
+    manifest = json.loads((output / MANIFEST_NAME).read_text())
+    assert len(manifest) == 5
+
+    undo = run("undo", cards, str(output))
+    assert undo["ok"] and undo["folders"][0]["removed"] == 5
+
+
+def test_continuous_numbering_and_shared_collisions(tmp_path):
+    cards = make_cards(tmp_path, [2, 2])
+    output = tmp_path / "out"
+    output.mkdir()
+    (output / "Flight_01_0003.jpg").write_bytes(b"old")
+
+    preview = run("preview", cards, str(output), numbering="continuous")
+
+    assert [f["newName"] for f in preview["files"]] == [
+        "Flight_01_0001.jpg", "Flight_01_0002.jpg", "Flight_01_0003_1.jpg", "Flight_01_0004.jpg",
+    ]
+
+
+def test_missing_folder_is_reported_per_folder(tmp_path):
+    cards = make_cards(tmp_path, [1])
+
+    result = run("preview", cards + [str(tmp_path / "nope")])
+
+    assert [f["ok"] for f in result["folders"]] == [True, False]
+    assert result["processed"] == 1
+    assert any("nope" in err for err in result["errors"])
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test script for the in-place rename mode of rename_images.py
+"""
+
+import json
+import sys
+from pathlib import Path
+
+# Add the flightRenamer directory to the path so we can import the module
+sys.path.insert(0, str(Path(__file__).parent / "python" / "flightRenamer"))
+
+import rename_images
+from rename_images import JOURNAL_NAME, journal_temp_name, process, rename_two_phase
+
+
+def make_images(folder, names):
+    for name in names:
+        (folder / name).write_bytes(name.encode())
+
+
+def listing(folder):
+    return sorted(p.name for p in folder.iterdir() if not p.name.startswith("."))
+
+
+def run(folder, mode, **options):
+    opts = {"pattern": "Flight_##_####.jpg", "flightNumber": 1, "inPlace": True}
+    opts.update(options)
+    return process({"mode": mode, "source": str(folder), "options": opts})
+
+
+def test_chained_names_do_not_collide(tmp_path):
+    names = ["Flight_01_0001.jpg", "Flight_01_0002.jpg", "Flight_01_0003.jpg"]
+    make_images(tmp_path, names)
+
+    result = run(tmp_path, "execute", startImageNumber=2)
+
+    assert result["ok"] and result["renamed"] == 3 and result["failed"] == 0
+    assert listing(tmp_path) == ["Flight_01_0002.jpg", "Flight_01_0003.jpg", "Flight_01_0004.jpg"]
+    # Each file keeps its own content under the new name
+    assert (tmp_path / "Flight_01_0002.jpg").read_bytes() == b"Flight_01_0001.jpg"
+    assert (tmp_path / "Flight_01_0004.jpg").read_bytes() == b"Flight_01_0003.jpg"
+    assert not (tmp_path / "renamed").exists()
+
+
+def test_undo_reverses_renames(tmp_path):
+    names = ["DJI_0001.JPG", "DJI_0002.JPG", "DJI_0003.JPG"]
+    make_images(tmp_path, names)
+    run(tmp_path, "execute")
+
+    result = run(tmp_path, "undo")
+
+    assert result["ok"] and result["restored"] == 3
+    assert listing(tmp_path) == names
+    assert (tmp_path / "DJI_0002.JPG").read_bytes() == b"DJI_0002.JPG"
+    assert not (tmp_path / JOURNAL_NAME).exists()
+
+
+def test_undo_recovers_interrupted_rename(tmp_path):
+    # Simulate a crash after phase 1: one file staged, one still at its old name
+    (tmp_path / journal_temp_name("abc", 0)).write_bytes(b"first")
+    (tmp_path / "b.jpg").write_bytes(b"second")
+    journal = {
+        "version": 1,
+        "token": "abc",
+        "status": "pending",
+        "renames": [{"old": "a.jpg", "new": "b.jpg"}, {"old": "b.jpg", "new": "c.jpg"}],
+    }
+    (tmp_path / JOURNAL_NAME).write_text(json.dumps(journal))
+
+    result = run(tmp_path, "undo")
+
+    assert result["restored"] == 1
+    assert (tmp_path / "a.jpg").read_bytes() == b"first"
+    assert (tmp_path / "b.jpg").read_bytes() == b"second"
+
+
+def failing_rename(monkeypatch, fails):
+    """Make os.rename in rename_images fail for (src name, dst name) pairs in `fails`."""
+    real = rename_images.os.rename
+
+    def rename(src, dst):
+        if (Path(src).name, Path(dst).name) in fails:
+            raise OSError("simulated")
+        real(src, dst)
+
+    monkeypatch.setattr(rename_images.os, "rename", rename)
+
+
+def test_failed_chain_never_overwrites(tmp_path, monkeypatch):
+    make_images(tmp_path, ["a.jpg", "b.jpg"])
+    pairs = [("a.jpg", "b.jpg"), ("b.jpg", "c.jpg")]
+    temp = journal_temp_name("tok", 1)
+    failing_rename(monkeypatch, {(temp, "c.jpg")})
+
+    failures = rename_two_phase(tmp_path, pairs, "tok")
+
+    # b.jpg already holds a.jpg's content, so the failed file stays at its temp name
+    assert [idx for idx, _err in failures] == [1] and temp in failures[0][1]
+    assert (tmp_path / "b.jpg").read_bytes() == b"a.jpg"
+    assert (tmp_path / temp).read_bytes() == b"b.jpg"
+
+    # Undo recovers it from the journal
+    journal = {"version": 1, "token": "tok", "status": "complete",
+               "renames": [{"old": "a.jpg", "new": "b.jpg"}, {"old": "b.jpg", "new": "c.jpg", "failed": True}]}
+    (tmp_path / JOURNAL_NAME).write_text(json.dumps(journal))
+    monkeypatch.undo()
+    result = run(tmp_path, "undo")
+    assert result["restored"] == 2 and not result["errors"]
+    assert (tmp_path / "a.jpg").read_bytes() == b"a.jpg"
+    assert (tmp_path / "b.jpg").read_bytes() == b"b.jpg"
+
+
+def test_unstaged_target_is_not_overwritten(tmp_path, monkeypatch):
+    make_images(tmp_path, ["a.jpg", "b.jpg"])
+    failing_rename(monkeypatch, {("b.jpg", journal_temp_name("tok", 1))})
+
+    failures = rename_two_phase(tmp_path, [("a.jpg", "b.jpg"), ("b.jpg", "c.jpg")], "tok")
+
+    assert sorted(idx for idx, _err in failures) == [0, 1]
+    assert listing(tmp_path) == ["a.jpg", "b.jpg"]
+    assert (tmp_path / "a.jpg").read_bytes() == b"a.jpg"
+    assert (tmp_path / "b.jpg").read_bytes() == b"b.jpg"
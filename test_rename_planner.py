@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Test script for the rename planner in rename_images.py
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the flightRenamer directory to the path so we can import the module
+sys.path.insert(0, str(Path(__file__).parent / "python" / "flightRenamer"))
+
+from rename_images import claim_unique, process
+
+
+def test_claim_unique_matches_disk_probing():
+    taken = {"a.jpg", "a_1.jpg", "a_3.jpg"}
+    next_suffix = {}
+    names = [claim_unique("A.jpg", taken, next_suffix) for _ in range(3)]
+    assert names == ["A_2.jpg", "A_4.jpg", "A_5.jpg"]
+    assert claim_unique("b.jpg", taken, next_suffix) == "b.jpg"
+
+
+def test_preview_and_execute_produce_identical_names(tmp_path):
+    source = tmp_path / "cards"
+    output = source / "renamed"
+    output.mkdir(parents=True)
+    for i in range(1, 6):
+        (source / f"DJI_{i:04d}.JPG").write_bytes(b"x")
+    # A previous run already produced some of the same names
+    for i in (1, 2, 4):
+        (output / f"Flight_03_{i:04d}.jpg").write_bytes(b"old")
+    (output / "Flight_03_0001_1.jpg").write_bytes(b"old")
+
+    options = {"pattern": "Flight_##_####.jpg", "flightNumber": 3}
+    preview = process({"mode": "preview", "source": str(source), "options": options})
+    execute = process({"mode": "execute", "source": str(source), "options": options})
+
+    expected = [
+        "Flight_03_0001_2.jpg",
+        "Flight_03_0002_1.jpg",
+        "Flight_03_0003.jpg",
+        "Flight_03_0004_1.jpg",
+        "Flight_03_0005.jpg",
+    ]
+    assert [f["newName"] for f in preview["files"]] == expected
+    assert [f["newName"] for f in execute["files"]] == expected
+    assert execute["copied"] == 5
+    assert all((output / name).exists() for name in expected)
+
+
+def test_in_place_plan_treats_sources_as_free(tmp_path):
+    for name in ("Flight_01_0002.jpg", "Flight_01_0001.jpg", "notes.jpg.txt"):
+        (tmp_path / name).write_bytes(b"x")
+    options = {"pattern": "Flight_##_####.jpg", "flightNumber": 1, "startImageNumber": 2, "inPlace": True}
+
+    preview = process({"mode": "preview", "source": str(tmp_path), "options": options})
+
+    assert [f["newName"] for f in preview["files"]] == ["Flight_01_0002.jpg", "Flight_01_0003.jpg"]
+
+
+def make_timed_jpeg(path, timestamp, subsec=None):
+    from PIL import Image
+
+    exif = Image.Exif()
+    exif_ifd = exif.get_ifd(0x8769)
+    exif_ifd[0x9003] = timestamp
+    if subsec:
+        exif_ifd[0x9291] = subsec
+    Image.new("RGB", (8, 8)).save(path, exif=exif)
+
+
+def test_capture_time_ordering(tmp_path):
+    pytest.importorskip("PIL")
+    # Camera counter rolled over: DJI_0001 was shot after DJI_9999
+    make_timed_jpeg(tmp_path / "DJI_0001.JPG", "2024:05:01 10:00:06")
+    make_timed_jpeg(tmp_path / "DJI_9998.JPG", "2024:05:01 10:00:02", "250")
+    make_timed_jpeg(tmp_path / "DJI_9999.JPG", "2024:05:01 10:00:02", "750")
+    (tmp_path / "no_exif.png").write_bytes(b"not really a png")
+
+    options = {"pattern": "F_##_####.jpg", "sortBy": "captureTime", "workers": 4}
+    preview = process({"mode": "preview", "source": str(tmp_path), "options": options})
+
+    assert [f["originalName"] for f in preview["files"]] == ["DJI_9998.JPG", "DJI_9999.JPG", "DJI_0001.JPG", "no_exif.png"]
+    assert [f["imageNumber"] for f in preview["files"]] == [1, 2, 3, 4]
+
+
+def test_header_reader_matches_pillow(tmp_path):
+    pytest.importorskip("PIL")
+    from rename_images import load_timestamp, read_header_meta
+
+    path = tmp_path / "a.jpg"
+    make_timed_jpeg(path, "2023:12:31 23:59:59")
+    assert read_header_meta(path)["timestamp"] == load_timestamp(path) == "2023:12:31 23:59:59"
+
+
+def test_auto_flights_split_on_time_gap(tmp_path):
+    pytest.importorskip("PIL")
+    for name, ts in (("a.jpg", "2024:05:01 10:00:00"), ("b.jpg", "2024:05:01 10:00:04"),
+                     ("c.jpg", "2024:05:01 10:30:00"), ("d.jpg", "2024:05:01 10:30:02")):
+        make_timed_jpeg(tmp_path / name, ts)
+
+    options = {"pattern": "F_##_####.jpg", "flightNumber": 7, "autoFlights": True}
+    preview = process({"mode": "preview", "source": str(tmp_path), "options": options})
+
+    assert [f["newName"] for f in preview["files"]] == ["F_07_0001.jpg", "F_07_0002.jpg", "F_08_0001.jpg", "F_08_0002.jpg"]
+    assert [(s["flightNumber"], s["count"], s["durationSeconds"]) for s in preview["segments"]] == [(7, 2, 4.0), (8, 2, 2.0)]
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_flight_boundaries_on_position_jump(monkeypatch, use_numpy):
+    import rename_images
+
+    if not use_numpy:
+        monkeypatch.setattr(rename_images, "np", None)
+    elif rename_images.np is None:
+        pytest.skip("numpy not installed")
+    epochs = [0.0, 2.0, 4.0, 6.0, 900.0]
+    # ~11 m steps, then a ~5.5 km jump, then a long pause
+    lats = [25.0, 25.0001, 25.0002, 25.05, 25.05]
+    lons = [55.0, 55.0, 55.0, 55.0, None]
+
+    assert rename_images.flight_boundaries(epochs, lats, lons, 300, 0) == [4]
+    assert rename_images.flight_boundaries(epochs, lats, lons, 300, 1000) == [3, 4]
+
+
+def test_paged_preview_keeps_global_conflicts(tmp_path):
+    output = tmp_path / "renamed"
+    output.mkdir()
+    for i in range(1, 121):
+        (tmp_path / f"DJI_{i:04d}.JPG").write_bytes(b"x")
+    (output / "F_01_0003.jpg").write_bytes(b"old")
+    options = {"pattern": "F_##_####.jpg", "flightNumber": 1}
+
+    full = process({"mode": "preview", "source": str(tmp_path), "options": options})
+    page = process({"mode": "preview", "source": str(tmp_path), "options": options, "offset": 50, "limit": 20})
+
+    assert len(page["files"]) == 20 and page["offset"] == 50 and page["limit"] == 20
+    assert page["files"] == full["files"][50:70]
+    assert page["processed"] == 120
+    assert page["summary"] == full["summary"] == {"total": 120, "duplicates": 0, "suffixed": 1, "firstConflict": 2}
+
+
+def test_template_tokens_from_header_metadata(tmp_path):
+    pytest.importorskip("PIL")
+    from PIL import Image
+    from PIL.TiffImagePlugin import IFDRational
+
+    exif = Image.Exif()
+    exif[0x0110] = "FC6310 Pro"
+    exif.get_ifd(0x8769)[0x9003] = "2024:05:01 10:20:30"
+    gps = exif.get_ifd(0x8825)
+    gps[5] = b"\x00"
+    gps[6] = IFDRational(1237, 10)
+    Image.new("RGB", (8, 8)).save(tmp_path / "DJI_0001.JPG", exif=exif)
+
+    options = {"pattern": "{date}_{time}_{model}_{alt:25}_F{flight:3}_{seq:6}.jpg", "flightNumber": 4}
+    preview = process({"mode": "preview", "source": str(tmp_path), "options": options})
+
+    assert preview["files"][0]["newName"] == "20240501_102030_FC6310-Pro_100m_F004_000001.jpg"
+
+
+def test_legacy_placeholders_unchanged():
+    from rename_images import build_name
+
+    options = {"pattern": "A######_###.jpg", "prefix": "p_", "includeOriginal": True, "flightNumber": 3}
+    assert build_name(options, 4, ".JPG", "DJI_9.JPG", "") == ("p_A000503_03#_DJI_9.jpg", 3, 5)
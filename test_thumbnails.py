@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test script for the thumbnail service in mapOrganizer/thumbnails.py
+"""
+
+import io
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("PIL")
+from PIL import Image
+
+# Add the mapOrganizer directory to the path so we can import the module
+sys.path.insert(0, str(Path(__file__).parent / "python" / "mapOrganizer"))
+
+import thumbnails
+from thumbnails import ThumbnailCache, generate_thumbnails, read_thumbnail
+
+
+def jpeg_bytes(size, color="red"):
+    out = io.BytesIO()
+    Image.new("RGB", size, color).save(out, "JPEG")
+    return out.getvalue()
+
+
+def make_with_thumbnail(path, thumb_size=(320, 240)):
+    piexif = pytest.importorskip("piexif")
+    exif = piexif.dump({"0th": {piexif.ImageIFD.Orientation: 6}, "1st": {}, "thumbnail": jpeg_bytes(thumb_size, "blue")})
+    Image.new("RGB", (1600, 1200), "red").save(path, "JPEG", exif=exif)
+    # piexif stores the thumbnail without its JFIF segment
+    return piexif.load(str(path))["thumbnail"]
+
+
+def test_embedded_thumbnail_is_read_from_the_header(tmp_path):
+    path = tmp_path / "a.jpg"
+    thumb = make_with_thumbnail(path)
+    assert read_thumbnail(path) == thumb
+
+    Image.new("RGB", (64, 48)).save(tmp_path / "plain.jpg")
+    assert read_thumbnail(tmp_path / "plain.jpg") is None
+
+
+def test_sources_cache_and_invalidation(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "cache"
+    embedded = tmp_path / "a.jpg"
+    thumb = make_with_thumbnail(embedded)
+    decoded = tmp_path / "b.jpg"
+    Image.new("RGB", (1600, 1200), "green").save(decoded)
+    paths = [embedded, decoded, tmp_path / "missing.jpg"]
+
+    first = generate_thumbnails(paths, size=256, cache_dir=str(cache_dir), workers=2)
+    a, b, missing = first["thumbnails"]
+    assert (a["source"], a["width"], a["height"], a["orientation"]) == ("embedded", 320, 240, 6)
+    assert Path(a["thumbnail"]).read_bytes() == thumb
+    assert b["source"] == "decoded" and max(b["width"], b["height"]) == 256
+    assert "error" in missing
+    assert first["stats"] == {"total": 3, "cache": 0, "embedded": 1, "decoded": 1, "failed": 1}
+
+    # Cache hits keep the orientation without reading the source header
+    with monkeypatch.context() as m:
+        m.setattr(thumbnails, "read_header", lambda *args: pytest.fail("source header read on a cache hit"))
+        second = generate_thumbnails(paths[:2], size=256, cache_dir=str(cache_dir))
+    assert [t["source"] for t in second["thumbnails"]] == ["cache", "cache"]
+    assert second["thumbnails"][0]["thumbnail"] == a["thumbnail"]
+    assert [t["orientation"] for t in second["thumbnails"]] == [6, None]
+
+    # A changed file gets a new cache entry; a larger size skips the small embedded one
+    os.utime(decoded, ns=(1, 1))
+    third = generate_thumbnails(paths[:2], size=400, cache_dir=str(cache_dir))
+    assert [t["source"] for t in third["thumbnails"]] == ["decoded", "decoded"]
+
+
+def test_cache_prunes_least_recently_used(tmp_path):
+    cache = ThumbnailCache(tmp_path, max_bytes=2500)
+    for i, name in enumerate(("old.jpg", "mid.jpg", "new.jpg")):
+        cache.store(name, b"x" * 1000)
+        os.utime(tmp_path / name, (1000 + i, 1000 + i))
+    assert cache.lookup("old.jpg") is not None  # a hit makes it the newest
+
+    assert cache.prune() == 1
+    assert sorted(os.listdir(tmp_path)) == ["new.jpg", "new.orientation", "old.jpg", "old.orientation"]